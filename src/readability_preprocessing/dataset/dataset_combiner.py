@@ -1,5 +1,12 @@
-import pandas as pd
-from datasets import Dataset, load_dataset, load_from_disk
+import numpy as np
+import pyarrow as pa
+from datasets import (
+    Dataset,
+    Features,
+    concatenate_datasets,
+    load_dataset,
+    load_from_disk,
+)
 
 
 def _load_datasets(paths: list[str]) -> list[Dataset]:
@@ -24,30 +31,74 @@ def _remove_ambiguous_samples(
     Ambiguous readability scores are the percent_to_remove% in the middle of the
     dataset. Unambiguous readability scores are the (percent_to_remove/2)% with the
     lowest and the (percent_to_remove/2)% with the highest readability scores.
+    The samples are sorted by score with a stable argsort of the score column and
+    selected by their indices, so no sample is loaded into Python.
     :param dataset: The dataset.
     :param percent_to_remove: The percentage of samples to remove from the middle of the
     dataset.
-    :return: The dataset without the ambiguous samples.
+    :return: The dataset without the ambiguous samples, sorted by readability score.
     """
     # Sort the dataset samples by readability score
-    sorted_samples = sorted(dataset, key=lambda x: x["score"])
+    scores = dataset.with_format("numpy")["score"]
+    sorted_indices = np.argsort(scores, kind="stable")
 
     # Calculate the number of samples to remove from the start and end
-    num_samples = len(sorted_samples)
+    num_samples = len(sorted_indices)
     num_to_remove = int(num_samples * percent_to_remove)
     num_to_remove_from_start_and_end = int(num_to_remove / 2)
 
-    # Get the indices of samples to be kept (lowest 25% and highest 25%)
-    indices_to_keep = set(range(num_to_remove_from_start_and_end)).union(
-        set(range(num_samples - num_to_remove_from_start_and_end, num_samples))
+    # Keep the samples with the lowest and the highest scores (lowest 25% and highest
+    # 25%)
+    indices_to_keep = np.concatenate(
+        [
+            sorted_indices[:num_to_remove_from_start_and_end],
+            sorted_indices[num_samples - num_to_remove_from_start_and_end :],
+        ]
     )
 
-    # Create a new dataset without the ambiguous samples
-    filtered_samples = [
-        sample for i, sample in enumerate(sorted_samples) if i in indices_to_keep
-    ]
+    return dataset.select(indices_to_keep)
+
 
-    return dataset.from_list(filtered_samples)
+def _unify_schema(datasets: list[Dataset]) -> pa.Schema:
+    """
+    Unifies the schemas of the datasets. Columns that are missing in a dataset are
+    added and column types are promoted, e.g. from float32 to float64.
+    :param datasets: The datasets.
+    :return: The schema with the columns of all datasets.
+    """
+    return pa.unify_schemas(
+        [dataset.features.arrow_schema for dataset in datasets],
+        promote_options="permissive",
+    )
+
+
+def _add_missing_columns(dataset: Dataset, schema: pa.Schema) -> Dataset:
+    """
+    Adds the columns of the schema that are missing in the dataset as columns of null
+    values.
+    :param dataset: The dataset.
+    :param schema: The unified schema.
+    :return: The dataset with all columns of the schema.
+    """
+    for field in schema:
+        if field.name not in dataset.column_names:
+            dataset = dataset.add_column(field.name, pa.nulls(len(dataset), field.type))
+    return dataset
+
+
+def _cast_to_schema(dataset: Dataset, schema: pa.Schema) -> Dataset:
+    """
+    Casts the dataset to the unified schema. Only datasets with different column types
+    are cast, in memory and in batches of Arrow records.
+    :param dataset: The dataset with all columns of the schema.
+    :param schema: The unified schema.
+    :return: The dataset with the columns of the schema in the order of the schema.
+    """
+    dataset = dataset.select_columns(schema.names)
+    features = Features.from_arrow_schema(schema)
+    if dataset.features.arrow_schema.equals(features.arrow_schema):
+        return dataset
+    return dataset.cast(features, keep_in_memory=True)
 
 
 def combine_datasets(
@@ -56,26 +107,29 @@ def combine_datasets(
     """
     Combines the datasets from the specified paths and saves the combined dataset to
     the output path.
+    The datasets are memory-mapped and concatenated as Arrow tables. The ambiguous
+    samples are removed by selecting the indices of the remaining samples, so the
+    samples are only copied when the combined dataset is saved.
+    If the datasets have different columns, missing columns are filled with null values.
     :param dataset_paths: The paths to the datasets.
     :param percent_to_remove: The percentage of ambiguous samples to remove from the
     dataset. If None, no samples are removed.
     :param output_path: The output path.
     """
     datasets = _load_datasets(dataset_paths)
+    schema = _unify_schema(datasets)
+
+    # Missing columns are added before the selection, which would otherwise be copied
+    datasets = [_add_missing_columns(dataset, schema) for dataset in datasets]
     if percent_to_remove is not None:
         datasets = [
             _remove_ambiguous_samples(dataset, percent_to_remove)
             for dataset in datasets
         ]
+    datasets = [_cast_to_schema(dataset, schema) for dataset in datasets]
 
-    # Convert the datasets to pandas dataframes
-    dfs = [dataset.to_pandas() for dataset in datasets]
-
-    # Concatenate the dataframes
-    combined_df = pd.concat(dfs)
-
-    # Convert the dataframe to a dataset
-    combined_dataset = Dataset.from_pandas(combined_df)
+    # Concatenate the datasets
+    combined_dataset = concatenate_datasets(datasets)
 
     combined_dataset.save_to_disk(output_path)
 
@@ -1,11 +1,19 @@
 import logging
 import os
+import tempfile
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from contextlib import nullcontext
 from enum import Enum
 
 import pandas as pd
 from datasets import Dataset
 
+from src.readability_preprocessing.utils.snippet_archive import SnippetArchive
+
+# The number of rows that are buffered before they are written to an Arrow shard
+WRITER_BATCH_SIZE = 1000
+
 
 def _get_snippet_name(file_name: str, prefix: str) -> str:
     """
@@ -53,7 +61,6 @@ class CodeLoader(ABC):
     Loads the code snippets from the files.
     """
 
-    @abstractmethod
     def load(self, data_dir: str) -> dict:
         """
         Loads the code snippets from the files to a dictionary. The file names are used
@@ -61,6 +68,15 @@ class CodeLoader(ABC):
         :param data_dir: Path to the directory containing the code snippets.
         :return: The code snippets as a dictionary.
         """
+        return dict(self.iterate(data_dir))
+
+    @abstractmethod
+    def iterate(self, data_dir: str) -> Iterator[tuple[str, str]]:
+        """
+        Loads the code snippets from the files one at a time.
+        :param data_dir: Path to the directory containing the code snippets.
+        :return: The file names and the code snippets.
+        """
         pass
 
     @abstractmethod
@@ -78,25 +94,21 @@ class ScalabrioCodeLoader(CodeLoader):
     Loads the code snippets of the Scalabrio dataset.
     """
 
-    def load(self, data_dir: str) -> dict:
+    def iterate(self, data_dir: str) -> Iterator[tuple[str, str]]:
         """
-        Loads the code snippets from the files to a dictionary. The file names are used
-        as keys and the code snippets as values.
+        Loads the code snippets from the files one at a time.
         :param data_dir: Path to the directory containing the code snippets.
-        :return: The code snippets as a dictionary.
+        :return: The file names and the code snippets.
         """
-        code_snippets = {}
-
         # Iterate through the files in the directory
         for file in os.listdir(data_dir):
             with open(os.path.join(data_dir, file)) as f:
                 # Replace "1.jsnp" with "Snippet1" etc. to match file names in the CSV
                 file_name = file.split(".")[0]
                 file_name = f"Snippet{file_name}"
-                code_snippets[file_name] = f.read()
-                logging.info(f"Loaded code snippet {file_name}")
-
-        return code_snippets
+                code_snippet = f.read()
+            logging.info(f"Loaded code snippet {file_name}")
+            yield file_name, code_snippet
 
     def get_snippet_name(self, file_name: str) -> str:
         """
@@ -112,23 +124,19 @@ class BWCodeLoader(CodeLoader):
     Loads the code snippets of the BW dataset.
     """
 
-    def load(self, data_dir: str) -> dict:
+    def iterate(self, data_dir: str) -> Iterator[tuple[str, str]]:
         """
-        Loads the code snippets from the files to a dictionary. The file names are used
-        as keys and the code snippets as values.
+        Loads the code snippets from the files one at a time.
         :param data_dir: Path to the directory containing the code snippets.
-        :return: The code snippets as a dictionary.
+        :return: The file names and the code snippets.
         """
-        code_snippets = {}
-
         # Iterate through the files in the directory
         for file in os.listdir(data_dir):
             with open(os.path.join(data_dir, file)) as f:
                 file_name = file.split(".")[0]
-                code_snippets[file_name] = f.read()
-                logging.info(f"Loaded code snippet {file_name}")
-
-        return code_snippets
+                code_snippet = f.read()
+            logging.info(f"Loaded code snippet {file_name}")
+            yield file_name, code_snippet
 
     def get_snippet_name(self, file_name: str) -> str:
         """
@@ -144,23 +152,19 @@ class DornCodeLoader(CodeLoader):
     Loads the java code snippets of the Dorn dataset.
     """
 
-    def load(self, data_dir: str) -> dict:
+    def iterate(self, data_dir: str) -> Iterator[tuple[str, str]]:
         """
-        Loads the code snippets from the files to a dictionary. The file names are used
-        as keys and the code snippets as values.
+        Loads the code snippets from the files one at a time.
         :param data_dir: Path to the directory containing the code snippets.
-        :return: The code snippets as a dictionary.
+        :return: The file names and the code snippets.
         """
-        code_snippets = {}
-
         # Iterate through the files in the directory
         for file in os.listdir(data_dir):
             with open(os.path.join(data_dir, file)) as f:
                 file_name = file.split(".")[0]
-                code_snippets[file_name] = f.read()
-                logging.info(f"Loaded code snippet {file_name}")
-
-        return code_snippets
+                code_snippet = f.read()
+            logging.info(f"Loaded code snippet {file_name}")
+            yield file_name, code_snippet
 
     def get_snippet_name(self, file_name: str) -> str:
         """
@@ -183,14 +187,21 @@ class KrodCodeLoader(CodeLoader):
         super().__init__()
         self.name_appendix = name_appendix
 
-    def load(self, data_dir: str) -> dict:
+    def iterate(self, data_dir: str) -> Iterator[tuple[str, str]]:
         """
-        Loads the code snippets from the files to a dictionary.
-        The path name and file names are used as keys and the code snippets as values.
+        Loads the code snippets from the files one at a time.
+        The path name and file names are used as file names.
+        The directory may also be a snippet archive.
         :param data_dir: Path to the directory containing the code snippets.
-        :return: The code snippets as a dictionary.
+        :return: The file names and the code snippets.
         """
-        code_snippets = {}
+        if SnippetArchive.is_archive(data_dir):
+            for path, code in SnippetArchive(data_dir).items():
+                root, file = os.path.split(os.path.join(data_dir, path))
+                file_name = self._file_name(data_dir, file, root)
+                logging.info(f"Loaded code snippet {file_name}")
+                yield file_name, code
+            return
 
         # Iterate through the files in the directory and subdirectories
         for root, _, files in os.walk(data_dir):
@@ -201,10 +212,9 @@ class KrodCodeLoader(CodeLoader):
 
                 with open(os.path.join(root, file)) as f:
                     file_name = self._file_name(data_dir, file, root)
-                    code_snippets[file_name] = f.read()
-                    logging.info(f"Loaded code snippet {file_name}")
-
-        return code_snippets
+                    code_snippet = f.read()
+                logging.info(f"Loaded code snippet {file_name}")
+                yield file_name, code_snippet
 
     def _file_name(self, data_dir: str, file: str, root: str) -> str:
         """
@@ -339,6 +349,73 @@ class DornCsvLoader(CsvLoader):
         return data_dict
 
 
+def _generate_rated_snippets(
+    code_loader: CodeLoader, data_dir: str, scores: dict
+) -> Iterator[dict]:
+    """
+    Loads the code snippets one at a time and yields those with scores.
+    :param code_loader: The code loader.
+    :param data_dir: Path to the directory containing the code snippets.
+    :param scores: The (mean) scores of the file names.
+    :return: The name, code snippet and score of each rated code snippet.
+    """
+    missing = set(scores)
+    for file_name, code_snippet in code_loader.iterate(data_dir):
+        if file_name not in scores:
+            continue
+        missing.discard(file_name)
+        yield {
+            "name": code_loader.get_snippet_name(file_name),
+            "code_snippet": code_snippet,
+            "score": scores[file_name],
+        }
+
+    if missing:
+        raise KeyError(f"No code snippets found for: {', '.join(sorted(missing))}")
+
+
+def _generate_scored_snippets(
+    folders: list[tuple[CodeLoader, str, float]],
+) -> Iterator[dict]:
+    """
+    Loads the code snippets of the folders one at a time and assigns them the score
+    of their folder.
+    :param folders: The code loader, directory and score of each folder.
+    :return: The name, code snippet and score of each code snippet.
+    """
+    for code_loader, data_dir, score in folders:
+        for file_name, code_snippet in code_loader.iterate(data_dir):
+            yield {
+                "name": code_loader.get_snippet_name(file_name),
+                "code_snippet": code_snippet,
+                "score": score,
+            }
+
+
+def _dataset_from_generator(
+    generator: Callable[..., Iterator[dict]], gen_kwargs: dict, cache_dir: str
+) -> Dataset:
+    """
+    Builds a dataset from a generator. The rows are written to Arrow shards in the
+    cache directory in batches, so the dataset is never held in memory.
+    The cache directory must be new or empty, as datasets reuses cached shards of a
+    generator with the same arguments, even if the code snippets have changed.
+    :param generator: The generator of the rows.
+    :param gen_kwargs: The arguments of the generator.
+    :param cache_dir: The directory the Arrow shards are written to.
+    :return: The HuggingFace dataset.
+    """
+    if cache_dir is None:
+        raise ValueError("The streaming conversion requires a cache directory.")
+
+    return Dataset.from_generator(
+        generator,
+        gen_kwargs=gen_kwargs,
+        cache_dir=cache_dir,
+        writer_batch_size=WRITER_BATCH_SIZE,
+    )
+
+
 class CsvFolderToDataset:
     """
     A data loader for loading data from a CSV file and the corresponding code snippets.
@@ -353,13 +430,35 @@ class CsvFolderToDataset:
         self.csv_loader = csv_loader
         self.code_loader = code_loader
 
-    def convert_to_dataset(self, csv: str, data_dir: str) -> Dataset:
+    def convert_to_dataset(
+        self,
+        csv: str,
+        data_dir: str,
+        streaming: bool = False,
+        cache_dir: str = None,
+    ) -> Dataset:
         """
         Loads the data and converts it to the HuggingFace format.
+        In streaming mode, the code snippets are loaded one at a time and written to
+        Arrow shards in the cache directory. The rows are then in the order of the code
+        loader instead of the order of the CSV file.
         :param csv: Path to the CSV file containing the scores.
         :param data_dir: Path to the directory containing the code snippets.
+        :param streaming: Whether to convert the code snippets in streaming mode.
+        :param cache_dir: The directory for the Arrow shards. Required for streaming.
         :return: The HuggingFace datasets.
         """
+        if streaming:
+            return _dataset_from_generator(
+                _generate_rated_snippets,
+                {
+                    "code_loader": self.code_loader,
+                    "data_dir": data_dir,
+                    "scores": self.csv_loader.load(csv),
+                },
+                cache_dir,
+            )
+
         aggregated_scores, code_snippets = self._load_from_storage(csv, data_dir)
 
         # Combine the scores and the code snippets into a list
@@ -411,15 +510,30 @@ class TwoFoldersToDataset:
         rdh_data_dir: str,
         original_score: float = 3.68,  # 4.5
         rdh_score: float = 3.26,  # 1.5
+        streaming: bool = False,
+        cache_dir: str = None,
     ) -> Dataset:
         """
         Loads the data and converts it to the HuggingFace format.
+        In streaming mode, the code snippets are loaded one at a time and written to
+        Arrow shards in the cache directory.
         :param original_data_dir: Path to the directory containing the original code
         :param rdh_data_dir: Path to the directory containing the RDH code
         :param original_score: The score for the original code
         :param rdh_score: The score for the RDH code
+        :param streaming: Whether to convert the code snippets in streaming mode
+        :param cache_dir: The directory for the Arrow shards. Required for streaming.
         :return: The HuggingFace datasets.
         """
+        if streaming:
+            folders = [
+                (self.code_loader, original_data_dir, original_score),
+                (self.rdh_loader, rdh_data_dir, rdh_score),
+            ]
+            return _dataset_from_generator(
+                _generate_scored_snippets, {"folders": folders}, cache_dir
+            )
+
         original_code_snippets = self.code_loader.load(original_data_dir)
         rdh_code_snippets = self.rdh_loader.load(rdh_data_dir)
 
@@ -578,8 +692,23 @@ def _build_csv_folder_to_dataset(dataset_type: DatasetType) -> CsvFolderToDatase
     raise ValueError(f"Dataset type {dataset_type} not supported.")
 
 
+def _streaming_cache_dir(streaming: bool):
+    """
+    Creates a temporary cache directory for the Arrow shards of a streaming conversion.
+    :param streaming: Whether the conversion is in streaming mode.
+    :return: A context manager of the cache directory or of None, if not streaming.
+    """
+    if not streaming:
+        return nullcontext()
+    return tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+
+
 def convert_dataset_csv(
-    csv: str, snippets_dir: str, output_path: str, dataset_type: DatasetType
+    csv: str,
+    snippets_dir: str,
+    output_path: str,
+    dataset_type: DatasetType,
+    streaming: bool = False,
 ):
     """
     Loads the data and converts it to the HuggingFace format.
@@ -587,6 +716,8 @@ def convert_dataset_csv(
     :param snippets_dir: Path to the directory containing the code snippets.
     :param output_path: Path to the output directory
     :param dataset_type: The type of the dataset
+    :param streaming: Whether to load the code snippets one at a time and write them
+    to Arrow shards in a temporary directory, so the memory usage is bounded
     :return: The HuggingFace datasets.
     """
     # Log the configuration
@@ -594,13 +725,16 @@ def convert_dataset_csv(
 
     # Load the data
     data_loader = _build_csv_folder_to_dataset(dataset_type)
-    dataset = data_loader.convert_to_dataset(csv, snippets_dir)
+    with _streaming_cache_dir(streaming) as cache_dir:
+        dataset = data_loader.convert_to_dataset(
+            csv, snippets_dir, streaming=streaming, cache_dir=cache_dir
+        )
 
-    # Store the dataset
-    dataset.save_to_disk(os.path.join(output_path))
+        # Store the dataset
+        dataset.save_to_disk(os.path.join(output_path))
 
-    # Log the number of saved code snippets
-    logging.info(f"Saved {len(dataset)} to {output_path}")
+        # Log the number of saved code snippets
+        logging.info(f"Saved {len(dataset)} to {output_path}")
 
 
 def convert_dataset_two_folders(
@@ -609,6 +743,7 @@ def convert_dataset_two_folders(
     output_path: str,
     original_score: float = 4.5,
     rdh_score: float = 1.5,
+    streaming: bool = False,
 ):
     """
     Loads the data and converts it to the HuggingFace format.
@@ -617,6 +752,8 @@ def convert_dataset_two_folders(
     :param output_path: Path to the output directory
     :param original_score: The score for the original code
     :param rdh_score: The score for the RDH code
+    :param streaming: Whether to load the code snippets one at a time and write them
+    to Arrow shards in a temporary directory, so the memory usage is bounded
     :return: The HuggingFace datasets.
     """
     # Log the configuration
@@ -627,18 +764,21 @@ def convert_dataset_two_folders(
         original_loader=KrodCodeLoader(),
         rdh_loader=KrodCodeLoader(name_appendix="_rdh"),
     )
-    dataset = data_loader.convert_to_dataset(
-        original_data_dir=original,
-        rdh_data_dir=rdh,
-        original_score=original_score,
-        rdh_score=rdh_score,
-    )
+    with _streaming_cache_dir(streaming) as cache_dir:
+        dataset = data_loader.convert_to_dataset(
+            original_data_dir=original,
+            rdh_data_dir=rdh,
+            original_score=original_score,
+            rdh_score=rdh_score,
+            streaming=streaming,
+            cache_dir=cache_dir,
+        )
 
-    # Store the dataset
-    dataset.save_to_disk(os.path.join(output_path))
+        # Store the dataset
+        dataset.save_to_disk(os.path.join(output_path))
 
-    # Log the number of saved code snippets
-    logging.info(f"Saved {len(dataset)} to {output_path}")
+        # Log the number of saved code snippets
+        logging.info(f"Saved {len(dataset)} to {output_path}")
 
 
 if __name__ == "__main__":
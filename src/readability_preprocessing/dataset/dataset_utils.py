@@ -1,107 +1,137 @@
-import random
+import hashlib
+import logging
 
-from datasets import load_dataset
+import numpy as np
+from datasets import Dataset, load_from_disk
 
+# The number of code snippets that are hashed at once
+HASH_BATCH_SIZE = 10_000
 
-def balance_dataset(dataset: list[dict]) -> list[dict]:
+# The size of the hashes of the code snippets in bytes
+HASH_DIGEST_SIZE = 16
+
+
+def balance_dataset(dataset: Dataset, seed: int | None = None) -> Dataset:
     """
     Balances the dataset by making sure each score has the same amount of samples.
+    The samples of each score are counted with a single group-by over the score
+    column. From each score with more samples than the score with the least samples,
+    a random subset of that size is selected.
     :param dataset: The dataset to balance.
-    :return: The balanced dataset.
+    :param seed: The seed for selecting the samples. If None, the selection is not
+    reproducible.
+    :return: The balanced dataset. The samples keep their order.
     """
     # Get the number of samples for each score
-    scores = [x["score"] for x in dataset]
-    score_counts = {score: scores.count(score) for score in set(scores)}
+    scores = dataset.with_format("numpy")["score"]
+    score_values, score_groups, score_counts = np.unique(
+        scores, return_inverse=True, return_counts=True
+    )
+    if len(score_values) == 0:
+        return dataset
 
     # Get the score with the least amount of samples
-    min_score = min(score_counts, key=score_counts.get)
-    min_count = score_counts[min_score]
+    min_count = score_counts.min()
 
-    # Get the score with the most amount of samples
-    max_score = max(score_counts, key=score_counts.get)
-    score_counts[max_score]
+    # Log the number of samples to remove
+    for score, count in zip(score_values, score_counts, strict=True):
+        logging.info(f"Score: {score}, Count: {count}, Remove: {count - min_count}")
 
-    # Print the number of samples to remove
-    for score, count in score_counts.items():
-        print(f"Score: {score}, Count: {count}, Remove: {count - min_count}")
+    # Group the indices of the samples by their score
+    indices_by_score = np.split(
+        np.argsort(score_groups, kind="stable"), np.cumsum(score_counts)[:-1]
+    )
 
     # Balance the dataset
-    balanced_dataset = []
-    for score in set(scores):
-        # Get the samples with the current score
-        samples = [x for x in dataset if x["score"] == score]
+    rng = np.random.default_rng(seed)
+    indices_to_keep = [
+        (
+            indices
+            if len(indices) == min_count
+            else rng.choice(indices, min_count, replace=False)
+        )
+        for indices in indices_by_score
+    ]
 
-        if score_counts[score] == min_count:
-            # If the score has min count, add all
-            balanced_dataset.extend(samples)
-        else:
-            # If the score has more than min count, add a random sample
-            balanced_dataset.extend(random.sample(samples, min_count))
+    return dataset.select(np.sort(np.concatenate(indices_to_keep)))
 
-    return balanced_dataset
 
-
-def fileter_out_duplicates(
-    dataset: dict[str, dict], original_score: float = 3.68
-) -> dict[str, dict]:
+def _hash_code_snippets(dataset: Dataset) -> np.ndarray:
+    """
+    Hashes the code snippets of the dataset. The code snippets are read from the
+    Arrow table in batches.
+    :param dataset: The dataset.
+    :return: The hashes of the code snippets as byte strings.
+    """
+    hashes = np.empty(len(dataset), dtype=f"S{HASH_DIGEST_SIZE}")
+    dataset = dataset.select_columns(["code_snippet"]).with_format("arrow")
+    for start in range(0, len(dataset), HASH_BATCH_SIZE):
+        code_snippets = dataset[start : start + HASH_BATCH_SIZE]["code_snippet"]
+        for offset, code_snippet in enumerate(code_snippets.to_pylist()):
+            hashes[start + offset] = hashlib.blake2b(
+                code_snippet.encode(), digest_size=HASH_DIGEST_SIZE
+            ).digest()
+    return hashes
+
+
+def filter_out_duplicates(dataset: Dataset, original_score: float = 3.68) -> Dataset:
     """
     Filters out duplicates from the dataset.
-    All code_snippets are sorted by their content and then compared.
+    The code snippets are compared by their hashes. Of each group of duplicates the
+    first sample with the original score is kept, or the first sample if none has the
+    original score.
     :param dataset: The dataset to filter.
     :param original_score: The score to keep if there are duplicates.
-    :return: The filtered dataset.
+    :return: The filtered dataset. The samples keep their order.
     """
-    # Sort the dataset by code_snippet and by score (original_score first)
-    sorted_dataset = sorted(
-        dataset.items(),
-        key=lambda x: (x[1]["code_snippet"], x[1]["score"]),
-        reverse=True,
+    hashes = _hash_code_snippets(dataset)
+    is_original = dataset.with_format("numpy")["score"] == original_score
+
+    # Find the first occurrence of each hash, with the original samples first
+    order = np.argsort(~is_original, kind="stable")
+    _, first_occurrences = np.unique(hashes[order], return_index=True)
+    indices_to_keep = np.sort(order[first_occurrences])
+
+    # Log the number of removed duplicates
+    num_removed_original = is_original.sum() - is_original[indices_to_keep].sum()
+    num_removed_modified = len(dataset) - len(indices_to_keep) - num_removed_original
+    logging.info(
+        f"Removed {num_removed_original} duplicates with a score of {original_score}"
     )
-
-    # Remove the duplicates. Always keep the first sample.
-    filtered_dataset = {}
-    num_removed_original = 0
-    num_removed_modified = 0
-    for i in range(len(sorted_dataset)):
-        name, sample = sorted_dataset[i]
-        if i == 0:
-            filtered_dataset.update({name: sample})
-        else:
-            prev_name, prev_sample = sorted_dataset[i - 1]
-            if sample["code_snippet"] == prev_sample["code_snippet"]:
-                if sample["score"] == original_score:
-                    num_removed_original += 1
-                else:
-                    num_removed_modified += 1
-            else:
-                filtered_dataset.update({name: sample})
-
-    # Print the number of removed duplicates
-    print(f"Removed {num_removed_original} duplicates with a score of {original_score}")
-    print(
+    logging.info(
         f"Removed {num_removed_modified} duplicates with a score different from "
         f"{original_score}"
     )
 
-    return filtered_dataset
+    return dataset.select(indices_to_keep)
 
 
-random.seed(42)
-ds = load_dataset(
-    "LuKrO/code-readability-krod-strong8"
-)  # download_mode="force_redownload",
-#                   verification_mode=VerificationMode.NO_CHECKS)
-ds = ds["train"]
-ds_as_list = ds.to_list()
-ds_dict = {x["name"]: x for x in ds_as_list}
-ds_without_duplicates = fileter_out_duplicates(ds_dict)
-ds_without_duplicates_as_list = list(ds_without_duplicates.values())
-balanced_ds = balance_dataset(ds_without_duplicates_as_list)
+def balance(input_path: str, output_path: str, seed: int | None = None) -> None:
+    """
+    Balances the dataset at the input path and saves it to the output path.
+    :param input_path: The path to the dataset.
+    :param output_path: The output path.
+    :param seed: The seed for selecting the samples.
+    :return: None
+    """
+    dataset = load_from_disk(input_path)
+    balanced_dataset = balance_dataset(dataset, seed=seed)
+    balanced_dataset.save_to_disk(output_path)
+    logging.info(f"Saved {len(balanced_dataset)} of {len(dataset)} samples.")
 
-# Store the dataset locally
-# ds = Dataset.from_list(balanced_ds)
-# ds.save_to_disk("LuKrO/code-readability-krod-strong5-balanced")
 
-# Store the dataset in the HuggingFace Hub
-# ds = Dataset.from_list(balanced_ds)
-# ds.push_to_hub("LuKrO/code-readability-krod-strong8-balanced", private=True)
+def deduplicate(
+    input_path: str, output_path: str, original_score: float = 3.68
+) -> None:
+    """
+    Filters out the duplicates of the dataset at the input path and saves it to the
+    output path.
+    :param input_path: The path to the dataset.
+    :param output_path: The output path.
+    :param original_score: The score to keep if there are duplicates.
+    :return: None
+    """
+    dataset = load_from_disk(input_path)
+    filtered_dataset = filter_out_duplicates(dataset, original_score=original_score)
+    filtered_dataset.save_to_disk(output_path)
+    logging.info(f"Saved {len(filtered_dataset)} of {len(dataset)} samples.")
@@ -0,0 +1,363 @@
+import csv
+import hashlib
+import logging
+import os
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass
+
+import numpy as np
+from datasets import Dataset, load_from_disk
+from javalang.tokenizer import Identifier, tokenize
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERMUTATIONS = 128
+DEFAULT_SHINGLE_SIZE = 5
+REPORT_FILE_NAME = "near_duplicates.csv"
+
+# The number of code snippets that are read at once
+CODE_BATCH_SIZE = 10_000
+
+# The universal hash functions (a * x + b) % MERSENNE_PRIME simulate the permutations.
+# The shingle hashes x and the coefficients a and b have 32 bits, so a * x + b fits
+# into 64 bits and is computed exactly.
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# All identifiers are replaced, so renamed variables, methods and types do not matter
+IDENTIFIER_TOKEN = "ID"
+
+
+def normalize_tokens(code: str) -> list[str]:
+    """
+    Tokenizes java code with javalang and normalizes the tokens. Whitespace and
+    comments are dropped by the tokenizer and identifiers are replaced by a
+    placeholder. Tokens that javalang cannot read are skipped.
+    :param code: The java code.
+    :return: The normalized tokens.
+    """
+    return [
+        IDENTIFIER_TOKEN if isinstance(token, Identifier) else token.value
+        for token in tokenize(code, ignore_errors=True)
+    ]
+
+
+def shingle_hashes(tokens: list[str], shingle_size: int) -> np.ndarray:
+    """
+    Hashes the distinct shingles (sequences of consecutive tokens) of the tokens.
+    If there are fewer tokens than the shingle size, all tokens form one shingle.
+    :param tokens: The normalized tokens.
+    :param shingle_size: The number of tokens of a shingle.
+    :return: The 32-bit hashes of the shingles.
+    """
+    num_shingles = max(len(tokens) - shingle_size + 1, 1)
+    shingles = {" ".join(tokens[i : i + shingle_size]) for i in range(num_shingles)}
+    return np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(shingle.encode(), digest_size=4).digest(), "little"
+            )
+            for shingle in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def _choose_bands(threshold: float, num_permutations: int) -> tuple[int, int]:
+    """
+    Chooses how the signatures are split into bands for the locality-sensitive
+    hashing. Two snippets become candidates if all rows of one of their bands are
+    equal, which is likely above a Jaccard similarity of about (1/bands)^(1/rows).
+    The highest such similarity that is not above the threshold is chosen, so
+    near-duplicates are rarely missed. The candidates are then verified.
+    :param threshold: The Jaccard similarity threshold.
+    :param num_permutations: The number of permutations of the signatures.
+    :return: The number of bands and the number of rows of a band.
+    """
+    options = [
+        (bands, num_permutations // bands)
+        for bands in range(1, num_permutations + 1)
+        if num_permutations % bands == 0
+    ]
+
+    def similarity(option: tuple[int, int]) -> float:
+        bands, rows = option
+        return (1 / bands) ** (1 / rows)
+
+    below = [option for option in options if similarity(option) <= threshold]
+    if below:
+        return max(below, key=similarity)
+    return min(options, key=similarity)
+
+
+class NearDuplicateIndex:
+    """
+    A MinHash index with locality-sensitive hashing (LSH) over the normalized token
+    shingles of code snippets. A snippet is only compared to the snippets that share
+    a band of their signatures, so finding near-duplicates scales sub-quadratically.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        seed: int = 42,
+    ):
+        """
+        Initialize the index.
+        :param threshold: The estimated Jaccard similarity at or above which two
+        snippets are near-duplicates.
+        :param num_permutations: The number of permutations of the signatures. More
+        permutations estimate the similarity more precisely, but need more memory.
+        :param shingle_size: The number of tokens of a shingle.
+        :param seed: The seed of the permutations.
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("The threshold must be in (0, 1].")
+        if num_permutations < 1:
+            raise ValueError("The number of permutations must be at least 1.")
+        if shingle_size < 1:
+            raise ValueError("The shingle size must be at least 1.")
+
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MAX_HASH, num_permutations, dtype=np.uint64)
+        self._b = rng.integers(0, MAX_HASH, num_permutations, dtype=np.uint64)
+        self.num_bands, self.band_size = _choose_bands(threshold, num_permutations)
+        self._buckets: list[dict[bytes, list[Hashable]]] = [
+            {} for _ in range(self.num_bands)
+        ]
+        self._signatures: dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, code: str) -> np.ndarray | None:
+        """
+        Computes the MinHash signature of a code snippet.
+        :param code: The java code.
+        :return: The signature or None, if the code has no tokens.
+        """
+        tokens = normalize_tokens(code)
+        if not tokens:
+            return None
+
+        hashes = shingle_hashes(tokens, self.shingle_size)[:, np.newaxis]
+        permuted = ((hashes * self._a + self._b) % MERSENNE_PRIME) & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def query(self, signature: np.ndarray) -> tuple[Hashable, float] | None:
+        """
+        Finds the most similar snippet in the index that is a near-duplicate.
+        :param signature: The signature of the snippet.
+        :return: The key of the most similar snippet and the estimated Jaccard
+        similarity or None, if there is no near-duplicate.
+        """
+        candidates = {}
+        for band, buckets in zip(self._bands(signature), self._buckets, strict=True):
+            for key in buckets.get(band, []):
+                candidates.setdefault(key, None)
+
+        best = None
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        """
+        Adds a snippet to the index.
+        :param key: The key of the snippet.
+        :param signature: The signature of the snippet.
+        :return: None
+        """
+        self._signatures[key] = signature
+        for band, buckets in zip(self._bands(signature), self._buckets, strict=True):
+            buckets.setdefault(band, []).append(key)
+
+    def _bands(self, signature: np.ndarray) -> Iterator[bytes]:
+        """
+        Splits a signature into its bands.
+        :param signature: The signature.
+        :return: The bytes of each band.
+        """
+        for band in range(self.num_bands):
+            start = band * self.band_size
+            yield signature[start : start + self.band_size].tobytes()
+
+
+@dataclass(frozen=True)
+class NearDuplicate:
+    """
+    A snippet that is a near-duplicate of a snippet that occurred before it.
+    """
+
+    dataset: int
+    index: int
+    duplicate_of_dataset: int
+    duplicate_of_index: int
+    similarity: float
+
+
+def _iterate_code_snippets(dataset: Dataset) -> Iterator[str]:
+    """
+    Reads the code snippets of a dataset in batches from its Arrow table.
+    :param dataset: The dataset.
+    :return: The code snippets.
+    """
+    dataset = dataset.select_columns(["code_snippet"]).with_format("arrow")
+    for start in range(0, len(dataset), CODE_BATCH_SIZE):
+        yield from dataset[start : start + CODE_BATCH_SIZE]["code_snippet"].to_pylist()
+
+
+def find_near_duplicates(
+    datasets: list[Dataset], index: NearDuplicateIndex
+) -> list[NearDuplicate]:
+    """
+    Finds the near-duplicates within and across the datasets. The snippets are visited
+    in the order of the datasets. A snippet is a near-duplicate if it is similar to a
+    snippet visited before, which is kept. Only kept snippets are added to the index.
+    :param datasets: The datasets with a code_snippet column.
+    :param index: The (empty) index.
+    :return: The near-duplicates.
+    """
+    near_duplicates = []
+    for dataset_idx, dataset in enumerate(datasets):
+        for idx, code in enumerate(_iterate_code_snippets(dataset)):
+            signature = index.signature(code)
+            if signature is None:
+                continue
+
+            match = index.query(signature)
+            if match is None:
+                index.add((dataset_idx, idx), signature)
+                continue
+
+            (match_dataset_idx, match_idx), similarity = match
+            near_duplicates.append(
+                NearDuplicate(
+                    dataset_idx, idx, match_dataset_idx, match_idx, similarity
+                )
+            )
+
+        logging.info(
+            f"Indexed dataset {dataset_idx}: {len(near_duplicates)} near-duplicates so "
+            f"far."
+        )
+    return near_duplicates
+
+
+def _store_report(
+    report_path: str,
+    dataset_paths: list[str],
+    datasets: list[Dataset],
+    near_duplicates: list[NearDuplicate],
+) -> None:
+    """
+    Stores the near-duplicates in a csv file. The names of the snippets are added, if
+    the datasets have a name column.
+    :param report_path: The path to the csv file.
+    :param dataset_paths: The paths to the datasets.
+    :param datasets: The datasets.
+    :param near_duplicates: The near-duplicates.
+    :return: None
+    """
+    names = [
+        dataset.select_columns(["name"]) if "name" in dataset.column_names else None
+        for dataset in datasets
+    ]
+
+    def name(dataset_idx: int, idx: int) -> str:
+        return names[dataset_idx][idx]["name"] if names[dataset_idx] else ""
+
+    with open(report_path, "w", newline="") as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow(
+            [
+                "dataset",
+                "index",
+                "name",
+                "duplicate_of_dataset",
+                "duplicate_of_index",
+                "duplicate_of_name",
+                "similarity",
+            ]
+        )
+        for near_duplicate in near_duplicates:
+            writer.writerow(
+                [
+                    dataset_paths[near_duplicate.dataset],
+                    near_duplicate.index,
+                    name(near_duplicate.dataset, near_duplicate.index),
+                    dataset_paths[near_duplicate.duplicate_of_dataset],
+                    near_duplicate.duplicate_of_index,
+                    name(
+                        near_duplicate.duplicate_of_dataset,
+                        near_duplicate.duplicate_of_index,
+                    ),
+                    f"{near_duplicate.similarity:.4f}",
+                ]
+            )
+
+
+def remove_near_duplicates(
+    dataset_paths: list[str],
+    output_path: str,
+    threshold: float = DEFAULT_THRESHOLD,
+    drop: bool = False,
+    num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+    shingle_size: int = DEFAULT_SHINGLE_SIZE,
+) -> list[NearDuplicate]:
+    """
+    Finds the near-duplicates within and across the datasets and stores them in a
+    report in the output directory. Of each group of near-duplicates, the snippet of
+    the first dataset (and the first snippet in a dataset) is kept.
+    If drop is True, the datasets without the near-duplicates are stored in the
+    output directory under the names of the input directories.
+    :param dataset_paths: The paths to the datasets.
+    :param output_path: The output directory.
+    :param threshold: The estimated Jaccard similarity at or above which two snippets
+    are near-duplicates.
+    :param drop: Whether to store the datasets without the near-duplicates.
+    :param num_permutations: The number of permutations of the signatures.
+    :param shingle_size: The number of tokens of a shingle.
+    :return: The near-duplicates.
+    """
+    dataset_names = [os.path.basename(os.path.normpath(p)) for p in dataset_paths]
+    if drop and len(set(dataset_names)) != len(dataset_names):
+        raise ValueError("The names of the dataset directories must be unique.")
+
+    datasets = [load_from_disk(path) for path in dataset_paths]
+    index = NearDuplicateIndex(threshold, num_permutations, shingle_size)
+    near_duplicates = find_near_duplicates(datasets, index)
+    num_snippets = sum(len(dataset) for dataset in datasets)
+    logging.info(
+        f"Found {len(near_duplicates)} near-duplicates in {num_snippets} snippets."
+    )
+
+    os.makedirs(output_path, exist_ok=True)
+    _store_report(
+        os.path.join(output_path, REPORT_FILE_NAME),
+        [str(path) for path in dataset_paths],
+        datasets,
+        near_duplicates,
+    )
+
+    if drop:
+        for dataset_idx, (dataset, dataset_name) in enumerate(
+            zip(datasets, dataset_names, strict=True)
+        ):
+            duplicates = np.array(
+                [d.index for d in near_duplicates if d.dataset == dataset_idx],
+                dtype=np.int64,
+            )
+            mask = np.ones(len(dataset), dtype=bool)
+            mask[duplicates] = False
+            filtered = dataset.select(np.flatnonzero(mask))
+            filtered.save_to_disk(os.path.join(output_path, dataset_name))
+            logging.info(f"Saved {len(filtered)} of {len(dataset)} to {dataset_name}.")
+
+    return near_duplicates
@@ -2,6 +2,7 @@ from itertools import combinations
 from pathlib import Path
 
 import numpy as np
+import pyarrow as pa
 import scipy.stats as stats
 from datasets import Dataset, load_dataset
 from matplotlib import pyplot
@@ -15,6 +16,10 @@ from readability_preprocessing.evaluation.utils import (
     SURVEY_DATA_DIR,
     load_json_file,
 )
+from readability_preprocessing.prolific.ratings import (
+    group_ratings,
+    load_ratings_table,
+)
 from readability_preprocessing.prolific.statistical.statistical_tests import (
     perform_tost,
 )
@@ -543,6 +548,18 @@ def load_stratas(input_path: Path) -> dict[str, Stratum]:
     return group_into_strats(snippet_datas)
 
 
+def load_ratings(input_path: Path, cache_path: Path | None = None) -> pa.Table:
+    """
+    Load the ratings of all surveys in the directory as a long-format table with one
+    row per rate.
+    :param input_path: The path to the directory containing the surveys
+    :param cache_path: The path to the Parquet cache of the table, which is only
+    rebuilt if the surveys changed. If None, the table is not cached.
+    :return: The ratings table
+    """
+    return load_ratings_table(input_path, cache_path=cache_path)
+
+
 def load_dataset_scores_krod(
     dataset_name: str = "LuKrO/code-readability-krod-survey-raw", rdh: str = "methods"
 ) -> list[int]:
@@ -607,6 +624,16 @@ def combine_by_rdh(stratas: dict[str, Stratum]) -> dict[str, list[int]]:
     return ratings
 
 
+def combine_ratings_by_rdh(ratings: pa.Table) -> dict[str, list[int]]:
+    """
+    Combine the ratings of all strata by RDH with a single group-by over the ratings
+    table
+    :param ratings: The ratings table
+    :return: A dictionary containing the combined ratings
+    """
+    return {rdh: rates.tolist() for rdh, rates in group_ratings(ratings, "rdh").items()}
+
+
 def combine_means_by_rdh(stratas: dict[str, Stratum]) -> dict[str, list[float]]:
     """
     Calculate the mean of the ratings for each snippet and combine the mean ratings
@@ -844,11 +871,14 @@ def subgroup_chi2(
     :return: The results of the test
     """
     combos = get_combinations(5, start=1)
-    none = ratings[compare_to]
-    for key, value in ratings.items():
+
+    # Count the ratings of each group once
+    counts = {key: np.bincount(value, minlength=6) for key, value in ratings.items()}
+    none = counts[compare_to]
+    for key, value in counts.items():
         if key != compare_to:
             for combo in combos:
-                table = np.array([[none.count(i), value.count(i)] for i in combo])
+                table = np.array([[none[i], value[i]] for i in combo])
                 results = stats.chi2_contingency(table)
                 rejected = results[1] < alpha
                 if rejected:
@@ -870,14 +900,17 @@ def binary_chi2(
     :return: The results of the test
     """
     splits = list(range(1, 6 - 1))
-    none = ratings[compare_to]
-    for key, value in ratings.items():
+
+    # Count the ratings of each group once
+    counts = {key: np.bincount(value, minlength=6) for key, value in ratings.items()}
+    none = counts[compare_to]
+    for key, value in counts.items():
         if key != compare_to:
             for split in splits:
-                low_none = len([i for i in none if i <= split])
-                high_none = len([i for i in none if i > split])
-                low_value = len([i for i in value if i <= split])
-                high_value = len([i for i in value if i > split])
+                low_none = none[: split + 1].sum()
+                high_none = none[split + 1 :].sum()
+                low_value = value[: split + 1].sum()
+                high_value = value[split + 1 :].sum()
                 table = np.array([[low_none, low_value], [high_none, high_value]])
                 results = stats.chi2_contingency(table)
                 rejected = results[1] < alpha
@@ -1,5 +1,6 @@
 from pathlib import Path
 
+import pyarrow as pa
 from matplotlib import pyplot as plt
 
 from readability_preprocessing.evaluation.utils import (
@@ -7,6 +8,7 @@ from readability_preprocessing.evaluation.utils import (
     SURVEYS_DIR,
     load_json_file,
 )
+from readability_preprocessing.prolific.ratings import load_ratings_table
 
 
 class Rate:
@@ -176,6 +178,19 @@ def load_snippet_datas(
     return json_objects
 
 
+def load_ratings(
+    input_path: Path = DEFAULT_SURVEY_DIR, cache_path: Path | None = None
+) -> pa.Table:
+    """
+    Load the ratings of the survey as a long-format table with one row per rate.
+    :param input_path: The path to the directory containing the JSON files
+    :param cache_path: The path to the Parquet cache of the table, which is only
+    rebuilt if the survey changed. If None, the table is not cached.
+    :return: The ratings table
+    """
+    return load_ratings_table(input_path, cache_path=cache_path, stratum_index=0)
+
+
 def group_into_strats(json_objects: list[SnippetData]) -> dict[str, Stratum]:
     """
     Group the snippets into strata and RDHs
@@ -1,9 +1,16 @@
 import difflib
+import hashlib
 import json
 import logging
 import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 
+STREAMING_BATCH_SIZE = 4096
+WORKER_CHUNK_SIZE = 64
+
 
 def _read_file(file_path: Path) -> list[str]:
     """
@@ -28,13 +35,157 @@ def _normalize_lines(lines):
     return stripped
 
 
-def compare_java_files(file1_path: Path, file2_path: Path) -> bool:
+def normalized_digest(file_path: Path) -> str:
+    """
+    Calculate the SHA-256 digest of the normalized lines of a file. Two files have the
+    same digest if and only if compare_java_files considers them not different.
+    :param file_path: The path to the file
+    :return: The hex digest of the normalized lines
+    """
+    normalized_lines = _normalize_lines(_read_file(file_path))
+    return hashlib.sha256("\n".join(normalized_lines).encode("utf-8")).hexdigest()
+
+
+class DigestIndex:
+    """
+    A cache of the normalized digests of the files below a root directory, e.g. the
+    snippets of all rdhs in a directory of stratas. Each file is read once and is
+    only read again if its size or modification time changes. If an index path is
+    given, the digests are loaded from and saved to a tab-separated file, so that
+    EXTRACT_DIFF and CRAFT_SURVEYS can reuse them for the same stratas.
+    """
+
+    def __init__(self, root: Path, index_path: Path | None = None):
+        """
+        Initialize the index.
+        :param root: The root directory of the files
+        :param index_path: The path to the index file or None to keep the digests in
+        memory only
+        """
+        self.root = Path(root).absolute()
+        self.index_path = index_path
+        self._entries: dict[str, tuple[int, int, str]] = {}
+        self._new_keys: list[str] = []
+        self._changed = False
+
+        if index_path is not None and os.path.isfile(index_path):
+            with open(index_path, encoding="utf-8") as index_file:
+                for line in index_file:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) == 4:
+                        key, size, mtime, digest = fields
+                        self._entries[key] = (int(size), int(mtime), digest)
+            logging.info(f"Loaded {len(self._entries)} digests from {index_path}.")
+
+    def digest(self, file_path: Path) -> str:
+        """
+        Get the normalized digest of a file.
+        :param file_path: The path to the file
+        :return: The hex digest of the normalized lines
+        """
+        key = self._key(file_path)
+        stat = os.stat(file_path)
+        entry = self._entries.get(key)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            return entry[2]
+
+        digest = normalized_digest(file_path)
+        self._entries[key] = (stat.st_size, stat.st_mtime_ns, digest)
+        self._new_keys.append(key)
+        self._changed = True
+        return digest
+
+    def take_new_entries(self) -> list[tuple[str, int, int, str]]:
+        """
+        Get the entries that were computed since the last call, e.g. to send them
+        from a worker process to the index of the main process.
+        :return: The key, size, modification time and digest of each new entry
+        """
+        entries = [(key, *self._entries[key]) for key in self._new_keys]
+        self._new_keys = []
+        return entries
+
+    def add_entries(self, entries: list[tuple[str, int, int, str]]) -> None:
+        """
+        Add entries that were computed by another index of the same root.
+        :param entries: The key, size, modification time and digest of each entry
+        :return: None
+        """
+        for key, size, mtime, digest in entries:
+            self._entries[key] = (size, mtime, digest)
+            self._changed = True
+
+    def save(self) -> None:
+        """
+        Save the digests to the index file, if an index path is given and digests
+        were added.
+        :return: None
+        """
+        if self.index_path is None or not self._changed:
+            return
+
+        if os.path.dirname(self.index_path):
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            for key, (size, mtime, digest) in self._entries.items():
+                index_file.write(f"{key}\t{size}\t{mtime}\t{digest}\n")
+        os.replace(temp_path, self.index_path)
+        self._changed = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+    def _key(self, file_path: Path) -> str:
+        """
+        Get the key of a file: its path relative to the root or, for files outside
+        of the root, its absolute path.
+        :param file_path: The path to the file
+        :return: The key of the file
+        """
+        absolute_path = Path(file_path).absolute()
+        try:
+            return absolute_path.relative_to(self.root).as_posix()
+        except ValueError:
+            return absolute_path.as_posix()
+
+
+def compare_java_files(
+    file1_path: Path, file2_path: Path, digest_index: DigestIndex | None = None
+) -> bool:
     """
     Compare two Java files. If the files are different, return True, otherwise False.
+    Trailing whitespaces and empty lines at the end are ignored. Use get_line_diff to
+    get the changed lines.
     :param file1_path: The path to the first Java file
     :param file2_path: The path to the second Java file
+    :param digest_index: An index of digests of the normalized files. If given, the
+    digests are compared instead of the lines.
     :return: Whether the files are different
     """
+    if digest_index is not None:
+        return digest_index.digest(file1_path) != digest_index.digest(file2_path)
+
+    # Normalize lines by stripping whitespaces and removing empty lines at the end
+    normalized_lines1 = _normalize_lines(_read_file(file1_path))
+    normalized_lines2 = _normalize_lines(_read_file(file2_path))
+    return normalized_lines1 != normalized_lines2
+
+
+def get_line_diff(file1_path: Path, file2_path: Path) -> list[str]:
+    """
+    Get the changed lines between two Java files in the format of difflib.Differ.
+    Trailing whitespaces and empty lines at the end are ignored.
+    :param file1_path: The path to the first Java file
+    :param file2_path: The path to the second Java file
+    :return: The removed ("-"), added ("+") and hint ("?") lines of the diff
+    """
     # Read the contents of the two Java files
     lines1 = _read_file(file1_path)
     lines2 = _read_file(file2_path)
@@ -52,7 +203,7 @@ def compare_java_files(file1_path: Path, file2_path: Path) -> bool:
         if line.startswith("-") or line.startswith("+") or line.startswith("?"):
             changed_lines.append(line)
 
-    return bool(len(changed_lines) > 0)
+    return changed_lines
 
 
 class Snippet:
@@ -190,7 +341,9 @@ def _load(input_path: Path, methods_dir_name: str) -> list[Stratum]:
 
 
 def get_diffs(
-    input_path: Path, methods_dir_name: str = "methods"
+    input_path: Path,
+    methods_dir_name: str = "methods",
+    digest_index: DigestIndex | None = None,
 ) -> tuple[list[Snippet], list[Snippet]]:
     """
     Get the snippets that are different from their original methods and the snippets
@@ -200,10 +353,14 @@ def get_diffs(
     "methods"-rdh folder.
     :param input_path: The path to the input directory (stratas)
     :param methods_dir_name: The name of the directory containing the methods
+    :param digest_index: The index of the digests of the snippets. If None, the
+    digests are kept in memory, so each method is only read once.
     :return: The snippets that are different from their original methods and the
     snippets that are not different from their original methods.
     """
     stratas = _load(input_path, methods_dir_name)
+    if digest_index is None:
+        digest_index = DigestIndex(input_path)
 
     not_different = []
     different = []
@@ -222,7 +379,7 @@ def get_diffs(
                     logging.error(f"The method {method_path} does not exist.")
                     raise FileNotFoundError(f"The method {method_path} does not exist.")
 
-                if not compare_java_files(method_path, snippet_path):
+                if not compare_java_files(method_path, snippet_path, digest_index):
                     not_different.append(snippet)
                 else:
                     different.append(snippet)
@@ -253,14 +410,14 @@ class Statistic:
         Return the statistic as a json.
         :return: The statistic as a json.
         """
+        total = self.different + self.not_different
         return {
             "stratum": self.stratum,  # Can also be the name of the rdh
-            "total": self.different + self.not_different,
+            "total": total,
             "not_different_abs": self.not_different,
             "different_abs": self.different,
-            "not_different_rel": self.not_different
-            / (self.different + self.not_different),
-            "different_rel": self.different / (self.different + self.not_different),
+            "not_different_rel": self.not_different / total if total else 0.0,
+            "different_rel": self.different / total if total else 0.0,
             "sub_statistics": [
                 sub_statistic.json() for sub_statistic in self.sub_statistics
             ],
@@ -411,7 +568,12 @@ def _add_rdh_sub_statistics(
 
 
 def compare_to_folder(
-    input_path: Path, output_path: Path | None = None, methods_dir_name: str = "methods"
+    input_path: Path,
+    output_path: Path | None = None,
+    methods_dir_name: str = "methods",
+    digest_index_path: Path | None = None,
+    streaming: bool = False,
+    workers: int = 1,
 ) -> None:
     """
     Compare the files of all rdhs in the stratas of the input directory to the files in
@@ -420,9 +582,24 @@ def compare_to_folder(
     :param input_path: The path to the input directory (stratas)
     :param output_path: The path to the output directory
     :param methods_dir_name: The name of the directory containing the methods
+    :param digest_index_path: The path to the index of the digests of the snippets,
+    which is reused and updated. If None, the digests are not stored.
+    :param streaming: Whether to compare the snippets while walking the input
+    directory and to write the results as they arrive, instead of loading all
+    snippets first. Used if workers > 1.
+    :param workers: The number of processes that compare the snippets.
     :return: None
     """
-    different, not_different = get_diffs(input_path, methods_dir_name)
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1.")
+    if streaming or workers > 1:
+        _compare_to_folder_streaming(
+            input_path, output_path, methods_dir_name, digest_index_path, workers
+        )
+        return
+
+    with DigestIndex(input_path, digest_index_path) as digest_index:
+        different, not_different = get_diffs(input_path, methods_dir_name, digest_index)
 
     # Log the results
     logging.info("The following files are not different from their original methods:")
@@ -432,14 +609,21 @@ def compare_to_folder(
     # Create overall statistics
     statistics = {"overall": Statistic("overall", len(different), len(not_different))}
 
-    # Create statistics for each stratum
-    strata_names = list({snippet.stratum.name for snippet in different + not_different})
+    # Create statistics for each stratum, including the folders without snippets
+    folder_strata_names, folder_rdh_names = _list_folders(input_path, methods_dir_name)
+    strata_names = list(
+        {snippet.stratum.name for snippet in different + not_different}
+        | set(folder_strata_names)
+    )
     s_not_different = _group_by_stratum(not_different, strata_names)
     s_different = _group_by_stratum(different, strata_names)
     statistics = _add_stratum_statistics(s_different, s_not_different, statistics)
 
     # Create statistics for each rdh
-    rdh_names = list({snippet.rdh.name for snippet in different + not_different})
+    rdh_names = list(
+        {snippet.rdh.name for snippet in different + not_different}
+        | set(folder_rdh_names)
+    )
     rdh_not_different = _group_by_rdh(s_not_different, rdh_names)
     rdh_different = _group_by_rdh(s_different, rdh_names)
     statistics = _add_rdh_sub_statistics(statistics, rdh_different, rdh_not_different)
@@ -453,3 +637,227 @@ def compare_to_folder(
         os.makedirs(output_path, exist_ok=True)
         _store_statistics(output_path, statistics)
         _store_paths(input_path, output_path, different, not_different)
+
+
+class _StreamingStatistics:
+    """
+    Counts of different and not different snippets per stratum and rdh, which are
+    updated as the comparison results arrive.
+    """
+
+    def __init__(self, strata_names: list[str], rdh_names: list[str]):
+        """
+        Initialize the counts with zeros for every stratum and rdh, so that folders
+        without snippets appear in the statistics as in compare_to_folder.
+        :param strata_names: The names of the strata
+        :param rdh_names: The names of the rdhs
+        """
+        self.counts: dict[str, dict[str, list[int]]] = {
+            stratum: {rdh: [0, 0] for rdh in rdh_names} for stratum in strata_names
+        }
+
+    def add(self, stratum: str, rdh: str, different: bool) -> None:
+        """
+        Count a comparison result.
+        :param stratum: The name of the stratum
+        :param rdh: The name of the rdh
+        :param different: Whether the snippet is different from its original method
+        :return: None
+        """
+        counts = self.counts.setdefault(stratum, {}).setdefault(rdh, [0, 0])
+        counts[0 if different else 1] += 1
+
+    def statistics(self) -> dict[str, Statistic]:
+        """
+        Create the statistics in the same structure as compare_to_folder.
+        :return: The overall statistic and the statistics of each stratum with the
+        sub-statistics of its rdhs
+        """
+        statistics = {"overall": Statistic("overall", 0, 0)}
+        for stratum, rdhs in sorted(self.counts.items()):
+            different = sum(counts[0] for counts in rdhs.values())
+            not_different = sum(counts[1] for counts in rdhs.values())
+            statistics["overall"].different += different
+            statistics["overall"].not_different += not_different
+            statistics[stratum] = Statistic(stratum, different, not_different)
+            for rdh, (rdh_different, rdh_not_different) in sorted(rdhs.items()):
+                statistics[stratum].add_sub_statistic(
+                    Statistic(rdh, rdh_different, rdh_not_different)
+                )
+        return statistics
+
+
+def _list_folders(
+    input_path: Path, methods_dir_name: str
+) -> tuple[list[str], list[str]]:
+    """
+    List the strata of the input directory and the rdh folders within them.
+    :param input_path: The path to the input directory (stratas)
+    :param methods_dir_name: The name of the directory containing the methods
+    :return: The sorted names of the strata and the sorted names of the rdhs
+    """
+    strata_names, rdh_names = [], set()
+    for stratum_path in sorted(Path(input_path).iterdir()):
+        if not stratum_path.is_dir() or not stratum_path.name.startswith("stratum"):
+            continue
+        strata_names.append(stratum_path.name)
+        rdh_names.update(
+            rdh_path.name
+            for rdh_path in stratum_path.iterdir()
+            if rdh_path.is_dir() and rdh_path.name != methods_dir_name
+        )
+    return strata_names, sorted(rdh_names)
+
+
+def _iterate_comparisons(
+    input_path: Path, methods_dir_name: str
+) -> Iterator[tuple[str, str, Path, Path]]:
+    """
+    Walk the stratas of the input directory and yield the snippets to compare to
+    their original methods, without loading the whole directory tree.
+    :param input_path: The path to the input directory (stratas)
+    :param methods_dir_name: The name of the directory containing the methods
+    :return: The stratum name, rdh name, method path and snippet path
+    """
+    for stratum_path in sorted(input_path.iterdir()):
+        if not stratum_path.is_dir() or not stratum_path.name.startswith("stratum"):
+            continue
+        methods_path = stratum_path / methods_dir_name
+        for rdh_path in sorted(stratum_path.iterdir()):
+            if not rdh_path.is_dir() or rdh_path.name == methods_dir_name:
+                continue
+            for snippet_path in sorted(rdh_path.iterdir()):
+                if not snippet_path.is_file():
+                    continue
+                method_path = methods_path / snippet_path.name
+                if not method_path.exists():
+                    logging.error(f"The method {method_path} does not exist.")
+                    raise FileNotFoundError(f"The method {method_path} does not exist.")
+                yield stratum_path.name, rdh_path.name, method_path, snippet_path
+
+
+_worker_digest_index: DigestIndex | None = None
+
+
+def _init_diff_worker(input_path: Path, digest_index_path: Path | None) -> None:
+    """
+    Initialize the digest index of a worker process. Digests computed by the worker
+    are sent back to the main process, which saves the index.
+    :param input_path: The path to the input directory (stratas)
+    :param digest_index_path: The path to the index of the digests or None
+    :return: None
+    """
+    global _worker_digest_index
+    _worker_digest_index = DigestIndex(input_path, digest_index_path)
+
+
+def _compare_in_worker(
+    paths: tuple[Path, Path],
+) -> tuple[bool, list[tuple[str, int, int, str]]]:
+    """
+    Compare a snippet to its original method in a worker process.
+    :param paths: The method path and the snippet path
+    :return: Whether the snippet is different and the new digest index entries
+    """
+    method_path, snippet_path = paths
+    different = compare_java_files(method_path, snippet_path, _worker_digest_index)
+    return different, _worker_digest_index.take_new_entries()
+
+
+def _compare_to_folder_streaming(
+    input_path: Path,
+    output_path: Path | None,
+    methods_dir_name: str,
+    digest_index_path: Path | None,
+    workers: int,
+) -> None:
+    """
+    Compare the snippets of all rdhs to their original methods while walking the input
+    directory. The comparisons are distributed to a pool of processes in batches, the
+    statistics are counted and the paths are written as the results arrive.
+    The paths are written in sorted order of the stratas, rdhs and snippets.
+    :param input_path: The path to the input directory (stratas)
+    :param output_path: The path to the output directory or None
+    :param methods_dir_name: The name of the directory containing the methods
+    :param digest_index_path: The path to the index of the digests or None
+    :param workers: The number of processes that compare the snippets
+    :return: None
+    """
+    input_path = Path(input_path)
+    statistics = _StreamingStatistics(*_list_folders(input_path, methods_dir_name))
+    comparisons = _iterate_comparisons(input_path, methods_dir_name)
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_diff_worker,
+            initargs=(input_path, digest_index_path),
+        )
+    else:
+        _init_diff_worker(input_path, digest_index_path)
+
+    path_files = None
+    if output_path is not None:
+        os.makedirs(output_path, exist_ok=True)
+        path_files = (
+            open(Path(output_path) / "diff.txt", "w"),  # noqa: SIM115
+            open(Path(output_path) / "no_diff.txt", "w"),  # noqa: SIM115
+        )
+
+    logging.info("The following files are not different from their original methods:")
+    try:
+        with DigestIndex(input_path, digest_index_path) as digest_index:
+            while batch := list(islice(comparisons, STREAMING_BATCH_SIZE)):
+                paths = [(method, snippet) for _, _, method, snippet in batch]
+                if executor is not None:
+                    results = executor.map(
+                        _compare_in_worker, paths, chunksize=WORKER_CHUNK_SIZE
+                    )
+                else:
+                    results = map(_compare_in_worker, paths)
+                _collect_results(batch, results, digest_index, statistics, path_files)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if path_files is not None:
+            for path_file in path_files:
+                path_file.close()
+
+    # Log the statistics
+    logging.info("The following statistics were calculated:")
+    for statistic in statistics.statistics().values():
+        logging.info(statistic.json())
+
+    if output_path is not None:
+        _store_statistics(Path(output_path), statistics.statistics())
+
+
+def _collect_results(
+    batch: list[tuple[str, str, Path, Path]],
+    results: Iterator[tuple[bool, list[tuple[str, int, int, str]]]],
+    digest_index: DigestIndex,
+    statistics: _StreamingStatistics,
+    path_files: tuple | None,
+) -> None:
+    """
+    Count the comparison results of a batch and write the paths of the snippets as
+    the results arrive.
+    :param batch: The stratum name, rdh name, method path and snippet path of each
+    comparison
+    :param results: The results of the comparisons in the order of the batch
+    :param digest_index: The digest index, to which the new entries are added
+    :param statistics: The statistics to count the results in
+    :param path_files: The files for the paths of the different and not different
+    snippets or None
+    :return: None
+    """
+    for (stratum, rdh, _, snippet_path), (different, entries) in zip(
+        batch, results, strict=True
+    ):
+        digest_index.add_entries(entries)
+        statistics.add(stratum, rdh, different)
+        if not different:
+            logging.info(snippet_path)
+        if path_files is not None:
+            path_files[0 if different else 1].write(f"{snippet_path}\n")
@@ -1,6 +1,10 @@
 import logging
 import os
-import shutil
+
+from src.readability_preprocessing.utils.materialization import (
+    MaterializationMode,
+    Materializer,
+)
 
 INPUT_DIR = r"D:\PyCharm_Projects_D\styler2.0\checkstyled"
 OUTPUT_DIR = r"D:\PyCharm_Projects_D\styler2.0\extracted"
@@ -40,6 +44,7 @@ def copy_files(
     output_dir: str,
     file_type: str = None,
     non_violated: str = NON_VIOLATED,
+    materialization: MaterializationMode = MaterializationMode.COPY,
 ) -> None:
     """
     Copies the files from the input paths to the output directory.
@@ -48,25 +53,29 @@ def copy_files(
     :param non_violated: The name of the subfolder that contains the successfully
     processed files.
     :param file_type: The type of the files to copy. If None, all files are copied.
+    :param materialization: How the files are stored in the output directory.
     """
     # Make a new directory in the output_dir for each path in input_paths
-    for path in input_paths:
-        # Get the directory name without the path
-        dir_name = os.path.basename(path)
+    with Materializer(materialization, output_dir) as materializer:
+        for path in input_paths:
+            # Get the directory name without the path
+            dir_name = os.path.basename(path)
 
-        logging.info("Copying files from directory: %s", path)
+            logging.info("Copying files from directory: %s", path)
 
-        # Create a subfolder for each input folder in the output directory
-        output_subdir = os.path.join(output_dir, dir_name)
-        os.makedirs(output_subdir, exist_ok=True)
+            # Create a subfolder for each input folder in the output directory
+            output_subdir = os.path.join(output_dir, dir_name)
+            os.makedirs(output_subdir, exist_ok=True)
 
-        # Iterate over files in the subfolder NON_VIOLATED of the input directory
-        for file in os.listdir(os.path.join(path, non_violated)):
-            file = os.path.join(path, non_violated, file)
-            # Check if the file is a file and if it has the correct file type
-            if os.path.isfile(file) and (file_type is None or file.endswith(file_type)):
-                # Copy the file to the output directory
-                shutil.copy(file, output_subdir)
+            # Iterate over files in the subfolder NON_VIOLATED of the input directory
+            for file in os.listdir(os.path.join(path, non_violated)):
+                file = os.path.join(path, non_violated, file)
+                # Check if the file is a file and if it has the correct file type
+                if os.path.isfile(file) and (
+                    file_type is None or file.endswith(file_type)
+                ):
+                    # Copy the file to the output directory
+                    materializer.materialize(file, output_subdir)
 
 
 def delete_empty_dirs(input_dir: str) -> None:
@@ -83,7 +92,10 @@ def delete_empty_dirs(input_dir: str) -> None:
 
 
 def extract_files(
-    input_dir: str, output_dir: str, non_violated: str = NON_VIOLATED
+    input_dir: str,
+    output_dir: str,
+    non_violated: str = NON_VIOLATED,
+    materialization: MaterializationMode = MaterializationMode.COPY,
 ) -> None:
     """
     Extracts all successfully processed files.
@@ -91,6 +103,7 @@ def extract_files(
     :param output_dir: The output directory.
     :param non_violated: The name of the subfolder that contains the successfully
      processed files.
+    :param materialization: How the files are stored in the output directory.
     :return: None
     """
     # Get the successfully processed and not successfully processed projects
@@ -108,6 +121,7 @@ def extract_files(
         output_dir=output_dir,
         file_type=".java",
         non_violated=non_violated,
+        materialization=materialization,
     )
     logging.info(
         "Copied %d successfully processed dirs to %s.", len(processed), output_dir
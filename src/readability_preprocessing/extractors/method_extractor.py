@@ -1,5 +1,7 @@
 import logging
 import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any
@@ -7,7 +9,16 @@ from typing import Any
 import javalang
 from javalang.parser import JavaSyntaxError
 from javalang.tokenizer import Position
-from javalang.tree import MethodDeclaration
+from javalang.tree import CompilationUnit, MethodDeclaration
+
+from src.readability_preprocessing.extractors.token_method_extractor import (
+    find_methods,
+)
+from src.readability_preprocessing.utils.manifest import ExtractionManifest
+from src.readability_preprocessing.utils.snippet_archive import SnippetArchive
+
+WORKER_CHUNK_SIZE = 16
+OUTPUT_FORMATS = ["files", "archive"]
 
 
 class OverwriteMode(Enum):
@@ -19,6 +30,28 @@ class OverwriteMode(Enum):
     SKIP = 1
 
 
+class ExtractionEngine(Enum):
+    """
+    Enum for the engine that finds the methods in a java file.
+
+    PARSER finds the methods in the javalang parse tree. TOKENS finds them in the
+    token stream without parsing (see token_method_extractor). The engines extract
+    the same methods with body, except that:
+    - TOKENS also extracts the methods of files that javalang cannot parse, e.g.
+      files with records, text blocks or switch expressions.
+    - If the modifiers of a method are on their own line, javalang places the method
+      at its return type, so PARSER drops the modifiers and the comment before them.
+      TOKENS starts the method at its first modifier.
+    - Without require_body, PARSER drops methods without body whose end javalang
+      does not report, e.g. the last method of an interface. TOKENS extracts all of
+      them. As the methods of a file are keyed by name, the engines may then keep
+      different overloads of a method.
+    """
+
+    PARSER = "parser"
+    TOKENS = "tokens"
+
+
 class MethodExtractorConfigurationError(Exception):
     """
     An exception class for MethodExtractor configuration errors.
@@ -41,12 +74,14 @@ class MethodExtractorConfig:
         comments_required: bool,
         remove_indentation: bool,
         require_body: bool,
+        engine: ExtractionEngine = ExtractionEngine.PARSER,
     ):
         self.overwrite_mode = overwrite_mode
         self.include_method_comments = include_method_comments
         self.comments_required = comments_required
         self.remove_indentation = remove_indentation
         self.require_body = require_body
+        self.engine = engine
 
 
 class MethodExtractor:
@@ -70,6 +105,17 @@ class MethodExtractor:
         :param output_dir: The output directory.
         :return: None.
         """
+        for input_file in self.list_java_files(input_dir):
+            self.extract_methods_from_file(input_file, output_dir)
+
+    @staticmethod
+    def list_java_files(input_dir: str) -> Iterator[str]:
+        """
+        Lists the java files in a directory and its subdirectories in the order in
+        which they are extracted.
+        :param input_dir: The input directory.
+        :return: The paths of the java files.
+        """
         # Check if the input directory exists and is a directory
         if not os.path.exists(input_dir) or not os.path.isdir(input_dir):
             logging.error(
@@ -84,13 +130,13 @@ class MethodExtractor:
             if os.path.isfile(file_or_dir):
                 # Check if the file_or_dir is a java file_or_dir
                 if file_or_dir.endswith(".java"):
-                    self.extract_methods_from_file(file_or_dir, output_dir)
+                    yield file_or_dir
                 else:
                     logging.warning("File %s is not a java file_or_dir.", file_or_dir)
             else:
                 # Check if the file_or_dir is a directory
                 if os.path.isdir(file_or_dir):
-                    self.extract_methods_from_dir(file_or_dir, output_dir)
+                    yield from MethodExtractor.list_java_files(file_or_dir)
 
     def extract_methods_from_file(self, input_file: str, output_dir: str) -> None:
         """
@@ -104,24 +150,67 @@ class MethodExtractor:
             logging.error("Input file %s does not exist or is not a file.", input_file)
             return
 
-        # Specify the output subdirectory path and name
-        output_subdir = os.path.join(output_dir, os.path.basename(input_file))
-
         # Check if we skip the file
-        if (
-            os.path.exists(output_subdir)
-            and self.config.overwrite_mode == OverwriteMode.SKIP
-        ):
+        if self.skip_file(input_file, output_dir):
+            return
+
+        # Extract the methods from the source code
+        methods = self._iterate_methods(input_file)
+        self.write_methods(input_file, output_dir, methods)
+
+    def skip_file(
+        self, input_file: str, output_dir: str, archive: SnippetArchive = None
+    ) -> bool:
+        """
+        Checks whether the extraction of a file is skipped, because its output
+        directory already exists and the overwrite mode is SKIP.
+        :param input_file: The input file.
+        :param output_dir: The output directory.
+        :param archive: The archive to store the methods in. If given, the output
+        directory is relative to the archive.
+        :return: True if the file is skipped, False otherwise.
+        """
+        output_subdir = os.path.join(output_dir, os.path.basename(input_file))
+        exists = (
+            output_subdir in archive
+            if archive is not None
+            else os.path.exists(output_subdir)
+        )
+        if exists and self.config.overwrite_mode == OverwriteMode.SKIP:
             logging.info(
                 "Skipping file %s, because the output directory %s already exists.",
                 input_file,
                 output_dir,
             )
-            return
+            return True
+        return False
 
-        # Extract the methods from the source code
-        methods = self._iterate_methods(input_file)
+    @staticmethod
+    def write_methods(
+        input_file: str,
+        output_dir: str,
+        methods: dict[str, str],
+        archive: SnippetArchive = None,
+    ) -> None:
+        """
+        Stores each extracted method of a file in a separate file.
+        :param input_file: The input file the methods were extracted from.
+        :param output_dir: The output directory.
+        :param methods: A dictionary containing the method name and the method code.
+        :param archive: The archive to store the methods in instead of files. If
+        given, the output directory is relative to the archive.
+        :return: None.
+        """
         logging.info("Found %d methods in file %s.", len(methods), input_file)
+        output_subdir = os.path.join(output_dir, os.path.basename(input_file))
+
+        # Append the methods to the archive under the same paths as the files
+        if archive is not None:
+            for method_name, method_code in methods.items():
+                archive.append(
+                    os.path.join(output_subdir, method_name + ".java"), method_code
+                )
+            return
 
         # Create a subfolder for each input file if methods were found
         if methods:
@@ -155,10 +244,52 @@ class MethodExtractor:
             logging.warning(e)
             return {}
 
+        # Find the start and end position of the methods
+        if self.config.engine == ExtractionEngine.TOKENS:
+            boundaries = self._get_token_method_boundaries(file, code_text)
+        else:
+            boundaries = self._get_parser_method_boundaries(file, code_text, codelines)
+
         methods = {}
+        for method_name, startpos, endpos, startline, endline in boundaries:
+            # Get the text of the method
+            method_text, startline, endline, lex = self._get_method_text(
+                codelines,
+                startpos,
+                endpos,
+                startline,
+                endline,
+                include_method_comments=self.config.include_method_comments,
+                remove_indentation=self.config.remove_indentation,
+                exact_end=self.config.engine == ExtractionEngine.TOKENS,
+            )
+
+            # Get the first line of the method text
+            first_line = method_text.split("\n")[0].strip()
+
+            # Check if COMMENTS_REQUIRED is True and the method has a comment
+            if self.config.comments_required and not first_line.startswith("/"):
+                logging.info(
+                    "Skipping method %s, because it has no comment.", method_name
+                )
+                continue
+
+            methods[method_name] = method_text
+
+        return methods
 
+    def _get_parser_method_boundaries(
+        self, file: str, code_text: str, codelines: list[str]
+    ) -> list[tuple[str, Position, Position, int, int]]:
+        """
+        Get the start and end position of the methods in a file from its parse tree.
+        :param file: The file.
+        :param code_text: The code of the file.
+        :param codelines: The code lines of the file.
+        :return: The name, start and end position and start and end line of each
+        method.
+        """
         # Try to parse the file
-        lex = None
         try:
             parse_tree = javalang.parse.parse(code_text)
         except JavaSyntaxError as e:
@@ -166,27 +297,30 @@ class MethodExtractor:
                 "Could not parse file %s: %s at %s", file, e.description, e.at
             )
             logging.warning(e)
-            return {}
+            return []
         except Exception as e:
             logging.warning("Could not parse file %s.", file)
             logging.warning(e)
-            return {}
-
-        # Iterate over the methods in the parse tree
-        for _, method_node in parse_tree.filter(MethodDeclaration):
+            return []
+
+        # Iterate over the methods in the parse tree with their start and end position
+        boundaries = []
+        brace_index = BraceDepthIndex(codelines)
+        for (
+            method_node,
+            startpos,
+            endpos,
+            startline,
+            endline,
+        ) in self._get_method_boundaries(parse_tree):
             # Check if the method has a body
             if self.config.require_body and method_node.body is None:
                 continue
 
-            # Get the start and end position of the method
-            startpos, endpos, startline, endline = self._get_method_start_end(
-                parse_tree, method_node
-            )
-
             # Find the endline of the method, as the parser failed to find it
             if endline is None:
                 try:
-                    endline = self._calculate_end_line_from_start(codelines, startline)
+                    endline = brace_index.end_line(startline)
                     endpos = Position(endline, 0)
                 except InvalidBraceCountException as e:
                     logging.warning(
@@ -197,54 +331,77 @@ class MethodExtractor:
                     logging.warning(e)
                     continue
 
-            # Get the text of the method
-            method_text, startline, endline, lex = self._get_method_text(
-                codelines, startpos, endpos, startline, endline
-            )
+            boundaries.append((method_node.name, startpos, endpos, startline, endline))
 
-            # Get the first line of the method text
-            first_line = method_text.split("\n")[0].strip()
+        return boundaries
 
-            # Check if COMMENTS_REQUIRED is True and the method has a comment
-            if self.config.comments_required and not first_line.startswith("/"):
-                logging.info(
-                    "Skipping method %s, because it has no comment.", method_node.name
-                )
-                continue
-
-            methods[method_node.name] = method_text
-
-        return methods
+    def _get_token_method_boundaries(
+        self, file: str, code_text: str
+    ) -> list[tuple[str, Position, Position, int, int]]:
+        """
+        Get the start and end position of the methods in a file from its tokens.
+        :param file: The file.
+        :param code_text: The code of the file.
+        :return: The name, start and end position and start and end line of each
+        method.
+        """
+        try:
+            token_methods = find_methods(code_text)
+        except Exception as e:
+            logging.warning("Could not tokenize file %s.", file)
+            logging.warning(e)
+            return []
+
+        # The end position is the line after the closing brace, as for the parser
+        return [
+            (
+                method.name,
+                Position(method.start_line, method.start_column),
+                Position(method.end_line + 1, 0),
+                method.start_line,
+                method.end_line + 1,
+            )
+            for method in token_methods
+            if method.has_body or not self.config.require_body
+        ]
 
     @staticmethod
-    def _get_method_start_end(
-        parse_tree: list, method_node: MethodDeclaration
-    ) -> tuple[str, str, int, int]:
+    def _get_method_boundaries(
+        parse_tree: CompilationUnit,
+    ) -> list[tuple[MethodDeclaration, Position, Position, int, int]]:
         """
-        Get the start and end position of a method in the source code.
+        Get the start and end position of all methods in the source code with a single
+        traversal of the parse tree. The end position of a method is the position of
+        the first node after the method node and its children.
         :param parse_tree: The full parse tree.
-        :param method_node: The method node.
-        :return: The start and end position of the method.
+        :return: The method nodes in the order of the parse tree with their start and
+        end position and their start and end line.
         """
-        startpos = None
-        endpos = None
-        startline = None
-        endline = None
+        boundaries = []
+        open_methods = []
 
-        # Iterate over the parse tree and find the method node
         for path, node in parse_tree:
-            if startpos is None and node == method_node:
-                startpos = node.position
+            # Close the methods whose children have all been visited
+            still_open = []
+            for boundary in open_methods:
+                method_node, startpos = boundary[0], boundary[1]
+                if method_node not in path and startpos is not node.position:
+                    boundary[2] = node.position
+                    boundary[4] = (
+                        node.position.line if node.position is not None else None
+                    )
+                else:
+                    still_open.append(boundary)
+            open_methods = still_open
+
+            if isinstance(node, MethodDeclaration):
                 startline = node.position.line if node.position is not None else None
-            if (
-                startpos is not None
-                and method_node not in path
-                and startpos is not node.position
-            ):
-                endpos = node.position
-                endline = node.position.line if node.position is not None else None
-                break
-        return startpos, endpos, startline, endline
+                boundary = [node, node.position, None, startline, None]
+                boundaries.append(boundary)
+                if node.position is not None:
+                    open_methods.append(boundary)
+
+        return [tuple(boundary) for boundary in boundaries]
 
     def _get_method_text(
         self,
@@ -255,6 +412,7 @@ class MethodExtractor:
         endline: int,
         include_method_comments: bool = True,
         remove_indentation: bool = True,
+        exact_end: bool = False,
     ) -> tuple[str, int | None, int | None, Any]:
         """
         Get the text of a method, including any comments before the method.
@@ -263,6 +421,10 @@ class MethodExtractor:
         :param endpos: The end position of the method.
         :param startline: The start line of the method.
         :param endline: The end line of the method.
+        :param include_method_comments: Whether to include comments before the method.
+        :param remove_indentation: Whether to remove indentation.
+        :param exact_end: Whether the end line is the line of the closing brace of the
+        method. Otherwise, trailing braces are removed until the braces are balanced.
         :return: The text of the method.
         """
         if startpos is None:
@@ -281,7 +443,7 @@ class MethodExtractor:
 
         # Remove trailing rbrace for last methods & any external content/comments
         # if endpos is None and
-        if abs(meth_text.count("}") - meth_text.count("{")) != 0:
+        if not exact_end and abs(meth_text.count("}") - meth_text.count("{")) != 0:
             # imbalanced braces
             brace_diff = abs(meth_text.count("}") - meth_text.count("{"))
 
@@ -356,43 +518,6 @@ class MethodExtractor:
 
         return "\n".join(meth_lines)
 
-    @staticmethod
-    def _calculate_end_line_from_start(meth_lines: list[str], start_line: int) -> int:
-        """
-        Calculate the end position of the method from the start position by counting
-        the braces.
-        :param meth_lines: The method lines.
-        :param start_line: The start line of the method.
-        :return: The last line of the method.
-        """
-        start_line_index = start_line - 1
-        last_line_index = start_line_index
-        brace_count = 0
-
-        # Count until the first opening brace
-        while last_line_index < len(meth_lines) and brace_count == 0:
-            line = meth_lines[last_line_index]
-            brace_count += line.count("{")
-            brace_count -= line.count("}")
-
-            if brace_count < 0:
-                raise InvalidBraceCountException(
-                    "Invalid brace count: %d" % brace_count
-                )
-
-            last_line_index += 1
-
-        # Iterate over the lines of the method
-        while last_line_index < len(meth_lines) and brace_count > 0:
-            line = meth_lines[last_line_index]
-            brace_count += line.count("{")
-            brace_count -= line.count("}")
-            last_line_index += 1
-
-        # The last line is the line after the last line with a brace
-        # because the parser also always overshoots the end of the method
-        return last_line_index + 1
-
     @staticmethod
     def _calculate_actual_end_line(meth_lines: list[str], startline_index: int) -> int:
         """
@@ -412,6 +537,152 @@ class MethodExtractor:
         return last_line + 1 + startline_index
 
 
+class BraceDepthIndex:
+    """
+    An index of the brace depth before each line of a file. It finds the end line of
+    a method from its start line without counting the braces of the method lines
+    again for each method.
+    """
+
+    def __init__(self, codelines: list[str]):
+        """
+        Initialize the index with one pass over the lines of the file.
+        :param codelines: The code lines.
+        """
+        self.num_lines = len(codelines)
+
+        # The brace depth before each line and after the last line
+        self.depths = [0] * (self.num_lines + 1)
+        for index, line in enumerate(codelines):
+            self.depths[index + 1] = (
+                self.depths[index] + line.count("{") - line.count("}")
+            )
+
+        # The next line (from each line on) that changes the brace depth
+        self.next_change = [self.num_lines] * (self.num_lines + 1)
+        for index in range(self.num_lines - 1, -1, -1):
+            if self.depths[index + 1] != self.depths[index]:
+                self.next_change[index] = index
+            else:
+                self.next_change[index] = self.next_change[index + 1]
+
+        # The next position with a lower brace depth than each position
+        self.next_lower = [self.num_lines + 1] * (self.num_lines + 1)
+        stack = []
+        for index, depth in enumerate(self.depths):
+            while stack and self.depths[stack[-1]] > depth:
+                self.next_lower[stack.pop()] = index
+            stack.append(index)
+
+    def end_line(self, start_line: int) -> int:
+        """
+        Calculate the end position of the method from the start position by the brace
+        depth of the lines.
+        :param start_line: The start line of the method.
+        :return: The last line of the method.
+        """
+        start_line_index = start_line - 1
+        if start_line_index >= self.num_lines:
+            return start_line_index + 1
+
+        # Find the first line that opens or closes a brace
+        brace_line_index = self.next_change[start_line_index]
+        if brace_line_index == self.num_lines:
+            return self.num_lines + 1
+        start_depth = self.depths[start_line_index]
+        brace_count = self.depths[brace_line_index + 1] - start_depth
+        if brace_count < 0:
+            raise InvalidBraceCountException(f"Invalid brace count: {brace_count}")
+
+        # Jump to the first line after which all braces of the method are closed
+        last_line_index = brace_line_index + 1
+        while (
+            last_line_index <= self.num_lines
+            and self.depths[last_line_index] > start_depth
+        ):
+            last_line_index = self.next_lower[last_line_index]
+
+        # The last line is the line after the last line with a brace
+        # because the parser also always overshoots the end of the method
+        return min(last_line_index, self.num_lines) + 1
+
+
+_worker_extractor: MethodExtractor | None = None
+
+
+def _init_worker(config: MethodExtractorConfig) -> None:
+    """
+    Initialize the method extractor of a worker process.
+    :param config: The configuration of the method extractor.
+    :return: None.
+    """
+    global _worker_extractor
+    _worker_extractor = MethodExtractor(config)
+
+
+def _iterate_methods_in_worker(input_file: str) -> dict[str, str]:
+    """
+    Extract the methods of a file in a worker process.
+    :param input_file: The input file.
+    :return: A dictionary containing the method name and the method code.
+    """
+    return _worker_extractor._iterate_methods(input_file)
+
+
+def _list_pending_files(
+    method_extractor: MethodExtractor,
+    input_dir: str,
+    output_dir: str,
+    manifest: ExtractionManifest | None,
+    archive: SnippetArchive | None,
+) -> Iterator[tuple[str, str, str]]:
+    """
+    Lists the java files of all projects in the input directory that still need to
+    be extracted.
+    :param method_extractor: The method extractor.
+    :param input_dir: The input directory.
+    :param output_dir: The output directory or, if an archive is given, the empty
+    path of the archive root.
+    :param manifest: The manifest of completed files or None.
+    :param archive: The archive to store the methods in or None.
+    :return: The input file, the output directory of its project and the path of the
+    file relative to the input directory.
+    """
+    # Iterate over each directory in the input directory
+    for directory in os.listdir(input_dir):
+        if not os.path.isdir(os.path.join(input_dir, directory)):
+            continue
+
+        # Create a subfolder for each directory in the output directory
+        output_subdir = os.path.join(output_dir, directory)
+        for input_file in method_extractor.list_java_files(
+            os.path.join(input_dir, directory)
+        ):
+            relative_path = os.path.relpath(input_file, input_dir)
+            if manifest is not None and relative_path in manifest:
+                continue
+            if method_extractor.skip_file(input_file, output_subdir, archive):
+                continue
+            yield input_file, output_subdir, relative_path
+
+
+def _check_extraction_arguments(workers: int, output_format: str) -> None:
+    """
+    Check the arguments of the method extraction.
+    :param workers: The number of processes that parse the files.
+    :param output_format: The format to store the methods in.
+    :return: None.
+    """
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1.")
+
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format: {output_format}. Valid formats are: "
+            f"{', '.join(OUTPUT_FORMATS)}."
+        )
+
+
 def extract_methods(
     input_dir: str,
     output_dir: str,
@@ -420,9 +691,17 @@ def extract_methods(
     comments_required: bool = True,
     remove_indentation: bool = True,
     require_body: bool = True,
+    workers: int = 1,
+    manifest_path: str = None,
+    engine: ExtractionEngine = ExtractionEngine.PARSER,
+    output_format: str = "files",
 ) -> None:
     """
     Extracts java methods from their classes and stores each in a separate file.
+    If workers > 1, the files are parsed by a pool of processes. The methods are
+    written by the main process in the same order as with a single worker.
+    If the output format is "archive", the methods are appended to a sharded
+    SnippetArchive in the output directory instead of creating one file per method.
     :param input_dir: The input directory.
     :param output_dir: The output directory.
     :param overwrite_mode: The overwrite mode.
@@ -430,28 +709,70 @@ def extract_methods(
     :param comments_required: Whether comments are required.
     :param remove_indentation: Whether to remove indentation.
     :param require_body: Whether the method must have a body.
+    :param workers: The number of processes that parse the files.
+    :param manifest_path: The path to the manifest of completed files. If given,
+    files listed in the manifest are skipped and newly completed files are added.
+    :param engine: The engine that finds the methods: the javalang parser or the
+    faster token-level engine, which also handles syntax the parser does not support.
+    :param output_format: The format to store the methods in: "files" or "archive".
     :return: None.
     """
-    method_extractor = MethodExtractor(
-        MethodExtractorConfig(
-            overwrite_mode=overwrite_mode,
-            include_method_comments=include_method_comments,
-            comments_required=comments_required,
-            remove_indentation=remove_indentation,
-            require_body=require_body,
+    _check_extraction_arguments(workers, output_format)
+
+    config = MethodExtractorConfig(
+        overwrite_mode=overwrite_mode,
+        include_method_comments=include_method_comments,
+        comments_required=comments_required,
+        remove_indentation=remove_indentation,
+        require_body=require_body,
+        engine=engine,
+    )
+    method_extractor = MethodExtractor(config)
+    manifest = ExtractionManifest(manifest_path) if manifest_path else None
+    archive = SnippetArchive(output_dir) if output_format == "archive" else None
+
+    pending_files = list(
+        _list_pending_files(
+            method_extractor,
+            input_dir,
+            output_dir if archive is None else "",
+            manifest,
+            archive,
         )
     )
+    input_files = [input_file for input_file, _, _ in pending_files]
+    logging.info("Extracting methods from %d files.", len(input_files))
 
-    # Iterate over each directory in the input directory
-    for directory in os.listdir(input_dir):
-        if not os.path.isdir(os.path.join(input_dir, directory)):
-            continue
-
-        # Create a subfolder for each directory in the output directory
-        output_subdir = os.path.join(output_dir, directory)
-        method_extractor.extract_methods_from_dir(
-            os.path.join(input_dir, directory), output_subdir
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(config,)
+        )
+        results = executor.map(
+            _iterate_methods_in_worker, input_files, chunksize=WORKER_CHUNK_SIZE
         )
+    else:
+        results = map(method_extractor._iterate_methods, input_files)
+
+    try:
+        for (input_file, output_subdir, relative_path), methods in zip(
+            pending_files, results, strict=True
+        ):
+            # Files of the same project may share an output directory
+            if not method_extractor.skip_file(input_file, output_subdir, archive):
+                method_extractor.write_methods(
+                    input_file, output_subdir, methods, archive
+                )
+            if manifest is not None:
+                if archive is not None:
+                    archive.flush()
+                manifest.add(relative_path)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        for resource in (manifest, archive):
+            if resource is not None:
+                resource.close()
 
 
 class InvalidBraceCountException(Exception):
@@ -1,20 +1,48 @@
 import logging
 import os
-import shutil
-from pathlib import Path
+from collections.abc import Callable
+from pathlib import Path, PureWindowsPath
+
+from src.readability_preprocessing.utils.materialization import (
+    MaterializationMode,
+    Materializer,
+)
+from src.readability_preprocessing.utils.snippet_archive import SnippetArchive
+
+MATCHING_MODES = ["substring", "index"]
 
 
 def extract_sampled(
-    input_dirs: list[Path], output_dir: Path, sampling_dir: Path
+    input_dirs: list[Path],
+    output_dir: Path,
+    sampling_dir: Path,
+    matching: str = "substring",
+    materialization: MaterializationMode = MaterializationMode.COPY,
 ) -> None:
     """
     Extracts the sampled files from the input directories into the output directory.
     The sampling is specified by the files in the sampling directory.
+    The input directories may also be snippet archives.
+    With the "substring" matching, every file of the input directories is copied
+    whose path contains the path of a sampled file relative to the common path of
+    all sampled files. With the "index" matching, the input directories are not
+    walked. Instead, the sampled files are looked up directly: a sampled file
+    matches the file in an input directory whose relative path is the longest
+    suffix of the sampled path.
     :param input_dirs: The directories to extract the sampled files from.
     :param output_dir: The directory to extract the sampled files to.
     :param sampling_dir: The directory containing the sampling files.
+    :param matching: The matching mode: "substring" or "index".
+    :param materialization: How the sampled files are stored in the output
+    directory.
     :return: None.
     """
+    if matching not in MATCHING_MODES:
+        raise ValueError(
+            f"Unknown matching mode: {matching}. Valid modes are: "
+            f"{', '.join(MATCHING_MODES)}."
+        )
+
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -33,16 +61,24 @@ def extract_sampled(
     for idx, stratum_contents in enumerate(strata_contents):
         logging.info(f"{idx}: first stratum entry absolute: {stratum_contents[0]}")
 
-    strata_contents = _to_relative_paths(strata_contents)
+    with Materializer(materialization, output_dir) as materializer:
+        if matching == "index":
+            for input_dir in input_dirs:
+                _copy_indexed_files_to_output(
+                    input_dir, output_dir, strata_names, strata_contents, materializer
+                )
+            return
+
+        strata_contents = _to_relative_paths(strata_contents)
 
-    # Log the first line of each stratum
-    for idx, stratum_contents in enumerate(strata_contents):
-        logging.info(f"{idx}: first stratum entry relative: {stratum_contents[0]}")
+        # Log the first line of each stratum
+        for idx, stratum_contents in enumerate(strata_contents):
+            logging.info(f"{idx}: first stratum entry relative: {stratum_contents[0]}")
 
-    stratas_with_names = list(zip(strata_names, strata_contents, strict=False))
+        stratas_with_names = list(zip(strata_names, strata_contents, strict=False))
 
-    # Copy the files to the output directory
-    _copy_files_to_output(input_dirs, output_dir, stratas_with_names)
+        # Copy the files to the output directory
+        _copy_files_to_output(input_dirs, output_dir, stratas_with_names, materializer)
 
 
 def _create_subdirectories(
@@ -66,28 +102,54 @@ def _create_subdirectories(
 
 
 def _copy_files_to_output(
-    input_dirs: list[Path], output_dir: Path, stratas_with_names: list
+    input_dirs: list[Path],
+    output_dir: Path,
+    stratas_with_names: list,
+    materializer: Materializer,
 ) -> None:
     """
     Copies the files to the output directories.
     :param input_dirs: The directories to extract the sampled files from.
     :param output_dir: The directory to extract the sampled files to.
     :param stratas_with_names: The stratas with names.
+    :param materializer: The materializer that stores the files.
     :return: None.
     """
     for input_dir in input_dirs:
+        if SnippetArchive.is_archive(input_dir):
+            archive = SnippetArchive(input_dir)
+            for path, code in archive.items():
+                _copy_matching_files(
+                    archive.absolute_path(path),
+                    stratas_with_names,
+                    output_dir,
+                    input_dir,
+                    materializer,
+                    code=code,
+                )
+            continue
+
         for root, _dirs, files in os.walk(input_dir):
             for file_name in files:
                 absolute_file_path = os.path.join(root, file_name)
                 absolute_file_path = str(Path(absolute_file_path).absolute())
 
                 _copy_matching_files(
-                    absolute_file_path, stratas_with_names, output_dir, input_dir
+                    absolute_file_path,
+                    stratas_with_names,
+                    output_dir,
+                    input_dir,
+                    materializer,
                 )
 
 
 def _copy_matching_files(
-    input_file_path: str, stratas_with_names: list, output_dir: Path, input_dir: Path
+    input_file_path: str,
+    stratas_with_names: list,
+    output_dir: Path,
+    input_dir: Path,
+    materializer: Materializer,
+    code: str = None,
 ) -> None:
     """
     Copies the files to the output directories.
@@ -95,6 +157,8 @@ def _copy_matching_files(
     :param stratas_with_names: The stratas with names.
     :param output_dir: The directory to extract the sampled files to.
     :param input_dir: The input directory.
+    :param materializer: The materializer that stores the files.
+    :param code: The code of the file, if it is read from a snippet archive.
     :return: None.
     """
     for name, stratum in stratas_with_names:
@@ -106,7 +170,113 @@ def _copy_matching_files(
             output_file_path = os.path.join(
                 output_dir, name.stem, input_dir.stem, new_file_name
             )
-            shutil.copy(input_file_path, output_file_path)
+            _write_sampled_file(input_file_path, output_file_path, materializer, code)
+
+
+def _write_sampled_file(
+    input_file_path: str,
+    output_file_path: str,
+    materializer: Materializer,
+    code: str = None,
+) -> None:
+    """
+    Copies a sampled file to the output file path.
+    :param input_file_path: The input file path.
+    :param output_file_path: The output file path.
+    :param materializer: The materializer that stores the files.
+    :param code: The code of the file, if it is read from a snippet archive.
+    :return: None.
+    """
+    if code is not None:
+        materializer.write(code, output_file_path, source=input_file_path)
+    else:
+        materializer.materialize(input_file_path, output_file_path)
+
+
+def _copy_indexed_files_to_output(
+    input_dir: Path,
+    output_dir: Path,
+    strata_names: list[Path],
+    strata_contents: list[list[str]],
+    materializer: Materializer,
+) -> None:
+    """
+    Copies the sampled files of an input directory to the output directories by
+    looking them up in the input directory, without walking it.
+    :param input_dir: The directory or snippet archive to extract the sampled files
+    from.
+    :param output_dir: The directory to extract the sampled files to.
+    :param strata_names: The sampling files.
+    :param strata_contents: The paths of the sampled files of each stratum.
+    :param materializer: The materializer that stores the files.
+    :return: None.
+    """
+    archive = None
+    if SnippetArchive.is_archive(input_dir):
+        archive = SnippetArchive(input_dir)
+        index = _build_sample_index(strata_names, strata_contents, archive.is_snippet)
+    else:
+        index = _build_sample_index(
+            strata_names,
+            strata_contents,
+            lambda relative_path: os.path.isfile(input_dir / relative_path),
+        )
+    logging.info(f"Found {len(index)} sampled files in {input_dir}.")
+
+    for relative_path, names in index.items():
+        input_file_path = str((input_dir / relative_path).absolute())
+        code = archive.read(relative_path) if archive is not None else None
+        new_file_name = relative_path.replace("/", "_")
+        for name in names:
+            output_file_path = os.path.join(
+                output_dir, name.stem, input_dir.stem, new_file_name
+            )
+            _write_sampled_file(input_file_path, output_file_path, materializer, code)
+
+
+def _build_sample_index(
+    strata_names: list[Path],
+    strata_contents: list[list[str]],
+    exists: Callable[[str], bool],
+) -> dict[str, list[Path]]:
+    """
+    Builds a map from the relative path of each sampled file in an input directory
+    to the strata it was sampled in.
+    :param strata_names: The sampling files.
+    :param strata_contents: The paths of the sampled files of each stratum.
+    :param exists: Checks whether a relative path is a file in the input directory.
+    :return: The strata of each relative path.
+    """
+    index = {}
+    for name, stratum in zip(strata_names, strata_contents, strict=True):
+        for sampled_path in stratum:
+            relative_path = _find_relative_path(sampled_path, exists)
+            if relative_path is None:
+                logging.warning(f"Sampled file not found: {sampled_path}")
+                continue
+            index.setdefault(relative_path, []).append(name)
+    return index
+
+
+def _find_relative_path(sampled_path: str, exists: Callable[[str], bool]) -> str | None:
+    """
+    Finds the longest suffix of a sampled path that exists in an input directory.
+    The sampled path may use forward or backward slashes.
+    :param sampled_path: The path of the sampled file.
+    :param exists: Checks whether a relative path is a file in the input directory.
+    :return: The suffix as relative path with forward slashes or None, if no suffix
+    exists.
+    """
+    parts = [
+        part
+        for part in PureWindowsPath(sampled_path).parts
+        if not PureWindowsPath(part).anchor
+    ]
+    for start in range(len(parts)):
+        relative_path = "/".join(parts[start:])
+        if exists(relative_path):
+            return relative_path
+    return None
 
 
 def _get_new_file_name(file_path: str, input_dir: Path) -> str:
@@ -0,0 +1,362 @@
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<whitespace>\s+)
+    |(?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<literal>
+        \"\"\".*?(?<!\\)\"\"\"
+        |"(?:[^"\\\n]|\\.)*"
+        |'(?:[^'\\\n]|\\.)*'
+        |\.?\d(?:[\w.]|[eEpP][+-])*
+    )
+    |(?P<name>(?:[^\W\d]|\$)(?:\w|\$)*)
+    |(?P<separator>\.\.\.|::|[(){}\[\];,.@])
+    |(?P<operator>
+        >>>=|<<=|>>=|>>>|->|==|>=|<=|!=|&&|\|\||\+\+|--|[-+*/&|^%]=|<<|>>
+        |[-=<>!~?:+*/&|^%]
+    )
+    |(?P<other>.)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+SKIPPED_KINDS = {"whitespace", "comment"}
+KEYWORDS = {
+    "abstract", "assert", "break", "case", "catch", "class", "const", "continue",
+    "default", "do", "else", "enum", "extends", "final", "finally", "for", "goto",
+    "if", "implements", "import", "instanceof", "interface", "native", "new",
+    "package", "private", "protected", "public", "return", "static", "strictfp",
+    "super", "switch", "synchronized", "this", "throw", "throws", "transient", "try",
+    "volatile", "while", "true", "false", "null",
+}  # fmt: skip
+BASIC_TYPES = {"boolean", "byte", "char", "short", "int", "long", "float", "double"}
+TYPE_KEYWORDS = {"class", "interface", "enum"}
+RETURN_TYPE_ENDS = {"]", ">", ">>", ">>>"}
+BRACKETS = {"(": ")", "{": "}", "[": "]"}
+
+
+@dataclass
+class Token:
+    """
+    A token of a java file.
+    """
+
+    kind: str
+    value: str
+    line: int
+    column: int
+
+
+@dataclass
+class TokenMethod:
+    """
+    A method declaration found in the token stream of a java file.
+    """
+
+    name: str
+    start_line: int
+    start_column: int
+    end_line: int
+    has_body: bool
+
+
+def tokenize(code_text: str) -> Iterator[Token]:
+    """
+    Split java code into tokens, skipping whitespace and comments. Unlike the
+    javalang tokenizer, literals are not decoded, which makes the tokenizer fast
+    enough to find methods without parsing, and text blocks are supported.
+    :param code_text: The java code.
+    :return: The tokens with their line and column (both starting at 1).
+    """
+    line = 1
+    line_start = 0
+    for match in TOKEN_PATTERN.finditer(code_text):
+        kind = match.lastgroup
+        value = match.group()
+        if kind not in SKIPPED_KINDS:
+            yield Token(kind, value, line, match.start() - line_start + 1)
+
+        newlines = value.count("\n")
+        if newlines:
+            line += newlines
+            line_start = match.start() + value.rfind("\n") + 1
+
+
+def find_methods(code_text: str) -> list[TokenMethod]:
+    """
+    Find the method declarations of all types in a java file from its tokens and
+    the bracket depth, without parsing the file. Methods of local and anonymous
+    classes are part of the enclosing method or field and are not returned
+    separately. Constructors and annotation type elements are not methods.
+    :param code_text: The source code of the java file.
+    :return: The methods in the order of the source code.
+    """
+    return _TokenScanner(list(tokenize(code_text))).scan()
+
+
+class _TokenScanner:
+    """
+    A scanner over the tokens of a java file that tracks the enclosing type bodies.
+    """
+
+    def __init__(self, tokens: list[Token]):
+        self.tokens = tokens
+        self.methods: list[TokenMethod] = []
+        # The name of each enclosing type and whether it is an annotation type
+        self.types: list[tuple[str, bool]] = []
+        self.member_start: int | None = None
+
+    def scan(self) -> list[TokenMethod]:
+        """
+        Scan all tokens for method declarations.
+        :return: The found methods.
+        """
+        index = 0
+        while index < len(self.tokens):
+            index = self._scan_token(index)
+        return self.methods
+
+    def _scan_token(self, index: int) -> int:
+        """
+        Process the token at the given index.
+        :param index: The index of the token.
+        :return: The index of the next token to process.
+        """
+        token = self.tokens[index]
+
+        if self._is_type_declaration(index):
+            return self._enter_type(index)
+        if _is(token, "separator", "}"):
+            if self.types:
+                self.types.pop()
+            self.member_start = None
+            return index + 1
+        if not self.types:
+            return index + 1
+        if _is(token, "separator", "@"):
+            return self._skip_annotation(index)
+        return self._scan_member_token(index)
+
+    def _scan_member_token(self, index: int) -> int:
+        """
+        Process a token of a member declaration in a type body.
+        :param index: The index of the token.
+        :return: The index of the next token to process.
+        """
+        token = self.tokens[index]
+        if self.member_start is None:
+            self.member_start = index
+
+        if _is(token, "separator", ";"):
+            self.member_start = None
+        elif _is(token, "separator", "{"):
+            # Initializer blocks and the bodies of enum constants
+            self.member_start = None
+            return self._find_closing(index) + 1
+        elif _is(token, "operator", "="):
+            # Field initializers, which may contain anonymous classes and lambdas
+            self.member_start = None
+            return self._find_next(index, ";") + 1
+        elif _is(token, "separator", "(") and self.tokens[index - 1].kind == "name":
+            return self._scan_invocable(index)
+        return index + 1
+
+    def _is_type_declaration(self, index: int) -> bool:
+        """
+        Check whether a class, interface, enum, record or annotation type is declared
+        at the given index.
+        :param index: The index of the token.
+        :return: True if a type is declared, False otherwise.
+        """
+        token = self.tokens[index]
+        if token.kind == "name" and token.value in TYPE_KEYWORDS:
+            return index == 0 or not _is(self.tokens[index - 1], "separator", ".")
+        if _is(token, "separator", "@"):
+            return _is(self._token(index + 1), "name", "interface")
+        return (
+            _is(token, "name", "record")
+            and _is_identifier(self._token(index + 1))
+            and (
+                _is(self._token(index + 2), "separator", "(")
+                or _is(self._token(index + 2), "operator", "<")
+            )
+        )
+
+    def _enter_type(self, index: int) -> int:
+        """
+        Enter the body of the type declared at the given index.
+        :param index: The index of the type keyword.
+        :return: The index after the opening brace of the type body.
+        """
+        is_annotation = _is(self.tokens[index], "separator", "@")
+        if is_annotation:
+            index += 1
+        name_token = self._token(index + 1)
+        name = name_token.value if name_token is not None else ""
+
+        body_start = self._find_next(index, "{")
+        self.types.append((name, is_annotation))
+        self.member_start = None
+        return body_start + 1
+
+    def _skip_annotation(self, index: int) -> int:
+        """
+        Skip an annotation including its qualified name and arguments.
+        :param index: The index of the @ token.
+        :return: The index after the annotation.
+        """
+        index += 1
+        while _is_identifier(self._token(index)) and _is(
+            self._token(index + 1), "separator", "."
+        ):
+            index += 2
+        index += 1
+        if _is(self._token(index), "separator", "("):
+            index = self._find_closing(index) + 1
+        return index
+
+    def _scan_invocable(self, index: int) -> int:
+        """
+        Scan a declaration with a parameter list, which is a method, a constructor,
+        an enum constant or an annotation type element.
+        :param index: The index of the opening parenthesis of the parameter list.
+        :return: The index after the declaration.
+        """
+        name_token = self.tokens[index - 1]
+        return_type = (
+            self.tokens[index - 2]
+            if self.member_start is not None and index - 2 >= self.member_start
+            else None
+        )
+        type_name, is_annotation = self.types[-1]
+
+        # Find the end of the declaration: its body or the terminating semicolon
+        end = self._find_closing(index) + 1
+        while end < len(self.tokens) and not (
+            _is(self.tokens[end], "separator", "{")
+            or _is(self.tokens[end], "separator", ";")
+        ):
+            if _is_opening(self.tokens[end]):
+                end = self._find_closing(end)
+            end += 1
+        has_body = end < len(self.tokens) and self.tokens[end].value == "{"
+        if has_body:
+            end = self._find_closing(end)
+
+        if (
+            not is_annotation
+            and _is_return_type(return_type)
+            and not (name_token.value == type_name and return_type.value == ">")
+        ):
+            start_token = self.tokens[self.member_start]
+            end_token = self._token(end) or self.tokens[-1]
+            self.methods.append(
+                TokenMethod(
+                    name=name_token.value,
+                    start_line=start_token.line,
+                    start_column=start_token.column,
+                    end_line=end_token.line,
+                    has_body=has_body,
+                )
+            )
+
+        self.member_start = None
+        return end + 1
+
+    def _find_closing(self, index: int) -> int:
+        """
+        Find the bracket that closes the bracket at the given index.
+        :param index: The index of the opening bracket.
+        :return: The index of the closing bracket or the last index, if it is not
+        closed.
+        """
+        depth = 0
+        for current in range(index, len(self.tokens)):
+            token = self.tokens[current]
+            if token.kind != "separator":
+                continue
+            if token.value in BRACKETS:
+                depth += 1
+            elif token.value in BRACKETS.values():
+                depth -= 1
+                if depth == 0:
+                    return current
+        return len(self.tokens) - 1
+
+    def _find_next(self, index: int, value: str) -> int:
+        """
+        Find the next separator with the given value outside of brackets.
+        :param index: The index to start from.
+        :param value: The value of the separator.
+        :return: The index of the separator or the last index, if there is none.
+        """
+        current = index
+        while current < len(self.tokens):
+            token = self.tokens[current]
+            if _is(token, "separator", value):
+                return current
+            if _is_opening(token):
+                current = self._find_closing(current)
+            current += 1
+        return len(self.tokens) - 1
+
+    def _token(self, index: int) -> Token | None:
+        """
+        Get the token at the given index.
+        :param index: The index of the token.
+        :return: The token or None, if the index is out of range.
+        """
+        return self.tokens[index] if index < len(self.tokens) else None
+
+
+def _is(token: Token | None, kind: str, value: str) -> bool:
+    """
+    Check whether a token has the given kind and value.
+    :param token: The token.
+    :param kind: The kind of the token.
+    :param value: The value of the token.
+    :return: True if the token matches, False otherwise.
+    """
+    return token is not None and token.kind == kind and token.value == value
+
+
+def _is_opening(token: Token) -> bool:
+    """
+    Check whether a token is an opening bracket.
+    :param token: The token.
+    :return: True if the token opens a bracket, False otherwise.
+    """
+    return token.kind == "separator" and token.value in BRACKETS
+
+
+def _is_identifier(token: Token | None) -> bool:
+    """
+    Check whether a token is an identifier, i.e. a name that is not a keyword.
+    :param token: The token.
+    :return: True if the token is an identifier, False otherwise.
+    """
+    return (
+        token is not None
+        and token.kind == "name"
+        and token.value not in KEYWORDS
+        and token.value not in BASIC_TYPES
+        and token.value != "void"
+    )
+
+
+def _is_return_type(token: Token | None) -> bool:
+    """
+    Check whether a token can be the last token of the return type of a method.
+    :param token: The token before the method name.
+    :return: True if the token can end a return type, False otherwise.
+    """
+    if token is None:
+        return False
+    return (
+        _is_identifier(token)
+        or (token.kind == "name" and token.value in BASIC_TYPES | {"void"})
+        or _is(token, "separator", "]")
+        or (token.kind == "operator" and token.value in RETURN_TYPE_ENDS)
+    )
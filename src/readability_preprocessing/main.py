@@ -8,7 +8,10 @@ from pathlib import Path
 from typing import Any
 
 from readability_preprocessing.extractors.diff_extractor import compare_to_folder
-from readability_preprocessing.extractors.sampled_extractor import extract_sampled
+from readability_preprocessing.extractors.sampled_extractor import (
+    MATCHING_MODES,
+    extract_sampled,
+)
 from readability_preprocessing.rdh.comments_remover import remove_comments
 from readability_preprocessing.sampling.survey_crafting import SurveyCrafter
 from src.readability_preprocessing.dataset.dataset_combiner import combine_datasets
@@ -17,17 +20,37 @@ from src.readability_preprocessing.dataset.dataset_converter import (
     convert_dataset_csv,
     convert_dataset_two_folders,
 )
+from src.readability_preprocessing.dataset.dataset_utils import balance, deduplicate
+from src.readability_preprocessing.dataset.near_duplicates import (
+    DEFAULT_NUM_PERMUTATIONS,
+    DEFAULT_SHINGLE_SIZE,
+    DEFAULT_THRESHOLD,
+    remove_near_duplicates,
+)
 from src.readability_preprocessing.extractors.file_extractor import extract_files
 from src.readability_preprocessing.extractors.method_extractor import (
+    OUTPUT_FORMATS,
+    ExtractionEngine,
     OverwriteMode,
     extract_methods,
 )
+from src.readability_preprocessing.prolific.agreement import (
+    DEFAULT_CONFIDENCE,
+    DEFAULT_NUM_BOOTSTRAP,
+    LEVELS_OF_MEASUREMENT,
+    analyze_agreement,
+)
+from src.readability_preprocessing.sampling.feature_cache import DEFAULT_MAX_ENTRIES
 from src.readability_preprocessing.sampling.stratified_sampling import (
+    DEFAULT_NUM_MICRO_CLUSTERS,
+    ENGINES,
     StratifiedSampler,
     calculate_features,
 )
-from src.readability_preprocessing.utils.csv import load_features_from_csv
+from src.readability_preprocessing.utils.csv import load_feature_matrix_from_csv
 from src.readability_preprocessing.utils.dataset import download_dataset, upload_dataset
+from src.readability_preprocessing.utils.feature_store import FeatureStore
+from src.readability_preprocessing.utils.materialization import MaterializationMode
 
 DEFAULT_LOG_FILE_NAME = "readability-preprocessing"
 DEFAULT_LOG_FILE = f"{DEFAULT_LOG_FILE_NAME}.log"
@@ -89,10 +112,14 @@ class Tasks(Enum):
     CONVERT_CSV = "CONVERT_CSV"
     CONVERT_TWO_FOLDERS = "CONVERT_TWO_FOLDERS"
     COMBINE = "COMBINE"
+    BALANCE = "BALANCE"
+    DEDUPLICATE = "DEDUPLICATE"
+    NEAR_DUPLICATES = "NEAR_DUPLICATES"
     DOWNLOAD = "DOWNLOAD"
     UPLOAD = "UPLOAD"
     CRAFT_SURVEYS = "CRAFT_SURVEYS"
     REMOVE_COMMENTS = "REMOVE_COMMENTS"
+    AGREEMENT = "AGREEMENT"
 
     @classmethod
     def _missing_(cls, value: object) -> Any:
@@ -117,8 +144,9 @@ def _set_up_arg_parser() -> ArgumentParser:
         "-i",
         required=True,
         type=Path,
-        help="Path to the folder containing java files to sample from or to a csv file "
-        "containing the paths and features of the java files.",
+        help="Path to the folder containing java files to sample from, to a csv file "
+        "containing the paths and features of the java files or to a feature store "
+        "folder (see --feature-format).",
     )
     sample_parser.add_argument(
         "--output",
@@ -144,6 +172,70 @@ def _set_up_arg_parser() -> ArgumentParser:
         default=400,
         help="Number of snippets to sample in total.",
     )
+    sample_parser.add_argument(
+        "--workers",
+        "-w",
+        required=False,
+        type=int,
+        default=1,
+        help="Number of feature extraction processes (JVMs) to run concurrently.",
+    )
+    sample_parser.add_argument(
+        "--cache",
+        "-c",
+        required=False,
+        type=Path,
+        default=None,
+        help="Path to a SQLite file caching the features of already processed "
+        "snippets. If not specified, the features of all snippets are extracted.",
+    )
+    sample_parser.add_argument(
+        "--cache-size",
+        "-cs",
+        required=False,
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help="Maximum number of snippets to keep in the feature cache.",
+    )
+    sample_parser.add_argument(
+        "--feature-format",
+        "-ff",
+        required=False,
+        type=str,
+        choices=["csv", "npy"],
+        default="csv",
+        help="Format in which the extracted features are stored in the output folder: "
+        "a csv file or a columnar feature store with a float32 matrix.",
+    )
+    sample_parser.add_argument(
+        "--engine",
+        "-e",
+        required=False,
+        type=str,
+        choices=ENGINES,
+        default="similarity",
+        help="Clustering engine. similarity clusters the full similarity matrix "
+        "(O(n²) memory), vector clusters the feature vectors with memory-saving Ward "
+        "linkage and kmeans clusters the centroids of mini-batch k-means clusters.",
+    )
+    sample_parser.add_argument(
+        "--num-micro-clusters",
+        "-nmc",
+        required=False,
+        type=int,
+        default=DEFAULT_NUM_MICRO_CLUSTERS,
+        help="Number of mini-batch k-means clusters for the kmeans engine.",
+    )
+    sample_parser.add_argument(
+        "--assignment-table",
+        "-at",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Whether to store the stratas of all levels as compact assignment tables "
+        "(stratas.npy, stratas_sampled.npy) instead of one folder of stratum files "
+        "per level.",
+    )
 
     # Parser for the extraction of sampled files
     extract_sampled_parser = sub_parser.add_parser(str(Tasks.EXTRACT_SAMPLED))
@@ -169,6 +261,28 @@ def _set_up_arg_parser() -> ArgumentParser:
         type=str,
         help="Path to the folder where the sampled, extracted methods are stored.",
     )
+    extract_sampled_parser.add_argument(
+        "--matching",
+        "-ma",
+        required=False,
+        type=str,
+        choices=MATCHING_MODES,
+        default="substring",
+        help="How the sampled files are matched: substring walks all input files and "
+        "matches paths containing a sampled path, index looks up the sampled files "
+        "directly without walking the input directories.",
+    )
+    extract_sampled_parser.add_argument(
+        "--materialization",
+        "-mat",
+        required=False,
+        type=str,
+        choices=[mode.value for mode in MaterializationMode],
+        default=MaterializationMode.COPY.value,
+        help="How the sampled files are stored: copied, hard linked, symbolically "
+        "linked, cloned (reflink) or only listed in a manifest. Links and clones "
+        "fall back to copies where the file system does not support them.",
+    )
 
     # Parser for extracting files
     extract_files_parser = sub_parser.add_parser(str(Tasks.EXTRACT_FILES))
@@ -195,6 +309,18 @@ def _set_up_arg_parser() -> ArgumentParser:
         help="Name of the subdirectory containing the non-violated files.",
     )
 
+    extract_files_parser.add_argument(
+        "--materialization",
+        "-mat",
+        required=False,
+        type=str,
+        choices=[mode.value for mode in MaterializationMode],
+        default=MaterializationMode.COPY.value,
+        help="How the extracted files are stored: copied, hard linked, symbolically "
+        "linked, cloned (reflink) or only listed in a manifest. Links and clones "
+        "fall back to copies where the file system does not support them.",
+    )
+
     # Parser for extracting methods
     extract_methods_parser = sub_parser.add_parser(str(Tasks.EXTRACT_METHODS))
     extract_methods_parser.add_argument(
@@ -244,6 +370,44 @@ def _set_up_arg_parser() -> ArgumentParser:
         action="store_true",
         help="Whether to not remove the indentation from the methods.",
     )
+    extract_methods_parser.add_argument(
+        "--workers",
+        "-w",
+        required=False,
+        type=int,
+        default=1,
+        help="Number of processes that parse the java files concurrently.",
+    )
+    extract_methods_parser.add_argument(
+        "--manifest",
+        "-m",
+        required=False,
+        type=Path,
+        default=None,
+        help="Path to the manifest of completed files. An interrupted extraction "
+        "with the same manifest resumes after the last completed file.",
+    )
+    extract_methods_parser.add_argument(
+        "--engine",
+        "-e",
+        required=False,
+        type=str,
+        choices=[engine.value for engine in ExtractionEngine],
+        default=ExtractionEngine.PARSER.value,
+        help="Engine that finds the methods: the javalang parser or the faster "
+        "token-level engine, which also supports newer Java syntax.",
+    )
+    extract_methods_parser.add_argument(
+        "--output-format",
+        "-of",
+        required=False,
+        type=str,
+        choices=OUTPUT_FORMATS,
+        default="files",
+        help="Format to store the methods in: one file per method or a sharded "
+        "snippet archive, which can be used as input of SAMPLE, EXTRACT_SAMPLED "
+        "and the dataset conversions.",
+    )
 
     # Parser for converting csv datasets
     convert_csv_parser = sub_parser.add_parser(str(Tasks.CONVERT_CSV))
@@ -276,6 +440,15 @@ def _set_up_arg_parser() -> ArgumentParser:
         choices=[dataset_type.value for dataset_type in DatasetType],
         help="The type of the dataset.",
     )
+    convert_csv_parser.add_argument(
+        "--streaming",
+        "-st",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Whether to load the java files one at a time and write them to Arrow "
+        "shards, so the memory usage does not grow with the size of the dataset.",
+    )
 
     # Parser for converting two folder datasets
     convert_two_folders_parser = sub_parser.add_parser(str(Tasks.CONVERT_TWO_FOLDERS))
@@ -316,6 +489,15 @@ def _set_up_arg_parser() -> ArgumentParser:
         default=1.5,
         help="The readability score of the not readable java files.",
     )
+    convert_two_folders_parser.add_argument(
+        "--streaming",
+        "-st",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Whether to load the java files one at a time and write them to Arrow "
+        "shards, so the memory usage does not grow with the size of the dataset.",
+    )
 
     # Parser for combining datasets
     combine_parser = sub_parser.add_parser(str(Tasks.COMBINE))
@@ -343,6 +525,111 @@ def _set_up_arg_parser() -> ArgumentParser:
         help="Percentage of ambiguous samples to remove from the dataset.",
     )
 
+    # Parser for balancing datasets
+    balance_parser = sub_parser.add_parser(str(Tasks.BALANCE))
+    balance_parser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        type=str,
+        help="Path to the folder containing the dataset.",
+    )
+    balance_parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        type=str,
+        help="Path to the folder where the balanced dataset should be stored.",
+    )
+    balance_parser.add_argument(
+        "--seed",
+        "-s",
+        required=False,
+        type=int,
+        default=42,
+        help="Seed for selecting the samples of each score.",
+    )
+
+    # Parser for removing duplicates from datasets
+    deduplicate_parser = sub_parser.add_parser(str(Tasks.DEDUPLICATE))
+    deduplicate_parser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        type=str,
+        help="Path to the folder containing the dataset.",
+    )
+    deduplicate_parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        type=str,
+        help="Path to the folder where the dataset without duplicates should be "
+        "stored.",
+    )
+    deduplicate_parser.add_argument(
+        "--original-score",
+        "-os",
+        required=False,
+        type=float,
+        default=3.68,
+        help="The score of the original code snippets, which are kept if there are "
+        "duplicates.",
+    )
+
+    # Parser for finding near-duplicates across datasets
+    near_duplicates_parser = sub_parser.add_parser(str(Tasks.NEAR_DUPLICATES))
+    near_duplicates_parser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        type=str,
+        nargs="+",
+        help="Paths to the folders containing the datasets. Of each group of "
+        "near-duplicates, the snippet of the first dataset is kept.",
+    )
+    near_duplicates_parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        type=str,
+        help="Path to the folder where the report and the datasets without "
+        "near-duplicates should be stored.",
+    )
+    near_duplicates_parser.add_argument(
+        "--threshold",
+        "-t",
+        required=False,
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Estimated Jaccard similarity of the token shingles at or above which "
+        "two snippets are near-duplicates.",
+    )
+    near_duplicates_parser.add_argument(
+        "--drop",
+        "-d",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Whether to store the datasets without the near-duplicates.",
+    )
+    near_duplicates_parser.add_argument(
+        "--num-permutations",
+        "-np",
+        required=False,
+        type=int,
+        default=DEFAULT_NUM_PERMUTATIONS,
+        help="Number of permutations of the MinHash signatures.",
+    )
+    near_duplicates_parser.add_argument(
+        "--shingle-size",
+        "-ss",
+        required=False,
+        type=int,
+        default=DEFAULT_SHINGLE_SIZE,
+        help="Number of consecutive tokens of a shingle.",
+    )
+
     # Parser for uploading datasets
     upload_parser = sub_parser.add_parser(str(Tasks.UPLOAD))
     upload_parser.add_argument(
@@ -455,6 +742,27 @@ def _set_up_arg_parser() -> ArgumentParser:
         default=None,
         help="Path to the file containing the paths of the snippets to exclude.",
     )
+    craft_surveys_parser.add_argument(
+        "--materialization",
+        "-mat",
+        required=False,
+        type=str,
+        choices=[mode.value for mode in MaterializationMode],
+        default=MaterializationMode.COPY.value,
+        help="How the snippets of the sheets are stored: copied, hard linked, "
+        "symbolically linked, cloned (reflink) or only listed in a manifest. Links "
+        "and clones fall back to copies where the file system does not support "
+        "them.",
+    )
+    craft_surveys_parser.add_argument(
+        "--digest-index",
+        "-di",
+        required=False,
+        type=Path,
+        default=None,
+        help="Path to an index of the normalized digests of the snippets. It is "
+        "reused and updated by EXTRACT_DIFF and CRAFT_SURVEYS for the same input.",
+    )
 
     # Parser for extracting diffs
     extract_diff_parser = sub_parser.add_parser(str(Tasks.EXTRACT_DIFF))
@@ -480,6 +788,32 @@ def _set_up_arg_parser() -> ArgumentParser:
         default="methods",
         help="Name of the directory containing original methods to compare against.",
     )
+    extract_diff_parser.add_argument(
+        "--digest-index",
+        "-di",
+        required=False,
+        type=Path,
+        default=None,
+        help="Path to an index of the normalized digests of the snippets. It is "
+        "reused and updated by EXTRACT_DIFF and CRAFT_SURVEYS for the same input.",
+    )
+    extract_diff_parser.add_argument(
+        "--streaming",
+        "-st",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Whether to compare the snippets while walking the input folder and "
+        "to write the results as they arrive. Used if more than one worker is set.",
+    )
+    extract_diff_parser.add_argument(
+        "--workers",
+        "-w",
+        required=False,
+        type=int,
+        default=1,
+        help="Number of processes that compare the snippets concurrently.",
+    )
 
     # Parser for removing comments
     remove_comments_parser = sub_parser.add_parser(str(Tasks.REMOVE_COMMENTS))
@@ -505,6 +839,91 @@ def _set_up_arg_parser() -> ArgumentParser:
         default=0.1,
         help="Probability with that a comment is removed.",
     )
+    remove_comments_parser.add_argument(
+        "--seed",
+        "-s",
+        required=False,
+        type=int,
+        default=None,
+        help="Base seed of the per-file random number generators. If given, the "
+        "output is reproducible and independent of the number of workers.",
+    )
+    remove_comments_parser.add_argument(
+        "--workers",
+        "-w",
+        required=False,
+        type=int,
+        default=1,
+        help="Number of processes that remove comments concurrently. Requires a seed.",
+    )
+    remove_comments_parser.add_argument(
+        "--manifest",
+        "-m",
+        required=False,
+        type=Path,
+        default=None,
+        help="Path to the manifest of completed files. An interrupted run "
+        "with the same manifest resumes after the last completed file.",
+    )
+
+    # Parser for the agreement of the survey ratings
+    agreement_parser = sub_parser.add_parser(str(Tasks.AGREEMENT))
+    agreement_parser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        type=str,
+        help="Path to the folder containing the survey results.",
+    )
+    agreement_parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        type=str,
+        help="Path to the folder where the agreement report should be stored.",
+    )
+    agreement_parser.add_argument(
+        "--levels",
+        "-l",
+        required=False,
+        type=str,
+        nargs="+",
+        choices=LEVELS_OF_MEASUREMENT,
+        default=LEVELS_OF_MEASUREMENT,
+        help="Levels of measurement for which Krippendorff's alpha is computed.",
+    )
+    agreement_parser.add_argument(
+        "--num-bootstrap",
+        "-nb",
+        required=False,
+        type=int,
+        default=DEFAULT_NUM_BOOTSTRAP,
+        help="Number of bootstrap resamples of the snippets.",
+    )
+    agreement_parser.add_argument(
+        "--confidence",
+        "-c",
+        required=False,
+        type=float,
+        default=DEFAULT_CONFIDENCE,
+        help="Confidence level of the bootstrap confidence intervals.",
+    )
+    agreement_parser.add_argument(
+        "--seed",
+        "-s",
+        required=False,
+        type=int,
+        default=42,
+        help="Seed of the bootstrap resamples.",
+    )
+    agreement_parser.add_argument(
+        "--workers",
+        "-w",
+        required=False,
+        type=int,
+        default=1,
+        help="Number of processes that evaluate the bootstrap resamples.",
+    )
 
     return arg_parser
 
@@ -519,26 +938,58 @@ def _run_stratified_sampling(args: Any) -> None:
     output_dir = args.output
     num_stratas = args.num_stratas
     num_snippets = args.num_snippets
+    workers = args.workers
+    cache_path = args.cache
+    cache_size = args.cache_size
+    feature_format = args.feature_format
+    engine = args.engine
+    num_micro_clusters = args.num_micro_clusters
+    assignment_table = args.assignment_table
 
     # Log the arguments
     logging.info(f"Input directory: {input_dir}")
     logging.info(f"Output directory: {output_dir}")
     logging.info(f"Number of stratas: {num_stratas}")
     logging.info(f"Number of snippets: {num_snippets}")
+    logging.info(f"Number of workers: {workers}")
+    logging.info(f"Feature cache: {cache_path}")
+    logging.info(f"Feature cache size: {cache_size}")
+    logging.info(f"Feature format: {feature_format}")
+    logging.info(f"Engine: {engine}")
+    logging.info(f"Number of micro clusters: {num_micro_clusters}")
+    logging.info(f"Assignment table: {assignment_table}")
 
     # Create the save directory, if it does not exist
     if output_dir is not None and not os.path.isdir(output_dir):
         os.makedirs(output_dir)
 
-    # If the input is a csv file, read the paths and features from the csv file
+    # If the input is a csv file or a feature store, read the paths and features
     if input_dir.suffix == ".csv":
-        features = load_features_from_csv(input_dir)
+        paths, _, features = load_feature_matrix_from_csv(input_dir)
+    elif FeatureStore.is_store(input_dir):
+        paths, features = FeatureStore(input_dir).load()
     else:  # If the input is a directory, get the paths to the Java code snippets
-        features = calculate_features(input_dir, output_dir)
+        features_by_path = calculate_features(
+            input_dir,
+            output_dir,
+            workers=workers,
+            cache_path=cache_path,
+            cache_size=cache_size,
+            feature_format=feature_format,
+        )
+        paths = list(features_by_path.keys())
+        features = [list(feature.values()) for feature in features_by_path.values()]
 
     # Perform stratified sampling
-    StratifiedSampler(output_dir=output_dir).sample(
-        features=features, max_num_stratas=num_stratas, num_snippets=num_snippets
+    StratifiedSampler(
+        output_dir=output_dir, assignment_table=assignment_table
+    ).sample_matrix(
+        java_code_snippet_paths=paths,
+        features=features,
+        max_num_stratas=num_stratas,
+        num_snippets=num_snippets,
+        engine=engine,
+        num_micro_clusters=num_micro_clusters,
     )
 
 
@@ -553,11 +1004,15 @@ def _run_extract_sampled(parsed_args: Any) -> None:
     input_dirs = [Path(input_dir) for input_dir in parsed_args.input]
     sampling_dir = Path(parsed_args.sampling)
     output_dir = Path(parsed_args.output)
+    matching = parsed_args.matching
+    materialization = MaterializationMode(parsed_args.materialization)
 
     # Log the arguments
     logging.info(f"Input directories: {input_dirs}")
     logging.info(f"Sampling directory: {sampling_dir}")
     logging.info(f"Output directory: {output_dir}")
+    logging.info(f"Matching: {matching}")
+    logging.info(f"Materialization: {materialization}")
 
     # Create the output directory, if it does not exist
     if not os.path.isdir(output_dir):
@@ -565,7 +1020,11 @@ def _run_extract_sampled(parsed_args: Any) -> None:
 
     # Extract the files
     extract_sampled(
-        input_dirs=input_dirs, output_dir=output_dir, sampling_dir=sampling_dir
+        input_dirs=input_dirs,
+        output_dir=output_dir,
+        sampling_dir=sampling_dir,
+        matching=matching,
+        materialization=materialization,
     )
 
 
@@ -579,11 +1038,13 @@ def _run_extract_files(parsed_args: Any) -> None:
     input_dir = parsed_args.input
     output_dir = parsed_args.output
     non_violated_subdir = parsed_args.non_violated_subdir
+    materialization = MaterializationMode(parsed_args.materialization)
 
     # Log the arguments
     logging.info(f"Input directory: {input_dir}")
     logging.info(f"Output directory: {output_dir}")
     logging.info(f"Non-violated subdirectory: {non_violated_subdir}")
+    logging.info(f"Materialization: {materialization}")
 
     # Create the output directory, if it does not exist
     if not os.path.isdir(output_dir):
@@ -591,7 +1052,10 @@ def _run_extract_files(parsed_args: Any) -> None:
 
     # Extract the files
     extract_files(
-        input_dir=input_dir, output_dir=output_dir, non_violated=non_violated_subdir
+        input_dir=input_dir,
+        output_dir=output_dir,
+        non_violated=non_violated_subdir,
+        materialization=materialization,
     )
 
 
@@ -608,6 +1072,10 @@ def _run_extract_methods(parsed_args: Any) -> None:
     include_method_comments = not parsed_args.not_include_comments
     comments_required = not parsed_args.comments_not_required
     remove_indentation = not parsed_args.not_remove_indentation
+    workers = parsed_args.workers
+    manifest_path = parsed_args.manifest
+    engine = ExtractionEngine(parsed_args.engine)
+    output_format = parsed_args.output_format
 
     # Log the arguments
     logging.info(f"Input directory: {input_dir}")
@@ -616,6 +1084,10 @@ def _run_extract_methods(parsed_args: Any) -> None:
     logging.info(f"Include method comments: {include_method_comments}")
     logging.info(f"Comments required: {comments_required}")
     logging.info(f"Remove indentation: {remove_indentation}")
+    logging.info(f"Number of workers: {workers}")
+    logging.info(f"Manifest: {manifest_path}")
+    logging.info(f"Engine: {engine}")
+    logging.info(f"Output format: {output_format}")
 
     os.makedirs(output_dir, exist_ok=True)
 
@@ -627,6 +1099,10 @@ def _run_extract_methods(parsed_args: Any) -> None:
         include_method_comments=include_method_comments,
         comments_required=comments_required,
         remove_indentation=remove_indentation,
+        workers=workers,
+        manifest_path=manifest_path,
+        engine=engine,
+        output_format=output_format,
     )
 
 
@@ -641,18 +1117,21 @@ def _run_convert_csv(parsed_args: Any) -> None:
     csv = parsed_args.csv
     output_path = parsed_args.output
     dataset_type = DatasetType(parsed_args.dataset_type)
+    streaming = parsed_args.streaming
 
     # Log the arguments
     logging.info(f"Snippets directory: {snippets_dir}")
     logging.info(f"CSV file: {csv}")
     logging.info(f"Output path: {output_path}")
     logging.info(f"Dataset type: {dataset_type}")
+    logging.info(f"Streaming: {streaming}")
 
     convert_dataset_csv(
         snippets_dir=snippets_dir,
         csv=csv,
         output_path=output_path,
         dataset_type=dataset_type,
+        streaming=streaming,
     )
 
 
@@ -667,6 +1146,7 @@ def _run_convert_two_folders(parsed_args: Any) -> None:
     not_readable_snippets_dir = parsed_args.not_readable
     not_readable_score = parsed_args.not_readable_score
     output_path = parsed_args.output
+    streaming = parsed_args.streaming
 
     # Log the arguments
     logging.info(f"Readable snippets directory: {readable_snippets_dir}")
@@ -674,6 +1154,7 @@ def _run_convert_two_folders(parsed_args: Any) -> None:
     logging.info(f"Not readable snippets directory: {not_readable_snippets_dir}")
     logging.info(f"Not readable score: {not_readable_score}")
     logging.info(f"Output path: {output_path}")
+    logging.info(f"Streaming: {streaming}")
 
     convert_dataset_two_folders(
         original=readable_snippets_dir,
@@ -681,6 +1162,7 @@ def _run_convert_two_folders(parsed_args: Any) -> None:
         original_score=readable_score,
         rdh_score=not_readable_score,
         output_path=output_path,
+        streaming=streaming,
     )
 
 
@@ -707,6 +1189,76 @@ def _run_combine_datasets(parsed_args: Any) -> None:
     combine_datasets(input_paths, output_dir, percent_to_remove)
 
 
+def _run_balance(parsed_args: Any) -> None:
+    """
+    Balances a dataset, so each score has the same amount of samples.
+    :param parsed_args: Parsed arguments.
+    :return: None
+    """
+    input_path = parsed_args.input
+    output_dir = parsed_args.output
+    seed = parsed_args.seed
+
+    # Log the arguments
+    logging.info(f"Input path: {input_path}")
+    logging.info(f"Output directory: {output_dir}")
+    logging.info(f"Seed: {seed}")
+
+    # Balance the dataset
+    balance(input_path, output_dir, seed=seed)
+
+
+def _run_deduplicate(parsed_args: Any) -> None:
+    """
+    Removes the samples with duplicate code snippets from a dataset.
+    :param parsed_args: Parsed arguments.
+    :return: None
+    """
+    input_path = parsed_args.input
+    output_dir = parsed_args.output
+    original_score = parsed_args.original_score
+
+    # Log the arguments
+    logging.info(f"Input path: {input_path}")
+    logging.info(f"Output directory: {output_dir}")
+    logging.info(f"Original score: {original_score}")
+
+    # Remove the duplicates
+    deduplicate(input_path, output_dir, original_score=original_score)
+
+
+def _run_near_duplicates(parsed_args: Any) -> None:
+    """
+    Finds the near-duplicates within and across datasets.
+    :param parsed_args: Parsed arguments.
+    :return: None
+    """
+    input_paths = parsed_args.input
+    output_dir = parsed_args.output
+    threshold = parsed_args.threshold
+    drop = parsed_args.drop
+    num_permutations = parsed_args.num_permutations
+    shingle_size = parsed_args.shingle_size
+
+    # Log the arguments
+    logging.info(f"Input paths: {input_paths}")
+    logging.info(f"Output directory: {output_dir}")
+    logging.info(f"Threshold: {threshold}")
+    logging.info(f"Drop: {drop}")
+    logging.info(f"Number of permutations: {num_permutations}")
+    logging.info(f"Shingle size: {shingle_size}")
+
+    # Find the near-duplicates
+    remove_near_duplicates(
+        input_paths,
+        output_dir,
+        threshold=threshold,
+        drop=drop,
+        num_permutations=num_permutations,
+        shingle_size=shingle_size,
+    )
+
+
 def _run_download(parsed_args: Any) -> None:
     """
     Downloads a dataset from the HuggingFace hub.
@@ -761,6 +1313,8 @@ def _run_craft_surveys(parsed_args: Any) -> None:
     original_name = parsed_args.original_name
     nomod_name = parsed_args.nomod_name
     exclude_path = parsed_args.exclude_path
+    materialization = MaterializationMode(parsed_args.materialization)
+    digest_index_path = parsed_args.digest_index
 
     # Log the arguments
     logging.info(f"Input directory: {input_dir}")
@@ -771,6 +1325,8 @@ def _run_craft_surveys(parsed_args: Any) -> None:
     logging.info(f"Original name: {original_name}")
     logging.info(f"Nomod name: {nomod_name}")
     logging.info(f"Exclude path: {exclude_path}")
+    logging.info(f"Materialization: {materialization}")
+    logging.info(f"Digest index: {digest_index_path}")
 
     # Create the output directory, if it does not exist
     if not os.path.isdir(output_dir):
@@ -786,6 +1342,8 @@ def _run_craft_surveys(parsed_args: Any) -> None:
         original_name=original_name,
         nomod_name=nomod_name,
         exclude_path=exclude_path,
+        materialization=materialization,
+        digest_index_path=digest_index_path,
     )
     survey_crafter.craft_surveys()
 
@@ -799,15 +1357,26 @@ def _run_extract_diff(parsed_args: Any) -> None:
     input_dir = Path(parsed_args.input)
     output_dir = Path(parsed_args.output) if parsed_args.output is not None else None
     methods_dir_name = parsed_args.methods_dir_name
+    digest_index_path = parsed_args.digest_index
+    streaming = parsed_args.streaming
+    workers = parsed_args.workers
 
     # Log the arguments
     logging.info(f"Input directory: {input_dir}")
     logging.info(f"Output directory: {output_dir}")
     logging.info(f"Methods directory name: {methods_dir_name}")
+    logging.info(f"Digest index: {digest_index_path}")
+    logging.info(f"Streaming: {streaming}")
+    logging.info(f"Workers: {workers}")
 
     # Extract the diffs
     compare_to_folder(
-        input_path=input_dir, output_path=output_dir, methods_dir_name=methods_dir_name
+        input_path=input_dir,
+        output_path=output_dir,
+        methods_dir_name=methods_dir_name,
+        digest_index_path=digest_index_path,
+        streaming=streaming,
+        workers=workers,
     )
 
 
@@ -820,18 +1389,67 @@ def _run_remove_comments(parsed_args: Any) -> None:
     input_dir = parsed_args.input
     output_dir = parsed_args.output
     probability = parsed_args.probability
+    seed = parsed_args.seed
+    workers = parsed_args.workers
+    manifest_path = parsed_args.manifest
 
     # Log the arguments
     logging.info(f"Input directory: {input_dir}")
     logging.info(f"Output directory: {output_dir}")
     logging.info(f"Probability: {probability}")
+    logging.info(f"Seed: {seed}")
+    logging.info(f"Workers: {workers}")
+    logging.info(f"Manifest: {manifest_path}")
 
     # Create the output directory, if it does not exist
     if not os.path.isdir(output_dir):
         os.makedirs(output_dir)
 
     # Remove the comments
-    remove_comments(input_dir=input_dir, output_dir=output_dir, probability=probability)
+    remove_comments(
+        input_dir=input_dir,
+        output_dir=output_dir,
+        probability=probability,
+        seed=seed,
+        workers=workers,
+        manifest_path=manifest_path,
+    )
+
+
+def _run_agreement(parsed_args: Any) -> None:
+    """
+    Computes Krippendorff's alpha of the survey ratings with bootstrap confidence
+    intervals.
+    :param parsed_args: Parsed arguments.
+    :return: None
+    """
+    input_path = parsed_args.input
+    output_dir = parsed_args.output
+    levels = parsed_args.levels
+    num_bootstrap = parsed_args.num_bootstrap
+    confidence = parsed_args.confidence
+    seed = parsed_args.seed
+    workers = parsed_args.workers
+
+    # Log the arguments
+    logging.info(f"Input path: {input_path}")
+    logging.info(f"Output directory: {output_dir}")
+    logging.info(f"Levels: {levels}")
+    logging.info(f"Number of bootstrap resamples: {num_bootstrap}")
+    logging.info(f"Confidence: {confidence}")
+    logging.info(f"Seed: {seed}")
+    logging.info(f"Workers: {workers}")
+
+    # Compute the agreement
+    analyze_agreement(
+        input_path,
+        output_dir,
+        levels=levels,
+        num_bootstrap=num_bootstrap,
+        confidence=confidence,
+        seed=seed,
+        workers=workers,
+    )
 
 
 def main(args: list[str]) -> int:
@@ -873,6 +1491,12 @@ def main(args: list[str]) -> int:
             _run_convert_two_folders(parsed_args)
         case Tasks.COMBINE:
             _run_combine_datasets(parsed_args)
+        case Tasks.BALANCE:
+            _run_balance(parsed_args)
+        case Tasks.DEDUPLICATE:
+            _run_deduplicate(parsed_args)
+        case Tasks.NEAR_DUPLICATES:
+            _run_near_duplicates(parsed_args)
         case Tasks.DOWNLOAD:
             _run_download(parsed_args)
         case Tasks.UPLOAD:
@@ -883,6 +1507,8 @@ def main(args: list[str]) -> int:
             _run_extract_diff(parsed_args)
         case Tasks.REMOVE_COMMENTS:
             _run_remove_comments(parsed_args)
+        case Tasks.AGREEMENT:
+            _run_agreement(parsed_args)
 
     return 0
 
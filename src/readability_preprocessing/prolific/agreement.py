@@ -0,0 +1,383 @@
+import csv
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import astuple, dataclass, fields
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from readability_preprocessing.prolific.ratings import (
+    RATINGS_FILE_NAME,
+    load_ratings_table,
+)
+
+LEVELS_OF_MEASUREMENT = ["nominal", "ordinal", "interval"]
+DEFAULT_VALUE_DOMAIN = (1, 2, 3, 4, 5)
+DEFAULT_NUM_BOOTSTRAP = 1000
+DEFAULT_CONFIDENCE = 0.95
+REPORT_FILE_NAME = "agreement.csv"
+
+# The number of resamples that are evaluated at once by a worker
+BOOTSTRAP_BATCH_SIZE = 250
+
+# The columns by which the agreement is broken down
+BREAKDOWN_COLUMNS = ["stratum", "rdh"]
+
+
+@dataclass(frozen=True)
+class Agreement:
+    """
+    Krippendorff's alpha of a group of ratings with its bootstrap confidence interval.
+    """
+
+    grouping: str
+    group: str
+    level: str
+    alpha: float
+    ci_low: float
+    ci_high: float
+    units: int
+    raters: int
+
+
+def reliability_matrix(ratings: pd.DataFrame) -> np.ndarray:
+    """
+    Build the rater x unit reliability matrix from long-format ratings.
+    :param ratings: The ratings with the columns rater, snippet and rate.
+    :return: The matrix with the rate of each rater for each snippet, NaN if the rater
+    did not rate the snippet.
+    """
+    rater_codes, raters = pd.factorize(ratings["rater"], sort=True)
+    unit_codes, units = pd.factorize(ratings["snippet"], sort=True)
+    reliability = np.full((len(raters), len(units)), np.nan)
+    reliability[rater_codes, unit_codes] = ratings["rate"].to_numpy(float)
+    return reliability
+
+
+def _unit_coincidences(
+    reliability: np.ndarray, value_domain: tuple[float, ...]
+) -> np.ndarray:
+    """
+    Compute the coincidence matrix of each pairable unit, i.e. each unit with at least
+    two ratings. The coincidence matrix of the data is the sum over the units.
+    :param reliability: The rater x unit reliability matrix.
+    :param value_domain: The possible values of the ratings.
+    :return: The unit x value x value coincidences.
+    """
+    values = np.asarray(value_domain, dtype=float)
+    rated = reliability[~np.isnan(reliability)]
+    if not np.isin(rated, values).all():
+        raise ValueError("The ratings contain values outside of the value domain.")
+
+    # Count the values of each unit
+    counts = (reliability.T[:, :, np.newaxis] == values).sum(axis=1).astype(float)
+    pairable = counts.sum(axis=1)
+    counts = counts[pairable >= 2]
+    pairable = pairable[pairable >= 2]
+
+    pairs = counts[:, :, np.newaxis] * counts[:, np.newaxis, :]
+    pairs -= counts[:, :, np.newaxis] * np.eye(len(values))
+    return pairs / (pairable - 1)[:, np.newaxis, np.newaxis]
+
+
+def _distances(
+    totals: np.ndarray, value_domain: tuple[float, ...], level: str
+) -> np.ndarray:
+    """
+    Compute the squared distances between the values.
+    :param totals: The number of pairable values of each value, one row per sample.
+    :param value_domain: The possible values of the ratings.
+    :param level: The level of measurement.
+    :return: The sample x value x value distances.
+    """
+    values = np.asarray(value_domain, dtype=float)
+    if level == "nominal":
+        distances = 1 - np.eye(len(values))
+    elif level == "interval":
+        distances = np.subtract.outer(values, values) ** 2
+    elif level == "ordinal":
+        # The number of values between two values, counting each end half
+        indices = np.arange(len(values))
+        lower = np.minimum.outer(indices, indices)
+        upper = np.maximum.outer(indices, indices)
+        cumulative = np.cumsum(totals, axis=1)
+        between = cumulative[:, upper] - cumulative[:, lower] + totals[:, lower]
+        ends = (totals[:, :, np.newaxis] + totals[:, np.newaxis, :]) / 2
+        return (between - ends) ** 2
+    else:
+        raise ValueError(
+            f"The level of measurement must be one of {LEVELS_OF_MEASUREMENT}."
+        )
+    return np.broadcast_to(distances, (len(totals), len(values), len(values)))
+
+
+def _alphas(
+    coincidences: np.ndarray, value_domain: tuple[float, ...], level: str
+) -> np.ndarray:
+    """
+    Compute Krippendorff's alpha of each coincidence matrix.
+    :param coincidences: The sample x value x value coincidences.
+    :param value_domain: The possible values of the ratings.
+    :param level: The level of measurement.
+    :return: The alpha of each sample, NaN if the expected disagreement is zero.
+    """
+    totals = coincidences.sum(axis=2)
+    num_values = totals.sum(axis=1)
+    distances = _distances(totals, value_domain, level)
+
+    observed = (coincidences * distances).sum(axis=(1, 2))
+    expected = (totals[:, :, np.newaxis] * totals[:, np.newaxis, :] * distances).sum(
+        axis=(1, 2)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            expected > 0, 1 - (num_values - 1) * observed / expected, np.nan
+        )
+
+
+def krippendorff_alpha(
+    reliability: np.ndarray,
+    level: str = "ordinal",
+    value_domain: tuple[float, ...] = DEFAULT_VALUE_DOMAIN,
+) -> float:
+    """
+    Compute Krippendorff's alpha of the reliability matrix.
+    :param reliability: The rater x unit reliability matrix with NaN for missing
+    ratings.
+    :param level: The level of measurement: nominal, ordinal or interval.
+    :param value_domain: The possible values of the ratings.
+    :return: The alpha.
+    """
+    coincidences = _unit_coincidences(reliability, value_domain).sum(axis=0)
+    return float(_alphas(coincidences[np.newaxis], value_domain, level)[0])
+
+
+def _bootstrap_batch(
+    unit_coincidences: np.ndarray,
+    value_domain: tuple[float, ...],
+    level: str,
+    num_resamples: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """
+    Compute the alphas of resamples of the units. The coincidence matrix of a
+    resample is the weighted sum of the unit coincidences, where the weight of a unit
+    is how often it was drawn.
+    :param unit_coincidences: The unit x value x value coincidences.
+    :param value_domain: The possible values of the ratings.
+    :param level: The level of measurement.
+    :param num_resamples: The number of resamples.
+    :param seed: The seed of the resamples.
+    :return: The alpha of each resample.
+    """
+    num_units, num_values, _ = unit_coincidences.shape
+    rng = np.random.default_rng(seed)
+
+    # Count how often each unit is drawn in each resample
+    draws = rng.integers(0, num_units, (num_resamples, num_units))
+    draws += num_units * np.arange(num_resamples)[:, np.newaxis]
+    weights = np.bincount(draws.ravel(), minlength=num_resamples * num_units)
+    weights = weights.reshape(num_resamples, num_units)
+    coincidences = weights @ unit_coincidences.reshape(num_units, -1)
+    return _alphas(
+        coincidences.reshape(num_resamples, num_values, num_values),
+        value_domain,
+        level,
+    )
+
+
+def bootstrap_alpha(
+    reliability: np.ndarray,
+    level: str = "ordinal",
+    value_domain: tuple[float, ...] = DEFAULT_VALUE_DOMAIN,
+    num_bootstrap: int = DEFAULT_NUM_BOOTSTRAP,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int | None = None,
+    executor: Executor | None = None,
+) -> tuple[float, float, float]:
+    """
+    Compute Krippendorff's alpha with a percentile bootstrap confidence interval over
+    the units. The resamples are split into batches, which are evaluated by the
+    executor, if given.
+    :param reliability: The rater x unit reliability matrix with NaN for missing
+    ratings.
+    :param level: The level of measurement: nominal, ordinal or interval.
+    :param value_domain: The possible values of the ratings.
+    :param num_bootstrap: The number of resamples.
+    :param confidence: The confidence level of the interval.
+    :param seed: The seed of the resamples. The result does not depend on the number
+    of workers.
+    :param executor: The executor for the batches or None to evaluate them in this
+    process.
+    :return: The alpha and the lower and upper bound of the confidence interval.
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("The confidence must be between 0 and 1.")
+    if num_bootstrap < 1:
+        raise ValueError("The number of bootstrap resamples must be at least 1.")
+
+    unit_coincidences = _unit_coincidences(reliability, value_domain)
+    alpha = _alphas(unit_coincidences.sum(axis=0)[np.newaxis], value_domain, level)[0]
+    if len(unit_coincidences) == 0:
+        return float(alpha), np.nan, np.nan
+
+    batch_sizes = [
+        min(BOOTSTRAP_BATCH_SIZE, num_bootstrap - start)
+        for start in range(0, num_bootstrap, BOOTSTRAP_BATCH_SIZE)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    args = (
+        [unit_coincidences] * len(batch_sizes),
+        [value_domain] * len(batch_sizes),
+        [level] * len(batch_sizes),
+        batch_sizes,
+        seeds,
+    )
+    batch_map = executor.map if executor is not None else map
+    alphas = np.concatenate(list(batch_map(_bootstrap_batch, *args)))
+
+    # E.g. the ratings of all resamples of a group without variance
+    if np.isnan(alphas).all():
+        return float(alpha), np.nan, np.nan
+
+    tail = (1 - confidence) / 2 * 100
+    ci_low, ci_high = np.nanpercentile(alphas, [tail, 100 - tail])
+    return float(alpha), float(ci_low), float(ci_high)
+
+
+def _group_agreements(
+    ratings: pd.DataFrame,
+    grouping: str,
+    group: str,
+    levels: list[str],
+    executor: Executor | None,
+    **bootstrap_kwargs,
+) -> list[Agreement]:
+    """
+    Compute the agreement of a group of ratings for each level of measurement.
+    :param ratings: The ratings of the group.
+    :param grouping: The column by which the group was formed or "all".
+    :param group: The value of the column.
+    :param levels: The levels of measurement.
+    :param executor: The executor for the resamples or None.
+    :param bootstrap_kwargs: The arguments of the bootstrap.
+    :return: The agreements.
+    """
+    reliability = reliability_matrix(ratings)
+    agreements = []
+    for level in levels:
+        alpha, ci_low, ci_high = bootstrap_alpha(
+            reliability, level=level, executor=executor, **bootstrap_kwargs
+        )
+        agreements.append(
+            Agreement(
+                grouping,
+                group,
+                level,
+                alpha,
+                ci_low,
+                ci_high,
+                reliability.shape[1],
+                reliability.shape[0],
+            )
+        )
+        logging.info(
+            f"{grouping}={group}, {level}: alpha={alpha:.4f} "
+            f"[{ci_low:.4f}, {ci_high:.4f}]"
+        )
+    return agreements
+
+
+def agreement_breakdown(
+    ratings: pd.DataFrame,
+    levels: list[str] = None,
+    executor: Executor | None = None,
+    **bootstrap_kwargs,
+) -> list[Agreement]:
+    """
+    Compute the agreement of all ratings and of the ratings of each stratum and RDH.
+    :param ratings: The long-format ratings with the columns rater, snippet, rate,
+    stratum and rdh.
+    :param levels: The levels of measurement. All levels if None.
+    :param executor: The executor for the resamples or None.
+    :param bootstrap_kwargs: The arguments of bootstrap_alpha.
+    :return: The agreements.
+    """
+    if levels is None:
+        levels = LEVELS_OF_MEASUREMENT
+
+    agreements = _group_agreements(
+        ratings, "all", "", levels, executor, **bootstrap_kwargs
+    )
+    for column in BREAKDOWN_COLUMNS:
+        for group, group_ratings in ratings.groupby(column, observed=True, sort=True):
+            agreements.extend(
+                _group_agreements(
+                    group_ratings, column, group, levels, executor, **bootstrap_kwargs
+                )
+            )
+    return agreements
+
+
+def _store_report(report_path: str, agreements: list[Agreement]) -> None:
+    """
+    Stores the agreements in a csv file.
+    :param report_path: The path to the csv file.
+    :param agreements: The agreements.
+    :return: None
+    """
+    with open(report_path, "w", newline="") as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow([field.name for field in fields(Agreement)])
+        writer.writerows(astuple(agreement) for agreement in agreements)
+
+
+def analyze_agreement(
+    input_path: str,
+    output_path: str,
+    levels: list[str] = None,
+    num_bootstrap: int = DEFAULT_NUM_BOOTSTRAP,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int | None = None,
+    workers: int = 1,
+) -> list[Agreement]:
+    """
+    Computes Krippendorff's alpha of the survey results with bootstrap confidence
+    intervals, overall and per stratum and RDH, and stores them in a csv file.
+    :param input_path: The path to the directory containing the survey results.
+    :param output_path: The path to the directory of the report and the cached
+    ratings table.
+    :param levels: The levels of measurement. All levels if None.
+    :param num_bootstrap: The number of resamples.
+    :param confidence: The confidence level of the intervals.
+    :param seed: The seed of the resamples.
+    :param workers: The number of processes that evaluate the resamples.
+    :return: The agreements.
+    """
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1.")
+
+    os.makedirs(output_path, exist_ok=True)
+    ratings = load_ratings_table(
+        Path(input_path), cache_path=Path(output_path) / RATINGS_FILE_NAME
+    )
+    ratings = ratings.select(["snippet", "stratum", "rdh", "rater", "rate"])
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        agreements = agreement_breakdown(
+            ratings.to_pandas(),
+            levels,
+            executor,
+            num_bootstrap=num_bootstrap,
+            confidence=confidence,
+            seed=seed,
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    _store_report(os.path.join(output_path, REPORT_FILE_NAME), agreements)
+    return agreements
@@ -1,37 +1,122 @@
+import logging
+from dataclasses import dataclass
 from pathlib import Path
 
-from readability_preprocessing.prolific.demographics import load_solutions
-from readability_preprocessing.prolific.paths import DEMOGRAPHIC_DATA_DIR, SURVEY_DATA_DIR
-from readability_preprocessing.prolific.raters import load_raters
-from readability_preprocessing.prolific.snippets import load_snippets, Snippet
+import numpy as np
+import pandas as pd
 
+from readability_preprocessing.prolific.demographics import Solution, load_solutions
+from readability_preprocessing.prolific.paths import (
+    DEMOGRAPHIC_DATA_DIR,
+    SURVEY_DATA_DIR,
+)
+from readability_preprocessing.prolific.ratings import load_ratings_table
 
-def load_combined(demographic_data_dir: Path = DEMOGRAPHIC_DATA_DIR, survey_results_dir: Path = SURVEY_DATA_DIR) -> \
-    list[Snippet]:
+
+@dataclass
+class CombinedRatings:
+    """
+    The ratings and demographic answers of all raters as matrices. The raters, snippets
+    and questions are integer-coded by their position in the id arrays.
+    """
+
+    # The survey rater ids
+    raters: np.ndarray
+    # The snippet paths
+    snippets: np.ndarray
+    # The demographic question ids
+    questions: np.ndarray
+    # The rater x snippet ratings, NaN if the rater did not rate the snippet
+    ratings: np.ndarray
+    # The rater x question index of the first selected option, NaN if not answered
+    demographics: np.ndarray
+    # The time taken of each rater in seconds, NaN if unknown
+    time_taken: np.ndarray
+
+
+def _solutions_frame(solutions: dict[str, dict[str, Solution]]) -> pd.DataFrame:
+    """
+    Flatten the demographic solutions into one row per answered question.
+    :param solutions: The solutions by rater and question id
+    :return: A frame with the columns rater, question and selected
+    """
+    rows = [
+        (rater, question_id, solution.solution.selected[0])
+        for rater, rater_solutions in solutions.items()
+        for question_id, solution in rater_solutions.items()
+        if solution.solution.selected
+    ]
+    return pd.DataFrame(rows, columns=["rater", "question", "selected"])
+
+
+def join_ratings(
+    ratings: pd.DataFrame, solutions: dict[str, dict[str, Solution]]
+) -> CombinedRatings:
+    """
+    Join the ratings with the demographic solutions of the raters. Each rater and
+    snippet is coded as an integer once, so the ratings and solutions are scattered
+    into their matrices without per-rate lookups.
+    :param ratings: The long-format ratings with the columns snippet, rater, rate and
+    time_taken, as from the ratings table
+    :param solutions: The demographic solutions by rater and question id
+    :return: The combined ratings
     """
-    Load the snippets by combining the demographic data and survey results.
+    rater_codes, raters = pd.factorize(ratings["rater"], sort=True)
+    snippet_codes, snippets = pd.factorize(ratings["snippet"], sort=True)
+    raters, snippets = np.asarray(raters), np.asarray(snippets)
+
+    rating_matrix = np.full((len(raters), len(snippets)), np.nan)
+    rating_matrix[rater_codes, snippet_codes] = ratings["rate"].to_numpy(float)
+
+    time_taken = np.full(len(raters), np.nan)
+    time_taken[rater_codes] = ratings["time_taken"].to_numpy(float, na_value=np.nan)
+
+    # Code the raters of the solutions like the raters of the ratings
+    solutions = _solutions_frame(solutions)
+    solution_raters = pd.Categorical(solutions["rater"], categories=raters).codes
+    unknown = solution_raters == -1
+    if unknown.any():
+        logging.warning(f"Demographics without ratings: {unknown.sum()} answers")
+    solutions = solutions[~unknown]
+    question_codes, questions = pd.factorize(solutions["question"], sort=True)
+
+    demographics = np.full((len(raters), len(questions)), np.nan)
+    demographics[solution_raters[~unknown], question_codes] = solutions[
+        "selected"
+    ].to_numpy(float)
+
+    missing = np.isnan(demographics).all(axis=1)
+    if missing.any():
+        logging.warning(f"Raters without demographics: {missing.sum()}")
+
+    return CombinedRatings(
+        raters=raters,
+        snippets=snippets,
+        questions=np.asarray(questions),
+        ratings=rating_matrix,
+        demographics=demographics,
+        time_taken=time_taken,
+    )
+
+
+def load_combined_ratings(
+    demographic_data_dir: Path = DEMOGRAPHIC_DATA_DIR,
+    survey_results_dir: Path = SURVEY_DATA_DIR,
+    cache_path: Path | None = None,
+) -> CombinedRatings:
+    """
+    Load the ratings and the demographic data as rater x snippet and rater x question
+    matrices.
     :param demographic_data_dir: The directory containing the demographic data
     :param survey_results_dir: The directory containing the survey results
-    :return: The list of snippet data objects
-    """
-    raters = load_raters(demographic_data_dir)
-    snippets = load_snippets(survey_results_dir)
-    demo_solutions = load_solutions(survey_results_dir)
-
-    # Match the raters.participant_id to snippets.rates.raterExternalId
-    for snippet in snippets:
-        for rate in snippet.rates:
-            if rate.raterExternalId in raters:
-                rate.rater_external = raters[rate.raterExternalId]
-            else:
-                print(f"Submission not found: {rate.raterExternalId}")
-
-    # Match demographic_solutions.rater to snippets.rates.rater
-    for snippet in snippets:
-        for rate in snippet.rates:
-            if rate.rater in demo_solutions:
-                rate.demographic_solutions = demo_solutions[rate.rater]
-            else:
-                print(f"Demographic not found: {rate.rater_external.participant_id}")
-
-    return snippets
+    :param cache_path: The path to the Parquet cache of the ratings table. If None,
+    the ratings are not cached.
+    :return: The combined ratings
+    """
+    ratings = load_ratings_table(
+        survey_results_dir, demographic_data_dir, cache_path=cache_path
+    )
+    columns = ["snippet", "rater", "rate", "time_taken"]
+    return join_ratings(
+        ratings.select(columns).to_pandas(), load_solutions(survey_results_dir)
+    )
@@ -1,27 +1,17 @@
-import numpy as np
-import krippendorff
-
-from readability_preprocessing.prolific.combiner import load_combined
-from readability_preprocessing.prolific.extraction import extract_ratings
-
-snippets = load_combined()
-value_domain = [1, 2, 3, 4, 5]
-
-# The ratings is a list of lists, where each list contains the ratings for a snippet
-ratings = extract_ratings(snippets)
-
-# Convert into np array
-ratings = np.array(ratings).T
+from readability_preprocessing.prolific.agreement import (
+    LEVELS_OF_MEASUREMENT,
+    bootstrap_alpha,
+    reliability_matrix,
+)
+from readability_preprocessing.prolific.paths import SURVEY_DATA_DIR
+from readability_preprocessing.prolific.ratings import load_ratings_table
+
+# The reliability matrix contains all ratings, with NaN for the snippets a rater
+# did not rate
+ratings = load_ratings_table(SURVEY_DATA_DIR).to_pandas()
+reliability = reliability_matrix(ratings)
 
 # Calculate the agreement
-krippendorffs_alpha_score = krippendorff.alpha(ratings, value_domain=value_domain)
-
-print(f"Krippendorff's Alpha: {krippendorffs_alpha_score}")
-print()
-
-# Example
-ratings = np.array([[1, 1, 2, 1, 2], [4, 5, 5, 4, 5], [3, 3, 3, 3, 3], [2, 2, 1, 2, 1]]).T
-
-krippendorffs_alpha_score = krippendorff.alpha(ratings, level_of_measurement="ordinal", value_domain=value_domain)
-print(f"Krippendorff's Alpha: {krippendorffs_alpha_score}")
-print()
+for level in LEVELS_OF_MEASUREMENT:
+    alpha, ci_low, ci_high = bootstrap_alpha(reliability, level=level, seed=42)
+    print(f"Krippendorff's Alpha ({level}): {alpha} [{ci_low}, {ci_high}]")
@@ -1,15 +1,15 @@
 import matplotlib.pyplot as plt
 
 from readability_preprocessing.evaluation.font_utils import set_custom_font
-from readability_preprocessing.prolific.combiner import load_combined
+from readability_preprocessing.prolific.combiner import load_combined_ratings
 from readability_preprocessing.prolific.extraction import question_rating_std_sum
 
 set_custom_font()
 
-snippets = load_combined()
+combined = load_combined_ratings()
 
 java_knowledge_question_id = 16
-group_diffs = question_rating_std_sum(snippets, java_knowledge_question_id)
+group_diffs = question_rating_std_sum(combined, java_knowledge_question_id)
 
 # 0 = Expert, 1 = Advanced, 2 = Intermediate, 3 = Beginner, 4 = Novice
 group_diffs = {
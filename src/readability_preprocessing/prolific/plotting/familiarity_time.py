@@ -2,15 +2,15 @@ import matplotlib.patches as mpatches
 import matplotlib.pyplot as plt
 
 from readability_preprocessing.evaluation.font_utils import set_custom_font
-from readability_preprocessing.prolific.combiner import load_combined
+from readability_preprocessing.prolific.combiner import load_combined_ratings
 from readability_preprocessing.prolific.extraction import question_time
 
 set_custom_font()
 
-snippets = load_combined()
+combined = load_combined_ratings()
 
 java_knowledge_question_id = 16
-tuples = question_time(snippets, java_knowledge_question_id)
+tuples = question_time(combined, java_knowledge_question_id)
 
 # Remove all tuples with to large time taken
 max_time = 40 * 60
@@ -0,0 +1,197 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from readability_preprocessing.prolific.raters import load_raters
+from readability_preprocessing.prolific.snippets import _list_json_file_paths
+
+RATINGS_FILE_NAME = "ratings.parquet"
+
+# The key of the fingerprint of the inputs in the metadata of the Parquet file
+FINGERPRINT_KEY = b"fingerprint"
+
+# The columns with few distinct values, which are stored dictionary-encoded
+CATEGORICAL_COLUMNS = ["snippet", "stratum", "rdh", "rater", "raterExternalId"]
+
+RATINGS_SCHEMA = pa.schema(
+    [(column, pa.dictionary(pa.int32(), pa.string())) for column in CATEGORICAL_COLUMNS]
+    + [("rate", pa.int8()), ("time_taken", pa.float64())]
+)
+
+
+def fingerprint_directory(input_path: Path, pattern: str = "*.json") -> str:
+    """
+    Compute a fingerprint of the files in the directory and its subdirectories. The
+    fingerprint changes if a file is added, removed or modified.
+    :param input_path: The path to the directory.
+    :param pattern: The pattern of the files to include.
+    :return: The fingerprint as hex string.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for file_path in sorted(input_path.rglob(pattern)):
+        stat = file_path.stat()
+        digest.update(
+            f"{file_path.relative_to(input_path)}:{stat.st_size}:"
+            f"{stat.st_mtime_ns}\n".encode()
+        )
+    return digest.hexdigest()
+
+
+def _split_path(path: str, stratum_index: int) -> tuple[str | None, str | None]:
+    """
+    Get the stratum and RDH from the path of a snippet.
+    :param path: The path of the snippet, e.g. "1_stratum0_methods_Foo.java".
+    :param stratum_index: The index of the stratum in the "_" separated path. The
+    RDH follows the stratum.
+    :return: The stratum and RDH, or None if the path has too few parts.
+    """
+    split_path = path.split("_")
+    if len(split_path) <= stratum_index + 1:
+        return None, None
+    return split_path[stratum_index], split_path[stratum_index + 1]
+
+
+def build_ratings_table(
+    survey_results_dir: Path,
+    demographic_data_dir: Path | None = None,
+    stratum_index: int = 1,
+) -> pa.Table:
+    """
+    Flatten the survey results into a long-format table with one row per rate. The
+    rates without a rating are skipped.
+    :param survey_results_dir: The directory containing the survey results.
+    :param demographic_data_dir: The directory containing the Prolific submissions.
+    If given, the time taken by the rater is added to each rate.
+    :param stratum_index: The index of the stratum in the "_" separated snippet path.
+    :return: The ratings table.
+    """
+    columns = {column: [] for column in RATINGS_SCHEMA.names}
+    for file_path in _list_json_file_paths(survey_results_dir):
+        with open(file_path) as file:
+            snippet = json.load(file)
+        stratum, rdh = _split_path(snippet["path"], stratum_index)
+        for rate in snippet["rates"]:
+            if rate.get("rate") is None:
+                continue
+            columns["snippet"].append(snippet["path"])
+            columns["stratum"].append(stratum)
+            columns["rdh"].append(rdh)
+            columns["rater"].append(rate["rater"])
+            columns["raterExternalId"].append(rate.get("raterExternalId"))
+            columns["rate"].append(rate["rate"])
+
+    # Look up the time taken of each rater once
+    time_taken = {}
+    if demographic_data_dir is not None:
+        time_taken = {
+            participant_id: submission.time_taken
+            for participant_id, submission in load_raters(demographic_data_dir).items()
+        }
+    columns["time_taken"] = [
+        time_taken.get(rater_external_id)
+        for rater_external_id in columns["raterExternalId"]
+    ]
+
+    return pa.Table.from_arrays(
+        [
+            (
+                pa.array(values, type=field.type.value_type).dictionary_encode()
+                if pa.types.is_dictionary(field.type)
+                else pa.array(values, type=field.type)
+            )
+            for values, field in zip(columns.values(), RATINGS_SCHEMA, strict=True)
+        ],
+        schema=RATINGS_SCHEMA,
+    )
+
+
+def _fingerprint_inputs(
+    survey_results_dir: Path, demographic_data_dir: Path | None, stratum_index: int
+) -> str:
+    """
+    Compute the fingerprint of all inputs of the ratings table.
+    :param survey_results_dir: The directory containing the survey results.
+    :param demographic_data_dir: The directory containing the Prolific submissions.
+    :param stratum_index: The index of the stratum in the snippet path.
+    :return: The fingerprint.
+    """
+    fingerprint = f"{fingerprint_directory(survey_results_dir)}:{stratum_index}"
+    if demographic_data_dir is not None:
+        fingerprint += f":{fingerprint_directory(demographic_data_dir, '*.csv')}"
+    return fingerprint
+
+
+def load_ratings_table(
+    survey_results_dir: Path,
+    demographic_data_dir: Path | None = None,
+    cache_path: Path | None = None,
+    stratum_index: int = 1,
+) -> pa.Table:
+    """
+    Load the ratings table from the Parquet cache. The table is rebuilt and the cache
+    is replaced only if the inputs changed since the cache was written.
+    :param survey_results_dir: The directory containing the survey results.
+    :param demographic_data_dir: The directory containing the Prolific submissions.
+    :param cache_path: The path to the Parquet file, e.g. RATINGS_FILE_NAME in an
+    output directory. If None, the table is built without a cache, so nothing is
+    written next to the inputs.
+    :param stratum_index: The index of the stratum in the "_" separated snippet path.
+    :return: The ratings table.
+    """
+    if cache_path is None:
+        return build_ratings_table(
+            survey_results_dir, demographic_data_dir, stratum_index
+        )
+    fingerprint = _fingerprint_inputs(
+        survey_results_dir, demographic_data_dir, stratum_index
+    ).encode()
+
+    if cache_path.exists():
+        metadata = pq.read_schema(cache_path).metadata or {}
+        if metadata.get(FINGERPRINT_KEY) == fingerprint:
+            return pq.read_table(cache_path)
+
+    table = build_ratings_table(survey_results_dir, demographic_data_dir, stratum_index)
+    table = table.replace_schema_metadata({FINGERPRINT_KEY: fingerprint})
+    pq.write_table(table, cache_path)
+    return table
+
+
+def group_ratings(
+    table: pa.Table, by: str | list[str]
+) -> dict[str | tuple[str, ...], np.ndarray]:
+    """
+    Group the ratings with a single group-by over the table.
+    :param table: The ratings table.
+    :param by: The column or columns to group by, e.g. "rdh" or ["stratum", "rdh"].
+    :return: The ratings of each group, keyed by the value of the column or the tuple
+    of the values of the columns.
+    """
+    keys = [by] if isinstance(by, str) else by
+    grouped = table.group_by(keys).aggregate([("rate", "list")]).to_pydict()
+    group_keys = (
+        grouped[by]
+        if isinstance(by, str)
+        else zip(*(grouped[key] for key in keys), strict=True)
+    )
+    return {
+        key: np.asarray(rates, dtype=np.int8)
+        for key, rates in zip(group_keys, grouped["rate_list"], strict=True)
+    }
+
+
+def mean_ratings(table: pa.Table, by: str | list[str]) -> pa.Table:
+    """
+    Compute the number, mean and standard deviation of the ratings of each group.
+    :param table: The ratings table.
+    :param by: The column or columns to group by.
+    :return: A table with the group columns and rate_count, rate_mean and rate_stddev.
+    """
+    keys = [by] if isinstance(by, str) else by
+    return table.group_by(keys).aggregate(
+        [("rate", "count"), ("rate", "mean"), ("rate", "stddev")]
+    )
@@ -0,0 +1,364 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import scipy.stats as stats
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+CORRECTIONS = ["holm", "bh"]
+
+# The largest difference of the mean ratings that is considered equivalent
+DEFAULT_EQUIVALENCE_MARGIN = 0.5
+
+RESULT_COLUMNS = [
+    "group1",
+    "group2",
+    "test",
+    "statistic",
+    "p_value",
+    "p_adjusted",
+    "rejected",
+    "n1",
+    "n2",
+]
+
+
+def adjust_p_values(p_values: np.ndarray, method: str | None = "holm") -> np.ndarray:
+    """
+    Adjust the p-values of a family of tests for multiple comparisons. NaN p-values
+    are not counted as tests.
+    :param p_values: The p-values.
+    :param method: "holm" for the Holm-Bonferroni step-down method, which controls
+    the family-wise error rate, "bh" for the Benjamini-Hochberg step-up method, which
+    controls the false discovery rate, or None to keep the p-values.
+    :return: The adjusted p-values.
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    if method is None:
+        return p_values.copy()
+    if method not in CORRECTIONS:
+        raise ValueError(f"The correction must be one of {CORRECTIONS} or None.")
+
+    adjusted = np.full_like(p_values, np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    order = tested[np.argsort(p_values[tested], kind="stable")]
+    sorted_p_values = p_values[order]
+    num_tests = len(order)
+    ranks = np.arange(1, num_tests + 1)
+
+    if method == "holm":
+        steps = np.maximum.accumulate((num_tests - ranks + 1) * sorted_p_values)
+    else:
+        steps = np.minimum.accumulate((num_tests / ranks * sorted_p_values)[::-1])
+        steps = steps[::-1]
+    adjusted[order] = np.minimum(steps, 1)
+    return adjusted
+
+
+def rating_histograms(
+    ratings: pd.DataFrame, by: list[str], values: tuple[int, ...] = RATING_VALUES
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Count the ratings of each value for each group with a single pass over the
+    ratings.
+    :param ratings: The long-format ratings with a rate column.
+    :param by: The columns that form the groups.
+    :param values: The possible values of the ratings.
+    :return: The groups, one row per group, and the group x value counts.
+    """
+    value_codes = np.searchsorted(values, ratings["rate"].to_numpy())
+    value_codes = np.minimum(value_codes, len(values) - 1)
+    if not np.array_equal(np.asarray(values)[value_codes], ratings["rate"]):
+        raise ValueError("The ratings contain values outside of the rating values.")
+
+    grouped = ratings[by].astype(str).groupby(by, sort=True)
+    groups = grouped.size().index.to_frame(index=False)
+    histograms = np.zeros((len(groups), len(values)), dtype=np.int64)
+    np.add.at(histograms, (grouped.ngroup().to_numpy(), value_codes), 1)
+    return groups, histograms
+
+
+def group_pairs(
+    groups: pd.DataFrame, by: str, within: list[str], compare_to: str | None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Form the pairs of groups to compare. Groups are only compared to groups with the
+    same values of the within columns.
+    :param groups: The groups, one row per group.
+    :param by: The column whose values are compared.
+    :param within: The columns within which the groups are compared.
+    :param compare_to: The group to which all others are compared, or None to compare
+    all pairs.
+    :return: The indices of the first and second groups of the pairs.
+    """
+    # A misspelled baseline would otherwise look like a result without comparisons
+    if compare_to is not None and compare_to not in set(groups[by]):
+        raise ValueError(f"The group to compare to does not exist: {compare_to}.")
+
+    blocks = (
+        groups.groupby(within, sort=False).indices.values()
+        if within
+        else [np.arange(len(groups))]
+    )
+    first, second = [], []
+    for block in blocks:
+        block = np.asarray(block)
+        if compare_to is None:
+            upper = np.triu_indices(len(block), k=1)
+            first.append(block[upper[0]])
+            second.append(block[upper[1]])
+        else:
+            is_baseline = groups[by].to_numpy()[block] == compare_to
+            baseline = block[is_baseline]
+            others = block[~is_baseline]
+            first.append(np.repeat(baseline, len(others)))
+            second.append(np.tile(others, len(baseline)))
+    if not first:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def mann_whitney_u(
+    first: np.ndarray, second: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sided Mann-Whitney U tests with the normal approximation, tie and continuity
+    correction, computed from the value counts of each pair of groups.
+    :param first: The pair x value counts of the first groups.
+    :param second: The pair x value counts of the second groups.
+    :return: The U statistics of the first groups and the p-values.
+    """
+    n1, n2 = first.sum(axis=1), second.sum(axis=1)
+    n = n1 + n2
+    ties = first + second
+
+    # The mid-rank of each value in the combined sample
+    mid_ranks = np.cumsum(ties, axis=1) - (ties - 1) / 2
+    u1 = (first * mid_ranks).sum(axis=1) - n1 * (n1 + 1) / 2
+
+    tie_term = (ties**3 - ties).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sd = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        z = (np.maximum(u1, n1 * n2 - u1) - n1 * n2 / 2 - 0.5) / sd
+    p_values = np.minimum(2 * stats.norm.sf(z), 1)
+    return u1, p_values
+
+
+def _moments(
+    counts: np.ndarray, values: tuple[int, ...]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the size, mean and sum of squared deviations of each group from its
+    value counts.
+    :param counts: The group x value counts.
+    :param values: The possible values of the ratings.
+    :return: The sizes, means and sums of squared deviations.
+    """
+    values = np.asarray(values, dtype=float)
+    size = counts.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = counts @ values / size
+    sum_of_squares = counts @ values**2 - size * mean**2
+    return size, mean, sum_of_squares
+
+
+def t_test(
+    first: np.ndarray, second: np.ndarray, values: tuple[int, ...] = RATING_VALUES
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sided independent t-tests with pooled variance, computed from the value
+    counts of each pair of groups.
+    :param first: The pair x value counts of the first groups.
+    :param second: The pair x value counts of the second groups.
+    :param values: The possible values of the ratings.
+    :return: The t statistics and the p-values.
+    """
+    n1, mean1, ss1 = _moments(first, values)
+    n2, mean2, ss2 = _moments(second, values)
+    dof = n1 + n2 - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pooled_variance = (ss1 + ss2) / dof
+        t = (mean1 - mean2) / np.sqrt(pooled_variance * (1 / n1 + 1 / n2))
+    return t, 2 * stats.t.sf(np.abs(t), dof)
+
+
+def tost(
+    first: np.ndarray,
+    second: np.ndarray,
+    margin: float = DEFAULT_EQUIVALENCE_MARGIN,
+    values: tuple[int, ...] = RATING_VALUES,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Equivalence tests of the means with two one-sided Welch t-tests (TOST), computed
+    from the value counts of each pair of groups. The null hypothesis is that the
+    means differ by at least the margin, so a rejection shows equivalence.
+    :param first: The pair x value counts of the first groups.
+    :param second: The pair x value counts of the second groups.
+    :param margin: The equivalence margin of the difference of the means.
+    :param values: The possible values of the ratings.
+    :return: The t statistics of the one-sided tests with the larger p-value and the
+    p-values, which are the larger p-values of both one-sided tests.
+    """
+    n1, mean1, ss1 = _moments(first, values)
+    n2, mean2, ss2 = _moments(second, values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        squared_errors1 = ss1 / (n1 - 1) / n1
+        squared_errors2 = ss2 / (n2 - 1) / n2
+        standard_error = np.sqrt(squared_errors1 + squared_errors2)
+        dof = (squared_errors1 + squared_errors2) ** 2 / (
+            squared_errors1**2 / (n1 - 1) + squared_errors2**2 / (n2 - 1)
+        )
+        difference = mean1 - mean2
+        t_lower = (difference + margin) / standard_error
+        t_upper = (difference - margin) / standard_error
+    p_lower = stats.t.sf(t_lower, dof)
+    p_upper = stats.t.cdf(t_upper, dof)
+    return (
+        np.where(p_lower >= p_upper, t_lower, t_upper),
+        np.maximum(p_lower, p_upper),
+    )
+
+
+def chi2_test(first: np.ndarray, second: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Chi-squared tests of independence of the 2 x k contingency tables of the value
+    counts of each pair of groups. Values that neither group contains are left out.
+    Yates' correction is applied to 2 x 2 tables.
+    :param first: The pair x value counts of the first groups.
+    :param second: The pair x value counts of the second groups.
+    :return: The chi-squared statistics and the p-values.
+    """
+    observed = np.stack([first, second], axis=1).astype(float)
+    column_totals = observed.sum(axis=1, keepdims=True)
+    row_totals = observed.sum(axis=2, keepdims=True)
+    total = observed.sum(axis=(1, 2), keepdims=True)
+    expected = row_totals * column_totals / total
+
+    dof = (column_totals[:, 0] > 0).sum(axis=1) - 1
+    deviation = np.abs(observed - expected)
+    yates = (dof == 1)[:, np.newaxis, np.newaxis]
+    deviation = np.where(yates, np.maximum(deviation - 0.5, 0), deviation)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(expected > 0, deviation**2 / expected, 0)
+    statistic = terms.sum(axis=(1, 2))
+
+    p_values = np.where(dof > 0, stats.chi2.sf(statistic, np.maximum(dof, 1)), 1.0)
+    empty_row = (row_totals[:, :, 0] == 0).any(axis=1)
+    p_values = np.where(empty_row, np.nan, p_values)
+    return statistic, p_values
+
+
+def _split_histograms(histograms: np.ndarray, split: int) -> np.ndarray:
+    """
+    Count the ratings up to and including the split value and above it.
+    :param histograms: The pair x value counts.
+    :param split: The index of the highest value of the lower part.
+    :return: The pair x 2 counts.
+    """
+    low = histograms[:, : split + 1].sum(axis=1)
+    return np.stack([low, histograms.sum(axis=1) - low], axis=1)
+
+
+def pairwise_tests(
+    ratings: pd.DataFrame | pa.Table,
+    by: str,
+    within: list[str] = None,
+    compare_to: str | None = None,
+    correction: str | None = "holm",
+    alpha: float = 0.05,
+    values: tuple[int, ...] = RATING_VALUES,
+    equivalence_margin: float = DEFAULT_EQUIVALENCE_MARGIN,
+) -> pd.DataFrame:
+    """
+    Run the Mann-Whitney U test, the t-test, the equivalence test (TOST), the
+    chi-squared test of the rating distributions and the chi-squared tests of each
+    split into low and high ratings for all pairs of groups at once. The tests are
+    computed from the value counts of each group, which are counted in a single pass.
+    The p-values of each test are adjusted for multiple comparisons over all pairs.
+    :param ratings: The long-format ratings, e.g. the ratings table.
+    :param by: The column whose groups are compared, e.g. "rdh".
+    :param within: The columns within which the groups are compared, e.g. ["stratum"]
+    to compare the RDHs of each stratum. If None, all ratings are compared.
+    :param compare_to: The group to which all others are compared, e.g. "none". If
+    None, all pairs of groups are compared.
+    :param correction: The correction for multiple comparisons: "holm", "bh" or None.
+    :param alpha: The significance level.
+    :param values: The possible values of the ratings.
+    :param equivalence_margin: The equivalence margin of the difference of the mean
+    ratings in the TOST.
+    :return: A frame with one row per pair and test. The split tests are named
+    "chi2_split_<value>", where value is the highest low rating. A rejected "tost"
+    means that the pair is equivalent.
+    """
+    if isinstance(ratings, pa.Table):
+        ratings = ratings.select([*(within or []), by, "rate"]).to_pandas()
+    within = within or []
+
+    groups, histograms = rating_histograms(ratings, [*within, by], values)
+    first, second = group_pairs(groups, by, within, compare_to)
+    first_histograms, second_histograms = histograms[first], histograms[second]
+
+    results = {
+        "mann_whitney_u": mann_whitney_u(first_histograms, second_histograms),
+        "t_test": t_test(first_histograms, second_histograms, values),
+        "tost": tost(first_histograms, second_histograms, equivalence_margin, values),
+        "chi2": chi2_test(first_histograms, second_histograms),
+    }
+    for split in range(len(values) - 1):
+        results[f"chi2_split_{values[split]}"] = chi2_test(
+            _split_histograms(first_histograms, split),
+            _split_histograms(second_histograms, split),
+        )
+
+    return results_frame(
+        groups,
+        by,
+        within,
+        first,
+        second,
+        results,
+        histograms.sum(axis=1),
+        correction,
+        alpha,
+    )
+
+
+def results_frame(
+    groups: pd.DataFrame,
+    by: str,
+    within: list[str],
+    first: np.ndarray,
+    second: np.ndarray,
+    results: dict[str, tuple[np.ndarray, np.ndarray]],
+    sizes: np.ndarray,
+    correction: str | None,
+    alpha: float,
+) -> pd.DataFrame:
+    """
+    Collect the results of the tests of the pairs of groups in a tidy frame. The
+    p-values of each test are adjusted for multiple comparisons over all pairs.
+    :param groups: The groups, one row per group.
+    :param by: The column whose groups are compared.
+    :param within: The columns within which the groups are compared.
+    :param first: The indices of the first groups of the pairs.
+    :param second: The indices of the second groups of the pairs.
+    :param results: The statistics and p-values of the pairs by test name.
+    :param sizes: The number of ratings of each group.
+    :param correction: The correction for multiple comparisons: "holm", "bh" or None.
+    :param alpha: The significance level.
+    :return: A frame with one row per pair and test.
+    """
+    frames = []
+    for test, (statistic, p_values) in results.items():
+        p_adjusted = adjust_p_values(p_values, correction)
+        frame = groups.iloc[first][within].reset_index(drop=True)
+        frame["group1"] = groups[by].to_numpy()[first]
+        frame["group2"] = groups[by].to_numpy()[second]
+        frame["test"] = test
+        frame["statistic"] = statistic
+        frame["p_value"] = p_values
+        frame["p_adjusted"] = p_adjusted
+        frame["rejected"] = p_adjusted < alpha
+        frame["n1"] = sizes[first]
+        frame["n2"] = sizes[second]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)[[*within, *RESULT_COLUMNS]]
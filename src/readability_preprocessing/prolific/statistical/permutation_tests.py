@@ -0,0 +1,369 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from scipy.special import gammaln
+
+from readability_preprocessing.prolific.statistical.batch_tests import (
+    RATING_VALUES,
+    group_pairs,
+    rating_histograms,
+    results_frame,
+)
+
+PERMUTATION_STATISTICS = ["mean", "median", "distribution"]
+DEFAULT_NUM_PERMUTATIONS = 100_000
+
+# The number of permutations that are evaluated at once
+PERMUTATION_BATCH_SIZE = 20_000
+
+# Statistics that differ by less are considered equal, to count ties as extreme
+TOLERANCE = 1e-9
+
+
+def _medians(counts: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Compute the median of each group from its value counts.
+    :param counts: The group x value counts.
+    :param values: The possible values of the ratings.
+    :return: The medians.
+    """
+    sizes = counts.sum(axis=1)
+    cumulative = np.cumsum(counts, axis=1)
+
+    def value_at(position: np.ndarray) -> np.ndarray:
+        return values[(cumulative <= position[:, np.newaxis]).sum(axis=1)]
+
+    return (value_at((sizes - 1) // 2) + value_at(sizes // 2)) / 2
+
+
+def statistics(
+    first: np.ndarray,
+    second: np.ndarray,
+    statistic: str,
+    values: tuple[int, ...] = RATING_VALUES,
+) -> np.ndarray:
+    """
+    Compute a test statistic of pairs of groups from their value counts.
+    :param first: The pair x value counts of the first groups.
+    :param second: The pair x value counts of the second groups.
+    :param statistic: "mean" or "median" for the difference of the means or medians
+    of the first and second group, "distribution" for the area between the
+    cumulative rating distributions, which is zero only for equal distributions.
+    :param values: The possible values of the ratings.
+    :return: The statistic of each pair.
+    """
+    values = np.asarray(values, dtype=float)
+    if statistic == "mean":
+        return first @ values / first.sum(axis=1) - second @ values / second.sum(axis=1)
+    if statistic == "median":
+        return _medians(first, values) - _medians(second, values)
+    if statistic == "distribution":
+        first_cdf = np.cumsum(first, axis=1) / first.sum(axis=1, keepdims=True)
+        second_cdf = np.cumsum(second, axis=1) / second.sum(axis=1, keepdims=True)
+        return (np.abs(first_cdf - second_cdf)[:, :-1] * np.diff(values)).sum(axis=1)
+    raise ValueError(f"The statistic must be one of {PERMUTATION_STATISTICS}.")
+
+
+def _exact_splits(pooled: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Enumerate all value counts a first group of the given size can have when the
+    pooled ratings are split into two groups, with their probabilities under random
+    permutation (multivariate hypergeometric).
+    :param pooled: The value counts of the pooled ratings.
+    :param size: The size of the first group.
+    :return: The split x value counts of the first groups and their probabilities.
+    """
+    # All counts of the values but the last, from which the last count follows
+    grids = np.meshgrid(*(np.arange(count + 1) for count in pooled[:-1]), indexing="ij")
+    splits = np.stack([grid.ravel() for grid in grids], axis=1)
+    splits = np.column_stack([splits, size - splits.sum(axis=1)])
+    splits = splits[(splits[:, -1] >= 0) & (splits[:, -1] <= pooled[-1])]
+
+    def log_binomial(n, k):
+        return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)
+
+    log_probabilities = log_binomial(pooled, splits).sum(axis=1) - log_binomial(
+        pooled.sum(), size
+    )
+    return splits, np.exp(log_probabilities)
+
+
+def _num_exact_splits(pooled: np.ndarray) -> int:
+    """
+    Get the number of value counts that are enumerated for an exact test.
+    :param pooled: The value counts of the pooled ratings.
+    :return: The number of enumerated value counts.
+    """
+    return int(np.prod(pooled[:-1] + 1, dtype=float))
+
+
+def _monte_carlo_batch(
+    pooled: np.ndarray,
+    size: int,
+    observed: np.ndarray,
+    tests: list[str],
+    values: tuple[int, ...],
+    num_permutations: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """
+    Count the random permutations whose statistics are at least as extreme as the
+    observed ones. The first group of a permutation draws its value counts from the
+    pooled counts without replacement, which is equivalent to shuffling the ratings.
+    :param pooled: The value counts of the pooled ratings.
+    :param size: The size of the first group.
+    :param observed: The observed statistic of each test.
+    :param tests: The statistics.
+    :param values: The possible values of the ratings.
+    :param num_permutations: The number of permutations.
+    :param seed: The seed of the permutations.
+    :return: The number of extreme permutations of each test.
+    """
+    rng = np.random.default_rng(seed)
+    first = rng.multivariate_hypergeometric(pooled, size, size=num_permutations)
+    second = pooled - first
+    return np.array(
+        [
+            (
+                np.abs(statistics(first, second, test, values))
+                >= abs(value) - TOLERANCE
+            ).sum()
+            for test, value in zip(tests, observed, strict=True)
+        ]
+    )
+
+
+def _exact_p_values(
+    pooled: np.ndarray,
+    size: int,
+    observed: np.ndarray,
+    tests: list[str],
+    values: tuple[int, ...],
+) -> np.ndarray:
+    """
+    Compute the exact p-values by enumerating all splits of the pooled ratings.
+    :param pooled: The value counts of the pooled ratings.
+    :param size: The size of the first group.
+    :param observed: The observed statistic of each test.
+    :param tests: The statistics.
+    :param values: The possible values of the ratings.
+    :return: The p-value of each test.
+    """
+    first, probabilities = _exact_splits(pooled, size)
+    second = pooled - first
+    return np.array(
+        [
+            probabilities[
+                np.abs(statistics(first, second, test, values))
+                >= abs(value) - TOLERANCE
+            ].sum()
+            for test, value in zip(tests, observed, strict=True)
+        ]
+    ).clip(max=1)
+
+
+def _batch_sizes(num_permutations: int) -> list[int]:
+    """
+    Split the random permutations of a pair into batches.
+    :param num_permutations: The number of random permutations.
+    :return: The number of permutations of each batch.
+    """
+    return [
+        min(PERMUTATION_BATCH_SIZE, num_permutations - start)
+        for start in range(0, num_permutations, PERMUTATION_BATCH_SIZE)
+    ]
+
+
+def _p_values(
+    first: np.ndarray,
+    second: np.ndarray,
+    tests: list[str],
+    values: tuple[int, ...],
+    num_permutations: int,
+    seeds: list[np.random.SeedSequence],
+    executor: Executor | None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the observed statistics and the permutation p-values of pairs of groups.
+    A pair is tested exactly, if enumerating all splits takes at most as many
+    evaluations as the random permutations. The batches of random permutations of all
+    pairs are evaluated together, so they can be spread over the executor.
+    :param first: The pair x value counts of the first groups.
+    :param second: The pair x value counts of the second groups.
+    :param tests: The statistics.
+    :param values: The possible values of the ratings.
+    :param num_permutations: The number of random permutations of each pair.
+    :param seeds: The seed of the permutations of each pair.
+    :param executor: The executor for the batches of permutations or None.
+    :return: The pair x test observed statistics and p-values and whether each pair
+    was tested exactly.
+    """
+    observed = np.stack(
+        [statistics(first, second, test, values) for test in tests], axis=1
+    )
+    pooled = first + second
+    sizes = first.sum(axis=1)
+    exact = np.array(
+        [_num_exact_splits(counts) <= num_permutations for counts in pooled],
+        dtype=bool,
+    )
+
+    p_values = np.empty_like(observed)
+    for pair in np.flatnonzero(exact):
+        p_values[pair] = _exact_p_values(
+            pooled[pair], sizes[pair], observed[pair], tests, values
+        )
+
+    sampled = np.flatnonzero(~exact)
+    batch_sizes = _batch_sizes(num_permutations)
+    batches = [
+        (pair, batch_size, batch_seed)
+        for pair in sampled
+        for batch_size, batch_seed in zip(
+            batch_sizes, seeds[pair].spawn(len(batch_sizes)), strict=True
+        )
+    ]
+    batch_map = executor.map if executor is not None else map
+    extreme = np.zeros((len(first), len(tests)))
+    for (pair, _, _), batch_extreme in zip(
+        batches,
+        batch_map(
+            _monte_carlo_batch,
+            [pooled[pair] for pair, _, _ in batches],
+            [sizes[pair] for pair, _, _ in batches],
+            [observed[pair] for pair, _, _ in batches],
+            [tests] * len(batches),
+            [values] * len(batches),
+            [batch_size for _, batch_size, _ in batches],
+            [batch_seed for _, _, batch_seed in batches],
+        ),
+        strict=True,
+    ):
+        extreme[pair] += batch_extreme
+
+    # Count the observed split as a permutation, so the p-value is never zero
+    p_values[sampled] = (extreme[sampled] + 1) / (num_permutations + 1)
+    return observed, p_values, exact
+
+
+def permutation_test(
+    first: list[int] | np.ndarray,
+    second: list[int] | np.ndarray,
+    statistic: str = "mean",
+    num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+    seed: int | None = None,
+    values: tuple[int, ...] = RATING_VALUES,
+) -> tuple[float, float, bool]:
+    """
+    Perform a two-sided permutation test of the ratings of two groups.
+    :param first: The ratings of the first group.
+    :param second: The ratings of the second group.
+    :param statistic: The statistic: mean, median or distribution.
+    :param num_permutations: The number of random permutations. If the ratings can be
+    split in at most as many ways, the test is exact.
+    :param seed: The seed of the permutations.
+    :param values: The possible values of the ratings.
+    :return: The observed statistic, the p-value and whether the test is exact.
+    """
+    ratings = pd.DataFrame(
+        {"group": ["first"] * len(first) + ["second"] * len(second)}
+    ).assign(rate=np.concatenate([first, second]))
+    groups, histograms = rating_histograms(ratings, ["group"], values)
+    if len(groups) != 2:
+        raise ValueError("Both groups must contain ratings.")
+
+    observed, p_values, exact = _p_values(
+        histograms[:1],
+        histograms[1:],
+        [statistic],
+        values,
+        num_permutations,
+        [np.random.SeedSequence(seed)],
+        None,
+    )
+    return float(observed[0, 0]), float(p_values[0, 0]), bool(exact[0])
+
+
+def permutation_tests(
+    ratings: pd.DataFrame | pa.Table,
+    by: str,
+    within: list[str] = None,
+    compare_to: str | None = None,
+    tests: list[str] = None,
+    num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+    correction: str | None = "holm",
+    alpha: float = 0.05,
+    seed: int | None = None,
+    workers: int = 1,
+    values: tuple[int, ...] = RATING_VALUES,
+) -> pd.DataFrame:
+    """
+    Perform two-sided permutation tests for all pairs of groups at once, e.g. for all
+    pairs of RDHs or for each RDH against the "none" baseline. Small pairs are tested
+    exactly, larger pairs with random permutations. The permutations are drawn as
+    value counts in vectorized batches, which can be spread over processes.
+    :param ratings: The long-format ratings, e.g. the ratings table.
+    :param by: The column whose groups are compared, e.g. "rdh".
+    :param within: The columns within which the groups are compared, e.g.
+    ["stratum"]. If None, all ratings are compared.
+    :param compare_to: The group to which all others are compared, e.g. "none". If
+    None, all pairs of groups are compared.
+    :param tests: The statistics: mean, median and/or distribution. All if None.
+    :param num_permutations: The number of random permutations of each pair.
+    :param correction: The correction for multiple comparisons: "holm", "bh" or None.
+    :param alpha: The significance level.
+    :param seed: The seed of the permutations. The result does not depend on the
+    number of workers.
+    :param workers: The number of processes that evaluate the permutations.
+    :param values: The possible values of the ratings.
+    :return: A frame with one row per pair and test, named "permutation_<statistic>",
+    and whether the test was exact.
+    """
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1.")
+    if num_permutations < 1:
+        raise ValueError("The number of permutations must be at least 1.")
+    if tests is None:
+        tests = PERMUTATION_STATISTICS
+    if isinstance(ratings, pa.Table):
+        ratings = ratings.select([*(within or []), by, "rate"]).to_pandas()
+    within = within or []
+
+    groups, histograms = rating_histograms(ratings, [*within, by], values)
+    first, second = group_pairs(groups, by, within, compare_to)
+    seeds = np.random.SeedSequence(seed).spawn(len(first))
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        observed, p_values, exact = _p_values(
+            histograms[first],
+            histograms[second],
+            tests,
+            values,
+            num_permutations,
+            seeds,
+            executor,
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    results = {
+        f"permutation_{test}": (observed[:, idx], p_values[:, idx])
+        for idx, test in enumerate(tests)
+    }
+    frame = results_frame(
+        groups,
+        by,
+        within,
+        first,
+        second,
+        results,
+        histograms.sum(axis=1),
+        correction,
+        alpha,
+    )
+    frame["exact"] = np.tile(exact, len(tests))
+    return frame
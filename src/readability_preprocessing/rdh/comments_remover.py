@@ -1,14 +1,22 @@
 import logging
+import os
 import random
+import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
+from readability_preprocessing.utils.manifest import ExtractionManifest
 from readability_preprocessing.utils.utils import (
     list_java_files_path,
     load_code,
     store_code,
 )
 
+QUOTES = "\"'"
+WORKER_CHUNK_SIZE = 16
+PROGRESS_INTERVAL = 1000
+
 
 @dataclass
 class CommentsRemoverConfig:
@@ -25,8 +33,15 @@ class CommentsRemover:
     A class for removing comments from files with java methods.
     """
 
-    def __init__(self, config: CommentsRemoverConfig):
+    def __init__(self, config: CommentsRemoverConfig, rng: random.Random | None = None):
+        """
+        Initialize the CommentsRemover.
+        :param config: The configuration.
+        :param rng: The random number generator that decides which comments are
+        removed. If None, the global random number generator is used.
+        """
         self.config = config
+        self.rng = rng if rng is not None else random
         self.arr = []
         self.comment = "//"
         self.esc = "\\"
@@ -84,44 +99,31 @@ class CommentsRemover:
             self.esc = None
 
         if self.comment in line:
-            comment_indexes = [
-                i for i in range(len(line)) if line.startswith(self.comment, i)
-            ]
             if self._should_remove_comment():
-                return self._extract_comment_free_line(line, comment_indexes)
+                return self._extract_comment_free_line(line)
             return line
         return line
 
-    def _extract_comment_free_line(self, line: str, comment_indexes: list) -> str:
+    def _extract_comment_free_line(self, line: str) -> str:
         """
-        Extracts the comment free line from the given line of java code.
+        Extracts the comment free line from the given line of java code. Only the
+        quotes and the starts of comments are visited, so the line is scanned once.
         :param line: The line of java code with comments.
-        :param comment_indexes: The indexes of the comments in the line.
         :return: The line of java code without comments.
         """
         d, s = 0, 0  # double and single quote counters
-        rem = line
 
-        i = 0
-        while i < len(line):
+        for i in self._find_positions(line, QUOTES, self.comment):
             check = self._is_valid_quote(line, i)
-            if line[i] == '"' and check and d == 0 and s == 0:
-                d += 1
-            elif line[i] == '"' and check and d == 1 and s == 0:
-                d -= 1
-
-            if line[i] == "'" and check and d == 0 and s == 0:
-                s += 1
-            elif line[i] == "'" and check and d == 0 and s == 1:
-                s -= 1
-
-            if i in comment_indexes and d == 0 and s == 0:
-                rem = line[:i]
-                break
+            if line[i] == '"' and check and s == 0:
+                d = 1 - d
+            elif line[i] == "'" and check and d == 0:
+                s = 1 - s
 
-            i += 1
+            if d == 0 and s == 0 and line.startswith(self.comment, i):
+                return line[:i]
 
-        return rem
+        return line
 
     def _is_valid_quote(self, line: str, i: int) -> bool:
         """
@@ -153,143 +155,179 @@ class CommentsRemover:
                 bc_close_indexes.append(c)
         return bc_open_indexes, bc_close_indexes
 
-    def _check_quotes(
-        self,
-        i: int,
-        full: str,
-        bc_open_indexes: list,
-        bc_close_indexes: list,
-        d: int,
-        s: int,
-    ) -> tuple:
-        """
-        Checks the double quotes and single quotes in the given java code.
-        :param i: The index of the character in the java code.
-        :param full: The java code with comments.
-        :param bc_open_indexes: The indexes of the block comments in the java code.
-        :param bc_close_indexes: The indexes of the block comments in the java code.
-        :param d: The double quote counter.
-        :param s: The single quote counter.
-        :return: The updated double and single quote counters.
-        """
-        if full[i] == '"' and self._is_valid_double_quote(i, full, d, s):
-            d += 1
-        elif full[i] == '"' and self._is_valid_double_quote(
-            i, full, d, s, closing=True
-        ):
-            d -= 1
-        if full[i] == "'" and self._is_valid_single_quote(
-            i, full, d, s, bc_open_indexes
-        ):
-            s += 1
-        elif full[i] == "'" and self._is_valid_single_quote(
-            i, full, d, s, bc_close_indexes
-        ):
-            s -= 1
-        return d, s
-
-    def _is_valid_double_quote(
-        self, i: int, full: str, d: int, s: int, closing=False
-    ) -> bool:
-        """
-        Checks if the given quote is valid.
-        :param i: The index of the quote in the line.
-        :param full: The line of java code with comments.
-        :param d: The double quote counter.
-        :param s: The single quote counter.
-        :param closing: True if the quote is a closing quote, False otherwise.
-        :return: True if the quote is valid, False otherwise.
-        """
-        return (
-            (full[i] == '"' and self._is_valid_quote(full, i))
-            and d == 0
-            and s == 0
-            and (not closing or d == 1)
-        )
-
-    def _is_valid_single_quote(
-        self, i: int, full: str, d: int, s: int, bc_indexes: list
-    ) -> bool:
+    @staticmethod
+    def _find_positions(code: str, chars: str, *delimiters: str) -> list[int]:
         """
-        Checks if the given single quote is valid.
-        :param i: The index of the single quote in the line.
-        :param full: The line of java code with comments.
-        :param d: The double quote counter.
-        :param s: The single quote counter.
-        :param bc_indexes: The indexes of the block comments in the java code.
-        :return: True if the single quote is valid, False otherwise.
+        Finds the positions of the given characters and the (possibly overlapping)
+        occurrences of the given delimiters in the code.
+        :param code: The java code.
+        :param chars: The characters to find.
+        :param delimiters: The delimiters to find.
+        :return: The sorted positions.
         """
-        return (
-            (full[i] == "'" and self._is_valid_quote(full, i))
-            and d == 0
-            and s == 0
-            and (i not in bc_indexes)
+        patterns = [f"[{re.escape(chars)}]"] + [
+            f"(?={re.escape(delimiter)})" for delimiter in delimiters if delimiter
+        ]
+        return sorted(
+            {match.start() for match in re.finditer("|".join(patterns), code)}
         )
 
     def remove_block_comments(self, full: str) -> str:
         """
-        Removes block comments from the given java code.
+        Removes block comments from the given java code. Only the quotes, newlines
+        and comment delimiters are visited, so the code is scanned once.
+        A quote starts a string that lasts until the end of the line, because a
+        string may contain a comment delimiter. If a comment is kept, the text from
+        the n-th comment opening to the n-th comment closing is kept.
         :param full: The java code with comments.
         :return: The java code without block comments.
         """
-        output = ""
+        output = []
         bc_open_indexes, bc_close_indexes = self._find_block_comment_indexes(full)
-        d, s, bc, record = 0, 0, 0, 0
-
-        for i in range(len(full)):
-            d, s = self._check_quotes(i, full, bc_open_indexes, bc_close_indexes, d, s)
+        bc_open_set = set(bc_open_indexes)
+        bc_close_numbers = {c: n for n, c in enumerate(bc_close_indexes)}
+        in_string, bc, record = False, False, 0
 
+        for i in self._find_positions(full, QUOTES + "\n", self.bcopen, self.bcclose):
             if full[i] == "\n":
-                d = 0
-                s = 0
-
-            if i in bc_open_indexes and d == 0 and s == 0 and bc == 0:
-                output += full[record:i]
-                i += len(self.bcopen) - 1
-                bc = 1
-            elif self.bcclose != "" and i in bc_close_indexes and bc == 1:
-                if self._should_remove_comment():
-                    record = i + len(self.bcclose)
-                    i += len(self.bcclose) - 1
-                    bc = 0
-                else:
-                    index = bc_close_indexes.index(i)
-                    bc_open_pos = bc_open_indexes[index]
-                    output += full[bc_open_pos : i + len(self.bcclose)]
-                    record = i + len(self.bcclose)
-                    i += len(self.bcclose) - 1
-                    bc = 0
-            elif i == len(full) - 1 and bc == 0:
-                output += full[record:]
-
-        return output
+                in_string = False
+            elif full[i] in QUOTES and self._is_valid_quote(full, i):
+                in_string = True
+
+            if i in bc_open_set and not in_string and not bc:
+                output.append(full[record:i])
+                bc = True
+            elif i in bc_close_numbers and bc:
+                if not self._should_remove_comment():
+                    bc_open_pos = bc_open_indexes[bc_close_numbers[i]]
+                    output.append(full[bc_open_pos : i + len(self.bcclose)])
+                record = i + len(self.bcclose)
+                bc = False
+
+        if not bc:
+            output.append(full[record:])
+        return "".join(output)
 
     def _should_remove_comment(self) -> bool:
         """
         True if comments should be removed, False otherwise.
         :return: True if comments should be removed, False otherwise.
         """
-        return random.random() < self.config.probability
+        return self.rng.random() < self.config.probability
+
+
+def file_rng(seed: int, relative_path: str | Path) -> random.Random:
+    """
+    Creates the random number generator for a file. It only depends on the seed and
+    the path of the file relative to the input directory, so the comments removed
+    from a file do not depend on the order in which the files are processed.
+    :param seed: The base seed.
+    :param relative_path: The path of the file relative to the input directory.
+    :return: The random number generator of the file.
+    """
+    return random.Random(f"{seed}:{Path(relative_path).as_posix()}")
+
+
+def _remove_comments_from_file(
+    file: Path, relative_path: str, probability: float, seed: int | None
+) -> str | None:
+    """
+    Removes comments from a java file.
+    :param file: The java file.
+    :param relative_path: The path of the file relative to the input directory.
+    :param probability: The probability of removing a comment.
+    :param seed: The base seed or None to use the global random number generator.
+    :return: The java code without comments or None, if the file could not be
+    processed.
+    """
+    rng = file_rng(seed, relative_path) if seed is not None else None
+    comments_remover = CommentsRemover(
+        CommentsRemoverConfig(probability=probability), rng
+    )
+    try:
+        return comments_remover.remove_comments(load_code(file))
+    except Exception as e:
+        logging.error(f"Error processing file: {file}. Error: {e}")
+        return None
+
+
+def _remove_comments_from_file_in_worker(args: tuple) -> str | None:
+    """
+    Removes comments from a java file in a worker process.
+    :param args: The arguments of _remove_comments_from_file.
+    :return: The java code without comments or None, if the file could not be
+    processed.
+    """
+    return _remove_comments_from_file(*args)
+
+
+def _check_removal_arguments(workers: int, seed: int | None) -> None:
+    """
+    Check the arguments of the comment removal.
+    :param workers: The number of processes that remove the comments.
+    :param seed: The base seed.
+    :return: None.
+    """
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1.")
+    if workers > 1 and seed is None:
+        raise ValueError("A seed is required for more than one worker.")
 
 
 def remove_comments(
-    input_dir: Path, output_dir: Path, probability: float = 0.1
+    input_dir: Path,
+    output_dir: Path,
+    probability: float = 0.1,
+    seed: int | None = None,
+    workers: int = 1,
+    manifest_path: str | None = None,
 ) -> None:
     """
     Removes comments from the java files in the input directory and stores the result
     in the output directory.
+    If a seed is given, each file gets its own random number generator derived from
+    the seed and its relative path. The output is then reproducible and does not
+    depend on the number of workers.
     :param input_dir: The input directory.
     :param output_dir: The output directory.
     :param probability: The probability of removing a comment.
+    :param seed: The base seed. Required if workers > 1.
+    :param workers: The number of processes that remove the comments.
+    :param manifest_path: The path to the manifest of completed files. If given,
+    files listed in the manifest are skipped and newly completed files are added.
+    :return: None.
     """
-    comments_remover = CommentsRemover(CommentsRemoverConfig(probability=probability))
-
-    java_files = list_java_files_path(input_dir)
-    for file in java_files:
-        logging.info(f"Processing file: {file}")
-        try:
-            code = load_code(file)
-            code = comments_remover.remove_comments(code)
-            store_code(code, file, input_dir, output_dir)
-        except Exception as e:
-            logging.error(f"Error processing file: {file}. Error: {e}")
+    _check_removal_arguments(workers, seed)
+
+    manifest = ExtractionManifest(manifest_path) if manifest_path else None
+    tasks = [
+        (file, Path(os.path.relpath(file, input_dir)).as_posix(), probability, seed)
+        for file in sorted(list_java_files_path(input_dir))
+    ]
+    if manifest is not None:
+        tasks = [task for task in tasks if task[1] not in manifest]
+    logging.info(f"Removing comments from {len(tasks)} files.")
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(
+            _remove_comments_from_file_in_worker, tasks, chunksize=WORKER_CHUNK_SIZE
+        )
+    else:
+        results = map(_remove_comments_from_file_in_worker, tasks)
+
+    try:
+        for count, (task, code) in enumerate(zip(tasks, results, strict=True), 1):
+            file, relative_path = task[:2]
+            if code is not None:
+                store_code(code, file, input_dir, output_dir)
+                if manifest is not None:
+                    manifest.add(relative_path)
+            if count % PROGRESS_INTERVAL == 0 or count == len(tasks):
+                logging.info(f"Processed {count}/{len(tasks)} files.")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if manifest is not None:
+            manifest.close()
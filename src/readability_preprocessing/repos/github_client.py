@@ -0,0 +1,362 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://api.github.com"
+
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 30
+
+# Pause when fewer requests remain, so requests of other threads do not fail
+DEFAULT_MIN_REMAINING = 10
+
+# The longest pause for a rate limit reset, in seconds
+DEFAULT_MAX_WAIT = 3600
+DEFAULT_MAX_RETRIES = 3
+
+RATE_LIMITED_STATUS_CODES = {403, 429}
+
+
+@dataclass
+class GitHubResponse:
+    """
+    The json body of a response of the GitHub API.
+    """
+
+    status_code: int
+    data: Any = None
+    links: dict = field(default_factory=dict)
+    from_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+
+class GitHubClient:
+    """
+    A client for the GitHub API that reuses the connections of a shared session for
+    concurrent requests. Responses with an ETag are cached. They are requested again
+    with If-None-Match, so unchanged resources are answered with 304 Not Modified,
+    which does not count against the rate limit. When few requests remain
+    (X-RateLimit-Remaining), all threads pause until the rate limit is reset
+    (X-RateLimit-Reset).
+    """
+
+    def __init__(
+        self,
+        headers: dict[str, str] | None = None,
+        api_url: str = API_URL,
+        workers: int = DEFAULT_WORKERS,
+        cache_path: str | None = None,
+        min_remaining: int = DEFAULT_MIN_REMAINING,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize the client.
+        :param headers: The headers of all requests, e.g. the authorization.
+        :param api_url: The url of the GitHub API.
+        :param workers: The number of concurrent requests.
+        :param cache_path: The path to the json lines file of the ETag cache. If None,
+        the cache is only kept in memory.
+        :param min_remaining: The number of remaining requests below which the client
+        pauses until the rate limit is reset.
+        :param max_wait: The longest pause for a rate limit reset in seconds.
+        :param max_retries: How often a rate limited request is retried.
+        :param timeout: The timeout of a request in seconds.
+        :param sleep: The function that pauses the client.
+        """
+        if workers < 1:
+            raise ValueError("The number of workers must be at least 1.")
+
+        self.api_url = api_url.rstrip("/")
+        self.workers = workers
+        self.cache_path = cache_path
+        self.min_remaining = min_remaining
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._sleep = sleep
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._cache: dict[str, dict] = {}
+        self._unsaved: set[str] = set()
+        if cache_path is not None and os.path.exists(cache_path):
+            entries = _load_json_lines(cache_path)
+            for entry in entries:
+                self._cache[entry.pop("key")] = entry
+            if len(entries) > len(self._cache):
+                # Drop the outdated entries of changed resources
+                _dump_json_lines_atomically(
+                    [{"key": key, **entry} for key, entry in self._cache.items()],
+                    cache_path,
+                )
+
+    def url(self, *parts: str) -> str:
+        """
+        Build the url of an endpoint of the API.
+        :param parts: The parts of the path.
+        :return: The url.
+        """
+        return "/".join([self.api_url, *parts])
+
+    def get(self, url: str, params: dict | None = None) -> GitHubResponse:
+        """
+        Request a resource, using the cached response if it has not changed.
+        :param url: The url of the resource.
+        :param params: The query parameters.
+        :return: The response.
+        """
+        key = _cache_key(url, params)
+        with self._lock:
+            cached = self._cache.get(key)
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+
+        for _ in range(self.max_retries + 1):
+            self._wait_for_rate_limit()
+            response = self.session.get(
+                url, params=params, headers=headers, timeout=self.timeout
+            )
+            rate_limited = self._update_rate_limit(response)
+            if not rate_limited:
+                break
+            logging.warning(f"Rate limited: {url}")
+
+        if response.status_code == 304 and cached:
+            return GitHubResponse(200, cached["data"], cached["links"], True)
+        if response.status_code != 200:
+            return GitHubResponse(response.status_code)
+
+        result = GitHubResponse(200, response.json(), _links(response))
+        if "ETag" in response.headers:
+            with self._lock:
+                self._cache[key] = {
+                    "etag": response.headers["ETag"],
+                    "data": result.data,
+                    "links": result.links,
+                }
+                self._unsaved.add(key)
+        return result
+
+    def get_all(
+        self, urls: Iterable[str], params: dict | None = None
+    ) -> list[GitHubResponse]:
+        """
+        Request the resources concurrently.
+        :param urls: The urls of the resources.
+        :param params: The query parameters of all requests.
+        :return: The responses in the order of the urls.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(lambda url: self.get(url, params), urls))
+
+    def save_cache(self) -> None:
+        """
+        Store the ETag cache, so unchanged resources are not downloaded again by a
+        resumed crawl. Only the responses cached since the last call are appended to
+        the json lines file.
+        :return: None
+        """
+        if self.cache_path is None:
+            return
+        with self._lock:
+            entries = [{"key": key, **self._cache[key]} for key in self._unsaved]
+            self._unsaved.clear()
+        _append_json_lines(entries, self.cache_path)
+
+    def close(self) -> None:
+        """
+        Store the ETag cache and close the session.
+        :return: None
+        """
+        self.save_cache()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _wait_for_rate_limit(self) -> None:
+        """
+        Pause until the rate limit is reset, if few requests remain.
+        :return: None
+        """
+        with self._lock:
+            wait = self._paused_until - time.time()
+        if wait > 0:
+            logging.info(f"Waiting {wait:.0f} seconds for the rate limit reset.")
+            self._sleep(wait)
+
+    def _update_rate_limit(self, response: requests.Response) -> bool:
+        """
+        Read the rate limit headers of a response and pause the client until the
+        rate limit is reset, if few requests remain.
+        :param response: The response.
+        :return: True if the request was rate limited and should be retried.
+        """
+        headers = response.headers
+        remaining = headers.get("X-RateLimit-Remaining")
+        rate_limited = response.status_code in RATE_LIMITED_STATUS_CODES and (
+            remaining == "0" or "Retry-After" in headers
+        )
+
+        pause = None
+        if "Retry-After" in headers and rate_limited:
+            pause = float(headers["Retry-After"])
+        elif remaining is not None and int(remaining) <= self.min_remaining:
+            reset = float(headers.get("X-RateLimit-Reset", time.time()))
+            pause = reset - time.time() + 1
+        if pause is not None:
+            with self._lock:
+                self._paused_until = max(
+                    self._paused_until, time.time() + min(max(pause, 0), self.max_wait)
+                )
+        return rate_limited
+
+
+def _cache_key(url: str, params: dict | None) -> str:
+    """
+    Build the key of a request in the ETag cache.
+    :param url: The url.
+    :param params: The query parameters.
+    :return: The key.
+    """
+    if not params:
+        return url
+    return url + "?" + "&".join(f"{key}={params[key]}" for key in sorted(params))
+
+
+def _links(response: requests.Response) -> dict[str, str]:
+    """
+    Get the urls of the Link header, e.g. of the next page.
+    :param response: The response.
+    :return: The url of each relation.
+    """
+    return {rel: link["url"] for rel, link in response.links.items()}
+
+
+def _load_json_lines(path: str) -> list[Any]:
+    """
+    Load a json lines file. A partially written last line of an interrupted run is
+    removed from the file, so new lines can be appended.
+    :param path: The path to the json lines file.
+    :return: The json value of each complete line.
+    """
+    values, valid_size = [], 0
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                values.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            if not line.endswith(b"\n"):
+                values.pop()
+                break
+            valid_size += len(line)
+    if valid_size < os.path.getsize(path):
+        logging.warning(f"Removing a partially written line of {path}.")
+        os.truncate(path, valid_size)
+    return values
+
+
+def _append_json_lines(values: list[Any], path: str) -> None:
+    """
+    Append each value as a json line to a file.
+    :param values: The values.
+    :param path: The path to the json lines file.
+    :return: None
+    """
+    if not values:
+        return
+    with open(path, "a") as file:
+        file.writelines(json.dumps(value) + "\n" for value in values)
+
+
+def _dump_json_lines_atomically(values: list[Any], path: str) -> None:
+    """
+    Store each value as a json line by replacing the file, so it is never partially
+    written.
+    :param values: The values.
+    :param path: The path to the json lines file.
+    :return: None
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.writelines(json.dumps(value) + "\n" for value in values)
+    os.replace(tmp_path, path)
+
+
+class CrawlCheckpoint:
+    """
+    The progress of a crawl, so an interrupted crawl can be resumed. The first line
+    of the json lines file holds the parameters of the crawl, each following line
+    the data of a downloaded page.
+    """
+
+    def __init__(self, path: str | None = None, params: dict | None = None):
+        """
+        Load the checkpoint, if it exists and was stored by a crawl with the same
+        parameters. A checkpoint of other parameters is replaced by the first save.
+        :param path: The path to the json lines file. If None, nothing is stored.
+        :param params: The parameters of the crawl, e.g. the query.
+        """
+        self.path = path
+        self.params = params or {}
+        self.last_page = 0
+        self.complete = False
+        self.data = {}
+        self._resumed = False
+        if path is None or not os.path.exists(path):
+            return
+
+        lines = _load_json_lines(path)
+        if not lines or lines[0]["params"] != self.params:
+            logging.warning(
+                f"Ignoring the checkpoint {path} of a crawl with other parameters."
+            )
+            return
+        for page in lines[1:]:
+            self.last_page = page["page"]
+            self.complete = page["complete"]
+            self.data.update(page["data"])
+        self._resumed = True
+
+    def save(self, page: int, data: dict, complete: bool) -> None:
+        """
+        Store the data of a completely downloaded page.
+        :param page: The downloaded page.
+        :param data: The data of the page.
+        :param complete: Whether there are no more pages to download.
+        :return: None
+        """
+        self.last_page = page
+        self.complete = complete
+        self.data.update(data)
+        if self.path is None:
+            return
+        lines = [{"page": page, "complete": complete, "data": data}]
+        if not self._resumed:
+            _dump_json_lines_atomically([{"params": self.params}], self.path)
+            self._resumed = True
+        _append_json_lines(lines, self.path)
@@ -4,10 +4,14 @@ import os
 from enum import Enum
 from typing import Any
 
-import requests
 import yaml
 
-API_URL = "https://api.github.com"
+from src.readability_preprocessing.repos.github_client import (
+    API_URL,
+    CrawlCheckpoint,
+    GitHubClient,
+)
+
 SEARCH = "search"
 COMMITS = "commits"
 CODE = "code"
@@ -41,8 +45,24 @@ def load(file_name: str, file_path: str = RESOURCES_DIR) -> dict:
         return yaml.safe_load(file_stream)
 
 
-AUTH_TOKEN = load("credentials.yaml")["github_auth_token"]
-HEADERS = {"Authorization": f"Bearer {AUTH_TOKEN}"}
+def load_auth_headers() -> dict[str, str]:
+    """
+    Loads the GitHub token from the credentials.yaml file.
+    :return: The authorization headers.
+    """
+    auth_token = load("credentials.yaml")["github_auth_token"]
+    return {"Authorization": f"Bearer {auth_token}"}
+
+
+def _client_or_default(client: GitHubClient | None) -> GitHubClient:
+    """
+    Returns the given client or a client authorized with the credentials.yaml file.
+    :param client: The given client or None.
+    :return: The client.
+    """
+    if client is not None:
+        return client
+    return GitHubClient(load_auth_headers(), api_url=API_URL)
 
 
 def get_unique_filename(dir_path, file_name):
@@ -103,68 +123,79 @@ def _get_checkstyle_repos(
     first_page: int = 1,
     last_page: int = 1,
     mode: QueryMode = QueryMode.CHECKSTYLE_FILE,
+    client: GitHubClient | None = None,
+    checkpoint_path: str | None = None,
 ) -> tuple[dict[Any, Any], str | int] | tuple[Any, Any]:
     """
     Returns the repositories that contain a checkstyle plugin in their pom.xml.
+    The repositories of a search page are fetched concurrently. After each page, the
+    repositories are appended to the checkpoint, from which an interrupted crawl with
+    the same query, per_page and first_page is resumed.
     :param per_page: The amount of repositories per page.
     :param first_page: The first page to fetch.
     :param last_page: The last page to fetch.
     :param mode: The query mode for the code search.
+    :param client: The GitHub client. If None, a client is authorized with the
+    credentials.yaml file.
+    :param checkpoint_path: The path to the checkpoint file or None.
     :return: Returns a tuple containing the repositories and the last downloaded page.
     """
+    client = _client_or_default(client)
+    query = _build_query(mode)
+    checkpoint = CrawlCheckpoint(
+        checkpoint_path,
+        params={"q": query, "per_page": per_page, "first_page": first_page},
+    )
+    data = checkpoint.data
+    if checkpoint.complete or checkpoint.last_page >= last_page:
+        return data, checkpoint.last_page
+
     # Define the API endpoint and query parameters
-    api_url = API_URL + "/" + SEARCH + "/" + CODE
+    api_url = client.url(SEARCH, CODE)
     query_params = {
-        "q": _build_query(mode),
+        "q": query,
         "per_page": per_page,
-        "page": first_page,
+        "page": max(first_page, checkpoint.last_page + 1),
     }
 
-    data = {}
-
     while True:
         # Make the GET request
-        response = requests.get(api_url, params=query_params, headers=HEADERS)
+        response = client.get(api_url, params=query_params)
 
         # Check the response status code
-        if response.status_code == 200:
-            search_response_json = response.json()
-
-            # Print the total amount of repositories on first request
-            if query_params["page"] == 1:
-                print(
-                    f"Total amount of repositories: "
-                    f"{search_response_json['total_count']}"
-                )
-
-            # Get each repo in the response
-            for item in search_response_json["items"]:
-                repository = item["repository"]
-                repository_name = repository["full_name"]
-                repository_url = repository["url"]
-
-                # Open the repository url and save the json
-                repository_response = requests.get(repository_url, headers=HEADERS)
-                if repository_response.status_code == 200:
-                    # Turn the json into a Munch object
-                    # repository_response_json = munchify(repository_response.json())
-                    repository_response_json = repository_response.json()
-                    data[repository_name] = repository_response_json
-                else:
-                    # Request failed -> Return the current data and the last page
-                    return data, query_params["page"]
-
-            # Check if there are more pages to fetch
-            if "next" in response.links and query_params["page"] < last_page:
-                # Update the query parameters to fetch the next page
-                query_params["page"] += 1
-            else:
-                # No more pages
-                return data, query_params["page"]
-        else:
+        if not response.ok:
             # Request failed -> Return the current data and the last page
             return data, query_params["page"]
 
+        # Print the total amount of repositories on first request
+        if query_params["page"] == 1:
+            print(f"Total amount of repositories: {response.data['total_count']}")
+
+        # Open the repository urls of the page concurrently and save the jsons
+        repositories = [item["repository"] for item in response.data["items"]]
+        repository_responses = client.get_all(
+            [repository["url"] for repository in repositories]
+        )
+        page_data = {}
+        for repository, repository_response in zip(
+            repositories, repository_responses, strict=True
+        ):
+            if not repository_response.ok:
+                # Request failed -> Return the current data and the last page
+                return data, query_params["page"]
+            page_data[repository["full_name"]] = repository_response.data
+
+        # Store the page and check if there are more pages to fetch
+        has_next = "next" in response.links
+        checkpoint.save(query_params["page"], page_data, complete=not has_next)
+        client.save_cache()
+        if not has_next or query_params["page"] >= last_page:
+            # No more pages
+            return data, query_params["page"]
+
+        # Update the query parameters to fetch the next page
+        query_params["page"] += 1
+
 
 def _remove_keys(
     data: dict[str, dict[str, str]], keys: list[str]
@@ -316,6 +347,8 @@ def download_repos(
     keys_to_keep: list = None,
     first_page: int = 1,
     mode: QueryMode = QueryMode.CHECKSTYLE_FILE,
+    client: GitHubClient | None = None,
+    checkpoint_path: str | None = None,
 ) -> tuple[dict[str, dict[str, str]] | Any, Any]:
     """
     Returns repositories from GitHub that have a pom.xml file that contains a checkstyle
@@ -324,13 +357,17 @@ def download_repos(
     :param keys_to_keep: The keys to keep in the returned repositories.
     :param first_page: The first page to include in the returned repositories.
     :param mode: The mode to use to query the repositories.
+    :param client: The GitHub client. If None, a client is authorized with the
+    credentials.yaml file.
+    :param checkpoint_path: The path to the checkpoint file, from which an interrupted
+    download is resumed, or None.
     """
     per_page = 100
     if amount < 100:
         per_page = amount
     last_page = amount // per_page
     data, last_downloaded_page = _get_checkstyle_repos(
-        per_page, first_page, last_page, mode
+        per_page, first_page, last_page, mode, client, checkpoint_path
     )
 
     # Remove unnecessary keys if keys_to_keep is provided
@@ -342,16 +379,29 @@ def download_repos(
     return data, last_downloaded_page
 
 
-def add_latest_commit(data: dict[str, dict[str, str]]) -> dict[str, dict[str, str]]:
+def add_latest_commit(
+    data: dict[str, dict[str, str]], client: GitHubClient | None = None
+) -> dict[str, dict[str, str]]:
     """
-    Adds the latest commit of the default branch to the repositories.
+    Adds the latest commit of the default branch to the repositories. The commits are
+    fetched concurrently. Repositories whose commit could not be fetched are left
+    without a latest commit.
     :param data: The repositories to add the latest commit to.
-    """
-    try:
-        for key, value in data.items():
-            value["latest_commit"] = _get_latest_commit(key, value["default_branch"])
-    except DownloadFailedException as e:
-        print(e)
+    :param client: The GitHub client. If None, a client is authorized with the
+    credentials.yaml file.
+    """
+    client = _client_or_default(client)
+    responses = client.get_all(
+        [
+            _latest_commit_url(client, key, value["default_branch"])
+            for key, value in data.items()
+        ]
+    )
+    for (key, value), response in zip(data.items(), responses, strict=True):
+        if response.ok:
+            value["latest_commit"] = response.data["sha"]
+        else:
+            print(_latest_commit_error(key))
     return data
 
 
@@ -387,22 +437,43 @@ def filter_and_sort(
     return {item["full_name"]: item for item in sorted_dict}
 
 
-def _get_latest_commit(full_name: str, default_branch: str) -> str:
+def _latest_commit_url(
+    client: GitHubClient, full_name: str, default_branch: str
+) -> str:
     """
-    Returns the latest commit of the default branch of the repository.
+    Returns the url of the latest commit of the default branch of the repository.
+    :param client: The GitHub client.
     :param full_name: The full name of the repository.
     :param default_branch: The default branch of the repository.
     """
-    url = API_URL + "/" + REPOS + "/" + full_name + "/" + COMMITS + "/" + default_branch
+    return client.url(REPOS, full_name, COMMITS, default_branch)
 
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        sha = response.json()["sha"]
-    else:
-        raise DownloadFailedException(
-            f"Could not get the latest commit of the default branch of {full_name}."
-        )
-    return sha
+
+def _latest_commit_error(full_name: str) -> DownloadFailedException:
+    """
+    Returns the exception for a latest commit that could not be fetched.
+    :param full_name: The full name of the repository.
+    """
+    return DownloadFailedException(
+        f"Could not get the latest commit of the default branch of {full_name}."
+    )
+
+
+def _get_latest_commit(
+    full_name: str, default_branch: str, client: GitHubClient | None = None
+) -> str:
+    """
+    Returns the latest commit of the default branch of the repository.
+    :param full_name: The full name of the repository.
+    :param default_branch: The default branch of the repository.
+    :param client: The GitHub client. If None, a client is authorized with the
+    credentials.yaml file.
+    """
+    client = _client_or_default(client)
+    response = client.get(_latest_commit_url(client, full_name, default_branch))
+    if not response.ok:
+        raise _latest_commit_error(full_name)
+    return response.data["sha"]
 
 
 def save_repos_as_json(
@@ -476,15 +547,18 @@ def save_repos_as_csv(
     remove_empty_lines(file_name, dir_path)
 
 
-def get_remaining_requests():
+def get_remaining_requests(client: GitHubClient | None = None):
     """
     Returns the amount of remaining requests.
+    :param client: The GitHub client. If None, a client is authorized with the
+    credentials.yaml file.
     """
-    response = requests.get(API_URL + "/" + RATE_LIMIT, headers=HEADERS)
-    raw_data = response.json()
+    client = _client_or_default(client)
+    response = client.get(client.url(RATE_LIMIT))
+    raw_data = response.data
     used_data = {}
 
-    if response.status_code == 200:
+    if response.ok:
         for key, value in raw_data["resources"].items():
             if value["used"] != 0:
                 used_data[key] = f"{value['used']} / {value['limit']}"
@@ -503,14 +577,22 @@ def main():
     filter_criteria = RepositoryFilterCriteria(download_criteria["filter_criteria"])
     sorting_criteria = RepositorySortCriteria(download_criteria["sorting_criteria"])
 
+    # Reuse the cached responses and the progress of an interrupted download
+    client = GitHubClient(
+        load_auth_headers(), cache_path=os.path.join(DATA_DIR, "etag_cache.jsonl")
+    )
+
     # Get the repositories
     data, last_downloaded_page = download_repos(
-        amount=1000000, mode=QueryMode.POM_WITH_CHECKSTYLE
+        amount=1000000,
+        mode=QueryMode.POM_WITH_CHECKSTYLE,
+        client=client,
+        checkpoint_path=os.path.join(DATA_DIR, "crawl_checkpoint.jsonl"),
     )
     print(f"Last downloaded page: {last_downloaded_page}")
 
     # Get the remaining requests
-    remaining_requests = get_remaining_requests()
+    remaining_requests = get_remaining_requests(client)
     if remaining_requests != -1:
         print(f"Used requests: {remaining_requests}")
     else:
@@ -521,7 +603,8 @@ def main():
     print(f"Number of repositories: {len(data)}")
 
     # Add the latest commit to the repositories
-    data = add_latest_commit(data)
+    data = add_latest_commit(data, client)
+    client.close()
 
     # Save the repositories with the latest commit
     save_repos_as_json(data, "repos_with_latest_commit.json")
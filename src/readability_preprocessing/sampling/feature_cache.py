@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+COMMIT_INTERVAL = 1000
+
+
+def file_digest(path: str | Path) -> str:
+    """
+    Calculate the SHA-256 digest of the content of a file.
+    :param path: The path to the file
+    :return: The hex digest of the file content
+    """
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+class FeatureCache:
+    """
+    An on-disk cache for the features extracted by the RSE tool. The features are
+    stored in a SQLite database and are keyed by the content of the snippet and the
+    version of the RSE tool, so renamed or moved snippets are still found and changed
+    snippets are recomputed. If the cache grows beyond max_entries, the least recently
+    used entries are evicted.
+    """
+
+    def __init__(
+        self, path: str | Path, version: str, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        """
+        Initialize the feature cache.
+        :param path: The path to the SQLite database file
+        :param version: The version of the feature extraction tool
+        :param max_entries: The maximum number of entries to keep in the cache
+        """
+        if max_entries < 1:
+            raise ValueError("The cache must be able to hold at least one entry.")
+
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending_writes = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS features (key TEXT PRIMARY KEY, "
+            "features TEXT NOT NULL, last_access INTEGER NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS features_last_access ON features(last_access)"
+        )
+        self._size = self._connection.execute(
+            "SELECT COUNT(*) FROM features"
+        ).fetchone()[0]
+        self._clock = (
+            self._connection.execute(
+                "SELECT MAX(last_access) FROM features"
+            ).fetchone()[0]
+            or 0
+        )
+
+    def key(self, snippet_path: str | Path) -> str:
+        """
+        Calculate the cache key of a snippet from its content and the tool version.
+        :param snippet_path: The path to the Java code snippet
+        :return: The cache key
+        """
+        return f"{self.version}:{file_digest(snippet_path)}"
+
+    def code_key(self, code: str) -> str:
+        """
+        Calculate the cache key of a snippet from its code and the tool version. The
+        key equals the key of a UTF-8 encoded file with the same code.
+        :param code: The code of the Java code snippet
+        :return: The cache key
+        """
+        return f"{self.version}:{hashlib.sha256(code.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> dict[str, float] | None:
+        """
+        Look up the features stored for the given key and count the hit or miss.
+        :param key: The cache key
+        :return: The cached features or None if the key is not cached
+        """
+        row = self._connection.execute(
+            "SELECT features FROM features WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._connection.execute(
+            "UPDATE features SET last_access = ? WHERE key = ?", (self._tick(), key)
+        )
+        self._written()
+        return json.loads(row[0])
+
+    def put(self, key: str, features: dict[str, float]) -> None:
+        """
+        Store the features for the given key. Evicts the least recently used entries,
+        if the cache is full.
+        :param key: The cache key
+        :param features: The extracted features
+        :return: None
+        """
+        cursor = self._connection.execute(
+            "INSERT OR IGNORE INTO features (key, features, last_access) "
+            "VALUES (?, ?, ?)",
+            (key, json.dumps(features), self._tick()),
+        )
+        self._size += cursor.rowcount
+        if self._size > self.max_entries:
+            self._evict(self._size - self.max_entries)
+        self._written()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        """
+        Commit all pending writes and close the database.
+        :return: None
+        """
+        self._connection.commit()
+        self._connection.close()
+        logging.info(
+            f"Feature cache {self.path}: {self.hits} hits, {self.misses} misses, "
+            f"{self._size} entries."
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _evict(self, num_entries: int) -> None:
+        """
+        Remove the least recently used entries from the cache.
+        :param num_entries: The number of entries to remove
+        :return: None
+        """
+        cursor = self._connection.execute(
+            "DELETE FROM features WHERE key IN "
+            "(SELECT key FROM features ORDER BY last_access LIMIT ?)",
+            (num_entries,),
+        )
+        self._size -= cursor.rowcount
+
+    def _tick(self) -> int:
+        """
+        Advance the logical clock used for the least recently used eviction.
+        :return: The new clock value
+        """
+        self._clock += 1
+        return self._clock
+
+    def _written(self) -> None:
+        """
+        Commit the pending writes every COMMIT_INTERVAL writes, so an interrupted
+        run keeps most of its results.
+        :return: None
+        """
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_INTERVAL:
+            self._connection.commit()
+            self._pending_writes = 0
@@ -3,18 +3,30 @@ import logging
 import math
 import os
 import subprocess
+import tempfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
 import numpy as np
-from fastcluster import linkage
+from fastcluster import linkage, linkage_vector
 from scipy.cluster.hierarchy import fcluster
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.metrics.pairwise import (
     cosine_similarity,
     euclidean_distances,
     pairwise_distances,
 )
 
+from src.readability_preprocessing.sampling.feature_cache import (
+    DEFAULT_MAX_ENTRIES,
+    FeatureCache,
+    file_digest,
+)
 from src.readability_preprocessing.utils.csv import append_features_to_csv, load_header
+from src.readability_preprocessing.utils.feature_store import FeatureStore
+from src.readability_preprocessing.utils.snippet_archive import SnippetArchive
 from src.readability_preprocessing.utils.utils import list_java_files
 
 CURR_DIR = Path(os.path.dirname(os.path.relpath(__file__)))
@@ -23,6 +35,12 @@ RSE_DIR = WORKING_DIR / "rse"
 FEATURE_JAR_PATH = (RSE_DIR / "RSE.jar").absolute()
 EXTRACT_METRICS_CMD = "it.unimol.readability.metric.runnable.ExtractMetrics"
 CSV_NAME = "features.csv"
+FEATURE_STORE_NAME = "features"
+ENGINES = ["similarity", "vector", "kmeans"]
+ASSIGNMENT_TABLE_NAME = "stratas.npy"
+SAMPLED_TABLE_NAME = "stratas_sampled.npy"
+TABLE_PATHS_NAME = "stratas_paths.txt"
+DEFAULT_NUM_MICRO_CLUSTERS = 1000
 
 
 def _parse_feature_output(feature_string: str) -> dict[str, float]:
@@ -32,12 +50,10 @@ def _parse_feature_output(feature_string: str) -> dict[str, float]:
     :return: The extracted features as a dictionary
     """
     feature_lines = feature_string.split("\n")[1:]
-    feature_data = {}
     header_feature_names = load_header()
 
     # Initialize the feature dictionary with NaN values
-    for _idx, header_feature_name in enumerate(header_feature_names[1:]):
-        feature_data[header_feature_name] = np.nan
+    feature_data = dict.fromkeys(header_feature_names[1:], np.nan)
 
     # Parse the feature lines
     for feature_line in feature_lines:
@@ -47,15 +63,22 @@ def _parse_feature_output(feature_string: str) -> dict[str, float]:
         # Parse the feature name and value
         feature_name = feature_line.split(":")[0].strip()
         feature_value = float(feature_line.split(":")[1].strip())
-        for header_feature_name in header_feature_names[1:]:
-            if header_feature_name == feature_name:
-                if feature_value >= 0.0:
-                    feature_data[header_feature_name] = feature_value
-                continue
+        if feature_name in feature_data and feature_value >= 0.0:
+            feature_data[feature_name] = feature_value
 
     return feature_data
 
 
+def _extraction_failed(features: dict[str, float]) -> bool:
+    """
+    Check whether the feature extraction failed, e.g. because the JVM could not be
+    started or crashed. In that case all features are NaN.
+    :param features: The extracted features
+    :return: True if no feature was extracted
+    """
+    return all(math.isnan(value) for value in features.values())
+
+
 def _extract_features(snippet_path: str) -> dict[str, float]:
     """
     Extract features from a Java code snippet using the Java JAR file
@@ -83,6 +106,40 @@ def _extract_features(snippet_path: str) -> dict[str, float]:
     return _parse_feature_output(feature_string)
 
 
+def _extract_archived_features(
+    archive: SnippetArchive, snippet_path: str
+) -> dict[str, float]:
+    """
+    Extract features from a Java code snippet of a snippet archive. The RSE tool
+    only reads files, so the snippet is written to a temporary file.
+    :param archive: The snippet archive
+    :param snippet_path: The path of the snippet in the archive
+    :return: Extracted features
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = os.path.join(tmp_dir, os.path.basename(snippet_path))
+        with open(tmp_path, "w") as tmp_file:
+            tmp_file.write(archive.read(snippet_path))
+        return _extract_features(tmp_path)
+
+
+def _list_snippets(
+    input_dir: str,
+) -> tuple[list[str], Callable[[str], dict[str, float]], SnippetArchive | None]:
+    """
+    List the Java code snippets of a directory or snippet archive.
+    :param input_dir: The directory or snippet archive containing the snippets
+    :return: The paths to the snippets, the function to extract the features of a
+    snippet and the archive, if the input directory is a snippet archive
+    """
+    if SnippetArchive.is_archive(input_dir):
+        archive = SnippetArchive(input_dir)
+        paths = [archive.absolute_path(path) for path in archive.paths()]
+        return paths, partial(_extract_archived_features, archive), archive
+
+    return list_java_files(input_dir), _extract_features, None
+
+
 def _normalize_features(
     features: list[list[float]], epsilon=1e-8
 ) -> np.ndarray[[float]]:
@@ -129,38 +186,302 @@ def _calculate_similarity_matrix(
     return similarity_matrix
 
 
+def _normalize_rows(features: np.ndarray[[float]], epsilon=1e-8) -> np.ndarray:
+    """
+    Scale each feature vector to unit L2 norm. The squared Euclidean distance of unit
+    vectors is twice their cosine distance, so Euclidean Ward linkage on the scaled
+    vectors clusters by cosine similarity.
+    :param features: The (column-normalized) features
+    :param epsilon: A small value to avoid division by zero
+    :return: The features with unit row norm
+    """
+    features = np.asarray(features, dtype=np.float64)
+    return features / (np.linalg.norm(features, axis=1, keepdims=True) + epsilon)
+
+
+def _calculate_vector_linkage(
+    features: np.ndarray[[float]],
+    engine: str = "vector",
+    num_micro_clusters: int = DEFAULT_NUM_MICRO_CLUSTERS,
+) -> tuple[np.ndarray[[float]], np.ndarray[int] | None]:
+    """
+    Calculate a Ward linkage matrix directly from the feature vectors without building
+    the O(n²) similarity matrix.
+    The "vector" engine clusters all snippets with the memory-saving Ward linkage of
+    fastcluster, which needs O(n) memory. The "kmeans" engine first groups the snippets
+    into num_micro_clusters clusters with mini-batch k-means and then clusters the
+    centroids with Ward's method, which also scales to millions of snippets.
+    :param features: The normalized features
+    :param engine: The engine to use: vector or kmeans
+    :param num_micro_clusters: The number of k-means clusters (kmeans engine only)
+    :return: The linkage matrix and, for the kmeans engine, the index of the linkage
+    leaf (micro cluster) of each snippet
+    """
+    unit_features = _normalize_rows(features)
+
+    if engine == "vector":
+        return linkage_vector(unit_features, method="ward"), None
+
+    if engine == "kmeans":
+        kmeans = MiniBatchKMeans(
+            n_clusters=min(num_micro_clusters, len(unit_features)),
+            random_state=42,
+            n_init=3,
+        )
+        micro_clusters = kmeans.fit_predict(unit_features)
+        return (
+            linkage_vector(kmeans.cluster_centers_, method="ward"),
+            micro_clusters,
+        )
+
+    raise ValueError(f"Unknown engine: {engine}. Valid engines are: vector, kmeans.")
+
+
+def _clusters_below(
+    node: int, children: np.ndarray[int], finest: dict[int, int], num_leaves: int
+) -> list[int]:
+    """
+    Collect the finest clusters below a node of the linkage tree.
+    :param node: The node of the linkage tree
+    :param children: The children of each merge of the linkage matrix
+    :param finest: The index of each node that is a finest cluster
+    :param num_leaves: The number of leaves of the linkage tree
+    :return: The indices of the finest clusters below the node
+    """
+    below = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node in finest:
+            below.append(finest[node])
+        else:
+            stack.extend(children[node - num_leaves])
+    return below
+
+
+def _cut_all_levels(
+    linkage_matrix: np.ndarray[[float]], max_num_stratas: int
+) -> np.ndarray[[int]]:
+    """
+    Cut the linkage tree into 2 to max_num_stratas clusters in one pass. Cutting into
+    k clusters undoes the last k - 1 merges, so the leaves are assigned to the
+    max_num_stratas finest clusters once and each coarser level only relabels these
+    clusters. Clusters are numbered from 0 in the same order as the 1-based cluster
+    ids of fcluster.
+    :param linkage_matrix: The linkage matrix
+    :param max_num_stratas: The maximum number of clusters
+    :return: The assignment table with one row per leaf and one column per number of
+    clusters (column k - 2 contains the cluster ids for k clusters)
+    """
+    num_leaves = linkage_matrix.shape[0] + 1
+    max_num_stratas = min(max_num_stratas, num_leaves)
+    children = linkage_matrix[:, :2].astype(np.int64)
+    root = 2 * num_leaves - 2
+
+    # The finest clusters are the children of the last merges that are not merged
+    # further down themselves
+    finest_threshold = 2 * num_leaves - max_num_stratas
+    finest_clusters = [
+        int(child)
+        for merge in range(finest_threshold - num_leaves, num_leaves - 1)
+        for child in children[merge]
+        if child < finest_threshold
+    ]
+    if num_leaves == 1:
+        finest_clusters = [0]
+    finest = {node: idx for idx, node in enumerate(finest_clusters)}
+
+    # Assign each leaf to its finest cluster by passing the cluster ids down the tree
+    node_cluster = np.full(2 * num_leaves - 1, -1, dtype=np.int64)
+    for node, idx in finest.items():
+        node_cluster[node] = idx
+    for merge in range(finest_threshold - num_leaves - 1, -1, -1):
+        node_cluster[children[merge]] = node_cluster[merge + num_leaves]
+    leaf_cluster = node_cluster[:num_leaves]
+
+    dtype = np.uint8 if max_num_stratas <= np.iinfo(np.uint8).max + 1 else np.uint16
+    table = np.zeros((num_leaves, max(max_num_stratas - 1, 0)), dtype=dtype)
+    for num_stratas in range(2, max_num_stratas + 1):
+        # Like fcluster, number the leaves in order if each leaf is its own cluster
+        if num_stratas == num_leaves:
+            table[:, num_stratas - 2] = np.arange(num_leaves)
+            continue
+
+        # Walk the merges above the level depth-first
+        threshold = 2 * num_leaves - num_stratas
+        relabel = np.empty(len(finest_clusters), dtype=dtype)
+        label = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node >= threshold:
+                # Like fcluster, visit the merged children before the single leaves
+                merged = [c for c in children[node - num_leaves] if c >= num_leaves]
+                single = [c for c in children[node - num_leaves] if c < num_leaves]
+                stack += (merged + single)[::-1]
+                continue
+            relabel[_clusters_below(node, children, finest, num_leaves)] = label
+            label += 1
+        table[:, num_stratas - 2] = relabel[leaf_cluster]
+
+    return table
+
+
+def _jar_version(jar_path: Path = FEATURE_JAR_PATH) -> str:
+    """
+    Get the version of the feature extraction JAR file as digest of its content.
+    :param jar_path: The path to the feature extraction JAR file
+    :return: The version of the JAR file
+    """
+    return file_digest(jar_path)
+
+
+def _check_extraction_arguments(
+    input_dir: str, workers: int, feature_format: str
+) -> None:
+    """
+    Check the arguments of the feature extraction.
+    :param input_dir: The directory containing the Java code snippets
+    :param workers: The number of JVMs to run concurrently
+    :param feature_format: The format to store the features in
+    :return: None
+    """
+    if input_dir is None or not os.path.isdir(input_dir):
+        raise ValueError("Input directory must be a valid directory.")
+
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1.")
+
+    if feature_format not in ("csv", "npy"):
+        raise ValueError(
+            f"Unknown feature format: {feature_format}. Valid formats are: csv, npy."
+        )
+
+
+def _lookup_cached_features(
+    cache: FeatureCache, paths: list[str], archive: SnippetArchive = None
+) -> tuple[dict[str, dict[str, float]], dict[str, str]]:
+    """
+    Look up the features of the Java code snippets in the feature cache.
+    :param cache: The feature cache
+    :param paths: The paths to the Java code snippets
+    :param archive: The snippet archive containing the snippets, if any
+    :return: The cached features and the cache keys of all snippets
+    """
+    cached = {}
+    cache_keys = {}
+    for path in paths:
+        cache_keys[path] = (
+            cache.code_key(archive.read(path))
+            if archive is not None
+            else cache.key(path)
+        )
+        features_of_snippet = cache.get(cache_keys[path])
+        if features_of_snippet is not None:
+            cached[path] = features_of_snippet
+    return cached, cache_keys
+
+
+def _store_features(
+    path: str,
+    features: dict[str, float],
+    output_dir: str | None,
+    feature_store: FeatureStore | None,
+) -> None:
+    """
+    Store the features of a snippet in the feature store or, if there is none, in the
+    CSV file of the output directory. Does nothing if no output directory is given.
+    :param path: The path to the Java code snippet
+    :param features: The features of the snippet
+    :param output_dir: The directory where the extracted features should be stored
+    :param feature_store: The feature store
+    :return: None
+    """
+    if feature_store is not None:
+        feature_store.append(path, features)
+    elif output_dir is not None:
+        append_features_to_csv(os.path.join(output_dir, CSV_NAME), path, features)
+
+
 def calculate_features(
-    input_dir: str, output_dir: str = None
+    input_dir: str,
+    output_dir: str = None,
+    workers: int = 1,
+    cache_path: str = None,
+    cache_size: int = DEFAULT_MAX_ENTRIES,
+    feature_format: str = "csv",
 ) -> dict[str, dict[str, float]]:
     """
     Extract features from a list of Java code snippets.
+    The RSE tool only accepts one snippet per JVM, so the extraction is spread over
+    multiple concurrently running JVMs if workers > 1. The results are processed in
+    the order of the snippets, so the stored features do not depend on the number of
+    workers.
+    If a cache path is specified, the features of snippets whose content was already
+    processed by the same version of the RSE tool are taken from the cache.
+    The features are stored in the output directory either as CSV file or, if the
+    feature format is "npy", as columnar feature store (see FeatureStore).
     :param input_dir: The directory containing the Java code snippets
     :param output_dir: The directory where the extracted features should be stored
+    :param workers: The number of JVMs to run concurrently
+    :param cache_path: The path to the feature cache database
+    :param cache_size: The maximum number of snippets to keep in the feature cache
+    :param feature_format: The format to store the features in: "csv" or "npy"
     :return: The extracted features
     """
-    if input_dir is None or not os.path.isdir(input_dir):
-        raise ValueError("Input directory must be a valid directory.")
+    _check_extraction_arguments(input_dir, workers, feature_format)
 
     # Get the paths to the Java code snippets
-    java_code_snippet_paths = list_java_files(input_dir)
+    java_code_snippet_paths, extract, archive = _list_snippets(input_dir)
+
+    # Look up the snippets in the cache, if a cache is specified
+    cache = None
+    cached = {}
+    cache_keys = {}
+    if cache_path is not None:
+        cache = FeatureCache(cache_path, _jar_version(), max_entries=cache_size)
+        cached, cache_keys = _lookup_cached_features(
+            cache, java_code_snippet_paths, archive
+        )
+    paths_to_extract = [path for path in java_code_snippet_paths if path not in cached]
+
+    # Open the feature store, if the features are stored in the npy format
+    feature_store = None
+    if output_dir is not None and feature_format == "npy":
+        feature_store = FeatureStore(os.path.join(output_dir, FEATURE_STORE_NAME))
 
     # Extract features from Java code snippets
     features = {}
-    for path in java_code_snippet_paths:
-        features_of_snippet = _extract_features(path)
-
-        # Store the features of the snippet, if an output directory is specified
-        if output_dir is not None:
-            append_features_to_csv(
-                os.path.join(output_dir, CSV_NAME), path, features_of_snippet
-            )
-
-        logging.info(f"Extracted features from {path}.")
-        features.update({path: features_of_snippet})
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # The uncached snippets are extracted in the order of the snippet paths
+            extracted = executor.map(extract, paths_to_extract)
+            for path in java_code_snippet_paths:
+                if path in cached:
+                    features_of_snippet = cached[path]
+                else:
+                    features_of_snippet = next(extracted)
+                    # A failed JVM is not cached, so it is retried in the next run
+                    if cache is not None and not _extraction_failed(
+                        features_of_snippet
+                    ):
+                        cache.put(cache_keys[path], features_of_snippet)
+
+                # Store the features of the snippet, if an output directory is
+                # specified
+                _store_features(path, features_of_snippet, output_dir, feature_store)
+
+                logging.info(f"Extracted features from {path}.")
+                features.update({path: features_of_snippet})
+    finally:
+        if cache is not None:
+            cache.close()
+        if feature_store is not None:
+            feature_store.close()
 
     logging.info(
         f"Extracted features from {len(java_code_snippet_paths)} Java code "
-        f"snippets."
+        f"snippets ({len(cached)} from cache)."
     )
 
     return features
@@ -168,9 +489,17 @@ def calculate_features(
 
 class StratifiedSampler:
     output_dir: str
+    assignment_table: bool
 
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, assignment_table: bool = False):
+        """
+        Initialize the stratified sampler.
+        :param output_dir: The directory to store the sampling results in
+        :param assignment_table: Whether to store the stratas of all levels as
+        assignment tables instead of one directory of stratum files per level
+        """
         self.output_dir = output_dir
+        self.assignment_table = assignment_table
 
     def sample(
         self,
@@ -190,9 +519,65 @@ class StratifiedSampler:
         java_code_snippet_paths = list(features.keys())
         features = [list(feature.values()) for feature in features.values()]
 
+        self.sample_matrix(
+            java_code_snippet_paths=java_code_snippet_paths,
+            features=features,
+            max_num_stratas=max_num_stratas,
+            num_snippets=num_snippets,
+        )
+
+    def sample_matrix(
+        self,
+        java_code_snippet_paths: list[str],
+        features: np.ndarray | list[list[float]],
+        max_num_stratas: int = 20,
+        num_snippets: int = 400,
+        engine: str = "similarity",
+        num_micro_clusters: int = DEFAULT_NUM_MICRO_CLUSTERS,
+    ) -> None:
+        """
+        Perform stratified sampling on a feature matrix, as loaded from a feature
+        store or with load_feature_matrix_from_csv.
+        The "similarity" engine clusters the cosine similarity matrix of all snippets,
+        which needs O(n²) memory. The "vector" and "kmeans" engines cluster the
+        feature vectors directly (see _calculate_vector_linkage).
+        :param java_code_snippet_paths: The paths to the Java code snippets
+        :param features: The features of the Java code snippets (one row per path)
+        :param max_num_stratas: The number of stratas to use for sampling
+        :param num_snippets: The number of Java code snippets to sample in total
+        :param engine: The clustering engine: similarity, vector or kmeans
+        :param num_micro_clusters: The number of k-means clusters (kmeans engine only)
+        :return: None
+        """
+        if engine not in ENGINES:
+            raise ValueError(
+                f"Unknown engine: {engine}. Valid engines are: {', '.join(ENGINES)}."
+            )
+
         # Normalize the features and convert to a np array
         normalized_features = _normalize_features(features)
 
+        if engine != "similarity":
+            if len(java_code_snippet_paths) != normalized_features.shape[0]:
+                raise ValueError(
+                    "Number of code snippets must match the rows of the features."
+                )
+
+            linkage_matrix, leaves = _calculate_vector_linkage(
+                normalized_features, engine, num_micro_clusters
+            )
+            if leaves is not None:
+                np.save(os.path.join(self.output_dir, "micro_clusters.npy"), leaves)
+
+            self._sample_from_linkage(
+                java_code_snippets_paths=java_code_snippet_paths,
+                linkage_matrix=linkage_matrix,
+                max_num_stratas=max_num_stratas,
+                num_snippets=num_snippets,
+                leaves=leaves,
+            )
+            return
+
         # Calculate the similarity matrix
         similarity_matrix = _calculate_similarity_matrix(normalized_features)
 
@@ -243,12 +628,48 @@ class StratifiedSampler:
         # Perform Ward's hierarchical clustering to create a dendrogram/linkage matrix
         linkage_matrix = linkage(similarity_matrix, method="ward", metric="cosine")
 
+        self._sample_from_linkage(
+            java_code_snippets_paths=java_code_snippets_paths,
+            linkage_matrix=linkage_matrix,
+            max_num_stratas=max_num_stratas,
+            num_snippets=num_snippets,
+        )
+
+    def _sample_from_linkage(
+        self,
+        java_code_snippets_paths: list[str],
+        linkage_matrix: np.ndarray[[float]],
+        max_num_stratas: int = 20,
+        num_snippets: int = 400,
+        leaves: np.ndarray[int] | None = None,
+    ) -> None:
+        """
+        Store the linkage matrix and the merge distances and save the stratas for
+        max_num_stratas to 2 stratas.
+        :param java_code_snippets_paths: The paths to the Java code snippets
+        :param linkage_matrix: The linkage matrix
+        :param max_num_stratas: The maximum number of stratas to use for sampling
+        :param num_snippets: The number of Java code snippets to sample in total
+        :param leaves: The linkage leaf of each snippet, if the leaves of the linkage
+        are clusters of snippets instead of single snippets
+        :return: None
+        """
         # Dump the linkage matrix to a file
         np.save(os.path.join(self.output_dir, "linkage_matrix.npy"), linkage_matrix)
 
         # Calculate merge distances and differences
         self._save_merge_distances(linkage_matrix)
 
+        if self.assignment_table:
+            self._save_assignment_table(
+                linkage_matrix,
+                java_code_snippets_paths,
+                max_num_stratas=max_num_stratas,
+                num_snippets=num_snippets,
+                leaves=leaves,
+            )
+            return
+
         # Save the clusters from max_num_stratas to 2
         for num_stratas in range(max_num_stratas, 1, -1):
             self._save_cluster(
@@ -256,14 +677,65 @@ class StratifiedSampler:
                 num_stratas,
                 java_code_snippets_paths,
                 snippets_per_stratum=math.ceil(num_snippets / num_stratas),
+                leaves=leaves,
             )
 
+    def _save_assignment_table(
+        self,
+        linkage_matrix: np.ndarray[[float]],
+        java_code_snippets_paths: list[str],
+        max_num_stratas: int,
+        num_snippets: int,
+        leaves: np.ndarray[int] | None = None,
+    ) -> None:
+        """
+        Save the stratas of all levels from 2 to max_num_stratas as two tables with
+        one row per snippet and one column per level (column k - 2 for k stratas):
+        the stratum of each snippet and whether the snippet is sampled. The rows are
+        in the order of the paths in the paths file.
+        :param linkage_matrix: The linkage matrix
+        :param java_code_snippets_paths: The paths to the Java code snippets
+        :param max_num_stratas: The maximum number of stratas to use for sampling
+        :param num_snippets: The number of Java code snippets to sample in total
+        :param leaves: The linkage leaf of each snippet, if the leaves of the linkage
+        are clusters of snippets instead of single snippets
+        :return: None
+        """
+        table = _cut_all_levels(linkage_matrix, max_num_stratas)
+        if leaves is not None:
+            table = table[leaves]
+
+        # Remove random snippets from the stratas, if they contain too many snippets
+        sampled = np.zeros(table.shape, dtype=bool)
+        for level in range(table.shape[1]):
+            num_stratas = level + 2
+            snippets_per_stratum = math.ceil(num_snippets / num_stratas)
+            order = np.argsort(table[:, level], kind="stable")
+            bounds = np.cumsum(np.bincount(table[:, level], minlength=num_stratas))
+            for stratum in np.split(order, bounds[:-1]):
+                if len(stratum) > snippets_per_stratum:
+                    stratum = np.random.choice(
+                        stratum, snippets_per_stratum, replace=False
+                    )
+                sampled[stratum, level] = True
+
+        np.save(os.path.join(self.output_dir, ASSIGNMENT_TABLE_NAME), table)
+        np.save(os.path.join(self.output_dir, SAMPLED_TABLE_NAME), sampled)
+        with open(os.path.join(self.output_dir, TABLE_PATHS_NAME), "w") as f:
+            f.writelines(f"{path}\n" for path in java_code_snippets_paths)
+
+        logging.info(
+            f"Saved the stratas of {table.shape[1]} levels for "
+            f"{len(java_code_snippets_paths)} snippets."
+        )
+
     def _save_cluster(
         self,
         linkage_matrix: np.ndarray[[float]],
         num_stratas: int,
         java_code_snippets_paths: list[str],
         snippets_per_stratum: int,
+        leaves: np.ndarray[int] | None = None,
     ) -> None:
         """
         Save the clusters to a file.
@@ -272,12 +744,16 @@ class StratifiedSampler:
         :param java_code_snippets_paths: The paths to the Java code snippets
         :param snippets_per_stratum: The number of Java code snippets to sample per
         stratum
+        :param leaves: The linkage leaf of each snippet, if the leaves of the linkage
+        are clusters of snippets instead of single snippets
         :return: None
         """
         stratas = [[] for _ in range(num_stratas)]
 
         # Add the Java code snippets to the stratas
         clusters = fcluster(linkage_matrix, num_stratas, criterion="maxclust")
+        if leaves is not None:
+            clusters = clusters[leaves]
 
         # Add the Java code snippets to the stratas
         for snippet_idx, stratum_idx in enumerate(clusters):
@@ -356,3 +832,38 @@ class StratifiedSampler:
 
         # Log the content of the json file
         logging.info(f"Merge distances: {merge_distances_and_diffs}")
+
+
+def export_stratas(
+    table_dir: str, num_stratas: int, output_dir: str, sampled_only: bool = True
+) -> None:
+    """
+    Export one level of the assignment tables stored by a StratifiedSampler with
+    assignment_table=True as stratum files, as used by extract_sampled.
+    :param table_dir: The directory containing the assignment tables
+    :param num_stratas: The number of stratas of the level to export
+    :param output_dir: The directory to store the stratum files in
+    :param sampled_only: Whether to export only the sampled snippets
+    :return: None
+    """
+    table = np.load(os.path.join(table_dir, ASSIGNMENT_TABLE_NAME), mmap_mode="r")
+    if not 2 <= num_stratas < table.shape[1] + 2:
+        raise ValueError(
+            f"Number of stratas must be between 2 and {table.shape[1] + 1}."
+        )
+    with open(os.path.join(table_dir, TABLE_PATHS_NAME)) as f:
+        paths = f.read().splitlines()
+
+    level = num_stratas - 2
+    stratas = np.asarray(table[:, level])
+    if sampled_only:
+        sampled = np.load(os.path.join(table_dir, SAMPLED_TABLE_NAME), mmap_mode="r")
+        selected = np.flatnonzero(sampled[:, level])
+    else:
+        selected = np.arange(len(paths))
+
+    os.makedirs(output_dir, exist_ok=True)
+    for stratum_idx in range(num_stratas):
+        with open(os.path.join(output_dir, f"stratum{stratum_idx}.txt"), "w") as f:
+            for snippet_idx in selected[stratas[selected] == stratum_idx]:
+                f.write(paths[snippet_idx] + "\n")
@@ -1,17 +1,23 @@
 import logging
 import os
 import random
-import shutil
 from pathlib import Path
 
 import numpy as np
 
-from readability_preprocessing.extractors.diff_extractor import compare_java_files
+from readability_preprocessing.extractors.diff_extractor import (
+    DigestIndex,
+    compare_java_files,
+)
 from readability_preprocessing.utils.utils import (
     list_non_hidden,
     load_txt_file,
     load_yaml_file,
 )
+from src.readability_preprocessing.utils.materialization import (
+    MaterializationMode,
+    Materializer,
+)
 
 default_sample_amount: dict[str, int] = {
     "stratum0": 2,
@@ -237,18 +243,21 @@ class Method:
         for rdh in self.rdhs.values():
             rdh.set_stratum(stratum)
 
-    def compare_to_nomod(self, root: Path) -> list[Snippet]:
+    def compare_to_nomod(
+        self, root: Path, digest_index: DigestIndex | None = None
+    ) -> list[Snippet]:
         """
         Compare each rdh snippet to the nomod snippet and return the not-different
         snippets.
         :param root: The root directory.
+        :param digest_index: The index of the digests of the snippets or None.
         :return: The not-different snippets.
         """
         not_diff = []
         for rdh in self.rdhs.values():
             if not isinstance(rdh, NoSnippet):
                 is_diff = compare_java_files(
-                    self.nomod.get_path(root), rdh.get_path(root)
+                    self.nomod.get_path(root), rdh.get_path(root), digest_index
                 )
                 if not is_diff:
                     not_diff.append(rdh)
@@ -313,6 +322,8 @@ class SurveyCrafter:
         original_name: str = "methods",
         nomod_name: str = "none",
         exclude_path: Path = None,
+        materialization: MaterializationMode = MaterializationMode.COPY,
+        digest_index_path: Path = None,
     ):
         """
         Initialize the survey crafter.
@@ -321,6 +332,10 @@ class SurveyCrafter:
         :param snippets_per_sheet: How many snippets per sheet.
         :param sample_amount_path: The path to the sample amount file.
         :param num_sheets: How many sheets.
+        :param materialization: How the snippets are stored in the sheets.
+        :param digest_index_path: The path to the index of the digests of the
+        snippets, which is shared with EXTRACT_DIFF. If None, the digests are not
+        stored.
         """
         self.input_dir = input_dir
         self.output_dir = output_dir
@@ -328,6 +343,8 @@ class SurveyCrafter:
         self.num_sheets = num_sheets
         self.original_name = original_name
         self.nomod_name = nomod_name
+        self.materialization = materialization
+        self.digest_index_path = digest_index_path
         self.num_stratas = None
         self.num_rdhs = None
         self.rdh_names = None
@@ -371,8 +388,11 @@ class SurveyCrafter:
 
         # Compare each rdh to the nomod to get the not different snippets
         no_mod_snippets: list[Snippet] = []
-        for method in methods:
-            no_mod_snippets += method.compare_to_nomod(Path(self.input_dir))
+        with DigestIndex(Path(self.input_dir), self.digest_index_path) as digest_index:
+            for method in methods:
+                no_mod_snippets += method.compare_to_nomod(
+                    Path(self.input_dir), digest_index
+                )
 
         # Log information about the not different snippets
         self._store_snippets(no_mod_snippets, "no_mod_snippets.txt")
@@ -533,31 +553,32 @@ class SurveyCrafter:
             os.makedirs(os.path.join(self.output_dir, f"sheet_{i}"), exist_ok=True)
 
         # Copy the snippets to the output with name "idx_stratum_rdh_oldName"
-        for i, survey in enumerate(surveys):
-            random.shuffle(survey.snippets)
-            for j, snippet in enumerate(survey.snippets):
-                stratum = snippet.stratum.name
-                rdh = snippet.rdh.name
-                old_name = snippet.name
-                new_name = f"{j}_{stratum}_{rdh}_{old_name}"
-                if isinstance(snippet, NoSnippet):
-                    logging.warning(
-                        f"Survey {i}: Snippet {j}: "
-                        f"{stratum}/{rdh}/{old_name} not found."
-                    )
-
-                    # Replace the first _ with / and remove everything after second _
-                    source_path = old_name.replace("_", "/", 1).split("_")[0]
-                    logging.info(f"None path:   none/none/{source_path}")
-                    logging.info(f"Source path: {rdh}/{rdh}/{source_path}")
-                    logging.info(
-                        f"Goal path:   sheet_{i}/{j}_{stratum}_{rdh}_{old_name}"
-                    )
-                else:
-                    shutil.copy(
-                        os.path.join(self.input_dir, stratum, rdh, old_name),
-                        os.path.join(self.output_dir, f"sheet_{i}", new_name),
-                    )
+        with Materializer(self.materialization, self.output_dir) as materializer:
+            for i, survey in enumerate(surveys):
+                random.shuffle(survey.snippets)
+                for j, snippet in enumerate(survey.snippets):
+                    stratum = snippet.stratum.name
+                    rdh = snippet.rdh.name
+                    old_name = snippet.name
+                    new_name = f"{j}_{stratum}_{rdh}_{old_name}"
+                    if isinstance(snippet, NoSnippet):
+                        logging.warning(
+                            f"Survey {i}: Snippet {j}: "
+                            f"{stratum}/{rdh}/{old_name} not found."
+                        )
+
+                        # Replace the first _ with /, remove everything after second _
+                        source_path = old_name.replace("_", "/", 1).split("_")[0]
+                        logging.info(f"None path:   none/none/{source_path}")
+                        logging.info(f"Source path: {rdh}/{rdh}/{source_path}")
+                        logging.info(
+                            f"Goal path:   sheet_{i}/{j}_{stratum}_{rdh}_{old_name}"
+                        )
+                    else:
+                        materializer.materialize(
+                            os.path.join(self.input_dir, stratum, rdh, old_name),
+                            os.path.join(self.output_dir, f"sheet_{i}", new_name),
+                        )
 
     def craft_sheets(self, methods: list[Method]) -> list[Survey]:
         """
@@ -1,6 +1,9 @@
+import functools
 import logging
 import os
 
+import numpy as np
+
 HEADER_PATH = os.path.join(os.path.dirname(__file__), "../../res/header.csv")
 
 
@@ -70,12 +73,53 @@ def load_features_from_csv(csv_file_path: str) -> dict[str, dict[str, float]]:
     return features
 
 
+def load_feature_matrix_from_csv(
+    csv_file_path: str,
+) -> tuple[list[str], list[str], np.ndarray]:
+    """
+    Load the extracted features from a CSV file as a matrix. The values are parsed
+    vectorized instead of one by one.
+    :param csv_file_path: The path to the CSV file
+    :return: The snippet paths, the feature names and the feature matrix (one row per
+    path)
+    """
+    # Check if the CSV file exists
+    if not os.path.isfile(csv_file_path):
+        raise ValueError(f"CSV file does not exist: {csv_file_path}")
+
+    with open(csv_file_path) as csv_file:
+        header = csv_file.readline().strip().split(",")
+        lines = [line for line in csv_file.read().splitlines() if line]
+
+    # Split off the paths and parse the remaining columns at once
+    paths = [line.split(",", 1)[0] for line in lines]
+    matrix = np.loadtxt(
+        (line.split(",", 1)[1] for line in lines),
+        delimiter=",",
+        dtype=np.float64,
+        ndmin=2,
+    ).reshape(len(lines), len(header) - 1)
+
+    logging.info(f"Loaded features from {csv_file_path}.")
+
+    return paths, header[1:], matrix
+
+
 def load_header(path: str = HEADER_PATH) -> list[str]:
     """
-    Load the header of the CSV file.
+    Load the header of the CSV file. The header file is only read once per path.
+    :param path: The path to the CSV file
+    :return: The header of the CSV file
+    """
+    return list(_read_header(path))
+
+
+@functools.cache
+def _read_header(path: str) -> tuple[str, ...]:
+    """
+    Read the header of the CSV file.
     :param path: The path to the CSV file
     :return: The header of the CSV file
     """
-    # Load the header
     with open(path) as header_file:
-        return header_file.readline().strip().split(",")
+        return tuple(header_file.readline().strip().split(","))
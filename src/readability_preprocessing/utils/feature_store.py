@@ -0,0 +1,198 @@
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.readability_preprocessing.utils.csv import load_header
+
+MATRIX_FILE_NAME = "features.f32"
+PATHS_FILE_NAME = "paths.txt"
+HEADER_FILE_NAME = "header.csv"
+FEATURE_DTYPE = np.float32
+DEFAULT_BUFFER_SIZE = 4096
+
+
+class FeatureStore:
+    """
+    A columnar store for the features extracted from Java code snippets.
+    The features are stored as a row-major float32 matrix in a raw binary file, which
+    can be memory-mapped when loading. The path of the snippet of each row is stored
+    in a separate index file and the feature names in a header file. Rows are
+    buffered and appended in batches.
+    """
+
+    def __init__(
+        self,
+        store_dir: str | Path,
+        feature_names: list[str] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        """
+        Initialize the feature store. If the store already exists, its feature names
+        are used and new rows are appended. The rows and paths of an interrupted
+        flush are discarded first, so new rows are paired with the right paths.
+        :param store_dir: The directory of the feature store
+        :param feature_names: The names of the features. Defaults to the header of the
+        RSE tool.
+        :param buffer_size: The number of rows to buffer before writing them to disk
+        """
+        self.store_dir = Path(store_dir)
+        self.buffer_size = buffer_size
+        self._paths_buffer: list[str] = []
+        self._rows_buffer: list[list[float]] = []
+
+        if FeatureStore.is_store(self.store_dir):
+            self.feature_names = _read_header(self.store_dir / HEADER_FILE_NAME)
+            self._discard_incomplete_flush()
+        else:
+            self.feature_names = (
+                feature_names if feature_names is not None else load_header()[1:]
+            )
+
+    def _discard_incomplete_flush(self) -> None:
+        """
+        Truncate the matrix and the paths to the rows that have both features and a
+        complete path line. A flush that was interrupted after writing the matrix may
+        have left rows without paths or an unfinished last path.
+        :return: None
+        """
+        matrix_path = self.store_dir / MATRIX_FILE_NAME
+        paths_path = self.store_dir / PATHS_FILE_NAME
+        paths = paths_path.read_bytes() if paths_path.is_file() else b""
+        row_bytes = len(self.feature_names) * np.dtype(FEATURE_DTYPE).itemsize
+
+        # Only lines terminated by a newline were written completely
+        matrix_size = os.path.getsize(matrix_path)
+        num_rows = min(paths.count(b"\n"), matrix_size // row_bytes)
+        paths_size = sum(len(line) + 1 for line in paths.split(b"\n")[:num_rows])
+
+        if matrix_size > num_rows * row_bytes or len(paths) > paths_size:
+            logging.warning(
+                f"Discarding the incomplete flush of {self.store_dir} after "
+                f"{num_rows} rows."
+            )
+            os.truncate(matrix_path, num_rows * row_bytes)
+            with open(paths_path, "ab") as paths_file:
+                paths_file.truncate(paths_size)
+
+    @staticmethod
+    def is_store(path: str | Path) -> bool:
+        """
+        Check whether the given path is the directory of a feature store.
+        :param path: The path to check
+        :return: True if the path is a feature store, False otherwise
+        """
+        return os.path.isfile(os.path.join(path, HEADER_FILE_NAME)) and os.path.isfile(
+            os.path.join(path, MATRIX_FILE_NAME)
+        )
+
+    def append(self, snippet_path: str, features: dict[str, float]) -> None:
+        """
+        Append the features of a snippet to the store. Missing features are stored as
+        NaN.
+        :param snippet_path: The path to the Java code snippet
+        :param features: The extracted features
+        :return: None
+        """
+        self._paths_buffer.append(snippet_path)
+        self._rows_buffer.append(
+            [features.get(name, np.nan) for name in self.feature_names]
+        )
+        if len(self._rows_buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered rows to disk. The matrix is written before the paths, so
+        an interrupted flush never leaves paths without features.
+        :return: None
+        """
+        if not self._rows_buffer and FeatureStore.is_store(self.store_dir):
+            return
+
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        header_path = self.store_dir / HEADER_FILE_NAME
+        if not header_path.is_file():
+            header_path.write_text(",".join(["path"] + self.feature_names) + "\n")
+
+        rows = np.array(self._rows_buffer, dtype=FEATURE_DTYPE).reshape(
+            -1, len(self.feature_names)
+        )
+        with open(self.store_dir / MATRIX_FILE_NAME, "ab") as matrix_file:
+            rows.tofile(matrix_file)
+        with open(self.store_dir / PATHS_FILE_NAME, "a") as paths_file:
+            paths_file.writelines(f"{path}\n" for path in self._paths_buffer)
+
+        self._paths_buffer = []
+        self._rows_buffer = []
+
+    def close(self) -> None:
+        """
+        Write the remaining buffered rows to disk.
+        :return: None
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def load(self, mmap: bool = True) -> tuple[list[str], np.ndarray]:
+        """
+        Load the paths and the feature matrix of the store.
+        :param mmap: Whether to memory-map the feature matrix instead of reading it
+        :return: The snippet paths and the feature matrix (one row per path)
+        """
+        if not FeatureStore.is_store(self.store_dir):
+            raise ValueError(f"Feature store does not exist: {self.store_dir}")
+
+        num_features = len(self.feature_names)
+        matrix_path = self.store_dir / MATRIX_FILE_NAME
+        paths_path = self.store_dir / PATHS_FILE_NAME
+        paths = paths_path.read_text().splitlines() if paths_path.is_file() else []
+
+        # Ignore incomplete rows of an interrupted flush
+        num_rows = min(
+            len(paths),
+            os.path.getsize(matrix_path)
+            // (num_features * np.dtype(FEATURE_DTYPE).itemsize),
+        )
+        if mmap and num_rows > 0:
+            matrix = np.memmap(
+                matrix_path,
+                dtype=FEATURE_DTYPE,
+                mode="r",
+                shape=(num_rows, num_features),
+            )
+        else:
+            matrix = np.fromfile(
+                matrix_path, dtype=FEATURE_DTYPE, count=num_rows * num_features
+            ).reshape(num_rows, num_features)
+
+        logging.info(f"Loaded features of {num_rows} snippets from {self.store_dir}.")
+
+        return paths[:num_rows], matrix
+
+    def to_dict(self) -> dict[str, dict[str, float]]:
+        """
+        Load the features of the store as dictionary, as returned by
+        load_features_from_csv.
+        :return: The features of each snippet
+        """
+        paths, matrix = self.load(mmap=False)
+        return {
+            path: dict(zip(self.feature_names, row.tolist(), strict=True))
+            for path, row in zip(paths, matrix, strict=True)
+        }
+
+
+def _read_header(path: Path) -> list[str]:
+    """
+    Read the feature names from the header file of a feature store.
+    :param path: The path to the header file
+    :return: The feature names without the path column
+    """
+    return path.read_text().splitlines()[0].split(",")[1:]
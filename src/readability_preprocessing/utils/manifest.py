@@ -0,0 +1,53 @@
+import logging
+import os
+
+
+class ExtractionManifest:
+    """
+    A manifest of the files that have been processed completely, e.g. the java
+    files whose methods have been extracted. Each completed file is appended as a
+    line to the manifest file, so that an interrupted run can be resumed without
+    processing any file twice.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the manifest and load the files completed by a previous run.
+        :param path: The path to the manifest file.
+        """
+        self.path = path
+        self.completed = set()
+        if os.path.isfile(path):
+            with open(path) as f:
+                self.completed = {line.rstrip("\n") for line in f if line.strip()}
+            logging.info(f"Resuming after {len(self.completed)} completed files.")
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a")  # noqa: SIM115
+
+    def __contains__(self, file: str) -> bool:
+        return file in self.completed
+
+    def add(self, file: str) -> None:
+        """
+        Mark a file as completed. The manifest file is flushed immediately.
+        :param file: The completed file.
+        :return: None.
+        """
+        self.completed.add(file)
+        self._file.write(f"{file}\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Close the manifest file.
+        :return: None.
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
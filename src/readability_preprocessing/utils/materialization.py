@@ -0,0 +1,221 @@
+import errno
+import logging
+import os
+import shutil
+from enum import Enum
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MANIFEST_FILE_NAME = "materialized.tsv"
+
+# The FICLONE ioctl of Linux, which clones a file on copy-on-write file systems
+FICLONE = 0x40049409
+
+# Errors that indicate that a link or clone is not possible for the file system
+UNSUPPORTED_ERRORS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EACCES,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.ENOSYS,
+    errno.EMLINK,
+}
+
+
+class MaterializationMode(Enum):
+    """
+    How the files of a stage are stored in its output directory.
+    """
+
+    COPY = "copy"
+    HARDLINK = "hardlink"
+    SYMLINK = "symlink"
+    REFLINK = "reflink"
+    MANIFEST = "manifest"
+
+
+class Materializer:
+    """
+    Stores files in an output directory with the given materialization mode:
+    - copy: copy the file
+    - hardlink: create a hard link to the file
+    - symlink: create a symbolic link to the absolute path of the file
+    - reflink: clone the file, which shares the data on copy-on-write file systems
+    - manifest: only append the destination and the source to a manifest file in the
+      output directory
+    If a hard link, symbolic link or clone is not supported, e.g. because the source
+    is on another device, the file is copied instead. An existing destination is
+    removed first in all modes, so a link of a previous run is never written through.
+    """
+
+    def __init__(
+        self,
+        mode: MaterializationMode = MaterializationMode.COPY,
+        output_dir: str = None,
+    ):
+        """
+        Initialize the materializer.
+        :param mode: The materialization mode.
+        :param output_dir: The output directory, which contains the manifest file.
+        Required for the manifest mode.
+        """
+        if mode == MaterializationMode.MANIFEST and output_dir is None:
+            raise ValueError("The manifest mode requires an output directory.")
+
+        self.mode = mode
+        self.output_dir = output_dir
+        self.fallbacks = 0
+        self._manifest = None
+
+    def materialize(self, source: str, destination: str) -> None:
+        """
+        Store a file at the destination.
+        :param source: The path of the file.
+        :param destination: The destination path. If it is a directory, the file is
+        stored in it under its name.
+        :return: None.
+        """
+        if os.path.isdir(destination):
+            destination = os.path.join(destination, os.path.basename(source))
+
+        if self.mode == MaterializationMode.MANIFEST:
+            self._add_to_manifest(source, destination)
+            return
+
+        # A link of a previous run must not be written through to its source
+        _remove_existing(destination)
+        if self.mode == MaterializationMode.COPY:
+            shutil.copy(source, destination)
+            return
+
+        try:
+            self._link(source, destination)
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRORS:
+                raise
+            if self.fallbacks == 0:
+                logging.warning(
+                    f"Cannot {self.mode.value} {source} to {destination}: {e}. "
+                    f"Copying instead."
+                )
+            self.fallbacks += 1
+            _remove_existing(destination)
+            shutil.copy(source, destination)
+
+    def write(self, code: str, destination: str, source: str = None) -> None:
+        """
+        Store code that is not stored in a file of its own, e.g. a snippet of a
+        snippet archive, at the destination. The code is always written, unless the
+        mode is manifest and a source is given.
+        :param code: The code.
+        :param destination: The destination path.
+        :param source: The path the code is stored under, e.g. in a snippet archive.
+        :return: None.
+        """
+        if self.mode == MaterializationMode.MANIFEST and source is not None:
+            self._add_to_manifest(source, destination)
+            return
+
+        _remove_existing(destination)
+        with open(destination, "w") as file:
+            file.write(code)
+
+    def close(self) -> None:
+        """
+        Close the manifest file and log how many files were copied as a fallback.
+        :return: None.
+        """
+        if self.fallbacks > 0:
+            logging.warning(
+                f"Copied {self.fallbacks} files, for which {self.mode.value} was "
+                f"not supported."
+            )
+        if self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _link(self, source: str, destination: str) -> None:
+        """
+        Create a hard link, symbolic link or clone of the source at the destination.
+        :param source: The path of the file.
+        :param destination: The destination path.
+        :return: None.
+        """
+        if self.mode == MaterializationMode.HARDLINK:
+            os.link(source, destination)
+        elif self.mode == MaterializationMode.SYMLINK:
+            os.symlink(os.path.abspath(source), destination)
+        else:
+            _reflink(source, destination)
+
+    def _add_to_manifest(self, source: str, destination: str) -> None:
+        """
+        Append the destination and the absolute source path to the manifest file.
+        The destination is relative to the output directory.
+        :param source: The path of the file.
+        :param destination: The destination path.
+        :return: None.
+        """
+        if self._manifest is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._manifest = open(  # noqa: SIM115
+                os.path.join(self.output_dir, MANIFEST_FILE_NAME), "a"
+            )
+        relative_destination = Path(
+            os.path.relpath(destination, self.output_dir)
+        ).as_posix()
+        self._manifest.write(f"{relative_destination}\t{os.path.abspath(source)}\n")
+
+
+def _remove_existing(destination: str) -> None:
+    """
+    Remove the file or link at the destination, so that writing to the destination
+    does not modify the file a hard link or symbolic link of a previous run points
+    to.
+    :param destination: The destination path.
+    :return: None.
+    """
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+
+def _reflink(source: str, destination: str) -> None:
+    """
+    Clone a file with the FICLONE ioctl. Only supported on Linux with a
+    copy-on-write file system, such as btrfs or XFS.
+    :param source: The path of the file.
+    :param destination: The destination path.
+    :return: None.
+    """
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "Reflinks are not supported on this platform")
+
+    with open(source, "rb") as source_file, open(destination, "wb") as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, source_file.fileno())
+    shutil.copymode(source, destination)
+
+
+def load_manifest(output_dir: str) -> dict[str, str]:
+    """
+    Load the manifest of an output directory written in the manifest mode.
+    :param output_dir: The output directory.
+    :return: The source path of each destination relative to the output directory.
+    """
+    manifest = {}
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME)) as file:
+        for line in file:
+            destination, source = line.rstrip("\n").split("\t")
+            manifest[destination] = source
+    return manifest
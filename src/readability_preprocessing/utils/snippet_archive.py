@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+from collections.abc import Iterator
+from pathlib import Path, PurePath
+
+INDEX_FILE_NAME = "index.tsv"
+SHARD_FILE_NAME = "snippets-{:05d}.jsonl"
+DEFAULT_MAX_SHARD_SIZE = 64 * 1024 * 1024
+
+
+class SnippetArchive:
+    """
+    An archive of Java code snippets, which replaces a directory with one file per
+    snippet. The snippets are appended as JSON lines ({"path": ..., "code": ...}) to
+    shard files of limited size. An index file maps the relative path of each
+    snippet to its shard, offset and length, so single snippets can be read without
+    scanning the shards. If a path is appended twice, the last snippet is used.
+    The absolute path of a snippet in the archive is the archive directory joined
+    with its relative path, as if the snippets were stored as files.
+    """
+
+    def __init__(
+        self, archive_dir: str | Path, max_shard_size: int = DEFAULT_MAX_SHARD_SIZE
+    ):
+        """
+        Initialize the archive. If the archive already exists, its index is loaded
+        and new snippets are appended.
+        :param archive_dir: The directory of the archive
+        :param max_shard_size: The size in bytes after which a new shard is started
+        """
+        self.archive_dir = Path(archive_dir)
+        self.max_shard_size = max_shard_size
+        self._index: dict[str, tuple[int, int, int]] = {}
+        self._dirs: set[str] = set()
+        self._shard_sizes: dict[int, int] = {}
+        self._shard_file = None
+        self._index_file = None
+        self._shard = 0
+
+        if SnippetArchive.is_archive(self.archive_dir):
+            self._load_index()
+            self._shard = max(self._shard_sizes, default=0)
+
+    @staticmethod
+    def is_archive(path: str | Path) -> bool:
+        """
+        Check whether the given path is the directory of a snippet archive.
+        :param path: The path to check
+        :return: True if the path is a snippet archive, False otherwise
+        """
+        return os.path.isfile(os.path.join(path, INDEX_FILE_NAME))
+
+    def append(self, path: str, code: str) -> None:
+        """
+        Append a snippet to the archive.
+        :param path: The path of the snippet relative to the archive
+        :param code: The code of the snippet
+        :return: None
+        """
+        path = _normalize(path)
+        record = (json.dumps({"path": path, "code": code}) + "\n").encode("utf-8")
+
+        if self._shard_file is None:
+            self._open_for_append()
+        offset = self._shard_file.tell()
+        if offset > 0 and offset + len(record) > self.max_shard_size:
+            self._shard_file.close()
+            self._shard += 1
+            self._shard_file = open(self._shard_path(self._shard), "ab")  # noqa: SIM115
+            offset = 0
+
+        self._shard_file.write(record)
+        self._index_file.write(f"{path}\t{self._shard}\t{offset}\t{len(record)}\n")
+        self._add_to_index(path, (self._shard, offset, len(record)))
+
+    def flush(self) -> None:
+        """
+        Write the buffered snippets and index entries to disk.
+        :return: None
+        """
+        if self._shard_file is not None:
+            self._shard_file.flush()
+            self._index_file.flush()
+
+    def close(self) -> None:
+        """
+        Close the shard and index files.
+        :return: None
+        """
+        if self._shard_file is not None:
+            self._shard_file.close()
+            self._index_file.close()
+            self._shard_file = None
+            self._index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, path: str) -> bool:
+        """
+        Check whether the archive contains a snippet or a directory with the path.
+        :param path: The relative or absolute path
+        :return: True if the path is in the archive, False otherwise
+        """
+        path = self.relative_path(path)
+        return path in self._index or path in self._dirs
+
+    def is_snippet(self, path: str | Path) -> bool:
+        """
+        Check whether the archive contains a snippet with the path.
+        :param path: The relative or absolute path
+        :return: True if the path is a snippet in the archive, False otherwise
+        """
+        return self.relative_path(path) in self._index
+
+    def relative_path(self, path: str | Path) -> str:
+        """
+        Convert an absolute path of a snippet in the archive to its relative path.
+        Relative paths are returned unchanged.
+        :param path: The absolute or relative path
+        :return: The path relative to the archive
+        """
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.archive_dir.absolute())
+        return _normalize(path)
+
+    def absolute_path(self, path: str) -> str:
+        """
+        Get the absolute path of a snippet in the archive.
+        :param path: The path of the snippet relative to the archive
+        :return: The archive directory joined with the relative path
+        """
+        return os.path.join(self.archive_dir.absolute(), *path.split("/"))
+
+    def paths(self) -> list[str]:
+        """
+        List the relative paths of all snippets in the order they were added.
+        :return: The paths of the snippets
+        """
+        return list(self._index.keys())
+
+    def read(self, path: str | Path) -> str:
+        """
+        Read the code of a snippet.
+        :param path: The relative or absolute path of the snippet
+        :return: The code of the snippet
+        """
+        shard, offset, length = self._index[self.relative_path(path)]
+        self.flush()
+        with open(self._shard_path(shard), "rb") as shard_file:
+            shard_file.seek(offset)
+            return json.loads(shard_file.read(length))["code"]
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        """
+        Iterate over the relative path and the code of all snippets. The shards are
+        read sequentially, so this is faster than reading each snippet by path.
+        :return: The relative paths and codes of the snippets
+        """
+        self.flush()
+        for shard in sorted(self._shard_sizes):
+            with open(self._shard_path(shard), "rb") as shard_file:
+                offset = 0
+                for line in shard_file:
+                    if offset >= self._shard_sizes[shard]:
+                        break
+                    record = json.loads(line)
+                    # Skip snippets that were replaced by a later snippet
+                    if self._index.get(record["path"], (None, None))[:2] == (
+                        shard,
+                        offset,
+                    ):
+                        yield record["path"], record["code"]
+                    offset += len(line)
+
+    def _open_for_append(self) -> None:
+        """
+        Open the index and the last shard for appending. Incompletely written
+        snippets at the end of the last shard are removed.
+        :return: None
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        index_path = self.archive_dir / INDEX_FILE_NAME
+        needs_newline = False
+        if index_path.is_file() and index_path.stat().st_size > 0:
+            with open(index_path, "rb") as index_file:
+                index_file.seek(-1, os.SEEK_END)
+                needs_newline = index_file.read(1) != b"\n"
+        self._index_file = open(index_path, "a", encoding="utf-8")  # noqa: SIM115
+        if needs_newline:
+            self._index_file.write("\n")
+
+        shard_path = self._shard_path(self._shard)
+        valid_size = self._shard_sizes.get(self._shard, 0)
+        if shard_path.is_file() and os.path.getsize(shard_path) > valid_size:
+            os.truncate(shard_path, valid_size)
+        self._shard_file = open(shard_path, "ab")  # noqa: SIM115
+
+    def _load_index(self) -> None:
+        """
+        Load the index of the archive. Entries of snippets that were not completely
+        written to their shard, e.g. because of a crash, are ignored.
+        :return: None
+        """
+        shard_sizes = {}
+        with open(self.archive_dir / INDEX_FILE_NAME, encoding="utf-8") as index_file:
+            for line in index_file:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) != 4:
+                    continue
+                path, shard, offset, length = fields[0], *map(int, fields[1:])
+                if shard not in shard_sizes:
+                    shard_path = self._shard_path(shard)
+                    shard_sizes[shard] = (
+                        os.path.getsize(shard_path) if shard_path.is_file() else 0
+                    )
+                if offset + length <= shard_sizes[shard]:
+                    self._add_to_index(path, (shard, offset, length))
+
+        logging.info(f"Loaded {len(self._index)} snippets from {self.archive_dir}.")
+
+    def _add_to_index(self, path: str, entry: tuple[int, int, int]) -> None:
+        """
+        Add a snippet to the in-memory index and register its parent directories.
+        :param path: The relative path of the snippet
+        :param entry: The shard, offset and length of the snippet
+        :return: None
+        """
+        self._index[path] = entry
+        shard, offset, length = entry
+        self._shard_sizes[shard] = max(self._shard_sizes.get(shard, 0), offset + length)
+        parent = PurePath(path).parent
+        while parent.parts and parent.as_posix() not in self._dirs:
+            self._dirs.add(parent.as_posix())
+            parent = parent.parent
+
+    def _shard_path(self, shard: int) -> Path:
+        """
+        Get the path of a shard file.
+        :param shard: The number of the shard
+        :return: The path of the shard file
+        """
+        return self.archive_dir / SHARD_FILE_NAME.format(shard)
+
+
+def _normalize(path: str | Path) -> str:
+    """
+    Normalize a relative path to use forward slashes.
+    :param path: The path
+    :return: The normalized path
+    """
+    return Path(path).as_posix()
@@ -1,5 +1,7 @@
 import os
 
+from datasets import load_from_disk
+
 from src.readability_preprocessing.dataset.dataset_combiner import (
     _load_datasets,
     _remove_ambiguous_samples,
@@ -34,3 +36,33 @@ class DatasetCombinerTest(DirTest):
             [ENCODED_BW_DIR, ENCODED_DORN_DIR, ENCODED_SCALABRIO_DIR], self.output_dir
         )
         assert len(os.listdir(self.output_dir)) == 3
+        combined = load_from_disk(self.output_dir)
+        assert len(combined) == 50 + 60 + 100
+        assert combined.column_names == [
+            "code_snippet",
+            "score",
+            "input_ids",
+            "token_type_ids",
+            "attention_mask",
+        ]
+
+        # Columns that are missing in a dataset are filled with null values
+        assert combined[0]["input_ids"] is None
+        assert combined[-1]["code_snippet"] is None
+
+    def test_combine_datasets_without_removal(self):
+        combine_datasets(
+            [ENCODED_BW_DIR, ENCODED_DORN_DIR, ENCODED_SCALABRIO_DIR],
+            self.output_dir,
+            percent_to_remove=None,
+        )
+        combined = load_from_disk(self.output_dir)
+        assert len(combined) == 100 + 121 + 200
+        assert combined.features["score"].dtype == "float64"
+
+    @staticmethod
+    def test_remove_ambiguous_samples_sorted():
+        dataset = _load_datasets([ENCODED_DORN_DIR])[0]
+        scores = sorted(dataset["score"])
+        dataset = _remove_ambiguous_samples(dataset, 0.5)
+        assert dataset["score"] == scores[:30] + scores[-30:]
@@ -1,5 +1,6 @@
 import os
 
+import pytest
 from datasets import Dataset
 
 from src.readability_preprocessing.dataset.dataset_converter import (
@@ -16,6 +17,8 @@ from src.readability_preprocessing.dataset.dataset_converter import (
     convert_dataset_csv,
     convert_dataset_two_folders,
 )
+from src.readability_preprocessing.utils.snippet_archive import SnippetArchive
+from src.readability_preprocessing.utils.utils import load_code
 from tests.readability_preprocessing.utils.utils import DirTest
 
 
@@ -108,6 +111,20 @@ class TestDataConversion(DirTest):
         self._check_if_dataset_was_saved()
         self._check_dataset_format()
 
+    def test_krod_code_loader_archive(self):
+        original = os.path.join(self.test_data_dir, "krod", "original")
+        archive_dir = os.path.join(self.output_dir, "original")
+        with SnippetArchive(archive_dir) as archive:
+            for root, _, files in os.walk(original):
+                for file in files:
+                    path = os.path.join(root, file)
+                    archive.append(os.path.relpath(path, original), load_code(path))
+
+        code_snippets = KrodCodeLoader().load(original)
+
+        assert len(code_snippets) == 4
+        assert KrodCodeLoader().load(archive_dir) == code_snippets
+
     def test_convert_dataset_csv(self):
         data_dir = os.path.join(self.test_data_dir, "bw")
         csv = os.path.join(data_dir, "scores.csv")
@@ -138,3 +155,69 @@ class TestDataConversion(DirTest):
         # Check if the dataset was saved successfully
         self._check_if_dataset_was_saved()
         self._check_dataset_format()
+
+    def test_convert_dataset_csv_streaming(self):
+        data_dir = os.path.join(self.test_data_dir, "bw")
+        csv = os.path.join(data_dir, "scores.csv")
+        snippets_dir = os.path.join(data_dir, "Snippets")
+
+        # Load the data
+        convert_dataset_csv(
+            csv=csv,
+            snippets_dir=snippets_dir,
+            output_path=self.output_dir,
+            dataset_type=DatasetType.BW,
+            streaming=True,
+        )
+
+        # Check if the dataset was saved successfully
+        self._check_if_dataset_was_saved()
+        self._check_dataset_format()
+
+        # The streaming conversion contains the same rows
+        data_loader = CsvFolderToDataset(
+            csv_loader=BWCsvLoader(), code_loader=BWCodeLoader()
+        )
+        dataset = data_loader.convert_to_dataset(csv, snippets_dir)
+        streamed_dataset = Dataset.load_from_disk(self.output_dir)
+        assert sorted(
+            streamed_dataset.to_list(), key=lambda row: row["name"]
+        ) == sorted(dataset.to_list(), key=lambda row: row["name"])
+
+    def test_convert_dataset_two_folders_streaming(self):
+        data_dir = os.path.join(self.test_data_dir, "krod")
+        original = os.path.join(data_dir, "original")
+        rdh = os.path.join(data_dir, "rdh")
+
+        # Load the data
+        convert_dataset_two_folders(
+            original=original, rdh=rdh, output_path=self.output_dir, streaming=True
+        )
+
+        # Check if the dataset was saved successfully
+        self._check_if_dataset_was_saved()
+        self._check_dataset_format()
+
+        # The streaming conversion contains the same rows in the same order
+        data_loader = TwoFoldersToDataset(
+            original_loader=KrodCodeLoader(),
+            rdh_loader=KrodCodeLoader(name_appendix="_rdh"),
+        )
+        dataset = data_loader.convert_to_dataset(
+            original, rdh, original_score=4.5, rdh_score=1.5
+        )
+        assert Dataset.load_from_disk(self.output_dir).to_list() == dataset.to_list()
+
+    def test_convert_to_dataset_streaming_without_cache_dir(self):
+        data_dir = os.path.join(self.test_data_dir, "krod")
+        data_loader = TwoFoldersToDataset(
+            original_loader=KrodCodeLoader(),
+            rdh_loader=KrodCodeLoader(name_appendix="_rdh"),
+        )
+
+        with pytest.raises(ValueError, match="cache directory"):
+            data_loader.convert_to_dataset(
+                os.path.join(data_dir, "original"),
+                os.path.join(data_dir, "rdh"),
+                streaming=True,
+            )
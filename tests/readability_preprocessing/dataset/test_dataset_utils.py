@@ -0,0 +1,84 @@
+import os
+from collections import Counter
+
+from datasets import Dataset, load_from_disk
+
+from src.readability_preprocessing.dataset.dataset_utils import (
+    balance,
+    balance_dataset,
+    deduplicate,
+    filter_out_duplicates,
+)
+from tests.readability_preprocessing.utils.utils import ENCODED_BW_DIR, DirTest
+
+
+def _create_dataset(scores: list[float], code_snippets: list[str] = None) -> Dataset:
+    if code_snippets is None:
+        code_snippets = [f"void m{idx}() {{}}" for idx in range(len(scores))]
+    return Dataset.from_list(
+        [
+            {"name": f"m{idx}", "code_snippet": code_snippet, "score": score}
+            for idx, (code_snippet, score) in enumerate(
+                zip(code_snippets, scores, strict=True)
+            )
+        ]
+    )
+
+
+class TestBalanceDataset:
+    def test_balance_dataset(self):
+        dataset = _create_dataset([1.0, 2.0, 2.0, 3.0, 2.0, 3.0, 1.0, 3.0])
+
+        balanced = balance_dataset(dataset, seed=42)
+
+        assert Counter(balanced["score"]) == {1.0: 2, 2.0: 2, 3.0: 2}
+        # The samples keep their order
+        names = balanced["name"]
+        assert names == sorted(names, key=lambda name: int(name[1:]))
+
+    def test_balance_dataset_seed(self):
+        dataset = _create_dataset([float(idx % 3) for idx in range(100)] + [3.0] * 10)
+
+        first = balance_dataset(dataset, seed=1)
+        second = balance_dataset(dataset, seed=1)
+
+        assert len(first) == 40
+        assert first["name"] == second["name"]
+
+    def test_balance_dataset_balanced(self):
+        dataset = _create_dataset([1.0, 2.0, 3.0])
+
+        assert balance_dataset(dataset, seed=42)["name"] == ["m0", "m1", "m2"]
+
+
+class TestFilterOutDuplicates:
+    def test_keep_original(self):
+        dataset = _create_dataset(
+            [3.26, 3.68, 3.26, 3.68, 3.26],
+            ["a", "a", "b", "c", "b"],
+        )
+
+        filtered = filter_out_duplicates(dataset, original_score=3.68)
+
+        # The original sample of "a" is kept, the first sample of "b" otherwise
+        assert filtered["name"] == ["m1", "m2", "m3"]
+
+    def test_no_duplicates(self):
+        dataset = _create_dataset([3.26, 3.68], ["a", "b"])
+
+        assert len(filter_out_duplicates(dataset)) == 2
+
+
+class TestDatasetUtilsOnDisk(DirTest):
+    def test_balance(self):
+        balance(str(ENCODED_BW_DIR), self.output_dir, seed=42)
+
+        balanced = load_from_disk(self.output_dir)
+        assert len(set(Counter(balanced["score"]).values())) == 1
+
+    def test_deduplicate(self):
+        deduplicate(str(ENCODED_BW_DIR), self.output_dir)
+
+        filtered = load_from_disk(self.output_dir)
+        assert len(filtered) == len(set(filtered["code_snippet"]))
+        assert os.path.exists(os.path.join(self.output_dir, "dataset_info.json"))
@@ -0,0 +1,141 @@
+import csv
+import os
+
+import pytest
+from datasets import Dataset, load_from_disk
+
+from src.readability_preprocessing.dataset.near_duplicates import (
+    MERSENNE_PRIME,
+    REPORT_FILE_NAME,
+    NearDuplicate,
+    NearDuplicateIndex,
+    find_near_duplicates,
+    normalize_tokens,
+    remove_near_duplicates,
+    shingle_hashes,
+)
+from tests.readability_preprocessing.utils.utils import DirTest
+
+SUM = """
+public int sum(int[] values) {
+    int total = 0;
+    for (int value : values) {
+        total += value;
+    }
+    return total;
+}
+"""
+SUM_RENAMED = (
+    "public int add(int[] xs) { int s = 0; for (int x : xs) { s += x; } return s; }"
+)
+SUM_EXTENDED = SUM.replace("return total;", "log(total);\n    return total;")
+GREET = """
+public String greet(String name) {
+    if (name == null) {
+        return "Hello";
+    }
+    return "Hello " + name.trim();
+}
+"""
+
+
+def _create_dataset(code_snippets: list[str], prefix: str) -> Dataset:
+    return Dataset.from_list(
+        [
+            {"name": f"{prefix}{idx}", "code_snippet": code_snippet, "score": 1.0}
+            for idx, code_snippet in enumerate(code_snippets)
+        ]
+    )
+
+
+class TestNearDuplicateIndex:
+    def test_normalize_tokens(self):
+        assert normalize_tokens("int a = 1; // comment") == normalize_tokens(
+            "int  b=1;"
+        )
+        assert normalize_tokens("int a = 1;") == ["int", "ID", "=", "1", ";"]
+
+    def test_query(self):
+        index = NearDuplicateIndex()
+        index.add("sum", index.signature(SUM))
+
+        assert index.query(index.signature(SUM_RENAMED)) == ("sum", 1.0)
+        assert index.query(index.signature(GREET)) is None
+
+    def test_threshold(self):
+        index = NearDuplicateIndex(threshold=0.5)
+        index.add("sum", index.signature(SUM))
+
+        key, similarity = index.query(index.signature(SUM_EXTENDED))
+        assert key == "sum"
+        assert 0.5 <= similarity < 1.0
+
+    def test_threshold_inclusive(self):
+        index = NearDuplicateIndex(threshold=1.0)
+        index.add("sum", index.signature(SUM))
+
+        # A similarity equal to the threshold is a near-duplicate
+        assert index.query(index.signature(SUM_RENAMED)) == ("sum", 1.0)
+
+    def test_signature(self):
+        index = NearDuplicateIndex(num_permutations=16)
+        hashes = [int(x) for x in shingle_hashes(normalize_tokens(SUM), 5)]
+
+        # The hash functions are computed exactly, as with Python integers
+        expected = [
+            min(
+                ((int(a) * x + int(b)) % int(MERSENNE_PRIME)) & 0xFFFFFFFF
+                for x in hashes
+            )
+            for a, b in zip(index._a, index._b, strict=True)
+        ]
+        assert index.signature(SUM).tolist() == expected
+
+    def test_empty_code(self):
+        assert NearDuplicateIndex().signature("  // only a comment") is None
+
+    def test_invalid_threshold(self):
+        with pytest.raises(ValueError, match="threshold"):
+            NearDuplicateIndex(threshold=0)
+
+    def test_find_near_duplicates(self):
+        first = _create_dataset([SUM, GREET], "first")
+        second = _create_dataset([GREET, SUM_RENAMED, SUM], "second")
+
+        near_duplicates = find_near_duplicates([first, second], NearDuplicateIndex())
+
+        assert near_duplicates == [
+            NearDuplicate(1, 0, 0, 1, 1.0),
+            NearDuplicate(1, 1, 0, 0, 1.0),
+            NearDuplicate(1, 2, 0, 0, 1.0),
+        ]
+
+
+class TestRemoveNearDuplicates(DirTest):
+    def test_remove_near_duplicates(self):
+        first_path = os.path.join(self.output_dir, "input", "first")
+        second_path = os.path.join(self.output_dir, "input", "second")
+        output_path = os.path.join(self.output_dir, "output")
+        _create_dataset([SUM, GREET, SUM_RENAMED], "first").save_to_disk(first_path)
+        _create_dataset([SUM_EXTENDED, GREET], "second").save_to_disk(second_path)
+
+        remove_near_duplicates([first_path, second_path], output_path, drop=True)
+
+        with open(os.path.join(output_path, REPORT_FILE_NAME)) as report_file:
+            report = list(csv.DictReader(report_file))
+        assert [(row["name"], row["duplicate_of_name"]) for row in report] == [
+            ("first2", "first0"),
+            ("second1", "first1"),
+        ]
+        assert load_from_disk(os.path.join(output_path, "first"))["name"] == [
+            "first0",
+            "first1",
+        ]
+        assert load_from_disk(os.path.join(output_path, "second"))["name"] == [
+            "second0"
+        ]
+
+    def test_remove_near_duplicates_same_names(self):
+        path = os.path.join(self.output_dir, "data")
+        with pytest.raises(ValueError, match="unique"):
+            remove_near_duplicates([path, path], self.output_dir, drop=True)
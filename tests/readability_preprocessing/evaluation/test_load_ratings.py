@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+import pytest
+
+# The evaluation modules import the equivalence tests of statsmodels
+pytest.importorskip("statsmodels")
+
+from src.readability_preprocessing.evaluation import (  # noqa: E402
+    prolific_evaluation,
+    survey_evaluation,
+)
+from tests.readability_preprocessing.utils.utils import (  # noqa: E402
+    SURVEYS_DIR,
+    DirTest,
+)
+
+
+def _sorted_values(ratings: dict[str, list[int]]) -> dict[str, list[int]]:
+    return {key: sorted(values) for key, values in ratings.items()}
+
+
+def test_prolific_load_ratings():
+    stratas = prolific_evaluation.load_stratas(SURVEYS_DIR)
+
+    ratings = prolific_evaluation.load_ratings(SURVEYS_DIR)
+
+    # The table holds the same rates per RDH as the snippet objects
+    assert _sorted_values(
+        prolific_evaluation.combine_ratings_by_rdh(ratings)
+    ) == _sorted_values(prolific_evaluation.combine_by_rdh(stratas))
+
+
+class TestSurveyLoadRatings(DirTest):
+    def test_load_ratings(self):
+        # A survey names its snippets without the number prefix, e.g. s0_methods_A
+        survey_dir = Path(self.output_dir)
+        for file_path in sorted(SURVEYS_DIR.rglob("*.json")):
+            with open(file_path) as file:
+                snippet = json.load(file)
+            snippet["path"] = snippet["path"].split("_", 1)[1]
+            snippet["rates"] = [
+                {key: rate[key] for key in ["comment", "rate", "rater", "solutions"]}
+                for rate in snippet["rates"]
+            ]
+            with open(survey_dir / f"{snippet['path']}.json", "w") as file:
+                json.dump(snippet, file)
+        stratas = survey_evaluation.group_into_strats(
+            survey_evaluation.load_snippet_datas(survey_dir)
+        )
+        expected = {}
+        for stratum in stratas.values():
+            for rdh in stratum.rdhs.values():
+                expected.setdefault(rdh.name, []).extend(
+                    rate.rate
+                    for snippet in rdh.snippets.values()
+                    for rate in snippet.rates
+                )
+
+        ratings = survey_evaluation.load_ratings(survey_dir)
+
+        assert _sorted_values(
+            prolific_evaluation.combine_ratings_by_rdh(ratings)
+        ) == _sorted_values(expected)
+        assert set(ratings.column("stratum").to_pylist()) == {"s0", "s1"}
@@ -1,10 +1,14 @@
+import json
 import os
+import shutil
 from pathlib import Path
 
 from readability_preprocessing.extractors.diff_extractor import (
+    DigestIndex,
     compare_java_files,
     compare_to_folder,
     get_diffs,
+    get_line_diff,
 )
 from tests.readability_preprocessing.utils.utils import (
     DIFF_EXTRACTOR_DIR,
@@ -59,6 +63,51 @@ class TestCompareJavaFiles:
         assert has_diff is False
 
 
+class TestDigestIndex(DirTest):
+    def test_same_result_as_lines(self):
+        digest_index = DigestIndex(DIFF_EXTRACTOR_DIR)
+        default_path = DIFF_EXTRACTOR_DIR / "default.java"
+        for file_path in sorted(DIFF_EXTRACTOR_DIR.iterdir()):
+            assert compare_java_files(
+                default_path, file_path, digest_index
+            ) == compare_java_files(default_path, file_path)
+
+        # Each file is only hashed once
+        assert len(digest_index) == 6
+
+    def test_saved_and_reused(self):
+        index_path = Path(self.output_dir) / "digests.tsv"
+        file_path = Path(self.output_dir) / "A.java"
+        file_path.write_text("class A {}\n")
+
+        with DigestIndex(self.output_dir, index_path) as digest_index:
+            digest = digest_index.digest(file_path)
+        assert_lines_equal(index_path, 1)
+
+        digest_index = DigestIndex(self.output_dir, index_path)
+        assert len(digest_index) == 1
+        assert digest_index.digest(file_path) == digest
+
+        # Changed files are hashed again
+        file_path.write_text("class Changed {}\n")
+        assert digest_index.digest(file_path) != digest
+
+
+def test_get_line_diff():
+    assert (
+        get_line_diff(
+            DIFF_EXTRACTOR_DIR / "default.java",
+            DIFF_EXTRACTOR_DIR / "newlineAtTheEnd.java",
+        )
+        == []
+    )
+    changed_lines = get_line_diff(
+        DIFF_EXTRACTOR_DIR / "default.java", DIFF_EXTRACTOR_DIR / "additionalTab.java"
+    )
+    assert len(changed_lines) > 0
+    assert all(line[0] in "-+?" for line in changed_lines)
+
+
 def test_get_diffs():
     different, not_different = get_diffs(input_path=EXTRACTED_2_DIR)
     assert len(not_different) == 1
@@ -82,3 +131,74 @@ class TestCompareToFolder(DirTest):
             os.path.join(self.output_dir, "statistics.json"),
             os.path.join(EXTRACTED_2_DIR, "statistics.json"),
         )
+
+    def test_compare_to_methods_streaming(self):
+        sequential_dir = os.path.join(self.output_dir, "sequential")
+        streaming_dir = os.path.join(self.output_dir, "streaming")
+        compare_to_folder(input_path=EXTRACTED_2_DIR, output_path=Path(sequential_dir))
+        compare_to_folder(
+            input_path=EXTRACTED_2_DIR,
+            output_path=Path(streaming_dir),
+            streaming=True,
+            workers=2,
+        )
+
+        # The streaming mode finds the same snippets and statistics
+        for file_name in ["diff.txt", "no_diff.txt"]:
+            with (
+                open(os.path.join(sequential_dir, file_name)) as sequential_file,
+                open(os.path.join(streaming_dir, file_name)) as streaming_file,
+            ):
+                assert sorted(sequential_file) == sorted(streaming_file)
+        assert_lines_equal(os.path.join(streaming_dir, "diff.txt"), 3)
+        assert_lines_equal(os.path.join(streaming_dir, "no_diff.txt"), 1)
+        with (
+            open(os.path.join(sequential_dir, "statistics.json")) as sequential_file,
+            open(os.path.join(streaming_dir, "statistics.json")) as streaming_file,
+        ):
+            sequential_statistics = json.load(sequential_file)
+            streaming_statistics = json.load(streaming_file)
+        assert sorted(sequential_statistics, key=lambda s: s["stratum"]) == sorted(
+            streaming_statistics, key=lambda s: s["stratum"]
+        )
+
+    def test_compare_to_methods_empty_rdh(self):
+        input_dir = os.path.join(self.output_dir, "input")
+        shutil.copytree(EXTRACTED_2_DIR, input_dir)
+        os.makedirs(os.path.join(input_dir, "stratum0", "methodsRename"))
+        sequential_dir = os.path.join(self.output_dir, "sequential")
+        streaming_dir = os.path.join(self.output_dir, "streaming")
+        compare_to_folder(input_path=Path(input_dir), output_path=Path(sequential_dir))
+        compare_to_folder(
+            input_path=Path(input_dir), output_path=Path(streaming_dir), streaming=True
+        )
+
+        statistics = []
+        for statistics_dir in [sequential_dir, streaming_dir]:
+            with open(os.path.join(statistics_dir, "statistics.json")) as file:
+                stratum_statistics = sorted(json.load(file), key=lambda s: s["stratum"])
+            for statistic in stratum_statistics:
+                statistic["sub_statistics"].sort(key=lambda s: s["stratum"])
+            statistics.append(stratum_statistics)
+
+        # The empty rdh folder is counted with zero snippets in both modes
+        assert statistics[0] == statistics[1]
+        stratum0 = next(s for s in statistics[1] if s["stratum"] == "stratum0")
+        empty_rdh = next(
+            s for s in stratum0["sub_statistics"] if s["stratum"] == "methodsRename"
+        )
+        assert empty_rdh["total"] == 0
+        assert empty_rdh["different_rel"] == 0.0
+
+    def test_compare_to_methods_streaming_digest_index(self):
+        index_path = Path(self.output_dir) / "digests.tsv"
+        compare_to_folder(
+            input_path=EXTRACTED_2_DIR,
+            digest_index_path=index_path,
+            streaming=True,
+            workers=2,
+        )
+
+        # The digests computed by the workers are stored by the main process
+        with DigestIndex(EXTRACTED_2_DIR, index_path) as digest_index:
+            assert len(digest_index) == 8
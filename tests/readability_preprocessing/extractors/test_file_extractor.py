@@ -1,6 +1,9 @@
 import os
+import shutil
 
 from src.readability_preprocessing.extractors.file_extractor import extract_files
+from src.readability_preprocessing.utils.materialization import MaterializationMode
+from src.readability_preprocessing.utils.utils import load_code
 from tests.readability_preprocessing.utils.utils import CHECKSTYLED_DIR, DirTest
 
 
@@ -16,3 +19,38 @@ class TestExtractFiles(DirTest):
         area_shop_dir = os.path.join(self.output_dir, "AreaShop")
         assert "AddCommand.java" in os.listdir(area_shop_dir)
         assert "AreaShopInterface.java" in os.listdir(area_shop_dir)
+
+    def test_extract_files_hardlink(self):
+        extract_files(
+            CHECKSTYLED_DIR.absolute(),
+            self.output_dir,
+            materialization=MaterializationMode.HARDLINK,
+        )
+
+        # The files are hard links to the input files, if both are on the same device
+        output_file = os.path.join(self.output_dir, "AreaShop", "AddCommand.java")
+        input_file = CHECKSTYLED_DIR / "AreaShop" / "non_violated" / "AddCommand.java"
+        assert load_code(output_file) == load_code(input_file)
+        if os.stat(self.output_dir).st_dev == os.stat(input_file).st_dev:
+            assert os.path.samefile(output_file, input_file)
+
+    def test_extract_files_copy_over_hardlinks(self):
+        first_input_dir = os.path.join(self.output_dir, "first")
+        second_input_dir = os.path.join(self.output_dir, "second")
+        output_dir = os.path.join(self.output_dir, "output")
+        shutil.copytree(CHECKSTYLED_DIR, first_input_dir)
+        shutil.copytree(CHECKSTYLED_DIR, second_input_dir)
+        relative_path = os.path.join("AreaShop", "non_violated", "AddCommand.java")
+        with open(os.path.join(second_input_dir, relative_path), "w") as f:
+            f.write("class AddCommand {}")
+
+        # Rerun the stage with copies over the hard links of the first run
+        extract_files(
+            first_input_dir, output_dir, materialization=MaterializationMode.HARDLINK
+        )
+        extract_files(second_input_dir, output_dir)
+
+        output_file = os.path.join(output_dir, "AreaShop", "AddCommand.java")
+        first_input_file = os.path.join(first_input_dir, relative_path)
+        assert load_code(output_file) == "class AddCommand {}"
+        assert load_code(first_input_file) == load_code(CHECKSTYLED_DIR / relative_path)
@@ -1,10 +1,25 @@
 import os
 import unittest
+from pathlib import Path
 
-from src.readability_preprocessing.extractors.method_extractor import extract_methods
+import pytest
+
+from src.readability_preprocessing.extractors.method_extractor import (
+    BraceDepthIndex,
+    ExtractionEngine,
+    InvalidBraceCountException,
+    OverwriteMode,
+    extract_methods,
+)
+from src.readability_preprocessing.utils.manifest import ExtractionManifest
+from src.readability_preprocessing.utils.snippet_archive import (
+    INDEX_FILE_NAME,
+    SnippetArchive,
+)
 from tests.readability_preprocessing.utils.utils import (
     CLASSES_DIR,
     CRAFTED_CLASSES_DIR,
+    MODERN_CLASSES_DIR,
     SELECTED_CLASSES_DIR,
     DirTest,
     assert_lines_equal,
@@ -89,6 +104,91 @@ class TestExtractMethods(DirTest):
         assert os.path.exists(os.path.join(class_dir, "test10.java"))
         assert_lines_equal(os.path.join(class_dir, "test10.java"), 6)
 
+    def test_extract_selected_methods_tokens(self):
+        parser_dir = os.path.join(self.output_dir, "parser")
+        tokens_dir = os.path.join(self.output_dir, "tokens")
+        extract_methods(SELECTED_CLASSES_DIR.absolute(), parser_dir)
+        extract_methods(
+            SELECTED_CLASSES_DIR.absolute(),
+            tokens_dir,
+            engine=ExtractionEngine.TOKENS,
+        )
+
+        # Both engines extract the same methods
+        for root, _, files in os.walk(parser_dir):
+            for file in files:
+                parser_file = os.path.join(root, file)
+                tokens_file = os.path.join(
+                    tokens_dir, os.path.relpath(parser_file, parser_dir)
+                )
+                with open(parser_file) as f1, open(tokens_file) as f2:
+                    assert f1.read() == f2.read()
+
+    def test_extract_modern_methods(self):
+        parser_dir = os.path.join(self.output_dir, "parser")
+        tokens_dir = os.path.join(self.output_dir, "tokens")
+        extract_methods(MODERN_CLASSES_DIR.absolute(), parser_dir)
+        extract_methods(
+            MODERN_CLASSES_DIR.absolute(),
+            tokens_dir,
+            engine=ExtractionEngine.TOKENS,
+        )
+
+        # The parser does not support records, text blocks and switch expressions
+        assert not os.path.exists(parser_dir)
+
+        class_dir = os.path.join(tokens_dir, "modern/Modern.java")
+        assert sorted(os.listdir(class_dir)) == [
+            "greeting.java",
+            "name.java",
+            "sum.java",
+        ]
+        assert_lines_equal(os.path.join(class_dir, "greeting.java"), 8)
+        assert_lines_equal(os.path.join(class_dir, "name.java"), 9)
+        assert_lines_equal(os.path.join(class_dir, "sum.java"), 6)
+
+    def test_extract_methods_archive(self):
+        files_dir = os.path.join(self.output_dir, "files")
+        archive_dir = os.path.join(self.output_dir, "archive")
+        extract_methods(SELECTED_CLASSES_DIR.absolute(), files_dir)
+        extract_methods(
+            SELECTED_CLASSES_DIR.absolute(), archive_dir, output_format="archive"
+        )
+
+        # The archive contains the same methods under the same paths as the files
+        files = {}
+        for root, _, file_names in os.walk(files_dir):
+            for file_name in file_names:
+                with open(os.path.join(root, file_name)) as f:
+                    relative_path = os.path.relpath(
+                        os.path.join(root, file_name), files_dir
+                    )
+                    files[Path(relative_path).as_posix()] = f.read()
+        assert len(files) == 16
+        assert dict(SnippetArchive(archive_dir).items()) == files
+
+    def test_extract_methods_archive_skip(self):
+        archive_dir = os.path.join(self.output_dir, "archive")
+        extract_methods(
+            SELECTED_CLASSES_DIR.absolute(), archive_dir, output_format="archive"
+        )
+        extract_methods(
+            SELECTED_CLASSES_DIR.absolute(),
+            archive_dir,
+            overwrite_mode=OverwriteMode.SKIP,
+            output_format="archive",
+        )
+
+        # All files are skipped, because their methods are already archived
+        with open(os.path.join(archive_dir, INDEX_FILE_NAME)) as index:
+            assert len(index.readlines()) == 16
+
+    def test_extract_methods_invalid_output_format(self):
+        with pytest.raises(ValueError, match="output format"):
+            extract_methods(
+                SELECTED_CLASSES_DIR.absolute(), self.output_dir, output_format="tar"
+            )
+
     @unittest.skip("Only used for debugging.")
     def test_extract_special(self):
         input_dir = CLASSES_DIR / "special"
@@ -98,3 +198,94 @@ class TestExtractMethods(DirTest):
         class_dir = os.path.join(self.output_dir, "special/RegionFeature.java")
         assert len(os.listdir(class_dir)) == 1
         assert_lines_equal(os.path.join(class_dir, "test.java"), 6)
+
+    def test_extract_methods_workers(self):
+        sequential_dir = os.path.join(self.output_dir, "sequential")
+        parallel_dir = os.path.join(self.output_dir, "parallel")
+        extract_methods(SELECTED_CLASSES_DIR.absolute(), sequential_dir)
+        extract_methods(SELECTED_CLASSES_DIR.absolute(), parallel_dir, workers=2)
+
+        # The output does not depend on the number of workers
+        sequential_files = sorted(
+            os.path.relpath(os.path.join(root, file), sequential_dir)
+            for root, _, files in os.walk(sequential_dir)
+            for file in files
+        )
+        parallel_files = sorted(
+            os.path.relpath(os.path.join(root, file), parallel_dir)
+            for root, _, files in os.walk(parallel_dir)
+            for file in files
+        )
+        assert len(sequential_files) == 16
+        assert sequential_files == parallel_files
+        for file in sequential_files:
+            with (
+                open(os.path.join(sequential_dir, file)) as sequential_file,
+                open(os.path.join(parallel_dir, file)) as parallel_file,
+            ):
+                assert sequential_file.read() == parallel_file.read()
+
+    def test_extract_methods_invalid_workers(self):
+        with pytest.raises(ValueError, match="workers"):
+            extract_methods(SELECTED_CLASSES_DIR.absolute(), self.output_dir, workers=0)
+
+    def test_extract_methods_manifest(self):
+        methods_dir = os.path.join(self.output_dir, "methods")
+        manifest_path = os.path.join(self.output_dir, "manifest.txt")
+
+        # Simulate a run that was interrupted after extracting the first file
+        first_file = "AreaShop/AddedFriendEvent.java"
+        with ExtractionManifest(manifest_path) as manifest:
+            manifest.add(first_file)
+
+        extract_methods(
+            SELECTED_CLASSES_DIR.absolute(),
+            methods_dir,
+            manifest_path=manifest_path,
+        )
+
+        # The completed file is not extracted again
+        assert not os.path.exists(
+            os.path.join(methods_dir, "AreaShop", "AddedFriendEvent.java")
+        )
+        assert os.path.exists(
+            os.path.join(methods_dir, "hadoop", "DynoInfraUtils.java")
+        )
+
+        # All files are completed, also those without extracted methods
+        assert_lines_equal(manifest_path, 6)
+        with ExtractionManifest(manifest_path) as manifest:
+            assert first_file in manifest
+            assert "AreaShop/AddCommand.java" in manifest
+
+
+class TestBraceDepthIndex(unittest.TestCase):
+    codelines = [
+        "class A {\n",
+        "    void a() {\n",
+        "        if (true) {\n",
+        "        }\n",
+        "    }\n",
+        "    void b()\n",
+        "    {\n",
+        "    }\n",
+        "}\n",
+    ]
+
+    def test_end_line(self):
+        index = BraceDepthIndex(self.codelines)
+
+        assert index.end_line(2) == 6
+        assert index.end_line(6) == 9
+        assert index.end_line(1) == 10
+
+    def test_end_line_no_braces(self):
+        index = BraceDepthIndex(["int a;\n", "int b;\n"])
+
+        assert index.end_line(1) == 3
+
+    def test_end_line_invalid_brace_count(self):
+        index = BraceDepthIndex(self.codelines)
+
+        with pytest.raises(InvalidBraceCountException, match="-1"):
+            index.end_line(4)
@@ -1,12 +1,18 @@
 import os
 from pathlib import Path
 
+import pytest
+
 from readability_preprocessing.extractors.sampled_extractor import (
     _check_path_in,
+    _find_relative_path,
     _get_common_path,
     _to_relative_paths,
     extract_sampled,
 )
+from src.readability_preprocessing.utils.materialization import MaterializationMode
+from src.readability_preprocessing.utils.snippet_archive import SnippetArchive
+from src.readability_preprocessing.utils.utils import list_java_files_path, load_code
 from tests.readability_preprocessing.utils.utils import (
     METHODS_ORIGINAL_DIR,
     METHODS_RDH_DIR,
@@ -16,6 +22,43 @@ from tests.readability_preprocessing.utils.utils import (
 
 
 class TestExtractSampled(DirTest):
+    def test_extract_sampled_archive(self):
+        archive_dir = Path(self.output_dir) / "methods_original"
+        with SnippetArchive(archive_dir) as archive:
+            for path in list_java_files_path(METHODS_ORIGINAL_DIR):
+                archive.append(
+                    path.relative_to(METHODS_ORIGINAL_DIR).as_posix(), load_code(path)
+                )
+
+        # Sample the execute and getHelp methods as two stratas
+        sampling_dir = Path(self.output_dir) / "sampling"
+        sampling_dir.mkdir()
+        for stratum_idx, method in enumerate(["execute", "getHelp"]):
+            (sampling_dir / f"stratum_{stratum_idx}.txt").write_text(
+                "\n".join(
+                    archive.absolute_path(f"AreaShop/{file}/{method}.java")
+                    for file in ["AddCommand.java", "AddfriendCommand.java"]
+                )
+            )
+
+        output_dir = Path(self.output_dir) / "output"
+        extract_sampled(
+            input_dirs=[archive_dir], output_dir=output_dir, sampling_dir=sampling_dir
+        )
+
+        stratum_0_original = output_dir / "stratum_0" / "methods_original"
+        assert sorted(os.listdir(stratum_0_original)) == [
+            "AreaShop_AddCommand.java_execute.java",
+            "AreaShop_AddfriendCommand.java_execute.java",
+        ]
+        assert sorted(os.listdir(output_dir / "stratum_1" / "methods_original")) == [
+            "AreaShop_AddCommand.java_getHelp.java",
+            "AreaShop_AddfriendCommand.java_getHelp.java",
+        ]
+        assert load_code(
+            stratum_0_original / "AreaShop_AddCommand.java_execute.java"
+        ) == load_code(METHODS_ORIGINAL_DIR / "AreaShop/AddCommand.java/execute.java")
+
     def test_extract_sampled_single_input(self):
         extract_sampled(
             input_dirs=[Path(METHODS_ORIGINAL_DIR)],
@@ -76,6 +119,103 @@ class TestExtractSampled(DirTest):
             "AreaShop_AddfriendCommand.java_getTabCompleteList.java",
         ]
 
+    def test_extract_sampled_index(self):
+        extract_sampled(
+            input_dirs=[Path(METHODS_ORIGINAL_DIR), Path(METHODS_RDH_DIR)],
+            output_dir=Path(self.output_dir),
+            sampling_dir=Path(SAMPLED_DIR_2_2),
+            matching="index",
+        )
+
+        for input_dir in [METHODS_ORIGINAL_DIR, METHODS_RDH_DIR]:
+            stratum_0_dir = Path(self.output_dir) / "stratum_0" / input_dir.stem
+            assert sorted(os.listdir(stratum_0_dir)) == [
+                "AreaShop_AddCommand.java_execute.java",
+                "AreaShop_AddfriendCommand.java_execute.java",
+            ]
+            assert load_code(
+                stratum_0_dir / "AreaShop_AddCommand.java_execute.java"
+            ) == load_code(input_dir / "AreaShop/AddCommand.java/execute.java")
+
+            stratum_1_dir = Path(self.output_dir) / "stratum_1" / input_dir.stem
+            assert sorted(os.listdir(stratum_1_dir)) == [
+                "AreaShop_AddCommand.java_getTabCompleteList.java",
+                "AreaShop_AddfriendCommand.java_getTabCompleteList.java",
+            ]
+
+    def test_extract_sampled_index_archive(self):
+        archive_dir = Path(self.output_dir) / "methods_original"
+        with SnippetArchive(archive_dir) as archive:
+            for path in list_java_files_path(METHODS_ORIGINAL_DIR):
+                archive.append(
+                    path.relative_to(METHODS_ORIGINAL_DIR).as_posix(), load_code(path)
+                )
+
+        output_dir = Path(self.output_dir) / "output"
+        extract_sampled(
+            input_dirs=[archive_dir],
+            output_dir=output_dir,
+            sampling_dir=Path(SAMPLED_DIR_2_2),
+            matching="index",
+        )
+
+        stratum_0_original = output_dir / "stratum_0" / "methods_original"
+        assert sorted(os.listdir(stratum_0_original)) == [
+            "AreaShop_AddCommand.java_execute.java",
+            "AreaShop_AddfriendCommand.java_execute.java",
+        ]
+        assert load_code(
+            stratum_0_original / "AreaShop_AddCommand.java_execute.java"
+        ) == load_code(METHODS_ORIGINAL_DIR / "AreaShop/AddCommand.java/execute.java")
+
+    def test_extract_sampled_index_symlink(self):
+        extract_sampled(
+            input_dirs=[Path(METHODS_ORIGINAL_DIR)],
+            output_dir=Path(self.output_dir),
+            sampling_dir=Path(SAMPLED_DIR_2_2),
+            matching="index",
+            materialization=MaterializationMode.SYMLINK,
+        )
+
+        output_file = (
+            Path(self.output_dir)
+            / "stratum_0"
+            / "methods_original"
+            / "AreaShop_AddCommand.java_execute.java"
+        )
+        assert output_file.is_symlink()
+        assert (
+            output_file.resolve()
+            == (
+                METHODS_ORIGINAL_DIR / "AreaShop/AddCommand.java/execute.java"
+            ).resolve()
+        )
+
+    def test_find_relative_path(self):
+        def exists(relative_path: str) -> bool:
+            return relative_path in {"AreaShop/AddCommand.java/execute.java", "a.java"}
+
+        assert (
+            _find_relative_path(
+                "res\\methods_rdh\\AreaShop\\AddCommand.java\\execute.java", exists
+            )
+            == "AreaShop/AddCommand.java/execute.java"
+        )
+        assert (
+            _find_relative_path("/res/AreaShop/AddCommand.java/execute.java", exists)
+            == "AreaShop/AddCommand.java/execute.java"
+        )
+        assert _find_relative_path("/res/b.java", exists) is None
+
+    def test_extract_sampled_invalid_matching(self):
+        with pytest.raises(ValueError, match="matching mode"):
+            extract_sampled(
+                input_dirs=[Path(METHODS_ORIGINAL_DIR)],
+                output_dir=Path(self.output_dir),
+                sampling_dir=Path(SAMPLED_DIR_2_2),
+                matching="regex",
+            )
+
     def test_to_relative_paths(self):
         absolute_paths = [
             [
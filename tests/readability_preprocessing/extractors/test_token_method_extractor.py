@@ -0,0 +1,159 @@
+from src.readability_preprocessing.extractors.method_extractor import (
+    ExtractionEngine,
+    MethodExtractor,
+    MethodExtractorConfig,
+    OverwriteMode,
+)
+from src.readability_preprocessing.extractors.token_method_extractor import (
+    TokenMethod,
+    find_methods,
+    tokenize,
+)
+from tests.readability_preprocessing.utils.utils import RES_DIR
+
+# The documented differences of the engines on the test resources, see
+# ExtractionEngine.TOKENS
+UNPARSEABLE_FILES = {"classes/modern/modern/Modern.java"}
+MODIFIERS_ON_OWN_LINE = {("classes/special/special/RegionFeature.java", "getRegion")}
+
+CODE = """package example;
+
+@Deprecated
+public class Example<T extends Comparable<T>> {
+    private Runnable runnable = new Runnable() {
+        public void run() { }
+    };
+
+    static {
+        System.out.println("}");
+    }
+
+    public Example() { }
+
+    /**
+     * A method with a comment.
+     */
+    @SuppressWarnings("unchecked")
+    public <U> List<U> generic(U value) throws Exception {
+        char brace = '{';
+        return null;
+    }
+
+    abstract int[] bodyless(int a);
+
+    enum Kind {
+        FIRST(1) {
+            void inner() { }
+        },
+        SECOND(2);
+
+        Kind(int value) { }
+
+        Map<String, List<Integer>> nested() { return null; }
+    }
+
+    @interface Marker {
+        int value() default 1;
+    }
+}
+"""
+
+
+def test_tokenize():
+    code = 'String s = """\n    {\n    """; // }\nint i = 1;'
+    tokens = [(token.kind, token.value, token.line) for token in tokenize(code)]
+
+    assert tokens == [
+        ("name", "String", 1),
+        ("name", "s", 1),
+        ("operator", "=", 1),
+        ("literal", '"""\n    {\n    """', 1),
+        ("separator", ";", 3),
+        ("name", "int", 4),
+        ("name", "i", 4),
+        ("operator", "=", 4),
+        ("literal", "1", 4),
+        ("separator", ";", 4),
+    ]
+
+
+def test_find_methods():
+    methods = find_methods(CODE)
+
+    assert methods == [
+        TokenMethod("generic", 19, 5, 22, True),
+        TokenMethod("bodyless", 24, 5, 24, False),
+        TokenMethod("nested", 34, 9, 34, True),
+    ]
+
+
+def test_find_methods_unbalanced():
+    methods = find_methods("class A {\n    void a() {\n        if (true) {\n")
+
+    assert methods == [TokenMethod("a", 2, 5, 3, True)]
+
+
+def _extract_with_both_engines(require_body: bool):
+    extractors = [
+        MethodExtractor(
+            MethodExtractorConfig(
+                overwrite_mode=OverwriteMode.OVERWRITE,
+                include_method_comments=True,
+                comments_required=False,
+                remove_indentation=True,
+                require_body=require_body,
+                engine=engine,
+            )
+        )
+        for engine in (ExtractionEngine.PARSER, ExtractionEngine.TOKENS)
+    ]
+    java_files = sorted(path for path in RES_DIR.rglob("*.java") if path.is_file())
+    assert java_files
+    for path in java_files:
+        parser_methods, tokens_methods = (
+            extractor._iterate_methods(str(path)) for extractor in extractors
+        )
+        yield path, parser_methods, tokens_methods
+
+
+def _differing_methods(parser_methods: dict, tokens_methods: dict) -> set[str]:
+    return {
+        name
+        for name in parser_methods.keys() | tokens_methods.keys()
+        if parser_methods.get(name) != tokens_methods.get(name)
+    }
+
+
+def test_engines_agree():
+    differences = set()
+    for path, parser_methods, tokens_methods in _extract_with_both_engines(True):
+        relative_path = path.relative_to(RES_DIR).as_posix()
+        if relative_path in UNPARSEABLE_FILES:
+            assert parser_methods == {}
+            assert tokens_methods
+            continue
+        differences |= {
+            (relative_path, name)
+            for name in _differing_methods(parser_methods, tokens_methods)
+        }
+
+    assert differences == MODIFIERS_ON_OWN_LINE
+
+
+def test_engines_agree_on_methods_with_body():
+    for path, parser_methods, tokens_methods in _extract_with_both_engines(False):
+        relative_path = path.relative_to(RES_DIR).as_posix()
+        if relative_path in UNPARSEABLE_FILES:
+            continue
+
+        # The engines only differ in methods without body and their overloads
+        bodyless = {
+            method.name
+            for method in find_methods(path.read_text())
+            if not method.has_body
+        }
+        differing = _differing_methods(parser_methods, tokens_methods) - {
+            name for file, name in MODIFIERS_ON_OWN_LINE if file == relative_path
+        }
+        assert parser_methods.keys() <= tokens_methods.keys()
+        assert differing <= bodyless
@@ -0,0 +1,134 @@
+import csv
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import krippendorff
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.readability_preprocessing.prolific.agreement import (
+    LEVELS_OF_MEASUREMENT,
+    REPORT_FILE_NAME,
+    agreement_breakdown,
+    analyze_agreement,
+    bootstrap_alpha,
+    krippendorff_alpha,
+    reliability_matrix,
+)
+from tests.readability_preprocessing.utils.utils import SURVEYS_DIR, DirTest
+
+
+def _reliability(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    reliability = rng.integers(1, 6, (6, 40)).astype(float)
+    reliability[rng.random(reliability.shape) < 0.3] = np.nan
+    return reliability
+
+
+class TestKrippendorffAlpha:
+    @pytest.mark.parametrize("level", LEVELS_OF_MEASUREMENT)
+    def test_matches_krippendorff(self, level):
+        reliability = _reliability(seed=0)
+
+        expected = krippendorff.alpha(
+            reliability_data=reliability,
+            level_of_measurement=level,
+            value_domain=[1, 2, 3, 4, 5],
+        )
+
+        assert krippendorff_alpha(reliability, level) == pytest.approx(expected)
+
+    def test_reliability_matrix(self):
+        ratings = pd.DataFrame(
+            {"rater": ["b", "a", "a"], "snippet": ["x", "x", "y"], "rate": [1, 2, 3]}
+        )
+
+        np.testing.assert_array_equal(
+            reliability_matrix(ratings), [[2, 3], [1, np.nan]]
+        )
+
+    def test_value_outside_domain(self):
+        with pytest.raises(ValueError, match="value domain"):
+            krippendorff_alpha(np.array([[1.0, 6.0], [1.0, 2.0]]))
+
+    def test_invalid_level(self):
+        with pytest.raises(ValueError, match="level of measurement"):
+            krippendorff_alpha(_reliability(seed=0), "ratio")
+
+
+class TestBootstrapAlpha:
+    def test_confidence_interval(self):
+        reliability = _reliability(seed=1)
+
+        alpha, ci_low, ci_high = bootstrap_alpha(reliability, seed=42)
+
+        assert alpha == pytest.approx(krippendorff_alpha(reliability))
+        assert ci_low < alpha < ci_high
+
+    def test_seed(self):
+        reliability = _reliability(seed=1)
+
+        first = bootstrap_alpha(reliability, num_bootstrap=600, seed=42)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            second = bootstrap_alpha(
+                reliability, num_bootstrap=600, seed=42, executor=executor
+            )
+
+        # The result does not depend on the executor
+        assert first == second
+
+    def test_without_variance(self):
+        reliability = np.array([[3.0, 3.0], [3.0, 3.0]])
+
+        # No resample has an alpha, so there is no confidence interval
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            alpha, ci_low, ci_high = bootstrap_alpha(reliability, seed=42)
+
+        assert np.isnan(alpha)
+        assert np.isnan(ci_low)
+        assert np.isnan(ci_high)
+
+    def test_invalid_confidence(self):
+        with pytest.raises(ValueError, match="confidence"):
+            bootstrap_alpha(_reliability(seed=0), confidence=1)
+
+
+class TestAgreementBreakdown(DirTest):
+    def test_agreement_breakdown(self):
+        ratings = pd.DataFrame(
+            {
+                "rater": ["r0", "r1", "r0", "r1", "r0", "r1"],
+                "snippet": ["a", "a", "b", "b", "c", "c"],
+                "rate": [1, 1, 5, 5, 3, 3],
+                "stratum": ["s0", "s0", "s0", "s0", "s1", "s1"],
+                "rdh": ["none", "none", "methods", "methods", "none", "none"],
+            }
+        )
+
+        agreements = agreement_breakdown(
+            ratings, ["interval"], num_bootstrap=10, seed=1
+        )
+
+        assert [(a.grouping, a.group) for a in agreements] == [
+            ("all", ""),
+            ("stratum", "s0"),
+            ("stratum", "s1"),
+            ("rdh", "methods"),
+            ("rdh", "none"),
+        ]
+        assert agreements[0].alpha == pytest.approx(1.0)
+        assert agreements[0].units == 3
+        assert agreements[0].raters == 2
+
+    def test_analyze_agreement(self):
+        agreements = analyze_agreement(
+            str(SURVEYS_DIR), self.output_dir, num_bootstrap=50, seed=42
+        )
+
+        with open(os.path.join(self.output_dir, REPORT_FILE_NAME)) as report_file:
+            report = list(csv.DictReader(report_file))
+        assert len(report) == len(agreements) == 5 * len(LEVELS_OF_MEASUREMENT)
+        assert report[0]["grouping"] == "all"
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.stats as stats
+
+from src.readability_preprocessing.prolific.statistical.batch_tests import (
+    adjust_p_values,
+    pairwise_tests,
+)
+
+
+def _ratings() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "stratum": rng.choice(["s0", "s1"], 600),
+            "rdh": rng.choice(["none", "methods", "comments"], 600),
+            "rate": rng.integers(1, 6, 600),
+        }
+    )
+
+
+def _group(ratings: pd.DataFrame, stratum: str, rdh: str) -> np.ndarray:
+    selected = (ratings["stratum"] == stratum) & (ratings["rdh"] == rdh)
+    return ratings.loc[selected, "rate"].to_numpy()
+
+
+def _tost(first: np.ndarray, second: np.ndarray, margin: float) -> tuple:
+    lower = stats.ttest_ind(
+        first + margin, second, equal_var=False, alternative="greater"
+    )
+    upper = stats.ttest_ind(first - margin, second, equal_var=False, alternative="less")
+    return max([lower, upper], key=lambda result: result.pvalue)
+
+
+class TestAdjustPValues:
+    def test_holm(self):
+        adjusted = adjust_p_values(np.array([0.01, 0.04, 0.03, np.nan]), "holm")
+
+        np.testing.assert_allclose(adjusted, [0.03, 0.06, 0.06, np.nan])
+
+    def test_bh(self):
+        adjusted = adjust_p_values(np.array([0.01, 0.04, 0.03, 0.5]), "bh")
+
+        np.testing.assert_allclose(adjusted, [0.04, 0.16 / 3, 0.16 / 3, 0.5])
+
+    def test_invalid_correction(self):
+        with pytest.raises(ValueError, match="correction"):
+            adjust_p_values(np.array([0.01]), "bonferroni")
+
+
+class TestPairwiseTests:
+    def test_matches_scipy(self):
+        ratings = _ratings()
+
+        results = pairwise_tests(ratings, "rdh", within=["stratum"])
+
+        # 2 strata x 3 pairs of RDHs x (4 tests + 4 splits)
+        assert len(results) == 2 * 3 * 8
+        for row in results.itertuples():
+            first = _group(ratings, row.stratum, row.group1)
+            second = _group(ratings, row.stratum, row.group2)
+            if row.test == "mann_whitney_u":
+                expected = stats.mannwhitneyu(first, second, method="asymptotic")
+            elif row.test == "t_test":
+                expected = stats.ttest_ind(first, second)
+            elif row.test == "tost":
+                expected = _tost(first, second, 0.5)
+            elif row.test == "chi2":
+                table = [
+                    [np.sum(group == value) for value in range(1, 6)]
+                    for group in (first, second)
+                ]
+                expected = stats.chi2_contingency(table)[:2]
+            else:
+                split = int(row.test.removeprefix("chi2_split_"))
+                table = [
+                    [np.sum(group <= split), np.sum(group > split)]
+                    for group in (first, second)
+                ]
+                expected = stats.chi2_contingency(table)[:2]
+            assert row.statistic == pytest.approx(expected[0])
+            assert row.p_value == pytest.approx(expected[1])
+
+    def test_compare_to(self):
+        results = pairwise_tests(_ratings(), "rdh", compare_to="none", correction=None)
+
+        assert set(results["group1"]) == {"none"}
+        assert set(results["group2"]) == {"methods", "comments"}
+        assert (results["p_adjusted"] == results["p_value"]).all()
+
+    def test_unknown_compare_to(self):
+        with pytest.raises(ValueError, match="compare to"):
+            pairwise_tests(_ratings(), "rdh", compare_to="None")
+
+    def test_correction(self):
+        results = pairwise_tests(_ratings(), "rdh", within=["stratum"])
+
+        t_tests = results[results["test"] == "t_test"]
+        np.testing.assert_allclose(
+            t_tests["p_adjusted"], adjust_p_values(t_tests["p_value"], "holm")
+        )
+        assert (t_tests["rejected"] == (t_tests["p_adjusted"] < 0.05)).all()
+
+    def test_equivalence_margin(self):
+        ratings = pd.DataFrame(
+            {
+                "rdh": ["a"] * 50 + ["b"] * 50,
+                "rate": [3, 4] * 25 + [3, 4, 4, 3] * 12 + [3, 4],
+            }
+        )
+
+        narrow = pairwise_tests(ratings, "rdh", equivalence_margin=0.01)
+        wide = pairwise_tests(ratings, "rdh", equivalence_margin=0.5)
+
+        # Equal means are only shown to be equivalent with a wide enough margin
+        assert not narrow[narrow["test"] == "tost"]["rejected"].item()
+        assert wide[wide["test"] == "tost"]["rejected"].item()
+
+    def test_value_outside_ratings(self):
+        ratings = pd.DataFrame({"rdh": ["a", "b"], "rate": [1, 7]})
+
+        with pytest.raises(ValueError, match="rating values"):
+            pairwise_tests(ratings, "rdh")
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.readability_preprocessing.prolific.combiner import join_ratings
+from src.readability_preprocessing.prolific.demographics import (
+    InnerSolution,
+    Solution,
+)
+from src.readability_preprocessing.prolific.extraction import (
+    question_rating_std_grouped,
+    question_rating_std_sum,
+    question_time,
+)
+
+QUESTION_ID = 16
+
+
+def _ratings() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "snippet": ["a", "b", "a", "b", "a"],
+            "rater": ["r1", "r1", "r0", "r0", "r2"],
+            "rate": [4, 2, 2, 4, 3],
+            "time_taken": [600.0, 600.0, 300.0, 300.0, None],
+        }
+    )
+
+
+def _solutions() -> dict[str, dict[int, Solution]]:
+    answers = {"r0": 0, "r1": 1, "r2": 1, "unknown": 0}
+    return {
+        rater: {QUESTION_ID: Solution(QUESTION_ID, rater, InnerSolution(None, [group]))}
+        for rater, group in answers.items()
+    }
+
+
+class TestJoinRatings:
+    def test_matrices(self):
+        combined = join_ratings(_ratings(), _solutions())
+
+        assert combined.raters.tolist() == ["r0", "r1", "r2"]
+        assert combined.snippets.tolist() == ["a", "b"]
+        np.testing.assert_array_equal(combined.ratings, [[2, 4], [4, 2], [3, np.nan]])
+        np.testing.assert_array_equal(combined.demographics, [[0], [1], [1]])
+        np.testing.assert_array_equal(combined.time_taken, [300, 600, np.nan])
+
+    def test_question_time(self):
+        combined = join_ratings(_ratings(), _solutions())
+
+        assert question_time(combined, QUESTION_ID) == [
+            (0, 300.0),
+            (0, 300.0),
+            (1, 600.0),
+            (1, 600.0),
+        ]
+
+    def test_question_rating_std(self):
+        combined = join_ratings(_ratings(), _solutions())
+
+        # The average ratings are 3 for "a" and 3 for "b"
+        assert question_rating_std_sum(combined, QUESTION_ID) == {0: 2.0, 1: 1.0}
+        assert question_rating_std_grouped(combined, QUESTION_ID) == {
+            0: [1.0, 1.0],
+            1: [1.0, 1.0, 0.0],
+        }
+
+    def test_unknown_question(self):
+        combined = join_ratings(_ratings(), _solutions())
+
+        with pytest.raises(ValueError, match="question 1"):
+            question_rating_std_sum(combined, 1)
@@ -0,0 +1,147 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.readability_preprocessing.prolific.statistical.permutation_tests import (
+    PERMUTATION_STATISTICS,
+    permutation_test,
+    permutation_tests,
+)
+
+FIRST = [1, 2, 2, 3, 5, 4]
+SECOND = [3, 4, 5, 5, 4, 4, 2]
+
+
+def _statistic(first: np.ndarray, second: np.ndarray, statistic: str) -> float:
+    if statistic == "mean":
+        return first.mean() - second.mean()
+    if statistic == "median":
+        return np.median(first) - np.median(second)
+    cdf_values = np.arange(1, 5)
+    return np.abs(
+        (first[:, np.newaxis] <= cdf_values).mean(axis=0)
+        - (second[:, np.newaxis] <= cdf_values).mean(axis=0)
+    ).sum()
+
+
+def _brute_force_p_value(first: list[int], second: list[int], statistic: str):
+    pooled = np.array(first + second)
+    observed = abs(_statistic(np.array(first), np.array(second), statistic))
+    extreme, total = 0, 0
+    for indices in itertools.combinations(range(len(pooled)), len(first)):
+        selected = np.zeros(len(pooled), dtype=bool)
+        selected[list(indices)] = True
+        value = abs(_statistic(pooled[selected], pooled[~selected], statistic))
+        extreme += value >= observed - 1e-9
+        total += 1
+    return extreme / total
+
+
+def _ratings() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "stratum": rng.choice(["s0", "s1"], 400),
+            "rdh": rng.choice(["none", "methods", "comments"], 400),
+            "rate": rng.integers(1, 6, 400),
+        }
+    )
+
+
+class TestPermutationTest:
+    @pytest.mark.parametrize("statistic", PERMUTATION_STATISTICS)
+    def test_exact(self, statistic):
+        observed, p_value, exact = permutation_test(FIRST, SECOND, statistic)
+
+        assert exact
+        assert observed == pytest.approx(
+            _statistic(np.array(FIRST), np.array(SECOND), statistic)
+        )
+        assert p_value == pytest.approx(_brute_force_p_value(FIRST, SECOND, statistic))
+
+    @pytest.mark.parametrize("statistic", PERMUTATION_STATISTICS)
+    def test_monte_carlo(self, statistic):
+        rng = np.random.default_rng(0)
+        first, second = rng.integers(1, 6, 30), rng.integers(2, 6, 30)
+        _, exact_p_value, exact = permutation_test(
+            first, second, statistic, num_permutations=1_000_000
+        )
+        _, p_value, sampled_exact = permutation_test(
+            first, second, statistic, num_permutations=20_000, seed=1
+        )
+
+        assert exact
+        assert not sampled_exact
+        assert p_value == pytest.approx(exact_p_value, abs=0.02)
+
+    def test_invalid_statistic(self):
+        with pytest.raises(ValueError, match="statistic"):
+            permutation_test(FIRST, SECOND, "mode")
+
+    def test_empty_group(self):
+        with pytest.raises(ValueError, match="Both groups"):
+            permutation_test(FIRST, [])
+
+
+class TestPermutationTests:
+    def test_compare_to_baseline(self):
+        ratings = _ratings()
+
+        results = permutation_tests(
+            ratings, "rdh", within=["stratum"], compare_to="none", seed=42
+        )
+
+        assert len(results) == 2 * 2 * len(PERMUTATION_STATISTICS)
+        assert (results["group1"] == "none").all()
+        assert set(results["test"]) == {
+            f"permutation_{statistic}" for statistic in PERMUTATION_STATISTICS
+        }
+        assert (results["p_adjusted"] >= results["p_value"]).all()
+
+    def test_matches_single_test(self):
+        ratings = _ratings()
+        first = ratings.loc[ratings["rdh"] == "comments", "rate"].to_numpy()
+        second = ratings.loc[ratings["rdh"] == "methods", "rate"].to_numpy()
+
+        results = permutation_tests(
+            ratings, "rdh", tests=["mean"], num_permutations=10, correction=None
+        )
+        row = results[(results["group1"] == "comments")]
+        row = row[row["group2"] == "methods"].iloc[0]
+
+        assert row["statistic"] == pytest.approx(first.mean() - second.mean())
+        assert not row["exact"]
+
+    def test_seeded(self):
+        ratings = _ratings()
+
+        first = permutation_tests(ratings, "rdh", num_permutations=1000, seed=7)
+        second = permutation_tests(ratings, "rdh", num_permutations=1000, seed=7)
+
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_independent_of_workers(self):
+        ratings = _ratings()
+
+        sequential = permutation_tests(
+            ratings, "rdh", tests=["mean"], num_permutations=30_000, seed=7
+        )
+        parallel = permutation_tests(
+            ratings, "rdh", tests=["mean"], num_permutations=30_000, seed=7, workers=2
+        )
+
+        pd.testing.assert_frame_equal(sequential, parallel)
+
+    def test_unknown_compare_to(self):
+        with pytest.raises(ValueError, match="compare to"):
+            permutation_tests(_ratings(), "rdh", compare_to="None")
+
+    def test_invalid_workers(self):
+        with pytest.raises(ValueError, match="workers"):
+            permutation_tests(_ratings(), "rdh", workers=0)
+
+    def test_invalid_num_permutations(self):
+        with pytest.raises(ValueError, match="permutations"):
+            permutation_tests(_ratings(), "rdh", num_permutations=0)
@@ -0,0 +1,116 @@
+import json
+import os
+from pathlib import Path
+
+import pyarrow as pa
+
+from src.readability_preprocessing.prolific.ratings import (
+    FINGERPRINT_KEY,
+    RATINGS_FILE_NAME,
+    build_ratings_table,
+    group_ratings,
+    load_ratings_table,
+    mean_ratings,
+)
+from tests.readability_preprocessing.utils.utils import DirTest
+
+
+def _write_snippet(dir_path: Path, path: str, rates: list[int | None]) -> None:
+    snippet = {
+        "path": path,
+        "fromLine": 1,
+        "toLine": 10,
+        "questions": [],
+        "rates": [
+            {
+                "comment": None,
+                "rate": rate,
+                "rater": f"rater{idx}",
+                "raterExternalId": f"pid{idx}",
+                "raterExternalSystem": "prolific",
+                "solutions": [],
+            }
+            for idx, rate in enumerate(rates)
+        ],
+    }
+    with open(dir_path / f"{path}.json", "w") as file:
+        json.dump(snippet, file)
+
+
+class TestRatingsTable(DirTest):
+    def setUp(self):
+        super().setUp()
+        self.survey_dir = Path(self.output_dir) / "results"
+        (self.survey_dir / "survey0").mkdir(parents=True)
+        (self.survey_dir / "survey1").mkdir()
+        _write_snippet(self.survey_dir / "survey0", "1_s0_methods_A.java", [4, 5])
+        _write_snippet(self.survey_dir / "survey0", "2_s0_none_A.java", [3, None])
+        _write_snippet(self.survey_dir / "survey1", "3_s1_methods_B.java", [2, 3, 1])
+        with open(self.survey_dir / "survey0" / "demographics.json", "w") as file:
+            json.dump({"questions": [], "solutions": []}, file)
+
+    def test_build_ratings_table(self):
+        table = build_ratings_table(self.survey_dir)
+
+        assert len(table) == 6
+        assert pa.types.is_dictionary(table.schema.field("rdh").type)
+        rows = sorted(
+            zip(
+                table["snippet"].to_pylist(),
+                table["stratum"].to_pylist(),
+                table["rdh"].to_pylist(),
+                table["raterExternalId"].to_pylist(),
+                table["rate"].to_pylist(),
+                strict=True,
+            )
+        )
+        assert rows[0] == ("1_s0_methods_A.java", "s0", "methods", "pid0", 4)
+        assert rows[2] == ("2_s0_none_A.java", "s0", "none", "pid0", 3)
+        assert table["time_taken"].null_count == 6
+
+    def test_group_ratings(self):
+        table = build_ratings_table(self.survey_dir)
+
+        by_rdh = group_ratings(table, "rdh")
+        by_stratum_and_rdh = group_ratings(table, ["stratum", "rdh"])
+
+        assert sorted(by_rdh["methods"].tolist()) == [1, 2, 3, 4, 5]
+        assert by_rdh["none"].tolist() == [3]
+        assert sorted(by_stratum_and_rdh[("s1", "methods")].tolist()) == [1, 2, 3]
+
+    def test_mean_ratings(self):
+        means = mean_ratings(build_ratings_table(self.survey_dir), "stratum")
+
+        assert dict(
+            zip(
+                means["stratum"].to_pylist(),
+                means["rate_mean"].to_pylist(),
+                strict=True,
+            )
+        ) == {"s0": 4.0, "s1": 2.0}
+
+    def test_load_ratings_table_cache(self):
+        cache_path = Path(self.output_dir) / RATINGS_FILE_NAME
+
+        table = load_ratings_table(self.survey_dir, cache_path=cache_path)
+        assert cache_path.exists()
+        fingerprint = table.schema.metadata[FINGERPRINT_KEY]
+
+        # Unchanged inputs are read from the cache
+        mtime = os.path.getmtime(cache_path)
+        cached = load_ratings_table(self.survey_dir, cache_path=cache_path)
+        assert os.path.getmtime(cache_path) == mtime
+        assert cached.equals(table)
+
+        # Changed inputs rebuild the table
+        _write_snippet(self.survey_dir / "survey1", "4_s1_none_B.java", [1])
+        rebuilt = load_ratings_table(self.survey_dir, cache_path=cache_path)
+        assert len(rebuilt) == 7
+        assert rebuilt.schema.metadata[FINGERPRINT_KEY] != fingerprint
+
+    def test_load_ratings_table_without_cache(self):
+        table = load_ratings_table(self.survey_dir)
+
+        # Nothing is written next to the inputs
+        assert len(table) == 6
+        assert not list(self.survey_dir.rglob("*.parquet"))
@@ -1,18 +1,27 @@
+import json
+import os
+import random
 from pathlib import Path
 
+import pytest
+
 from readability_preprocessing.utils.utils import load_code
 from src.readability_preprocessing.rdh.comments_remover import (
     CommentsRemover,
     CommentsRemoverConfig,
     remove_comments,
 )
+from src.readability_preprocessing.utils.manifest import ExtractionManifest
 from tests.readability_preprocessing.utils.utils import (
+    CLASSES_DIR,
+    COMMENTS_DIR,
     COMMENTS_WITH_DIR,
     COMMENTS_WITHOUT_DIR,
     EXTRACTED_DIR,
     METHODS_ORIGINAL_DIR,
     DirTest,
     assert_content_equal,
+    assert_lines_equal,
 )
 
 
@@ -78,3 +87,102 @@ class TestExtractSampled(DirTest):
             assert_content_equal(
                 COMMENTS_WITHOUT_DIR / filename, Path(self.output_dir) / filename
             )
+
+    def test_remove_comments_workers(self):
+        sequential_dir = Path(self.output_dir) / "sequential"
+        parallel_dir = Path(self.output_dir) / "parallel"
+        remove_comments(METHODS_ORIGINAL_DIR, sequential_dir, probability=0.5, seed=1)
+        remove_comments(
+            METHODS_ORIGINAL_DIR, parallel_dir, probability=0.5, seed=1, workers=2
+        )
+
+        # The output does not depend on the number of workers
+        sequential_files = sorted(
+            file.relative_to(sequential_dir) for file in sequential_dir.glob("**/*")
+        )
+        assert len(sequential_files) > 0
+        assert sequential_files == sorted(
+            file.relative_to(parallel_dir) for file in parallel_dir.glob("**/*")
+        )
+        for file in sequential_files:
+            if (sequential_dir / file).is_file():
+                assert (sequential_dir / file).read_bytes() == (
+                    parallel_dir / file
+                ).read_bytes()
+
+    def test_remove_comments_seed(self):
+        remove_comments(COMMENTS_WITH_DIR, Path(self.output_dir), 0.5, seed=1)
+        file = Path(self.output_dir) / "helloWorld.java"
+        code = load_code(file)
+
+        # The same seed removes the same comments, regardless of the global state
+        random.seed(2)
+        remove_comments(COMMENTS_WITH_DIR, Path(self.output_dir), 0.5, seed=1)
+        assert load_code(file) == code
+
+    def test_remove_comments_workers_without_seed(self):
+        with pytest.raises(ValueError, match="seed"):
+            remove_comments(COMMENTS_WITH_DIR, Path(self.output_dir), workers=2)
+
+    def test_remove_comments_manifest(self):
+        manifest_path = os.path.join(self.output_dir, "manifest.txt")
+        output_dir = Path(self.output_dir) / "output"
+
+        # Simulate a run that was interrupted after the first file
+        with ExtractionManifest(manifest_path) as manifest:
+            manifest.add("helloWorld.java")
+
+        remove_comments(
+            COMMENTS_WITH_DIR,
+            output_dir,
+            probability=1,
+            seed=1,
+            manifest_path=manifest_path,
+        )
+
+        # The completed file is not processed again
+        assert not (output_dir / "helloWorld.java").exists()
+        assert_content_equal(
+            COMMENTS_WITHOUT_DIR / "folder/helloWorld.java",
+            output_dir / "folder/helloWorld.java",
+        )
+        assert_lines_equal(manifest_path, 3)
+
+
+def _remove_comments_seeded(comments_remover: CommentsRemover, code: str, seed: int):
+    random.seed(seed)
+    try:
+        return comments_remover.remove_comments(code)
+    except IndexError:
+        return None
+
+
+def _load_expected_output() -> dict:
+    # The output of the previous implementation, None if it raised an IndexError
+    with open(COMMENTS_DIR / "expected.json") as file:
+        return json.load(file)
+
+
+class TestExpectedOutput:
+    def test_snippets(self):
+        expected = _load_expected_output()
+        comments_remover = CommentsRemover(
+            CommentsRemoverConfig(probability=expected["probability"])
+        )
+        for snippet in expected["snippets"]:
+            assert (
+                _remove_comments_seeded(
+                    comments_remover, snippet["code"], snippet["seed"]
+                )
+                == snippet["expected"]
+            ), snippet["code"]
+
+    def test_files(self):
+        expected = _load_expected_output()
+        config = CommentsRemoverConfig(probability=expected["probability"])
+        for file, expected_code in expected["files"].items():
+            code = load_code(CLASSES_DIR / file)
+            assert (
+                _remove_comments_seeded(CommentsRemover(config), code, 0)
+                == expected_code
+            ), file
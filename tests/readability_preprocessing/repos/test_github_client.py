@@ -0,0 +1,334 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.readability_preprocessing.repos.github_client import (
+    CrawlCheckpoint,
+    GitHubClient,
+)
+from src.readability_preprocessing.repos.repository import (
+    GITHUB_CHECKSTYLE_CONF_REG,
+    QueryMode,
+    _build_query,
+    _get_checkstyle_repos,
+    add_latest_commit,
+)
+from tests.readability_preprocessing.utils.utils import DirTest
+
+REPOSITORIES = [f"owner/repo{idx}" for idx in range(5)]
+PER_PAGE = 2
+CHECKSTYLE_FILE_PARAMS = {
+    "q": GITHUB_CHECKSTYLE_CONF_REG,
+    "per_page": PER_PAGE,
+    "first_page": 1,
+}
+
+
+class StubGitHubHandler(BaseHTTPRequestHandler):
+    """
+    Serves a small part of the GitHub API: the code search, repositories and commits.
+    """
+
+    def do_GET(self):  # noqa: N802
+        server = self.server
+        url = urlparse(self.path)
+        with server.lock:
+            server.requests.append(url.path)
+
+        if server.rate_limited:
+            server.rate_limited = False
+            self._send(403, {}, {"X-RateLimit-Remaining": "0"})
+        elif url.path == "/search/code":
+            self._send_search_page(int(parse_qs(url.query)["page"][0]))
+        elif url.path.startswith("/repos/") and "/commits/" in url.path:
+            full_name = url.path.removeprefix("/repos/").split("/commits/")[0]
+            self._send(200, {"sha": f"sha-{full_name}"})
+        elif url.path.startswith("/repos/"):
+            self._send_repository(url.path.removeprefix("/repos/"))
+        else:
+            self._send(404, {})
+
+    def _send_search_page(self, page: int):
+        server = self.server
+        if page in server.failing_pages:
+            self._send(500, {})
+            return
+        names = REPOSITORIES[(page - 1) * PER_PAGE : page * PER_PAGE]
+        items = [
+            {
+                "repository": {
+                    "full_name": name,
+                    "url": f"http://{server.address}/repos/{name}",
+                }
+            }
+            for name in names
+        ]
+        headers = {}
+        if page * PER_PAGE < len(REPOSITORIES):
+            next_url = f"http://{server.address}/search/code?page={page + 1}"
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        self._send(200, {"total_count": len(REPOSITORIES), "items": items}, headers)
+
+    def _send_repository(self, full_name: str):
+        etag = f'"{full_name}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, None)
+            return
+        self._send(
+            200, {"full_name": full_name, "default_branch": "main"}, {"ETag": etag}
+        )
+
+    def _send(self, status: int, body, headers: dict[str, str] | None = None):
+        self.send_response(status)
+        headers = {"X-RateLimit-Remaining": "4000", **(headers or {})}
+        for key, value in headers.items():
+            self.send_header(key, value)
+        content = b"" if body is None else json.dumps(body).encode()
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGitHubServerTest(DirTest):
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubGitHubHandler)
+        self.server.address = f"127.0.0.1:{self.server.server_port}"
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.failing_pages = set()
+        self.server.rate_limited = False
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.sleeps = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def create_client(self, **kwargs) -> GitHubClient:
+        return GitHubClient(
+            api_url=f"http://{self.server.address}",
+            workers=4,
+            sleep=self.sleeps.append,
+            **kwargs,
+        )
+
+
+class TestGitHubClient(StubGitHubServerTest):
+    def test_etag_cache(self):
+        cache_path = os.path.join(self.output_dir, "cache.jsonl")
+        url_parts = ("repos", "owner", "repo0")
+
+        with self.create_client(cache_path=cache_path) as client:
+            first = client.get(client.url(*url_parts))
+
+        # A new client reuses the stored cache
+        with self.create_client(cache_path=cache_path) as client:
+            second = client.get(client.url(*url_parts))
+
+        assert first.ok
+        assert not first.from_cache
+        assert second.ok
+        assert second.from_cache
+        assert second.data == first.data
+
+    def test_etag_cache_appended(self):
+        cache_path = os.path.join(self.output_dir, "cache.jsonl")
+
+        with self.create_client(cache_path=cache_path) as client:
+            client.get(client.url("repos", "owner", "repo0"))
+            client.save_cache()
+            client.get(client.url("repos", "owner", "repo1"))
+            client.get(client.url("repos", "owner", "repo0"))
+
+        # Each cached response is stored once, without rewriting the file
+        with open(cache_path) as cache_file:
+            keys = [json.loads(line)["key"] for line in cache_file]
+        assert keys == [
+            client.url("repos", "owner", "repo0"),
+            client.url("repos", "owner", "repo1"),
+        ]
+
+    def test_get_all(self):
+        client = self.create_client()
+        urls = [client.url("repos", name) for name in REPOSITORIES]
+
+        responses = client.get_all(urls)
+
+        assert [response.data["full_name"] for response in responses] == REPOSITORIES
+
+    def test_rate_limit_backoff(self):
+        self.server.rate_limited = True
+        client = self.create_client(min_remaining=0)
+
+        response = client.get(client.url("repos", "owner", "repo0"))
+
+        # The rate limited request is retried after a pause
+        assert response.ok
+        assert len(self.sleeps) == 1
+        assert self.server.requests == ["/repos/owner/repo0"] * 2
+
+    def test_low_remaining_requests(self):
+        client = self.create_client(min_remaining=5000, max_wait=2)
+
+        client.get(client.url("repos", "owner", "repo0"))
+        client.get(client.url("repos", "owner", "repo1"))
+
+        assert len(self.sleeps) == 1
+        assert 0 < self.sleeps[0] <= 2
+
+    def test_invalid_workers(self):
+        with pytest.raises(ValueError, match="workers"):
+            GitHubClient(workers=0)
+
+
+class TestCrawl(StubGitHubServerTest):
+    def test_get_checkstyle_repos(self):
+        data, last_page = _get_checkstyle_repos(
+            per_page=PER_PAGE, last_page=10, client=self.create_client()
+        )
+
+        assert list(data) == REPOSITORIES
+        assert last_page == 3
+
+    def test_get_checkstyle_repos_last_page(self):
+        data, last_page = _get_checkstyle_repos(
+            per_page=PER_PAGE, last_page=2, client=self.create_client()
+        )
+
+        assert list(data) == REPOSITORIES[:4]
+        assert last_page == 2
+
+    def test_resume_from_checkpoint(self):
+        checkpoint_path = os.path.join(self.output_dir, "checkpoint.jsonl")
+        self.server.failing_pages = {2}
+
+        data, last_page = _get_checkstyle_repos(
+            per_page=PER_PAGE,
+            last_page=10,
+            client=self.create_client(),
+            checkpoint_path=checkpoint_path,
+        )
+        assert list(data) == REPOSITORIES[:2]
+        assert last_page == 2
+        checkpoint = CrawlCheckpoint(checkpoint_path, params=CHECKSTYLE_FILE_PARAMS)
+        assert checkpoint.last_page == 1
+        assert not checkpoint.complete
+
+        # The resumed crawl starts at the failed page
+        self.server.failing_pages = set()
+        self.server.requests.clear()
+        data, last_page = _get_checkstyle_repos(
+            per_page=PER_PAGE,
+            last_page=10,
+            client=self.create_client(),
+            checkpoint_path=checkpoint_path,
+        )
+        assert list(data) == REPOSITORIES
+        assert last_page == 3
+        assert "/repos/owner/repo0" not in self.server.requests
+        assert CrawlCheckpoint(checkpoint_path, params=CHECKSTYLE_FILE_PARAMS).complete
+
+        # A complete crawl is not repeated
+        self.server.requests.clear()
+        data, _ = _get_checkstyle_repos(
+            per_page=PER_PAGE,
+            last_page=10,
+            client=self.create_client(),
+            checkpoint_path=checkpoint_path,
+        )
+        assert list(data) == REPOSITORIES
+        assert self.server.requests == []
+
+    def test_checkpoint_of_other_parameters(self):
+        checkpoint_path = os.path.join(self.output_dir, "checkpoint.jsonl")
+        _get_checkstyle_repos(
+            per_page=PER_PAGE,
+            last_page=10,
+            client=self.create_client(),
+            checkpoint_path=checkpoint_path,
+        )
+
+        # A complete crawl of another query is not reused
+        self.server.requests.clear()
+        data, last_page = _get_checkstyle_repos(
+            per_page=PER_PAGE,
+            last_page=10,
+            mode=QueryMode.POM_WITH_CHECKSTYLE,
+            client=self.create_client(),
+            checkpoint_path=checkpoint_path,
+        )
+        assert list(data) == REPOSITORIES
+        assert last_page == 3
+        assert "/search/code" in self.server.requests
+        checkpoint = CrawlCheckpoint(
+            checkpoint_path,
+            params={
+                "q": _build_query(QueryMode.POM_WITH_CHECKSTYLE),
+                "per_page": PER_PAGE,
+                "first_page": 1,
+            },
+        )
+        assert checkpoint.complete
+
+    def test_resume_after_last_page(self):
+        checkpoint_path = os.path.join(self.output_dir, "checkpoint.jsonl")
+        _get_checkstyle_repos(
+            per_page=PER_PAGE,
+            last_page=1,
+            client=self.create_client(),
+            checkpoint_path=checkpoint_path,
+        )
+
+        # A crawl stopped at its last page is continued with a later last page
+        data, last_page = _get_checkstyle_repos(
+            per_page=PER_PAGE,
+            last_page=10,
+            client=self.create_client(),
+            checkpoint_path=checkpoint_path,
+        )
+        assert list(data) == REPOSITORIES
+        assert last_page == 3
+
+    def test_add_latest_commit(self):
+        data = {name: {"default_branch": "main"} for name in REPOSITORIES}
+
+        data = add_latest_commit(data, client=self.create_client())
+
+        assert [value["latest_commit"] for value in data.values()] == [
+            f"sha-{name}" for name in REPOSITORIES
+        ]
+
+
+def test_checkpoint_without_path():
+    checkpoint = CrawlCheckpoint()
+    checkpoint.save(1, {"repo": {}}, complete=False)
+
+    assert checkpoint.last_page == 1
+    assert checkpoint.data == {"repo": {}}
+
+
+class TestCrawlCheckpoint(DirTest):
+    def test_partially_written_page(self):
+        checkpoint_path = os.path.join(self.output_dir, "checkpoint.jsonl")
+        checkpoint = CrawlCheckpoint(checkpoint_path, params=CHECKSTYLE_FILE_PARAMS)
+        checkpoint.save(1, {"repo0": {}}, complete=False)
+        with open(checkpoint_path, "a") as checkpoint_file:
+            checkpoint_file.write('{"page": 2, "complete": fa')
+
+        # The interrupted page is dropped and the next page is appended after page 1
+        checkpoint = CrawlCheckpoint(checkpoint_path, params=CHECKSTYLE_FILE_PARAMS)
+        assert checkpoint.last_page == 1
+        checkpoint.save(2, {"repo1": {}}, complete=True)
+        checkpoint = CrawlCheckpoint(checkpoint_path, params=CHECKSTYLE_FILE_PARAMS)
+        assert checkpoint.data == {"repo0": {}, "repo1": {}}
+        assert checkpoint.complete
@@ -0,0 +1,120 @@
+import math
+import os
+import shutil
+
+from src.readability_preprocessing.sampling.feature_cache import FeatureCache
+from src.readability_preprocessing.sampling.stratified_sampling import (
+    _extraction_failed,
+    _jar_version,
+    _parse_feature_output,
+    calculate_features,
+)
+from src.readability_preprocessing.utils.snippet_archive import SnippetArchive
+from src.readability_preprocessing.utils.utils import list_java_files, load_code
+from tests.readability_preprocessing.utils.utils import (
+    METHODS_ORIGINAL_ADD_COMMAND_DIR,
+    METHODS_ORIGINAL_DIR,
+    DirTest,
+)
+
+
+class TestFeatureCache(DirTest):
+    def setUp(self):
+        super().setUp()
+        self.cache_path = os.path.join(self.output_dir, "features.sqlite")
+
+    def test_get_put(self):
+        features = {"a": 1.0, "b": math.nan}
+
+        with FeatureCache(self.cache_path, "v1") as cache:
+            assert cache.get("key") is None
+            cache.put("key", features)
+            cached = cache.get("key")
+
+            assert cache.hits == 1
+            assert cache.misses == 1
+            assert len(cache) == 1
+
+        assert list(cached.keys()) == ["a", "b"]
+        assert cached["a"] == 1.0
+        assert math.isnan(cached["b"])
+
+    def test_persistence(self):
+        with FeatureCache(self.cache_path, "v1") as cache:
+            cache.put("key", {"a": 1.0})
+
+        with FeatureCache(self.cache_path, "v1") as cache:
+            assert len(cache) == 1
+            assert cache.get("key") == {"a": 1.0}
+
+    def test_key(self):
+        snippet = METHODS_ORIGINAL_DIR / "AreaShop/AddCommand.java/execute.java"
+        other_snippet = METHODS_ORIGINAL_DIR / "AreaShop/AddCommand.java/getHelp.java"
+        moved_snippet = os.path.join(self.output_dir, "moved.java")
+        shutil.copy(snippet, moved_snippet)
+
+        with FeatureCache(self.cache_path, "v1") as cache:
+            key = cache.key(snippet)
+            assert key == cache.key(moved_snippet)
+            assert key != cache.key(other_snippet)
+
+        with FeatureCache(self.cache_path, "v2") as cache:
+            assert key != cache.key(snippet)
+
+    def test_eviction(self):
+        with FeatureCache(self.cache_path, "v1", max_entries=2) as cache:
+            cache.put("first", {"a": 1.0})
+            cache.put("second", {"a": 2.0})
+            cache.get("first")
+            cache.put("third", {"a": 3.0})
+
+            assert len(cache) == 2
+            assert cache.get("second") is None
+            assert cache.get("first") == {"a": 1.0}
+            assert cache.get("third") == {"a": 3.0}
+
+    def test_calculate_features_from_cache(self):
+        # Fill the cache, so that no snippet needs to be extracted
+        paths = list_java_files(str(METHODS_ORIGINAL_ADD_COMMAND_DIR))
+        with FeatureCache(self.cache_path, _jar_version()) as cache:
+            for idx, path in enumerate(paths):
+                cache.put(cache.key(path), {"a": float(idx), "b": math.nan})
+
+        features = calculate_features(
+            str(METHODS_ORIGINAL_ADD_COMMAND_DIR),
+            self.output_dir,
+            cache_path=self.cache_path,
+        )
+
+        assert list(features.keys()) == paths
+        for idx, path in enumerate(paths):
+            assert features[path]["a"] == float(idx)
+            assert math.isnan(features[path]["b"])
+        assert os.path.isfile(os.path.join(self.output_dir, "features.csv"))
+
+    def test_calculate_features_from_archive(self):
+        archive_dir = os.path.join(self.output_dir, "archive")
+        paths = list_java_files(str(METHODS_ORIGINAL_ADD_COMMAND_DIR))
+        with SnippetArchive(archive_dir) as archive:
+            for path in paths:
+                archive.append(os.path.basename(path), load_code(path))
+
+        # The snippets of the archive have the same cache keys as the files
+        with FeatureCache(self.cache_path, _jar_version()) as cache:
+            for idx, path in enumerate(paths):
+                cache.put(cache.key(path), {"a": float(idx)})
+
+        features = calculate_features(
+            archive_dir, self.output_dir, cache_path=self.cache_path
+        )
+
+        assert list(features.keys()) == [
+            os.path.join(os.path.abspath(archive_dir), os.path.basename(path))
+            for path in paths
+        ]
+        assert [feature["a"] for feature in features.values()] == [0.0, 1.0, 2.0, 3.0]
+
+    def test_extraction_failed(self):
+        # A JVM that fails to start or crashes prints no features
+        assert _extraction_failed(_parse_feature_output(""))
+        assert not _extraction_failed({"a": math.nan, "b": 0.0})
@@ -3,16 +3,24 @@ import math
 import os
 
 import numpy as np
+import pytest
+from fastcluster import linkage_vector
+from scipy.cluster.hierarchy import fcluster
 
 from src.readability_preprocessing.sampling.stratified_sampling import (
     StratifiedSampler,
     _calculate_similarity_matrix,
+    _cut_all_levels,
     _extract_features,
     _normalize_features,
     _parse_feature_output,
     calculate_features,
+    export_stratas,
+)
+from src.readability_preprocessing.utils.csv import (
+    load_feature_matrix_from_csv,
+    load_features_from_csv,
 )
-from src.readability_preprocessing.utils.csv import load_features_from_csv
 from tests.readability_preprocessing.utils.utils import (
     CSV_DIR,
     JAR_OUTPUTS_DIR,
@@ -160,6 +168,25 @@ class TestCalculateFeatures:
                 assert isinstance(feature_value, float)
                 assert feature_value >= 0.0 or math.isnan(feature_value)
 
+    def test_calculate_features_workers(self):
+        folder = "AreaShop/AddCommand.java"
+        dir = os.path.join(METHODS_ORIGINAL_DIR, folder)
+        features = calculate_features(dir)
+        features_parallel = calculate_features(dir, workers=2)
+
+        assert list(features_parallel.keys()) == list(features.keys())
+        for path, feature in features.items():
+            for feature_name, feature_value in feature.items():
+                parallel_value = features_parallel[path][feature_name]
+                assert feature_value == parallel_value or (
+                    math.isnan(feature_value) and math.isnan(parallel_value)
+                )
+
+    def test_calculate_features_invalid_workers(self):
+        dir = os.path.join(METHODS_ORIGINAL_DIR, "AreaShop/AddCommand.java")
+        with pytest.raises(ValueError, match="workers"):
+            calculate_features(dir, workers=0)
+
 
 class TestStratifiedSampling(DirTest):
     def setUp(self):
@@ -270,3 +297,115 @@ class TestStratifiedSampling(DirTest):
         assert_lines_equal(
             os.path.join(self.output_dir, "3_stratas_all", "stratum2.txt"), 4
         )
+
+    def test_sample_matrix(self):
+        paths, _, features = load_feature_matrix_from_csv(
+            os.path.join(CSV_DIR, "features.csv")
+        )
+        self.sampler.sample_matrix(
+            java_code_snippet_paths=paths,
+            features=features,
+            max_num_stratas=3,
+            num_snippets=4,
+        )
+
+        output_dir_content = os.listdir(self.output_dir)
+        assert "merge_distances.json" in output_dir_content
+        assert "2_stratas_all" in output_dir_content
+        assert_lines_equal(
+            os.path.join(self.output_dir, "2_stratas_all", "stratum0.txt"), 2
+        )
+        assert_lines_equal(
+            os.path.join(self.output_dir, "2_stratas_all", "stratum1.txt"), 6
+        )
+
+    def test_sample_matrix_vector(self):
+        paths, _, features = load_feature_matrix_from_csv(
+            os.path.join(CSV_DIR, "features.csv")
+        )
+        self.sampler.sample_matrix(
+            java_code_snippet_paths=paths,
+            features=features,
+            max_num_stratas=3,
+            num_snippets=4,
+            engine="vector",
+        )
+
+        output_dir_content = os.listdir(self.output_dir)
+        assert "similarity_matrix.npy" not in output_dir_content
+        assert "linkage_matrix.npy" in output_dir_content
+        for num_stratas in [2, 3]:
+            stratas_dir = os.path.join(self.output_dir, f"{num_stratas}_stratas_all")
+            sampled = []
+            for stratum_idx in range(num_stratas):
+                with open(os.path.join(stratas_dir, f"stratum{stratum_idx}.txt")) as f:
+                    stratum = f.read().splitlines()
+                assert len(stratum) > 0
+                sampled += stratum
+            assert sorted(sampled) == sorted(paths)
+
+    def test_sample_matrix_kmeans(self):
+        paths, _, features = load_feature_matrix_from_csv(
+            os.path.join(CSV_DIR, "features.csv")
+        )
+        self.sampler.sample_matrix(
+            java_code_snippet_paths=paths,
+            features=features,
+            max_num_stratas=3,
+            num_snippets=4,
+            engine="kmeans",
+            num_micro_clusters=5,
+        )
+
+        micro_clusters = np.load(os.path.join(self.output_dir, "micro_clusters.npy"))
+        assert micro_clusters.shape == (len(paths),)
+        linkage_matrix = np.load(os.path.join(self.output_dir, "linkage_matrix.npy"))
+        assert linkage_matrix.shape == (4, 4)
+
+        stratas_dir = os.path.join(self.output_dir, "3_stratas_all")
+        sampled = []
+        for stratum_idx in range(3):
+            with open(os.path.join(stratas_dir, f"stratum{stratum_idx}.txt")) as f:
+                sampled += f.read().splitlines()
+        assert sorted(sampled) == sorted(paths)
+
+    def test_sample_matrix_unknown_engine(self):
+        with pytest.raises(ValueError, match="engine"):
+            self.sampler.sample_matrix(
+                java_code_snippet_paths=["a.java"], features=[[1.0]], engine="unknown"
+            )
+
+    def test_cut_all_levels(self):
+        features = np.random.default_rng(42).random((50, 5))
+        linkage_matrix = linkage_vector(features, method="ward")
+
+        table = _cut_all_levels(linkage_matrix, max_num_stratas=20)
+
+        assert table.shape == (50, 19)
+        assert table.dtype == np.uint8
+        for num_stratas in range(2, 21):
+            clusters = fcluster(linkage_matrix, num_stratas, criterion="maxclust")
+            assert np.array_equal(table[:, num_stratas - 2], clusters - 1)
+
+    def test_sample_assignment_table(self):
+        sampler = StratifiedSampler(output_dir=self.output_dir, assignment_table=True)
+        features = load_features_from_csv(os.path.join(CSV_DIR, "features.csv"))
+        sampler.sample(features=features, max_num_stratas=3, num_snippets=4)
+
+        output_dir_content = os.listdir(self.output_dir)
+        assert "2_stratas_all" not in output_dir_content
+        table = np.load(os.path.join(self.output_dir, "stratas.npy"))
+        sampled = np.load(os.path.join(self.output_dir, "stratas_sampled.npy"))
+        assert table.shape == (8, 2)
+        assert sampled.shape == (8, 2)
+
+        # Same stratas as the stratum files of the default mode
+        assert np.bincount(table[:, 0]).tolist() == [2, 6]
+        assert np.bincount(table[:, 1]).tolist() == [2, 2, 4]
+        assert sampled.sum(axis=0).tolist() == [4, 6]
+
+        # Export a level as stratum files
+        export_dir = os.path.join(self.output_dir, "3_stratas_2")
+        export_stratas(self.output_dir, 3, export_dir)
+        for stratum_idx in range(3):
+            assert_lines_equal(os.path.join(export_dir, f"stratum{stratum_idx}.txt"), 2)
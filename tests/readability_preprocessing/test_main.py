@@ -4,15 +4,19 @@ from pathlib import Path
 
 from src.readability_preprocessing.extractors.method_extractor import OverwriteMode
 from src.readability_preprocessing.main import (
+    _run_agreement,
+    _run_balance,
     _run_combine_datasets,
     _run_convert_csv,
     _run_convert_two_folders,
     _run_craft_surveys,
+    _run_deduplicate,
     _run_download,
     _run_extract_diff,
     _run_extract_files,
     _run_extract_methods,
     _run_extract_sampled,
+    _run_near_duplicates,
     _run_remove_comments,
     _run_stratified_sampling,
     _run_upload,
@@ -30,6 +34,7 @@ from tests.readability_preprocessing.utils.utils import (
     SAMPLE_AMOUNT_FILE,
     SAMPLED_DIR_2_2,
     SELECTED_CLASSES_DIR,
+    SURVEYS_DIR,
     DirTest,
 )
 
@@ -42,6 +47,13 @@ class TestRunMain(DirTest):
                 self.output = output
                 self.num_stratas = 2
                 self.num_snippets = 2
+                self.workers = 1
+                self.cache = None
+                self.cache_size = 100
+                self.feature_format = "csv"
+                self.engine = "similarity"
+                self.num_micro_clusters = 1000
+                self.assignment_table = False
 
         parsed_args = MockParsedArgs()
 
@@ -57,6 +69,8 @@ class TestRunMain(DirTest):
                 self.input = [METHODS_ORIGINAL_DIR]
                 self.sampling = SAMPLED_DIR_2_2
                 self.output = output
+                self.matching = "substring"
+                self.materialization = "copy"
 
         parsed_args = MockParsedArgs()
 
@@ -72,6 +86,7 @@ class TestRunMain(DirTest):
                 self.input = CHECKSTYLED_DIR
                 self.output = save
                 self.non_violated_subdir = "non_violated"
+                self.materialization = "copy"
 
         parsed_args = MockParsedArgs()
 
@@ -90,6 +105,10 @@ class TestRunMain(DirTest):
                 self.not_include_comments = False
                 self.comments_not_required = True
                 self.not_remove_indentation = False
+                self.workers = 1
+                self.manifest = None
+                self.engine = "parser"
+                self.output_format = "files"
 
         parsed_args = MockParsedArgs()
 
@@ -106,6 +125,7 @@ class TestRunMain(DirTest):
                 self.csv = RAW_BW_DIR / "scores.csv"
                 self.output = save
                 self.dataset_type = "BW"
+                self.streaming = False
 
         parsed_args = MockParsedArgs()
 
@@ -123,6 +143,7 @@ class TestRunMain(DirTest):
                 self.output = save
                 self.readable_score = 4.5
                 self.not_readable_score = 1.5
+                self.streaming = False
 
         parsed_args = MockParsedArgs()
 
@@ -147,6 +168,74 @@ class TestRunMain(DirTest):
         # Assert that the datasets have been combined successfully
         assert len(os.listdir(self.output_dir)) != 0
 
+    def test_run_balance(self):
+        class MockParsedArgs:
+            def __init__(self, save: str = self.output_dir):
+                self.input = str(ENCODED_BW_DIR)
+                self.output = save
+                self.seed = 42
+
+        parsed_args = MockParsedArgs()
+
+        # Balancing the dataset within the test
+        _run_balance(parsed_args)
+
+        # Assert that the dataset has been balanced successfully
+        assert len(os.listdir(self.output_dir)) != 0
+
+    def test_run_deduplicate(self):
+        class MockParsedArgs:
+            def __init__(self, save: str = self.output_dir):
+                self.input = str(ENCODED_BW_DIR)
+                self.output = save
+                self.original_score = 3.68
+
+        parsed_args = MockParsedArgs()
+
+        # Removing the duplicates within the test
+        _run_deduplicate(parsed_args)
+
+        # Assert that the duplicates have been removed successfully
+        assert len(os.listdir(self.output_dir)) != 0
+
+    def test_run_near_duplicates(self):
+        class MockParsedArgs:
+            def __init__(self, save: str = self.output_dir):
+                self.input = [str(ENCODED_BW_DIR)]
+                self.output = save
+                self.threshold = 0.8
+                self.drop = True
+                self.num_permutations = 128
+                self.shingle_size = 5
+
+        parsed_args = MockParsedArgs()
+
+        # Finding the near-duplicates within the test
+        _run_near_duplicates(parsed_args)
+
+        # Assert that the report and the dataset have been stored successfully
+        assert "near_duplicates.csv" in os.listdir(self.output_dir)
+        assert "bw" in os.listdir(self.output_dir)
+
+    def test_run_agreement(self):
+        class MockParsedArgs:
+            def __init__(self, save: str = self.output_dir):
+                self.input = str(SURVEYS_DIR)
+                self.output = save
+                self.levels = ["nominal", "ordinal", "interval"]
+                self.num_bootstrap = 100
+                self.confidence = 0.95
+                self.seed = 42
+                self.workers = 1
+
+        parsed_args = MockParsedArgs()
+
+        # Computing the agreement within the test
+        _run_agreement(parsed_args)
+
+        # Assert that the report has been stored successfully
+        assert "agreement.csv" in os.listdir(self.output_dir)
+
     def test_run_download(self):
         class MockParsedArgs:
             def __init__(self, temp_dir_name: str = self.output_dir):
@@ -190,6 +279,8 @@ class TestRunMain(DirTest):
                 self.original_name = "methods"
                 self.nomod_name = "none"
                 self.exclude_path = None
+                self.materialization = "copy"
+                self.digest_index = None
 
         parsed_args = MockParsedArgs()
 
@@ -205,6 +296,9 @@ class TestRunMain(DirTest):
                 self.input = EXTRACTED_2_DIR
                 self.output = None
                 self.methods_dir_name = "methods"
+                self.digest_index = None
+                self.streaming = False
+                self.workers = 1
 
         parsed_args = MockParsedArgs()
 
@@ -217,6 +311,9 @@ class TestRunMain(DirTest):
                 self.input = EXTRACTED_DIR
                 self.output = save
                 self.probability = 0.1
+                self.seed = None
+                self.workers = 1
+                self.manifest = None
 
         parsed_args = MockParsedArgs()
 
@@ -0,0 +1,107 @@
+import math
+import os
+
+import numpy as np
+
+from src.readability_preprocessing.utils.csv import (
+    load_feature_matrix_from_csv,
+    load_features_from_csv,
+    load_header,
+)
+from src.readability_preprocessing.utils.feature_store import (
+    MATRIX_FILE_NAME,
+    PATHS_FILE_NAME,
+    FeatureStore,
+)
+from tests.readability_preprocessing.utils.utils import CSV_DIR, DirTest
+
+
+class TestFeatureStore(DirTest):
+    def setUp(self):
+        super().setUp()
+        self.store_dir = os.path.join(self.output_dir, "features")
+
+    def test_append_load(self):
+        with FeatureStore(self.store_dir, ["a", "b"], buffer_size=2) as store:
+            store.append("first.java", {"a": 1.0, "b": 2.0})
+            store.append("second.java", {"b": 4.0, "a": 3.0})
+            store.append("third.java", {"a": 5.0})
+
+        assert FeatureStore.is_store(self.store_dir)
+        paths, matrix = FeatureStore(self.store_dir).load()
+
+        assert paths == ["first.java", "second.java", "third.java"]
+        assert matrix.dtype == np.float32
+        assert matrix.shape == (3, 2)
+        assert matrix[1].tolist() == [3.0, 4.0]
+        assert matrix[2, 0] == 5.0
+        assert math.isnan(matrix[2, 1])
+
+    def test_append_existing(self):
+        with FeatureStore(self.store_dir, ["a", "b"]) as store:
+            store.append("first.java", {"a": 1.0, "b": 2.0})
+
+        # The feature names are taken from the existing store
+        with FeatureStore(self.store_dir) as store:
+            assert store.feature_names == ["a", "b"]
+            store.append("second.java", {"a": 3.0, "b": 4.0})
+
+        paths, matrix = FeatureStore(self.store_dir).load(mmap=False)
+        assert paths == ["first.java", "second.java"]
+        assert matrix.tolist() == [[1.0, 2.0], [3.0, 4.0]]
+
+    def test_load_incomplete_flush(self):
+        with FeatureStore(self.store_dir, ["a", "b"]) as store:
+            store.append("first.java", {"a": 1.0, "b": 2.0})
+
+        # Simulate an interrupted flush that only wrote half a row
+        with open(os.path.join(self.store_dir, MATRIX_FILE_NAME), "ab") as f:
+            np.array([7.0], dtype=np.float32).tofile(f)
+
+        paths, matrix = FeatureStore(self.store_dir).load()
+        assert paths == ["first.java"]
+        assert matrix.shape == (1, 2)
+
+    def test_append_after_incomplete_flush(self):
+        with FeatureStore(self.store_dir, ["a", "b"]) as store:
+            store.append("first.java", {"a": 1.0, "b": 2.0})
+
+        # Simulate a flush that was interrupted after writing the matrix and
+        # part of the paths
+        with open(os.path.join(self.store_dir, MATRIX_FILE_NAME), "ab") as f:
+            np.array([[3.0, 4.0], [5.0, 6.0]], dtype=np.float32).tofile(f)
+        with open(os.path.join(self.store_dir, PATHS_FILE_NAME), "a") as f:
+            f.write("second.java\nthi")
+
+        with FeatureStore(self.store_dir) as store:
+            store.append("fourth.java", {"a": 7.0, "b": 8.0})
+
+        # The rows of the interrupted flush are discarded
+        paths, matrix = FeatureStore(self.store_dir).load(mmap=False)
+        assert paths == ["first.java", "second.java", "fourth.java"]
+        assert matrix.tolist() == [[1.0, 2.0], [3.0, 4.0], [7.0, 8.0]]
+
+    def test_default_feature_names(self):
+        store = FeatureStore(self.store_dir)
+        assert store.feature_names == load_header()[1:]
+
+    def test_to_dict(self):
+        with FeatureStore(self.store_dir, ["a", "b"]) as store:
+            store.append("first.java", {"a": 1.0, "b": 2.0})
+
+        assert FeatureStore(self.store_dir).to_dict() == {
+            "first.java": {"a": 1.0, "b": 2.0}
+        }
+
+
+def test_load_feature_matrix_from_csv():
+    csv_path = os.path.join(CSV_DIR, "features.csv")
+
+    paths, feature_names, matrix = load_feature_matrix_from_csv(csv_path)
+    features = load_features_from_csv(csv_path)
+
+    assert paths == list(features.keys())
+    assert feature_names == load_header()[1:]
+    assert matrix.shape == (len(paths), len(feature_names))
+    expected = np.array([list(feature.values()) for feature in features.values()])
+    assert np.array_equal(matrix, expected, equal_nan=True)
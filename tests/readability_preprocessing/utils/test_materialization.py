@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from src.readability_preprocessing.utils.materialization import (
+    MANIFEST_FILE_NAME,
+    MaterializationMode,
+    Materializer,
+    load_manifest,
+)
+from tests.readability_preprocessing.utils.utils import DirTest
+
+
+class TestMaterializer(DirTest):
+    def setUp(self):
+        super().setUp()
+        self.source = os.path.join(self.output_dir, "source.java")
+        with open(self.source, "w") as f:
+            f.write("class A {}")
+        self.destination = os.path.join(self.output_dir, "destination.java")
+
+    def _read_destination(self) -> str:
+        with open(self.destination) as f:
+            return f.read()
+
+    def test_copy(self):
+        with Materializer(MaterializationMode.COPY) as materializer:
+            materializer.materialize(self.source, self.destination)
+
+        assert self._read_destination() == "class A {}"
+        assert not os.path.samefile(self.source, self.destination)
+
+    def test_hardlink(self):
+        with Materializer(MaterializationMode.HARDLINK) as materializer:
+            materializer.materialize(self.source, self.destination)
+            # An existing destination is replaced
+            materializer.materialize(self.source, self.destination)
+
+        assert os.path.samefile(self.source, self.destination)
+        assert not os.path.islink(self.destination)
+
+    def test_copy_over_links(self):
+        for mode in [MaterializationMode.HARDLINK, MaterializationMode.SYMLINK]:
+            with Materializer(mode) as materializer:
+                materializer.materialize(self.source, self.destination)
+            with Materializer(MaterializationMode.COPY) as materializer:
+                materializer.write("class B {}", self.destination)
+
+            # The link is replaced instead of written through to the source
+            assert self._read_destination() == "class B {}"
+            with open(self.source) as f:
+                assert f.read() == "class A {}"
+
+            with Materializer(mode) as materializer:
+                materializer.materialize(self.source, self.destination)
+            with Materializer(MaterializationMode.COPY) as materializer:
+                materializer.materialize(self.source, self.destination)
+
+            assert not os.path.islink(self.destination)
+            assert not os.path.samefile(self.source, self.destination)
+
+    def test_symlink(self):
+        with Materializer(MaterializationMode.SYMLINK) as materializer:
+            materializer.materialize(self.source, self.destination)
+
+        assert os.path.islink(self.destination)
+        assert self._read_destination() == "class A {}"
+
+    def test_reflink(self):
+        with Materializer(MaterializationMode.REFLINK) as materializer:
+            materializer.materialize(self.source, self.destination)
+
+        # Without copy-on-write support, the file is copied
+        assert self._read_destination() == "class A {}"
+        assert not os.path.samefile(self.source, self.destination)
+
+    def test_materialize_into_directory(self):
+        target_dir = os.path.join(self.output_dir, "target")
+        os.makedirs(target_dir)
+        with Materializer(MaterializationMode.HARDLINK) as materializer:
+            materializer.materialize(self.source, target_dir)
+
+        assert os.path.samefile(self.source, os.path.join(target_dir, "source.java"))
+
+    def test_manifest(self):
+        output_dir = os.path.join(self.output_dir, "output")
+        with Materializer(MaterializationMode.MANIFEST, output_dir) as materializer:
+            materializer.materialize(
+                self.source, os.path.join(output_dir, "a", "source.java")
+            )
+            materializer.write("class B {}", os.path.join(output_dir, "b.java"), "x")
+
+        assert os.listdir(output_dir) == [MANIFEST_FILE_NAME]
+        assert load_manifest(output_dir) == {
+            "a/source.java": os.path.abspath(self.source),
+            "b.java": os.path.abspath("x"),
+        }
+
+    def test_manifest_without_output_dir(self):
+        with pytest.raises(ValueError, match="output directory"):
+            Materializer(MaterializationMode.MANIFEST)
+
+    def test_write(self):
+        with Materializer(MaterializationMode.HARDLINK) as materializer:
+            materializer.write("class B {}", self.destination, source=self.source)
+
+        assert self._read_destination() == "class B {}"
@@ -0,0 +1,98 @@
+import os
+
+from src.readability_preprocessing.utils.snippet_archive import (
+    INDEX_FILE_NAME,
+    SnippetArchive,
+)
+from tests.readability_preprocessing.utils.utils import DirTest
+
+
+class TestSnippetArchive(DirTest):
+    def setUp(self):
+        super().setUp()
+        self.archive_dir = os.path.join(self.output_dir, "archive")
+
+    def test_append_read(self):
+        with SnippetArchive(self.archive_dir) as archive:
+            archive.append("project/A.java/first.java", "void first() {}")
+            archive.append("project/A.java/second.java", 'void second() { "ü"; }')
+
+        assert SnippetArchive.is_archive(self.archive_dir)
+        archive = SnippetArchive(self.archive_dir)
+        assert len(archive) == 2
+        assert archive.paths() == [
+            "project/A.java/first.java",
+            "project/A.java/second.java",
+        ]
+        assert archive.read("project/A.java/second.java") == 'void second() { "ü"; }'
+        assert list(archive.items()) == [
+            ("project/A.java/first.java", "void first() {}"),
+            ("project/A.java/second.java", 'void second() { "ü"; }'),
+        ]
+
+    def test_absolute_paths(self):
+        with SnippetArchive(self.archive_dir) as archive:
+            archive.append("project/A.java/first.java", "void first() {}")
+
+            absolute_path = archive.absolute_path("project/A.java/first.java")
+            assert absolute_path == os.path.join(
+                os.path.abspath(self.archive_dir), "project", "A.java", "first.java"
+            )
+            assert archive.read(absolute_path) == "void first() {}"
+            assert absolute_path in archive
+
+    def test_contains(self):
+        with SnippetArchive(self.archive_dir) as archive:
+            archive.append("project/A.java/first.java", "void first() {}")
+
+            assert "project/A.java/first.java" in archive
+            assert "project/A.java" in archive
+            assert "project" in archive
+            assert "project/B.java" not in archive
+            assert archive.is_snippet("project/A.java/first.java")
+            assert not archive.is_snippet("project/A.java")
+
+    def test_reopen_and_replace(self):
+        with SnippetArchive(self.archive_dir) as archive:
+            archive.append("first.java", "old")
+            archive.append("second.java", "second")
+
+        with SnippetArchive(self.archive_dir) as archive:
+            archive.append("first.java", "new")
+
+        archive = SnippetArchive(self.archive_dir)
+        assert archive.paths() == ["first.java", "second.java"]
+        assert archive.read("first.java") == "new"
+        assert dict(archive.items()) == {"first.java": "new", "second.java": "second"}
+
+    def test_shards(self):
+        with SnippetArchive(self.archive_dir, max_shard_size=100) as archive:
+            for idx in range(10):
+                archive.append(f"snippet{idx}.java", "x" * 40)
+
+        shards = [file for file in os.listdir(self.archive_dir) if "jsonl" in file]
+        assert len(shards) == 10
+        archive = SnippetArchive(self.archive_dir)
+        assert [code for _, code in archive.items()] == ["x" * 40] * 10
+        assert archive.read("snippet7.java") == "x" * 40
+
+    def test_incomplete_write(self):
+        with SnippetArchive(self.archive_dir) as archive:
+            archive.append("first.java", "first")
+
+        # Simulate a crash that wrote a partial snippet and index entry
+        archive = SnippetArchive(self.archive_dir)
+        with open(archive._shard_path(0), "ab") as shard_file:
+            shard_file.write(b'{"path": "second.java", "co')
+        with open(os.path.join(self.archive_dir, INDEX_FILE_NAME), "a") as index:
+            index.write("second.java\t0\t")
+
+        archive = SnippetArchive(self.archive_dir)
+        assert archive.paths() == ["first.java"]
+        assert list(archive.items()) == [("first.java", "first")]
+
+        # Appending removes the partial snippet
+        with archive:
+            archive.append("third.java", "third")
+        archive = SnippetArchive(self.archive_dir)
+        assert dict(archive.items()) == {"first.java": "first", "third.java": "third"}
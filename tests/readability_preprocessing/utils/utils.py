@@ -31,6 +31,7 @@ CHECKSTYLED_DIR = RES_DIR / "checkstyled/"
 CLASSES_DIR = RES_DIR / "classes/"
 SELECTED_CLASSES_DIR = CLASSES_DIR / "selected/"
 CRAFTED_CLASSES_DIR = CLASSES_DIR / "crafted/"
+MODERN_CLASSES_DIR = CLASSES_DIR / "modern/"
 
 SAMPLED_DIR = RES_DIR / "sampled/"
 SAMPLED_DIR_2_2 = SAMPLED_DIR / "2_stratas_2/"
@@ -52,6 +53,7 @@ SAMPLE_AMOUNT_FILE = RES_DIR / "sample_amount.yaml"
 COMMENTS_DIR = RES_DIR / "comments/"
 COMMENTS_WITH_DIR = COMMENTS_DIR / "with/"
 COMMENTS_WITHOUT_DIR = COMMENTS_DIR / "without/"
+SURVEYS_DIR = RES_DIR / "surveys/"
 
 
 class DirTest(unittest.TestCase):
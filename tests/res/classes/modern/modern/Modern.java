@@ -0,0 +1,36 @@
+package modern;
+
+public class Modern {
+
+    /**
+     * A point with two coordinates.
+     */
+    public record Point(int x, int y) {
+
+        /**
+         * Returns the sum of the coordinates.
+         */
+        public int sum() {
+            return x + y;
+        }
+    }
+
+    /**
+     * Returns a greeting as text block.
+     */
+    public String greeting() {
+        return """
+            Hello {
+            """;
+    }
+
+    /**
+     * Returns the name of a number with a switch expression.
+     */
+    public String name(int number) {
+        return switch (number) {
+            case 1 -> "one";
+            default -> "many";
+        };
+    }
+}